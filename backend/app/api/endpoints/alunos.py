@@ -2,15 +2,26 @@
 Endpoints para gestão de alunos
 """
 
-from fastapi import APIRouter, HTTPException, Query
+import time
+
+from fastapi import APIRouter, HTTPException, Query, Request, UploadFile, File
 from typing import List, Optional
 from uuid import UUID
 from datetime import date
 
-from app.models.database import get_supabase
+from app.models.database import get_supabase, executar
+from app.services.cache_respostas import (
+    buscar, calcular_etag, guardar, invalidar_turmas, responder, tag_aluno, tag_turma
+)
+from app.services.escopo_escola import escola_atual, escopar
+from app.services.serializacao import RespostaJSONRapida, alunos_para_resposta, json_bytes
+from app.services.turmas import contar_alunos_ativos
+from app.services.paginacao import decodificar_cursor, filtro_keyset, proximo_cursor
+from app.services.importacao_alunos import importar_alunos, ArquivoImportacaoInvalido
+from app.services.busca_alunos import buscar_alunos, obter_indice_busca
 from app.models.schemas import (
-    AlunoCreate, AlunoUpdate, AlunoResponse,
-    MessageResponse, ErrorResponse
+    AlunoCreate, AlunoUpdate, AlunoResponse, ImportacaoAlunosResponse,
+    BuscaAlunosResponse, MessageResponse, ErrorResponse
 )
 
 router = APIRouter(
@@ -20,6 +31,16 @@ router = APIRouter(
 )
 
 
+async def _matricula_em_uso(matricula: str, escola_id: Optional[str], ignorar_id: Optional[UUID] = None) -> bool:
+    """Matrícula já usada por outro aluno da escola (UNIQUE(escola_id, matricula))"""
+    query = escopar(get_supabase().table("alunos").select("id").eq("matricula", matricula))
+    if escola_id:
+        query = query.eq("escola_id", str(escola_id))
+    if ignorar_id:
+        query = query.neq("id", str(ignorar_id))
+    return bool((await executar(query)).data)
+
+
 @router.post("/", response_model=AlunoResponse, status_code=201)
 async def criar_aluno(aluno: AlunoCreate):
     """
@@ -40,25 +61,12 @@ async def criar_aluno(aluno: AlunoCreate):
     try:
         supabase = get_supabase()
         
-        # Verificar se matrícula já existe
-        existing = supabase.table("alunos")\
-            .select("id")\
-            .eq("matricula", aluno.matricula)\
-            .execute()
-            
-        if existing.data:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Matrícula '{aluno.matricula}' já está em uso"
-            )
-        
-        # Verificar se turma existe
+        # Verificar se turma existe (na escola da requisição)
         try:
-            turma = supabase.table("turmas")\
-                .select("id, capacidade_maxima")\
-                .eq("id", str(aluno.turma_id))\
-                .single()\
-                .execute()
+            turma = await executar(
+                escopar(supabase.table("turmas").select("id, capacidade_maxima, escola_id").eq("id", str(aluno.turma_id)))
+                .single()
+            )
         except Exception:
             raise HTTPException(
                 status_code=404, 
@@ -68,15 +76,19 @@ async def criar_aluno(aluno: AlunoCreate):
         if not turma.data:
             raise HTTPException(status_code=404, detail="Turma não encontrada")
         
+        # Verificar se matrícula já existe na escola da turma
+        if await _matricula_em_uso(aluno.matricula, turma.data.get("escola_id")):
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Matrícula '{aluno.matricula}' já está em uso"
+            )
+        
         # Verificar capacidade da turma (se definida)
         if turma.data.get('capacidade_maxima'):
-            count_result = supabase.table("alunos")\
-                .select("id", count="exact")\
-                .eq("turma_id", str(aluno.turma_id))\
-                .eq("ativo", True)\
-                .execute()
+            contagens = await contar_alunos_ativos([aluno.turma_id])
+            quantidade_atual = contagens[str(aluno.turma_id)]
                 
-            if count_result.count >= turma.data['capacidade_maxima']:
+            if quantidade_atual >= turma.data['capacidade_maxima']:
                 raise HTTPException(
                     status_code=400, 
                     detail="Turma já atingiu a capacidade máxima"
@@ -104,10 +116,12 @@ async def criar_aluno(aluno: AlunoCreate):
         data = aluno.model_dump(mode="json")
         
         # Inserir no banco
-        result = supabase.table("alunos").insert(data).execute()
+        result = await executar(supabase.table("alunos").insert(data))
         
         if not result.data:
             raise HTTPException(status_code=400, detail="Erro ao criar aluno")
+        invalidar_turmas([aluno.turma_id])
+        obter_indice_busca().registrar(result.data[0])
             
         return AlunoResponse(**result.data[0])
         
@@ -117,6 +131,30 @@ async def criar_aluno(aluno: AlunoCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/importar", response_model=ImportacaoAlunosResponse)
+async def importar_alunos_arquivo(
+    arquivo: UploadFile = File(..., description="Planilha .csv ou .xlsx com cabeçalho"),
+    simular: bool = Query(False, description="Apenas validar, sem gravar")
+):
+    """
+    Importa alunos em massa a partir de CSV ou XLSX
+    
+    Colunas seguem os campos de criação de aluno (**matricula**, **nome**,
+    **data_nascimento**, **turma_id**, ...). Linhas inválidas são devolvidas
+    em `erros` com o número da linha; as válidas são inseridas em lotes.
+    """
+    try:
+        conteudo = await arquivo.read()
+        return await importar_alunos(arquivo.filename, conteudo, simular=simular)
+        
+    except ArquivoImportacaoInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/", response_model=List[AlunoResponse])
 async def listar_alunos(
     turma_id: Optional[UUID] = Query(None, description="Filtrar por turma"),
@@ -124,16 +162,20 @@ async def listar_alunos(
     ativo: bool = Query(True, description="Mostrar apenas alunos ativos"),
     ordenar_por: str = Query("nome", description="Ordenar por: nome, idade, matricula"),
     limite: int = Query(50, ge=1, le=100, description="Limite de resultados"),
-    offset: int = Query(0, ge=0, description="Offset para paginação")
+    offset: int = Query(0, ge=0, description="Offset para paginação (prefira cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)")
 ):
     """
     Lista alunos com filtros opcionais
+    
+    A próxima página vem no header **X-Next-Cursor**; envie-o em `cursor`
+    para continuar a listagem com custo constante por página.
     """
     try:
         supabase = get_supabase()
         
-        # Começar query
-        query = supabase.table("alunos").select("*")
+        # Começar query (escola primeiro: idx_alunos_escola_ativo_*_id)
+        query = escopar(supabase.table("alunos").select("*"))
         
         # Aplicar filtros
         if turma_id:
@@ -142,21 +184,69 @@ async def listar_alunos(
             query = query.eq("necessidades_especiais", necessidades_especiais)
         query = query.eq("ativo", ativo)
         
-        # Ordenação
+        # Ordenação (id como desempate garante ordem total para o cursor)
         if ordenar_por == "idade":
-            query = query.order("data_nascimento", desc=False)  # Mais velho primeiro
+            coluna = "data_nascimento"  # Mais velho primeiro
         elif ordenar_por == "matricula":
-            query = query.order("matricula")
+            coluna = "matricula"
         else:  # default: nome
-            query = query.order("nome")
+            coluna = "nome"
+        query = query.order(coluna).order("id")
+        
+        # 🚨 ÂNCORA: CRÍTICO - Paginação keyset
+        # Contexto: Com cursor, o banco continua após (coluna, id) da última linha
+        #           usando os índices compostos, sem descartar linhas como no offset
+        if cursor:
+            posicao = decodificar_cursor(cursor, coluna)
+            query = query.or_(filtro_keyset(coluna, posicao["v"], posicao["id"]))
+        elif offset:
+            query = query.offset(offset)
         
-        # Paginação
-        query = query.limit(limite).offset(offset)
+        # Uma linha extra indica se existe próxima página
+        query = query.limit(limite + 1)
         
-        result = query.execute()
+        result = await executar(query)
         
-        return [AlunoResponse(**aluno) for aluno in result.data]
+        next_cursor = proximo_cursor(result.data, limite, coluna)
         
+        # Caminho rápido: sem AlunoResponse por linha nem segunda validação
+        return RespostaJSONRapida(
+            alunos_para_resposta(result.data[:limite]),
+            headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/busca", response_model=BuscaAlunosResponse)
+async def buscar_alunos_endpoint(
+    q: str = Query(..., min_length=1, max_length=100, description="Nome, matrícula ou nome do responsável"),
+    limite: int = Query(20, ge=1, le=50, description="Máximo de resultados"),
+    turma_id: Optional[UUID] = Query(None, description="Restringir a uma turma"),
+    apenas_ativos: bool = Query(True, description="Ignorar alunos desativados")
+):
+    """
+    Busca de alunos para o campo de pesquisa (digitação parcial, sem acento)
+    
+    "joao sil" encontra "João da Silva"; o começo da matrícula também casa.
+    Sem casamento por prefixo, cai na busca aproximada do banco (erros de
+    digitação) e `origem` vem como **banco**.
+    """
+    try:
+        inicio = time.perf_counter()
+        resultados, origem = await buscar_alunos(q, limite, turma_id, apenas_ativos, escola_atual())
+        return BuscaAlunosResponse(
+            termo=q,
+            origem=origem,
+            resultados=resultados,
+            duracao_ms=round((time.perf_counter() - inicio) * 1000, 2)
+        )
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -169,11 +259,10 @@ async def obter_aluno(aluno_id: UUID):
     try:
         supabase = get_supabase()
         
-        result = supabase.table("alunos")\
-            .select("*")\
-            .eq("id", str(aluno_id))\
-            .single()\
-            .execute()
+        result = await executar(
+            escopar(supabase.table("alunos").select("*").eq("id", str(aluno_id)))
+            .single()
+        )
             
         if not result.data:
             raise HTTPException(status_code=404, detail="Aluno não encontrado")
@@ -201,39 +290,27 @@ async def atualizar_aluno(aluno_id: UUID, aluno_update: AlunoUpdate):
             raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
         
         # Validações específicas se campos estão sendo atualizados
-        if "matricula" in update_data:
-            # Verificar se nova matrícula já existe
-            existing = supabase.table("alunos")\
-                .select("id")\
-                .eq("matricula", update_data["matricula"])\
-                .neq("id", str(aluno_id))\
-                .execute()
-                
-            if existing.data:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Matrícula '{update_data['matricula']}' já está em uso"
-                )
-        
+        escola_destino = None
         if "turma_id" in update_data:
             # Verificar se nova turma existe e tem capacidade
-            turma = supabase.table("turmas")\
-                .select("id, capacidade_maxima")\
-                .eq("id", str(update_data["turma_id"]))\
-                .single()\
-                .execute()
+            turma = await executar(
+                escopar(supabase.table("turmas").select("id, capacidade_maxima, escola_id").eq("id", str(update_data["turma_id"])))
+                .single()
+            )
                 
             if not turma.data:
                 raise HTTPException(status_code=404, detail="Turma não encontrada")
+            escola_destino = turma.data.get("escola_id")
                 
             # Verificar capacidade
             if turma.data.get('capacidade_maxima'):
-                count_result = supabase.table("alunos")\
-                    .select("id", count="exact")\
-                    .eq("turma_id", str(update_data["turma_id"]))\
-                    .eq("ativo", True)\
-                    .neq("id", str(aluno_id))\
-                    .execute()
+                count_result = await executar(
+                    supabase.table("alunos")
+                    .select("id", count="exact")
+                    .eq("turma_id", str(update_data["turma_id"]))
+                    .eq("ativo", True)
+                    .neq("id", str(aluno_id))
+                )
                     
                 if count_result.count >= turma.data['capacidade_maxima']:
                     raise HTTPException(
@@ -241,14 +318,28 @@ async def atualizar_aluno(aluno_id: UUID, aluno_update: AlunoUpdate):
                         detail="Turma já atingiu a capacidade máxima"
                     )
         
+        if "matricula" in update_data:
+            # Verificar se nova matrícula já existe na escola (a da nova turma, se trocar)
+            if escola_destino is None:
+                atual = await executar(
+                    escopar(supabase.table("alunos").select("escola_id").eq("id", str(aluno_id)))
+                )
+                if not atual.data:
+                    raise HTTPException(status_code=404, detail="Aluno não encontrado")
+                escola_destino = atual.data[0].get("escola_id")
+            if await _matricula_em_uso(update_data["matricula"], escola_destino, aluno_id):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Matrícula '{update_data['matricula']}' já está em uso"
+                )
+        
         if "necessidades_especiais" in update_data:
             if update_data["necessidades_especiais"] and "necessidades_descricao" not in update_data:
                 # Verificar se já tem descrição
-                current = supabase.table("alunos")\
-                    .select("necessidades_descricao")\
-                    .eq("id", str(aluno_id))\
-                    .single()\
-                    .execute()
+                current = await executar(
+                    escopar(supabase.table("alunos").select("necessidades_descricao").eq("id", str(aluno_id)))
+                    .single()
+                )
                     
                 if not current.data.get("necessidades_descricao"):
                     raise HTTPException(
@@ -263,14 +354,17 @@ async def atualizar_aluno(aluno_id: UUID, aluno_update: AlunoUpdate):
                     detail="Data de nascimento não pode ser futura"
                 )
         
-        # Atualizar
-        result = supabase.table("alunos")\
-            .update(update_data)\
-            .eq("id", str(aluno_id))\
-            .execute()
+        # Atualizar (datas e UUIDs serializados para JSON)
+        result = await executar(
+            escopar(supabase.table("alunos").update(aluno_update.model_dump(mode="json", exclude_unset=True)))
+            .eq("id", str(aluno_id))
+        )
             
         if not result.data:
             raise HTTPException(status_code=404, detail="Aluno não encontrado")
+        # Troca de turma: a contagem da turma antiga muda em todas as listagens
+        invalidar_turmas([result.data[0]["turma_id"]], [aluno_id], listas="turma_id" in update_data)
+        obter_indice_busca().registrar(result.data[0])
             
         return AlunoResponse(**result.data[0])
         
@@ -289,19 +383,23 @@ async def deletar_aluno(aluno_id: UUID):
         supabase = get_supabase()
         
         # Soft delete com data de saída
-        result = supabase.table("alunos")\
-            .update({
+        result = await executar(
+            escopar(supabase.table("alunos").update({
                 "ativo": False,
                 "data_saida": date.today().isoformat()
-            })\
-            .eq("id", str(aluno_id))\
-            .execute()
+            }))
+            .eq("id", str(aluno_id))
+        )
             
         if not result.data:
             raise HTTPException(status_code=404, detail="Aluno não encontrado")
+        invalidar_turmas([result.data[0]["turma_id"]], [aluno_id])
+        obter_indice_busca().registrar(result.data[0])
             
         return MessageResponse(message="Aluno desativado com sucesso")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -311,21 +409,31 @@ async def deletar_aluno(aluno_id: UUID):
 # Dependências: Usado pelo frontend na tela de avaliação
 @router.get("/turma/{turma_id}", response_model=List[AlunoResponse])
 async def listar_alunos_turma(
+    request: Request,
     turma_id: UUID,
     apenas_ativos: bool = Query(True, description="Mostrar apenas alunos ativos")
 ):
     """
     Lista todos os alunos de uma turma específica
+    
+    Resposta com **ETag** (304 com `If-None-Match`), servida da memória até
+    uma escrita nos alunos da turma.
     """
     try:
+        # Idade é calculada no dia: a data entra na chave e na versão
+        hoje = date.today().isoformat()
+        chave = f"alunos_turma:{turma_id}:{apenas_ativos}:{hoje}"
+        entrada, versao = buscar(chave)
+        if entrada is not None:
+            return responder(request, entrada)
+        
         supabase = get_supabase()
         
-        # Verificar se turma existe
-        turma = supabase.table("turmas")\
-            .select("id, serie, turma")\
-            .eq("id", str(turma_id))\
-            .single()\
-            .execute()
+        # Verificar se turma existe (na escola da requisição)
+        turma = await executar(
+            escopar(supabase.table("turmas").select("id, serie, turma").eq("id", str(turma_id)))
+            .single()
+        )
             
         if not turma.data:
             raise HTTPException(status_code=404, detail="Turma não encontrada")
@@ -340,9 +448,12 @@ async def listar_alunos_turma(
             
         query = query.order("nome")
         
-        result = query.execute()
+        result = await executar(query)
         
-        return [AlunoResponse(**aluno) for aluno in result.data]
+        corpo = json_bytes(alunos_para_resposta(result.data, date.fromisoformat(hoje)))
+        etag = calcular_etag(result.data, hoje)
+        tags = [tag_turma(turma_id), *(tag_aluno(aluno["id"]) for aluno in result.data)]
+        return responder(request, guardar(chave, corpo, etag, tags, versao))
         
     except Exception as e:
         if "single" in str(e):
@@ -0,0 +1,45 @@
+"""
+Endpoints públicos de arquivos (links assinados enviados aos responsáveis)
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from uuid import UUID
+
+from app.services.links_pdf import assinatura_valida, ler_pdf, obter_relatorio_pdf, resposta_pdf
+from app.models.schemas import ErrorResponse
+
+router = APIRouter(
+    prefix="/arquivos",
+    tags=["Arquivos"],
+    responses={404: {"model": ErrorResponse}}
+)
+
+
+@router.get("/relatorios/{relatorio_id}.pdf")
+async def baixar_pdf_assinado(
+    relatorio_id: UUID,
+    expira: int = Query(..., description="Validade do link (epoch em segundos)"),
+    assinatura: str = Query(..., description="HMAC gerado no envio")
+):
+    """
+    PDF de um relatório por link assinado (sem X-Escola-Id)
+    
+    O link sai no envio aos responsáveis (services/links_pdf). Assinatura
+    inválida ou vencida: 403.
+    """
+    try:
+        if not assinatura_valida(str(relatorio_id), expira, assinatura):
+            raise HTTPException(status_code=403, detail="Link inválido ou expirado")
+        
+        relatorio = await obter_relatorio_pdf(str(relatorio_id))
+        dados = await ler_pdf(relatorio) if relatorio else None
+        
+        if dados is None:
+            raise HTTPException(status_code=404, detail="PDF não encontrado")
+        
+        return resposta_pdf(relatorio, dados)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,130 @@
+"""
+Endpoints para avaliações diárias
+"""
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException
+from datetime import date
+from uuid import UUID
+
+from app.models.database import get_supabase, executar
+from app.services.avaliacoes import validar_campos_avaliados
+from app.services.escopo_escola import escopar
+from app.models.schemas import (
+    AvaliacaoTurmaLote, AvaliacaoLoteResponse, AvaliacaoResponse,
+    TagResponse, ErrorResponse
+)
+
+router = APIRouter(
+    prefix="/avaliacoes",
+    tags=["Avaliações"],
+    responses={404: {"model": ErrorResponse}}
+)
+
+
+# 🚨 ÂNCORA: CRÍTICO - Gravação da tela de avaliação
+# Contexto: O professor avalia 25-30 alunos de uma vez; o lote inteiro é
+#           validado e gravado em uma única chamada (upsert + tags)
+# Dependências: Função SQL salvar_avaliacoes_lote (ver SQL_CREATE_TABLES)
+@router.post("/turma/{turma_id}/lote", response_model=AvaliacaoLoteResponse)
+async def salvar_avaliacoes_turma(turma_id: UUID, lote: AvaliacaoTurmaLote):
+    """
+    Salva as avaliações de uma turma em um dia
+    
+    - **data_avaliacao**: Dia avaliado (reenviar o mesmo dia atualiza as avaliações)
+    - **trimestre**: 1, 2 ou 3
+    - **status**: rascunho ou concluida
+    - **avaliacoes**: Uma entrada por aluno com `campos_avaliados` (categoria -> nota 1-3),
+      `observacao_livre` e `tags_ids` (substituem as tags já gravadas)
+    """
+    try:
+        supabase = get_supabase()
+        
+        if lote.data_avaliacao > date.today():
+            raise HTTPException(status_code=400, detail="Data da avaliação não pode ser futura")
+        
+        # Turma, alunos ativos e tags citadas: consultas independentes, em paralelo
+        tags_ids = sorted({str(tag_id) for item in lote.avaliacoes for tag_id in item.tags_ids})
+        consultas = [
+            executar(
+                escopar(supabase.table("turmas").select("id, nivel").eq("id", str(turma_id)))
+            ),
+            executar(
+                supabase.table("alunos")
+                .select("id")
+                .eq("turma_id", str(turma_id))
+                .eq("ativo", True)
+            ),
+        ]
+        if tags_ids:
+            consultas.append(executar(
+                supabase.table("tags")
+                .select("*")
+                .in_("id", tags_ids)
+            ))
+        turma, alunos, *result_tags = await asyncio.gather(*consultas)
+        
+        if not turma.data:
+            raise HTTPException(status_code=404, detail="Turma não encontrada")
+        
+        nivel = turma.data[0]["nivel"]
+        alunos_turma = {aluno["id"] for aluno in alunos.data}
+        tags = {tag["id"]: tag for tag in result_tags[0].data} if result_tags else {}
+        
+        # Validar o lote inteiro antes de gravar
+        problemas = []
+        vistos = set()
+        for item in lote.avaliacoes:
+            aluno_id = str(item.aluno_id)
+            if aluno_id in vistos:
+                problemas.append(f"Aluno {aluno_id}: avaliado mais de uma vez no lote")
+            vistos.add(aluno_id)
+            if aluno_id not in alunos_turma:
+                problemas.append(f"Aluno {aluno_id}: não é aluno ativo desta turma")
+            for problema in validar_campos_avaliados(item.campos_avaliados, nivel):
+                problemas.append(f"Aluno {aluno_id}: {problema}")
+            faltando = [str(t) for t in item.tags_ids if str(t) not in tags]
+            if faltando:
+                problemas.append(f"Aluno {aluno_id}: tag(s) não encontrada(s): {', '.join(faltando)}")
+        
+        if problemas:
+            raise HTTPException(status_code=400, detail="; ".join(problemas))
+        
+        itens = [
+            {
+                "aluno_id": str(item.aluno_id),
+                "data_avaliacao": lote.data_avaliacao.isoformat(),
+                "trimestre": lote.trimestre,
+                "ano": lote.data_avaliacao.year,
+                "status": lote.status,
+                "campos_avaliados": item.campos_avaliados,
+                "observacao_livre": item.observacao_livre,
+                "professor_id": str(lote.professor_id) if lote.professor_id else None,
+                "tags_ids": sorted({str(t) for t in item.tags_ids}),
+            }
+            for item in lote.avaliacoes
+        ]
+        
+        result = await executar(supabase.rpc("salvar_avaliacoes_lote", {"itens": itens}))
+        
+        tags_por_aluno = {item["aluno_id"]: item["tags_ids"] for item in itens}
+        avaliacoes = [
+            AvaliacaoResponse(
+                **avaliacao,
+                tags=[TagResponse(**tags[tag_id]) for tag_id in tags_por_aluno[str(avaliacao["aluno_id"])]]
+            )
+            for avaliacao in result.data
+        ]
+        
+        return AvaliacaoLoteResponse(
+            turma_id=turma_id,
+            data_avaliacao=lote.data_avaliacao,
+            total=len(avaliacoes),
+            avaliacoes=avaliacoes
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
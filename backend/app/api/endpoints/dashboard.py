@@ -0,0 +1,41 @@
+"""
+Endpoint do dashboard do usuário logado
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from datetime import date
+
+from app.services.dashboard import montar_dashboard
+from app.models.schemas import DashboardResponse, ErrorResponse
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["Dashboard"],
+    responses={404: {"model": ErrorResponse}}
+)
+
+
+@router.get("/", response_model=DashboardResponse)
+async def obter_dashboard(
+    # Temporário: simular usuário logado via query param
+    usuario_id: Optional[str] = Query(None, description="ID do usuário logado"),
+    usuario_tipo: Optional[str] = Query(None, description="Tipo do usuário"),
+    data: Optional[date] = Query(None, description="Dia das avaliações (padrão: hoje)"),
+    trimestre: Optional[int] = Query(None, ge=1, le=3, description="Trimestre dos relatórios (padrão: pelo mês)"),
+    ano: Optional[int] = Query(None, description="Ano dos relatórios (padrão: ano da data)")
+):
+    """
+    Tudo que a tela inicial precisa em uma chamada
+
+    Turmas ativas visíveis ao usuário (mesma regra de GET /turmas) com
+    alunos ativos, necessidades especiais, avaliações do dia (concluídas,
+    rascunho, pendentes) e relatórios do trimestre por status, mais os totais.
+    """
+    try:
+        return await montar_dashboard(usuario_id, usuario_tipo, data, trimestre, ano)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,426 @@
+"""
+Endpoints para relatórios trimestrais
+"""
+
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from app.services.agregados import obter_dados_consolidados
+from app.services.cache_relatorios import obter_cache
+from app.services.consolidacao import consolidar_turma
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+from app.services.custos_llm import resumo_uso
+from app.services.escopo_escola import escola_atual, escopar, garantir_da_escola, verificar_escola
+from app.services.canais_envio import canal_configurado
+from app.services.envio_relatorios import CANAIS_PADRAO
+from app.services.geracao_relatorios import preparar_rascunho_aluno, transmitir_rascunho
+from app.services.links_pdf import ler_pdf, obter_relatorio_pdf, resposta_pdf
+from app.services.roteador_llm import ordem_provedores, resumo_estatisticas
+from app.services.tarefas import enfileirar
+from app.models.schemas import (
+    CacheRelatoriosResponse, ConsolidacaoAlunoResponse, ConsolidacaoTurmaResponse, EnvioRelatoriosRequest,
+    ErrorResponse, GeracaoRelatoriosRequest, ModoRascunho, ProvedorLLM, ProvedoresLLMResponse,
+    RenderizacaoPdfRequest, TarefaEnfileiradaResponse, UsoLLMResponse
+)
+
+router = APIRouter(
+    prefix="/relatorios",
+    tags=["Relatórios"],
+    responses={404: {"model": ErrorResponse}}
+)
+
+
+@router.get("/consolidacao/turma/{turma_id}", response_model=ConsolidacaoTurmaResponse)
+async def obter_consolidacao_turma(
+    turma_id: UUID,
+    trimestre: int = Query(..., ge=1, le=3, description="Trimestre (1, 2 ou 3)"),
+    ano: Optional[int] = Query(None, description="Ano (padrão: ano atual)"),
+    incluir_rascunhos: bool = Query(False, description="Considerar avaliações em rascunho")
+):
+    """
+    Consolida o trimestre de todos os alunos ativos da turma
+    
+    Para cada aluno: distribuição das notas por categoria, média, nota
+    predominante, tendência no trimestre, tags mais frequentes e observações.
+    É o conteúdo de `dados_consolidados` dos relatórios.
+    """
+    try:
+        ano = ano or datetime.now().year
+        await garantir_da_escola("turmas", turma_id, "Turma não encontrada")
+        
+        alunos = await consolidar_turma(str(turma_id), trimestre, ano, incluir_rascunhos)
+        
+        if alunos is None:
+            raise HTTPException(status_code=404, detail="Turma não encontrada")
+        
+        return ConsolidacaoTurmaResponse(
+            turma_id=turma_id,
+            trimestre=trimestre,
+            ano=ano,
+            alunos=alunos
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/consolidacao/aluno/{aluno_id}", response_model=ConsolidacaoAlunoResponse)
+async def obter_consolidacao_aluno(
+    aluno_id: UUID,
+    trimestre: int = Query(..., ge=1, le=3, description="Trimestre (1, 2 ou 3)"),
+    ano: Optional[int] = Query(None, description="Ano (padrão: ano atual)")
+):
+    """
+    Dados consolidados de um aluno a partir dos agregados incrementais
+    
+    Custo constante no número de dias avaliados (não lê as avaliações);
+    a tendência considera as últimas 10 avaliações concluídas.
+    """
+    try:
+        ano = ano or datetime.now().year
+        await garantir_da_escola("alunos", aluno_id, "Aluno não encontrado")
+        
+        dados = await obter_dados_consolidados(str(aluno_id), trimestre, ano)
+        
+        if dados is None:
+            raise HTTPException(status_code=404, detail="Nenhuma avaliação concluída no trimestre")
+        
+        return ConsolidacaoAlunoResponse(
+            aluno_id=aluno_id,
+            trimestre=trimestre,
+            ano=ano,
+            dados_consolidados=dados
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _enfileirar(
+    request: Request, tipo: str, parametros: dict, escola_id: Optional[str] = None
+) -> TarefaEnfileiradaResponse:
+    """Grava a tarefa na fila e monta a resposta 202 com o endereço do progresso"""
+    tarefa = await enfileirar(tipo, parametros, escola_id or escola_atual())
+    return TarefaEnfileiradaResponse(
+        tarefa_id=tarefa["id"],
+        tipo=tipo,
+        status=tarefa["status"],
+        status_url=str(request.url_for("obter_progresso", tarefa_id=tarefa["id"]))
+    )
+
+
+async def _garantir_escola_existe(escola_id: UUID) -> None:
+    verificar_escola(escola_id)
+    escola = await executar(get_supabase().table("escolas").select("id").eq("id", str(escola_id)))
+    if not escola.data:
+        raise HTTPException(status_code=404, detail="Escola não encontrada")
+
+
+@router.post("/gerar/turma/{turma_id}", response_model=TarefaEnfileiradaResponse, status_code=202)
+async def gerar_relatorios_da_turma(turma_id: UUID, pedido: GeracaoRelatoriosRequest, request: Request):
+    """
+    Enfileira a geração dos rascunhos de todos os alunos ativos da turma
+    
+    Roda na fila de tarefas (tarefa `gerar_relatorios_turma`); acompanhe por
+    `status_url` e leia o resultado (GeracaoRelatoriosResponse) em
+    /tarefas/{id}. As chamadas ao LLM saem em paralelo, dentro dos limites
+    de concorrência e tokens por minuto do provedor. Relatórios em revisão
+    ou aprovados não são tocados; rascunhos existentes só com `sobrescrever`.
+    """
+    try:
+        await garantir_da_escola("turmas", turma_id, "Turma não encontrada")
+        return await _enfileirar(
+            request, "gerar_relatorios_turma",
+            {"turma_id": str(turma_id), **pedido.model_dump(mode="json")}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/gerar/escola/{escola_id}", response_model=TarefaEnfileiradaResponse, status_code=202)
+async def gerar_relatorios_da_escola(escola_id: UUID, pedido: GeracaoRelatoriosRequest, request: Request):
+    """
+    Enfileira a geração dos rascunhos de todas as turmas ativas da escola
+    
+    Mesmas regras da geração por turma (tarefa `gerar_relatorios_escola`);
+    todos os alunos da escola compartilham os limites do provedor.
+    """
+    try:
+        await _garantir_escola_existe(escola_id)
+        return await _enfileirar(
+            request, "gerar_relatorios_escola",
+            {"escola_id": str(escola_id), **pedido.model_dump(mode="json")}, str(escola_id)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _evento_sse(evento: str, dados: dict) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.get("/gerar/aluno/{aluno_id}/stream")
+async def gerar_relatorio_aluno_stream(
+    aluno_id: UUID,
+    trimestre: int = Query(..., ge=1, le=3, description="Trimestre (1, 2 ou 3)"),
+    usuario_id: UUID = Query(..., description="ID do usuário logado (vai para o histórico de revisões)"),
+    ano: Optional[int] = Query(None, description="Ano (padrão: ano atual)"),
+    provedor: Optional[ProvedorLLM] = Query(None, description="Padrão: provedor configurado"),
+    modelo: Optional[str] = Query(None, description="Padrão: modelo configurado"),
+    ignorar_cache: bool = Query(False, description="Gera de novo mesmo com texto igual em cache"),
+    modo: Optional[ModoRascunho] = Query(None, description="llm, modelo ou refinar (padrão: configurado)")
+):
+    """
+    Gera o rascunho de um aluno enviando o texto por Server-Sent Events
+    
+    GET para funcionar com `EventSource` no navegador. Eventos:
+    `inicio` (provedor/modelo), vários `texto` (trecho a anexar), `fim`
+    (relatorio_id, texto_final, uso) depois de gravar `texto_final` e a
+    entrada em `historico_revisoes`, ou `erro` (detail). Relatórios em
+    revisão ou aprovados não podem ser regerados (409). Com dados comuns
+    no modo `modelo`, o texto chega inteiro num único `texto`.
+    """
+    try:
+        ano = ano or datetime.now().year
+        supabase = get_supabase()
+        
+        await garantir_da_escola("alunos", aluno_id, "Aluno não encontrado")
+        (alvo, existente), usuario = await asyncio.gather(
+            preparar_rascunho_aluno(str(aluno_id), trimestre, ano),
+            executar(escopar(supabase.table("usuarios").select("id, nome").eq("id", str(usuario_id))))
+        )
+        
+        if not usuario.data:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        if alvo is None:
+            raise HTTPException(status_code=404, detail="Aluno não encontrado ou sem avaliação concluída no trimestre")
+        if existente and existente["status"] != "rascunho":
+            raise HTTPException(status_code=409, detail="Relatório em revisão ou aprovado não pode ser regerado")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def eventos():
+        try:
+            async for evento, dados in transmitir_rascunho(
+                alvo, existente, trimestre, ano, usuario.data[0], provedor, modelo, ignorar_cache, modo
+            ):
+                yield _evento_sse(evento, dados)
+        except Exception as e:
+            yield _evento_sse("erro", {"detail": str(e)})
+    
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        # Sem cache nem buffer de proxy (nginx), senão os trechos chegam juntos no fim
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/pdf/turma/{turma_id}", response_model=TarefaEnfileiradaResponse, status_code=202)
+async def renderizar_pdfs_da_turma(turma_id: UUID, pedido: RenderizacaoPdfRequest, request: Request):
+    """
+    Enfileira os PDFs dos relatórios aprovados da turma (gravados em `pdf_url`)
+    
+    Tarefa `renderizar_pdfs_turma`, resultado no formato
+    RenderizacaoPdfResponse. Renderização em paralelo (um processo por
+    núcleo); relatórios cujo conteúdo não mudou desde o último PDF não são
+    renderizados de novo.
+    """
+    try:
+        await garantir_da_escola("turmas", turma_id, "Turma não encontrada")
+        return await _enfileirar(
+            request, "renderizar_pdfs_turma",
+            {"turma_id": str(turma_id), **pedido.model_dump(mode="json")}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/pdf/escola/{escola_id}", response_model=TarefaEnfileiradaResponse, status_code=202)
+async def renderizar_pdfs_da_escola(escola_id: UUID, pedido: RenderizacaoPdfRequest, request: Request):
+    """Enfileira os PDFs dos relatórios aprovados de todas as turmas ativas da escola"""
+    try:
+        await _garantir_escola_existe(escola_id)
+        return await _enfileirar(
+            request, "renderizar_pdfs_escola",
+            {"escola_id": str(escola_id), **pedido.model_dump(mode="json")}, str(escola_id)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _verificar_canais(pedido: EnvioRelatoriosRequest) -> None:
+    """400 na hora se nenhum dos canais pedidos está configurado (não deixa para a tarefa)"""
+    canais = pedido.canais or CANAIS_PADRAO
+    if not any(canal_configurado(canal) for canal in canais):
+        raise HTTPException(
+            status_code=400, detail=f"Nenhum canal de envio configurado entre: {', '.join(canais)}"
+        )
+
+
+@router.post("/enviar/turma/{turma_id}", response_model=TarefaEnfileiradaResponse, status_code=202)
+async def enviar_relatorios_da_turma(turma_id: UUID, pedido: EnvioRelatoriosRequest, request: Request):
+    """
+    Enfileira o envio dos relatórios aprovados da turma aos responsáveis
+    
+    Tarefa `enviar_relatorios_turma`, resultado no formato
+    EnvioRelatoriosResponse. Cada relatório vai pelo primeiro canal de
+    `canais` para o qual o responsável tem contato, com o link do PDF quando
+    já renderizado. Relatórios já enviados são pulados (exceto com `reenviar`).
+    """
+    try:
+        await garantir_da_escola("turmas", turma_id, "Turma não encontrada")
+        _verificar_canais(pedido)
+        return await _enfileirar(
+            request, "enviar_relatorios_turma",
+            {"turma_id": str(turma_id), **pedido.model_dump(mode="json")}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/enviar/escola/{escola_id}", response_model=TarefaEnfileiradaResponse, status_code=202)
+async def enviar_relatorios_da_escola(escola_id: UUID, pedido: EnvioRelatoriosRequest, request: Request):
+    """Enfileira o envio dos relatórios aprovados de todas as turmas ativas da escola"""
+    try:
+        await _garantir_escola_existe(escola_id)
+        _verificar_canais(pedido)
+        return await _enfileirar(
+            request, "enviar_relatorios_escola",
+            {"escola_id": str(escola_id), **pedido.model_dump(mode="json")}, str(escola_id)
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{relatorio_id}/pdf")
+async def baixar_pdf(relatorio_id: UUID):
+    """
+    PDF do relatório (gerado por /relatorios/pdf/...)
+    
+    Só relatórios de alunos da escola da requisição; os responsáveis abrem
+    pelo link assinado do envio (/arquivos/relatorios/{id}.pdf).
+    """
+    try:
+        relatorio = await obter_relatorio_pdf(str(relatorio_id))
+        if relatorio is None:
+            raise HTTPException(status_code=404, detail="PDF não encontrado")
+        # Escola conferida antes de ler o arquivo: outra escola recebe 404
+        await garantir_da_escola("alunos", relatorio["aluno_id"], "PDF não encontrado")
+        
+        dados = await ler_pdf(relatorio)
+        if dados is None:
+            raise HTTPException(status_code=404, detail="PDF não encontrado")
+        
+        return resposta_pdf(relatorio, dados)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache/estatisticas", response_model=CacheRelatoriosResponse)
+async def estatisticas_cache():
+    """Acertos, faltas e ocupação do cache de rascunhos gerados"""
+    cache = obter_cache()
+    if cache is None:
+        return CacheRelatoriosResponse(ativo=False)
+    return CacheRelatoriosResponse(ativo=True, **await asyncio.to_thread(cache.estatisticas))
+
+
+@router.delete("/cache", response_model=CacheRelatoriosResponse)
+async def limpar_cache():
+    """
+    Esvazia o cache de rascunhos (ex: após trocar o modelo padrão)
+    
+    O cache é compartilhado (chave = hash do conteúdo, sem escola): só sem
+    X-Escola-Id (admin); com escola, 403.
+    """
+    if escola_atual():
+        raise HTTPException(status_code=403, detail="Cache de rascunhos vale para todas as escolas")
+    cache = obter_cache()
+    if cache is None:
+        return CacheRelatoriosResponse(ativo=False)
+    await asyncio.to_thread(cache.limpar)
+    return CacheRelatoriosResponse(ativo=True, **await asyncio.to_thread(cache.estatisticas))
+
+
+@router.get("/uso", response_model=UsoLLMResponse)
+async def obter_uso_llm(
+    escola_id: Optional[UUID] = Query(None, description="Filtra por escola"),
+    turma_id: Optional[UUID] = Query(None, description="Filtra por turma"),
+    desde: Optional[datetime] = Query(None, description="Apenas gerações a partir desta data")
+):
+    """
+    Contabilidade de tokens e custo da geração de relatórios
+    
+    Totais geral, por escola e por turma: tokens de prompt (e quanto veio do
+    cache de prompt do provedor), tokens de resposta e custo em USD.
+    Com chamadas de modelos sem preço cadastrado, `custo_usd` vem null e
+    `chamadas_sem_preco` diz quantas. Com X-Escola-Id, apenas a escola da
+    requisição.
+    """
+    try:
+        verificar_escola(escola_id)
+        escola = str(escola_id) if escola_id else escola_atual()
+        return UsoLLMResponse(**await resumo_uso(
+            escola,
+            str(turma_id) if turma_id else None,
+            desde
+        ))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/provedores/estatisticas", response_model=ProvedoresLLMResponse)
+async def estatisticas_provedores():
+    """
+    Latência (p50/p95), taxa de erro e circuito de cada provedor de LLM
+    
+    Janela móvel das últimas chamadas deste processo. `prazo_hedge` é o
+    tempo após o qual uma chamada lenta ganha uma cópia no próximo provedor
+    de `ordem_failover`.
+    """
+    settings = get_settings()
+    return ProvedoresLLMResponse(
+        primario=settings.default_llm_provider,
+        ordem_failover=ordem_provedores(settings.default_llm_provider),
+        hedge_ativo=settings.llm_hedge_ativo,
+        provedores=resumo_estatisticas()
+    )
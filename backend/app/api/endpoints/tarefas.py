@@ -0,0 +1,151 @@
+"""
+Endpoints da fila de tarefas em segundo plano
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from uuid import UUID
+
+from app.services.escopo_escola import escola_atual, garantir_da_escola, verificar_escola
+from app.services.tarefas import (
+    cancelar_tarefa, enfileirar, listar_tarefas, obter_tarefa, progresso_tarefa
+)
+from app.models.schemas import (
+    StatusTarefa, TarefaCreate, TarefaProgressoResponse, TarefaResponse, ErrorResponse
+)
+
+router = APIRouter(
+    prefix="/tarefas",
+    tags=["Tarefas"],
+    responses={404: {"model": ErrorResponse}}
+)
+
+
+def _da_escola(tarefa: Optional[dict]) -> bool:
+    """Tarefa existe e é da escola da requisição (sem escola: qualquer uma)"""
+    escola_id = escola_atual()
+    return bool(tarefa) and (not escola_id or tarefa.get("escola_id") == escola_id)
+
+
+@router.post("/", response_model=TarefaResponse, status_code=202)
+async def criar_tarefa(tarefa: TarefaCreate):
+    """
+    Enfileira uma tarefa e retorna na hora (acompanhe por /tarefas/{id}/progresso)
+    
+    - **gerar_relatorios_escola**: {escola_id, trimestre, ano?, provedor?, modelo?, sobrescrever?, ignorar_cache?}
+    - **gerar_relatorios_turma**: {turma_id, trimestre, ...mesmas opções}
+    - **reconstruir_agregados**: {aluno_ids?} (todos se omitido)
+    - **arquivar_avaliacoes**: {anos_ativos?, tablespace?} (todas as escolas: só sem X-Escola-Id)
+    
+    Maior `prioridade` sai primeiro; entre escolas, quem tem menos tarefas
+    em execução é atendida antes. Com X-Escola-Id, a tarefa é da escola
+    da requisição e só pode citar turmas dela.
+    """
+    try:
+        parametros = tarefa.model_dump(mode="json")["parametros"]
+        if tarefa.tipo == "arquivar_avaliacoes" and (escola_atual() or tarefa.escola_id):
+            raise HTTPException(status_code=403, detail="Arquivamento vale para todas as escolas")
+        verificar_escola(tarefa.escola_id)
+        verificar_escola(parametros.get("escola_id"))
+        if parametros.get("turma_id"):
+            await garantir_da_escola("turmas", parametros["turma_id"], "Turma não encontrada")
+        escola_id = str(tarefa.escola_id) if tarefa.escola_id else escola_atual()
+        criada = await enfileirar(
+            tarefa.tipo,
+            parametros,
+            escola_id,
+            tarefa.prioridade,
+            str(tarefa.criado_por) if tarefa.criado_por else None
+        )
+        return TarefaResponse(**criada)
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/", response_model=List[TarefaResponse])
+async def listar(
+    escola_id: Optional[UUID] = Query(None, description="Filtrar por escola"),
+    status: Optional[StatusTarefa] = Query(None, description="Filtrar por status"),
+    limite: int = Query(50, ge=1, le=200)
+):
+    """Tarefas mais recentes primeiro (sem o campo resultado)"""
+    try:
+        verificar_escola(escola_id)
+        escola = str(escola_id) if escola_id else escola_atual()
+        tarefas = await listar_tarefas(escola, status, limite)
+        return [TarefaResponse(**t) for t in tarefas]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{tarefa_id}", response_model=TarefaResponse)
+async def obter(tarefa_id: UUID):
+    """Estado completo da tarefa, incluindo o resultado quando concluída"""
+    try:
+        tarefa = await obter_tarefa(str(tarefa_id))
+        
+        if not _da_escola(tarefa):
+            raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+        
+        return TarefaResponse(**tarefa)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{tarefa_id}/progresso", response_model=TarefaProgressoResponse)
+async def obter_progresso(tarefa_id: UUID):
+    """
+    Progresso para acompanhamento (ex: barra de progresso consultada a cada poucos segundos)
+    
+    Atualizado a cada heartbeat do trabalhador; inclui vazão (itens por
+    minuto) e estimativa do tempo restante.
+    """
+    try:
+        tarefa = await obter_tarefa(str(tarefa_id))
+        
+        if not _da_escola(tarefa):
+            raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+        
+        return TarefaProgressoResponse(**progresso_tarefa(tarefa))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{tarefa_id}/cancelar", response_model=TarefaResponse)
+async def cancelar(tarefa_id: UUID):
+    """
+    Cancela a tarefa
+    
+    Pendente: cancelada na hora. Em execução: interrompida no próximo
+    heartbeat (o que já foi gravado permanece). Finalizada: 409.
+    """
+    try:
+        if escola_atual() and not _da_escola(await obter_tarefa(str(tarefa_id))):
+            raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+        tarefa, cancelou = await cancelar_tarefa(str(tarefa_id))
+        
+        if not tarefa:
+            raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+        if not cancelou:
+            raise HTTPException(status_code=409, detail=f"Tarefa já finalizada ({tarefa['status']})")
+        
+        return TarefaResponse(**tarefa)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -2,11 +2,17 @@
 Endpoints para gestão de turmas
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import List, Optional
 from uuid import UUID
 
-from app.models.database import get_supabase
+from app.models.database import get_supabase, executar
+from app.services.cache_respostas import (
+    TAG_TURMAS, buscar, calcular_etag, guardar, invalidar_turmas, responder, tag_coordenacao, tag_turma
+)
+from app.services.escopo_escola import escola_atual, escopar, verificar_escola
+from app.services.serializacao import json_bytes, turmas_para_resposta
+from app.services.turmas import contar_alunos_ativos, filtrar_por_usuario
 from app.models.schemas import (
     TurmaCreate, TurmaUpdate, TurmaResponse,
     MessageResponse, ErrorResponse
@@ -30,18 +36,22 @@ async def criar_turma(turma: TurmaCreate):
     - **periodo**: manha, tarde ou integral
     - **nivel**: infantil ou fundamental
     - **capacidade_maxima**: Limite de alunos (opcional)
+    - **escola_id**: Padrão: escola da requisição (X-Escola-Id)
     """
     try:
         supabase = get_supabase()
         
         # Preparar dados para inserção
-        data = turma.model_dump()
+        data = turma.model_dump(mode="json")
+        verificar_escola(data.get("escola_id"))
+        data["escola_id"] = data.get("escola_id") or escola_atual()
         
         # Inserir no banco
-        result = supabase.table("turmas").insert(data).execute()
+        result = await executar(supabase.table("turmas").insert(data))
         
         if not result.data:
             raise HTTPException(status_code=400, detail="Erro ao criar turma")
+        invalidar_turmas(listas=True)
         
         # Adicionar campos calculados
         turma_response = TurmaResponse(**result.data[0])
@@ -50,12 +60,15 @@ async def criar_turma(turma: TurmaCreate):
             
         return turma_response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/", response_model=List[TurmaResponse])
 async def listar_turmas(
+    request: Request,
     nivel: Optional[str] = Query(None, description="Filtrar por nível"),
     periodo: Optional[str] = Query(None, description="Filtrar por período"),
     ano_letivo: Optional[int] = Query(None, description="Filtrar por ano letivo"),
@@ -66,8 +79,17 @@ async def listar_turmas(
 ):
     """
     Lista turmas com filtros opcionais e restrições por tipo de usuário
+    
+    Resposta com **ETag**: envie-a em `If-None-Match` para receber 304 quando
+    nada mudou. Repetições são servidas da memória até uma escrita em
+    turmas/alunos invalidar a listagem.
     """
     try:
+        chave = f"turmas:{nivel}:{periodo}:{ano_letivo}:{ativo}:{usuario_id}:{usuario_tipo}"
+        entrada, versao = buscar(chave)
+        if entrada is not None:
+            return responder(request, entrada)
+        
         supabase = get_supabase()
         
         # Começar query com JOIN para trazer dados do professor
@@ -90,43 +112,28 @@ async def listar_turmas(
         query = query.eq("ativo", ativo)
         
         # Aplicar filtros baseado no tipo de usuário
-        if usuario_tipo == "professor" and usuario_id:
-            # Professor vê apenas suas turmas
-            query = query.eq("professor_id", usuario_id)
-        elif usuario_tipo == "coordenador" and usuario_id:
-            # Coordenador vê turmas dos professores que coordena
-            # Por enquanto, vamos mostrar todas (implementar depois)
-            pass
-        # Admin vê tudo (não precisa filtro)
+        query = await filtrar_por_usuario(query, usuario_id, usuario_tipo)
         
         # Ordenar
         query = query.order("serie").order("turma")
         
-        result = query.execute()
+        result = await executar(query)
         
-        turmas = []
-        for turma_data in result.data:
-            # Extrair dados do professor
-            professor_data = turma_data.pop('professor', None)
-            
-            turma = TurmaResponse(**turma_data)
-            turma.nome_completo = f"{turma.serie} {turma.turma}"
-            
-            # Adicionar nome do professor se disponível
-            if professor_data:
-                turma.professor_nome = professor_data.get('nome', 'Sem professor')
-            
-            # Contar alunos
-            count_result = supabase.table("alunos")\
-                .select("id", count="exact")\
-                .eq("turma_id", str(turma.id))\
-                .eq("ativo", True)\
-                .execute()
-            
-            turma.quantidade_atual = count_result.count or 0
-            turmas.append(turma)
+        # Contar alunos de todas as turmas em uma única consulta
+        contagens = await contar_alunos_ativos(t["id"] for t in result.data)
+        
+        # Caminho rápido: linhas já validadas viram dicts da resposta (sem
+        # TurmaResponse por linha) e o JSON sai direto pelo orjson
+        turmas = turmas_para_resposta(result.data, contagens)
         
-        return turmas
+        # 🚨 ÂNCORA: CRÍTICO - Versão da resposta
+        # Contexto: updated_at das turmas + campos calculados (contagem e professor)
+        corpo = json_bytes(turmas)
+        etag = calcular_etag(result.data, [(t["quantidade_atual"], t["professor_nome"]) for t in turmas])
+        tags = [TAG_TURMAS, *(tag_turma(t["id"]) for t in turmas)]
+        if usuario_tipo == "coordenador" and usuario_id:
+            tags.append(tag_coordenacao(usuario_id))  # Equipe mudou: invalidar_coordenacao()
+        return responder(request, guardar(chave, corpo, etag, tags, versao))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -140,11 +147,10 @@ async def obter_turma(turma_id: UUID):
     try:
         supabase = get_supabase()
         
-        result = supabase.table("turmas")\
-            .select("*")\
-            .eq("id", str(turma_id))\
-            .single()\
-            .execute()
+        result = await executar(
+            escopar(supabase.table("turmas").select("*").eq("id", str(turma_id)))
+            .single()
+        )
             
         if not result.data:
             raise HTTPException(status_code=404, detail="Turma não encontrada")
@@ -153,13 +159,8 @@ async def obter_turma(turma_id: UUID):
         turma.nome_completo = f"{turma.serie} {turma.turma}"
         
         # Contar alunos ativos
-        count_result = supabase.table("alunos")\
-            .select("id", count="exact")\
-            .eq("turma_id", str(turma_id))\
-            .eq("ativo", True)\
-            .execute()
-        
-        turma.quantidade_atual = count_result.count or 0
+        contagens = await contar_alunos_ativos([turma_id])
+        turma.quantidade_atual = contagens[str(turma_id)]
             
         return turma
         
@@ -178,33 +179,30 @@ async def atualizar_turma(turma_id: UUID, turma_update: TurmaUpdate):
         supabase = get_supabase()
         
         # Preparar apenas campos não-nulos
-        update_data = turma_update.model_dump(exclude_unset=True)
+        update_data = turma_update.model_dump(mode="json", exclude_unset=True)
         
         if not update_data:
             raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
         
-        result = supabase.table("turmas")\
-            .update(update_data)\
-            .eq("id", str(turma_id))\
-            .execute()
+        result = await executar(
+            escopar(supabase.table("turmas").update(update_data).eq("id", str(turma_id)))
+        )
             
         if not result.data:
             raise HTTPException(status_code=404, detail="Turma não encontrada")
+        invalidar_turmas([turma_id], listas=True)
         
         turma = TurmaResponse(**result.data[0])
         turma.nome_completo = f"{turma.serie} {turma.turma}"
         
         # Contar alunos ativos
-        count_result = supabase.table("alunos")\
-            .select("id", count="exact")\
-            .eq("turma_id", str(turma_id))\
-            .eq("ativo", True)\
-            .execute()
-        
-        turma.quantidade_atual = count_result.count or 0
+        contagens = await contar_alunos_ativos([turma_id])
+        turma.quantidade_atual = contagens[str(turma_id)]
             
         return turma
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -218,16 +216,18 @@ async def deletar_turma(turma_id: UUID):
         supabase = get_supabase()
         
         # Soft delete - apenas marca como inativo
-        result = supabase.table("turmas")\
-            .update({"ativo": False})\
-            .eq("id", str(turma_id))\
-            .execute()
+        result = await executar(
+            escopar(supabase.table("turmas").update({"ativo": False}).eq("id", str(turma_id)))
+        )
             
         if not result.data:
             raise HTTPException(status_code=404, detail="Turma não encontrada")
+        invalidar_turmas([turma_id], listas=True)
             
         return MessageResponse(message="Turma desativada com sucesso")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -241,27 +241,26 @@ async def contar_alunos_turma(turma_id: UUID):
         supabase = get_supabase()
         
         # Verificar se turma existe
-        turma = supabase.table("turmas")\
-            .select("id, serie, turma")\
-            .eq("id", str(turma_id))\
-            .single()\
-            .execute()
+        turma = await executar(
+            escopar(supabase.table("turmas").select("id, serie, turma").eq("id", str(turma_id)))
+            .single()
+        )
             
         if not turma.data:
             raise HTTPException(status_code=404, detail="Turma não encontrada")
         
         # Contar alunos
-        result = supabase.table("alunos")\
-            .select("id", count="exact")\
-            .eq("turma_id", str(turma_id))\
-            .eq("ativo", True)\
-            .execute()
+        contagens = await contar_alunos_ativos([turma_id])
             
         return {
             "turma_id": turma_id,
             "turma_nome": f"{turma.data['serie']} {turma.data['turma']}",
-            "total_alunos": result.count or 0
+            "total_alunos": contagens[str(turma_id)]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
+        if "single" in str(e):
+            raise HTTPException(status_code=404, detail="Turma não encontrada")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
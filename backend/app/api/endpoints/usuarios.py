@@ -0,0 +1,69 @@
+"""
+Endpoints para gestão de usuários (equipe da escola)
+"""
+
+from fastapi import APIRouter, HTTPException
+from uuid import UUID
+
+from app.models.database import get_supabase, executar
+from app.services.escopo_escola import escopar
+from app.services.turmas import invalidar_coordenacao
+from app.models.schemas import UsuarioUpdate, UsuarioResponse, ErrorResponse
+
+router = APIRouter(
+    prefix="/usuarios",
+    tags=["Usuários"],
+    responses={404: {"model": ErrorResponse}}
+)
+
+# Campos que mudam quem cada coordenador enxerga (professores_coordenados)
+CAMPOS_COORDENACAO = {"coordenador_id", "tipo", "ativo"}
+
+
+@router.patch("/{usuario_id}", response_model=UsuarioResponse)
+async def atualizar_usuario(usuario_id: UUID, usuario_update: UsuarioUpdate):
+    """
+    Atualiza dados de um usuário
+
+    - **coordenador_id**: Quem coordena este usuário (da mesma escola)
+    - **tipo** / **ativo**: Também mudam a hierarquia de coordenação
+    """
+    try:
+        supabase = get_supabase()
+
+        # Preparar apenas campos não-nulos
+        update_data = usuario_update.model_dump(mode="json", exclude_unset=True)
+
+        if not update_data:
+            raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
+
+        coordenador_id = update_data.get("coordenador_id")
+        if coordenador_id:
+            if coordenador_id == str(usuario_id):
+                raise HTTPException(status_code=400, detail="Usuário não pode coordenar a si mesmo")
+            coordenador = await executar(
+                escopar(supabase.table("usuarios").select("id").eq("id", coordenador_id))
+            )
+            if not coordenador.data:
+                raise HTTPException(status_code=404, detail="Coordenador não encontrado")
+
+        result = await executar(
+            escopar(supabase.table("usuarios").update(update_data).eq("id", str(usuario_id)))
+        )
+
+        if not result.data:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+        # 🚨 ÂNCORA: CRÍTICO - Hierarquia mudou
+        # Contexto: professores_coordenados é recursivo (quem coordena o
+        # coordenador também é afetado): esquece todas as coordenações e as
+        # listagens de turmas em cache (invalidar_turmas(listas=True))
+        if CAMPOS_COORDENACAO & update_data.keys():
+            invalidar_coordenacao()
+
+        return UsuarioResponse(**result.data[0])
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
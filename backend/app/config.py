@@ -27,16 +27,138 @@ class Settings(BaseSettings):
     port: int = 8000
     environment: Literal["development", "production"] = "development"
     
+    # Acesso ao banco (pool de threads + conexões keep-alive)
+    db_max_concorrencia: int = 32
+    db_keepalive_segundos: float = 30.0
+    db_timeout_segundos: float = 10.0
+    
+    # Banco local em memória compatível com PostgREST (benchmarks e testes de carga)
+    banco_local: bool = False
+    banco_local_latencia_ms: float = 0.0
+    banco_local_jitter_ms: float = 0.0
+    
     # JWT
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24  # 24 horas
     
     # Configuração de IA
-    default_llm_provider: Literal["openai", "anthropic", "google"] = "openai"
+    default_llm_provider: Literal["openai", "anthropic", "google", "local"] = "openai"
     default_llm_model: str = "gpt-3.5-turbo"
     llm_temperature: float = 0.7
-    
+    llm_max_tokens: int = 800  # Tamanho máximo de um relatório gerado
+    llm_timeout_segundos: float = 60.0
+    llm_max_tentativas: int = 4
+    llm_backoff_segundos: float = 1.0  # Base do backoff exponencial (com jitter)
+
+    # Limites por provedor: chamadas simultâneas e tokens por minuto (TPM)
+    llm_concorrencia_openai: int = 16
+    llm_tpm_openai: int = 200_000
+    llm_concorrencia_anthropic: int = 8
+    llm_tpm_anthropic: int = 80_000
+    llm_concorrencia_google: int = 16
+    llm_tpm_google: int = 250_000
+    llm_concorrencia_local: int = 64
+    llm_tpm_local: int = 10_000_000
+
+    # Roteamento entre provedores: failover na ordem abaixo (só os com chave)
+    # e requisição "hedge" no próximo quando o primário passa do seu p95
+    llm_failover: str = "openai,anthropic,google"
+    llm_modelo_openai: str = "gpt-4o-mini"  # Modelo usado quando o provedor não é o padrão
+    llm_modelo_anthropic: str = "claude-3-5-haiku-latest"
+    llm_modelo_google: str = "gemini-2.0-flash"
+    llm_modelo_local: str = "simulado"
+    llm_hedge_ativo: bool = True
+    llm_hedge_percentil: float = 0.95
+    llm_hedge_min_amostras: int = 20  # Abaixo disso vale o prazo padrão
+    llm_hedge_prazo_padrao_segundos: float = 10.0
+    llm_janela_estatisticas: int = 200  # Últimas chamadas por provedor
+    llm_circuito_falhas: int = 5  # Falhas seguidas que tiram o provedor da rota
+    llm_circuito_segundos: float = 30.0
+
+    # Rascunho por modelo de texto: "llm" (sempre LLM), "modelo" (LLM só para
+    # dados incomuns) ou "refinar" (LLM revisa o texto do modelo)
+    rascunho_modo: Literal["llm", "modelo", "refinar"] = "modelo"
+    rascunho_min_dias: int = 5  # Menos dias avaliados: incomum
+    rascunho_max_intervencao: int = 1  # Áreas com nota predominante 3
+    rascunho_max_regressoes: int = 2  # Áreas com tendência "regredindo"
+    rascunho_max_fracao_tags_negativas: float = 0.5  # Das ocorrências de tags
+    rascunho_max_observacoes: int = 3  # Observações livres do professor
+
+    # Provedor local simulado (testes e benchmarks, sem chamadas externas)
+    llm_local_latencia_ms: float = 1500.0
+    llm_local_taxa_erro: float = 0.0  # Fração de chamadas que falham com 429
+
+    # Fila de tarefas em segundo plano (tabela tarefas)
+    tarefas_trabalhadores: int = 4  # 0 = este processo só enfileira
+    tarefas_intervalo_segundos: float = 2.0  # Espera quando a fila está vazia
+    tarefas_heartbeat_segundos: float = 5.0  # Também grava o progresso
+    tarefas_orfa_segundos: int = 120  # Sem heartbeat há mais que isso: volta à fila
+    tarefas_max_por_escola: int = 2  # Tarefas da mesma escola executando ao mesmo tempo
+    tarefas_max_tentativas: int = 3
+
+    # avaliacoes é particionada por ano; a tarefa arquivar_avaliacoes move os
+    # anos anteriores aos N mais recentes para o schema arquivo
+    avaliacoes_anos_ativos: int = 2  # Ano corrente e o anterior
+    avaliacoes_tablespace_arquivo: Optional[str] = None  # Ex: tablespace em disco barato
+
+    # PDFs dos relatórios aprovados (pool de processos) e onde são gravados
+    pdf_processos: int = 0  # 0 = um processo por núcleo
+    pdf_cor_marca: str = "#E8891C"  # Faixa do cabeçalho e detalhes
+    armazenamento_tipo: str = "local"  # Outros backends: registrar_armazenamento
+    armazenamento_dir: str = ".storage"
+    armazenamento_url_base: str = "/arquivos"  # Prefixo de pdf_url (local); não é servido direto
+    pdf_link_validade_horas: int = 720  # Links assinados enviados aos responsáveis (30 dias)
+
+    # Envio dos relatórios aos responsáveis: só os canais configurados são usados.
+    # Taxas em mensagens por minuto; conexões ficam abertas entre os lotes
+    envio_url_publica: str = "http://localhost:8000"  # Prefixo dos links assinados dos PDFs
+    envio_remetente: str = "relatorios@colegiosolare.com.br"
+    envio_max_tentativas: int = 4
+    envio_backoff_segundos: float = 1.0
+    smtp_host: Optional[str] = None
+    smtp_porta: int = 587
+    smtp_usuario: Optional[str] = None
+    smtp_senha: Optional[str] = None
+    smtp_starttls: bool = True
+    smtp_conexoes: int = 4
+    smtp_lote: int = 50  # Mensagens por sessão SMTP
+    envio_taxa_email: int = 600
+    whatsapp_api_url: Optional[str] = None  # Ex: https://graph.facebook.com/v20.0/<id do número>
+    whatsapp_token: Optional[str] = None
+    whatsapp_conexoes: int = 16
+    envio_taxa_whatsapp: int = 1200
+    envio_api_url: Optional[str] = None  # Integração da escola (recebe lotes em JSON)
+    envio_api_token: Optional[str] = None
+    envio_api_lote: int = 100
+    envio_taxa_api: int = 6000
+
+    # Cache em memória das listagens com ETag (GET /turmas, /alunos/turma/{id}),
+    # invalidado pelas escritas em turmas/alunos; o TTL cobre escritas de fora.
+    # Um LRU de max_entradas por escola (uma escola grande não expulsa as outras)
+    cache_respostas_ativo: bool = True
+    cache_respostas_max_entradas: int = 2_000
+    cache_respostas_ttl_segundos: float = 300.0
+
+    # Busca de alunos: índice de prefixos em memória, recarregado para pegar
+    # escritas feitas fora deste processo
+    busca_indice_recarga_segundos: float = 600.0
+
+    # Professores de cada coordenador (usuarios.coordenador_id) em memória;
+    # invalidar_coordenacao() limpa na hora, o TTL cobre escritas de fora
+    coordenacao_cache_ttl_segundos: float = 300.0
+    coordenacao_cache_max_entradas: int = 5_000  # LRU por (escola, coordenador)
+
+    # Multi-escola: header X-Escola-Id filtra todas as rotas pela escola.
+    # Obrigatório desliga o acesso sem escola (visão global de admin)
+    escola_obrigatoria: bool = False
+
+    # Cache em disco dos rascunhos gerados (LRU por entradas e por tamanho)
+    cache_relatorios_ativo: bool = True
+    cache_relatorios_dir: str = ".cache/relatorios"
+    cache_relatorios_max_entradas: int = 50_000
+    cache_relatorios_max_mb: int = 500
+
     class Config:
         env_file = ".env"
         case_sensitive = False
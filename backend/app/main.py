@@ -2,7 +2,7 @@
 Sistema de Avaliação Escolar - API Principal
 """
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
@@ -14,6 +14,11 @@ from app.config import (
     CATEGORIAS_INFANTIL,
     TAGS_COMPORTAMENTAIS_PADRAO
 )
+from app.models.database import fechar_conexoes
+from app.services.canais_envio import fechar_canais
+from app.services.escopo_escola import escopo_escola
+from app.services.renderizacao_pdf import encerrar_pool_pdf
+from app.services.tarefas import iniciar_trabalhadores, parar_trabalhadores
 
 
 # 🚨 ÂNCORA: CRÍTICO - Configuração do ciclo de vida da aplicação
@@ -26,11 +31,16 @@ async def lifespan(app: FastAPI):
     print("🚀 Iniciando Sistema de Avaliação Escolar...")
     print("📊 Ambiente:", get_settings().environment)
     print("🔌 Conectando ao Supabase...")
+    iniciar_trabalhadores()  # Fila de tarefas em segundo plano
     
     yield
     
     # Shutdown
     print("👋 Encerrando aplicação...")
+    await parar_trabalhadores()  # Antes de fechar as conexões: devolve tarefas à fila
+    encerrar_pool_pdf()
+    await fechar_canais()  # Sessões SMTP e clientes HTTP abertos
+    fechar_conexoes()
 
 
 # Criar instância do FastAPI
@@ -51,6 +61,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Paginação por cursor
 )
 
 
@@ -117,10 +128,21 @@ async def config_info():
 # 🚨 ÂNCORA: CRÍTICO - Registro de rotas
 # Contexto: Todas as rotas da API devem ser registradas aqui
 # Cuidado: Ordem pode afetar precedência de rotas
-from app.api.endpoints import turmas, alunos
-
-app.include_router(turmas.router, prefix="/api/v1")
-app.include_router(alunos.router, prefix="/api/v1")
+# Todas passam pelo escopo da escola (header X-Escola-Id)
+from app.api.endpoints import turmas, alunos, avaliacoes, relatorios, tarefas, dashboard, usuarios, arquivos
+
+escopo = [Depends(escopo_escola)]
+app.include_router(turmas.router, prefix="/api/v1", dependencies=escopo)
+app.include_router(alunos.router, prefix="/api/v1", dependencies=escopo)
+app.include_router(avaliacoes.router, prefix="/api/v1", dependencies=escopo)
+app.include_router(relatorios.router, prefix="/api/v1", dependencies=escopo)
+app.include_router(tarefas.router, prefix="/api/v1", dependencies=escopo)
+app.include_router(dashboard.router, prefix="/api/v1", dependencies=escopo)
+app.include_router(usuarios.router, prefix="/api/v1", dependencies=escopo)
+
+# Exceção ao escopo: links assinados dos PDFs, abertos pelos responsáveis sem
+# header. Os PDFs não são servidos direto do armazenamento (ver links_pdf)
+app.include_router(arquivos.router, prefix="/api/v1")
 
 
 if __name__ == "__main__":
@@ -5,32 +5,123 @@ Cuidado: Todas as operações de banco passam por aqui
 Dependências: Todos os services dependem desta conexão
 """
 
-from supabase import create_client, Client
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from supabase import create_client, Client, ClientOptions
 from app.config import get_settings
-from typing import Optional
 
 # Instância global do cliente Supabase
 _supabase_client: Optional[Client] = None
 
+# Cliente HTTP compartilhado (pool de conexões keep-alive)
+_http_client: Optional[httpx.Client] = None
+
+# Pool limitado de threads para executar as consultas sem bloquear o event loop
+_executor: Optional[ThreadPoolExecutor] = None
+
 
 def get_supabase() -> Client:
     """
     Retorna cliente Supabase (Singleton)
     Cria apenas uma conexão e reutiliza
     """
-    global _supabase_client
+    global _supabase_client, _http_client
     
     if _supabase_client is None:
         settings = get_settings()
+        
+        # Banco local: mesmo cliente, mas o transporte HTTP responde em memória
+        transport = None
+        if settings.banco_local:
+            from app.models.postgrest_local import TransportePostgRESTLocal, get_banco_local
+            transport = TransportePostgRESTLocal(
+                get_banco_local(),
+                latencia_ms=settings.banco_local_latencia_ms,
+                jitter_ms=settings.banco_local_jitter_ms
+            )
+        
+        # Conexões HTTP reaproveitadas entre requisições (keep-alive)
+        _http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=settings.db_max_concorrencia,
+                max_keepalive_connections=settings.db_max_concorrencia,
+                keepalive_expiry=settings.db_keepalive_segundos
+            ),
+            timeout=settings.db_timeout_segundos,
+            transport=transport
+        )
         _supabase_client = create_client(
             settings.supabase_url,
-            settings.supabase_key
+            settings.supabase_key,
+            options=ClientOptions(httpx_client=_http_client)
         )
         print("✅ Conexão com Supabase estabelecida")
     
     return _supabase_client
 
 
+def _get_executor() -> ThreadPoolExecutor:
+    """Retorna o pool de threads dedicado às consultas (Singleton)"""
+    global _executor
+    
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().db_max_concorrencia,
+            thread_name_prefix="supabase"
+        )
+    
+    return _executor
+
+
+# 🚨 ÂNCORA: CRÍTICO - Execução não bloqueante das consultas
+# Contexto: O cliente Supabase é síncrono; chamar .execute() direto num
+#           endpoint async trava o event loop para todas as requisições
+# Cuidado: Todo endpoint async deve usar `await executar(query)`
+async def executar(query: Any) -> Any:
+    """
+    Executa uma consulta do Supabase em thread separada (pool limitado)
+    Aceita qualquer objeto com .execute() (table, rpc, etc.)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), query.execute)
+
+
+async def executar_paginado(criar_query: Callable[[], Any], tamanho_pagina: int = 1000) -> List[Dict]:
+    """
+    Busca todas as linhas de uma consulta em páginas de `tamanho_pagina`
+    
+    🚨 ÂNCORA: CRÍTICO - O PostgREST do Supabase corta respostas em max-rows
+    (1000 por padrão); sem paginar, consultas grandes voltam truncadas.
+    `criar_query` deve devolver uma consulta nova com ordenação estável.
+    """
+    linhas: List[Dict] = []
+    inicio = 0
+    while True:
+        result = await executar(criar_query().range(inicio, inicio + tamanho_pagina - 1))
+        linhas.extend(result.data)
+        if len(result.data) < tamanho_pagina:
+            return linhas
+        inicio += tamanho_pagina
+
+
+def fechar_conexoes() -> None:
+    """Libera pool de threads e conexões HTTP (chamado no shutdown)"""
+    global _supabase_client, _http_client, _executor
+    
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+    
+    _supabase_client = None
+
+
 # 🚨 ÂNCORA: CRÍTICO - Script SQL para criar tabelas
 # Contexto: Execute este SQL no Supabase para criar a estrutura
 # Cuidado: Ordem importa devido às foreign keys
@@ -40,6 +131,17 @@ SQL_CREATE_TABLES = """
 -- Configurar timezone para Brasília
 SET timezone = 'America/Sao_Paulo';
 
+-- Busca aproximada de alunos (trigramas, sem acento)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() não é IMMUTABLE (depende do dicionário); o wrapper com o
+-- dicionário fixo pode ser usado em índice de expressão
+CREATE OR REPLACE FUNCTION normalizar_busca(texto TEXT)
+RETURNS TEXT AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, coalesce(texto, '')));
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
 -- Tabela de escolas (para futuro multi-tenant)
 CREATE TABLE IF NOT EXISTS escolas (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -57,7 +159,7 @@ CREATE TABLE IF NOT EXISTS usuarios (
     telefone VARCHAR(20),  -- NOVO: telefone opcional
     tipo VARCHAR(50) CHECK (tipo IN ('professor', 'coordenador', 'admin')) DEFAULT 'professor',
     escola_id UUID REFERENCES escolas(id),
-    coordenador_id UUID REFERENCES usuarios(id)
+    coordenador_id UUID REFERENCES usuarios(id),
     ativo BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
@@ -77,17 +179,18 @@ CREATE TABLE IF NOT EXISTS turmas (
     ativo BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(serie, turma, ano_letivo, periodo)  -- Evita duplicar turmas
+    UNIQUE(escola_id, serie, turma, ano_letivo, periodo)  -- Evita duplicar turmas na escola
 );
 
 -- Tabela de alunos
 CREATE TABLE IF NOT EXISTS alunos (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
-    matricula VARCHAR(50) UNIQUE NOT NULL,  -- NOVO: matrícula única
+    matricula VARCHAR(50) NOT NULL,  -- Única por escola (UNIQUE abaixo)
     nome VARCHAR(255) NOT NULL,
     data_nascimento DATE NOT NULL,
     foto_url VARCHAR(500),  -- NOVO: foto do aluno
     turma_id UUID REFERENCES turmas(id),
+    escola_id UUID REFERENCES escolas(id),  -- Copiada da turma (trigger escola_alunos)
     
     -- Dados do responsável
     responsavel_nome VARCHAR(255),
@@ -106,7 +209,8 @@ CREATE TABLE IF NOT EXISTS alunos (
     ativo BOOLEAN DEFAULT TRUE,
     data_saida DATE,  -- NOVO: quando deixou a escola
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(escola_id, matricula)  -- escola_id vem do trigger BEFORE escola_alunos
 );
 
 -- Tabela de tags comportamentais
@@ -123,9 +227,19 @@ CREATE TABLE IF NOT EXISTS tags (
 );
 
 -- Tabela de avaliações diárias
+-- 🚨 ÂNCORA: CRÍTICO - Particionada por ano (uma partição avaliacoes_<ano>)
+-- Contexto: Quase toda leitura é do ano/trimestre corrente e a tabela só cresce;
+--           filtrar por ano lê só a partição do ano, e anos encerrados saem
+--           inteiros para o schema arquivo (arquivar_avaliacoes), sem DELETE
+-- Cuidado: Chave primária e UNIQUE incluem ano (exigência do particionamento);
+--          o CHECK garante ano = ano de data_avaliacao, então UNIQUE(aluno_id,
+--          data_avaliacao, ano) vale como um por aluno/dia. Ano sem partição
+--          recusa o INSERT: criar_particoes_avaliacoes(ano) antes (o job de
+--          arquivamento já cria a do ano seguinte)
 CREATE TABLE IF NOT EXISTS avaliacoes (
-    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    id UUID DEFAULT gen_random_uuid() NOT NULL,
     aluno_id UUID REFERENCES alunos(id) NOT NULL,
+    escola_id UUID REFERENCES escolas(id),  -- Copiada do aluno (trigger escola_avaliacoes)
     data_avaliacao DATE NOT NULL,
     trimestre INTEGER CHECK (trimestre IN (1, 2, 3)) NOT NULL,
     ano INTEGER NOT NULL,
@@ -135,14 +249,28 @@ CREATE TABLE IF NOT EXISTS avaliacoes (
     professor_id UUID REFERENCES usuarios(id),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(aluno_id, data_avaliacao)
-);
+    PRIMARY KEY (id, ano),
+    UNIQUE(aluno_id, data_avaliacao, ano),
+    CHECK (ano = EXTRACT(YEAR FROM data_avaliacao))
+) PARTITION BY LIST (ano);
 
--- Tabela de relação avaliação-tags (muitos para muitos)
+-- Tabela de relação avaliação-tags (muitos para muitos), particionada junto
+-- com avaliacoes (mesmo ano) para ser arquivada com ela
 CREATE TABLE IF NOT EXISTS avaliacao_tags (
-    avaliacao_id UUID REFERENCES avaliacoes(id) ON DELETE CASCADE,
+    avaliacao_id UUID NOT NULL,
+    ano INTEGER NOT NULL,
     tag_id UUID REFERENCES tags(id) ON DELETE CASCADE,
-    PRIMARY KEY (avaliacao_id, tag_id)
+    PRIMARY KEY (avaliacao_id, tag_id, ano),
+    FOREIGN KEY (avaliacao_id, ano) REFERENCES avaliacoes(id, ano) ON DELETE CASCADE
+) PARTITION BY LIST (ano);
+
+-- Anos de avaliações já arquivados (tabelas no schema arquivo)
+CREATE TABLE IF NOT EXISTS avaliacoes_arquivadas (
+    ano INTEGER PRIMARY KEY,
+    avaliacoes INTEGER NOT NULL,
+    tags INTEGER NOT NULL,
+    tablespace TEXT,
+    arquivado_em TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Tabela de relatórios trimestrais
@@ -166,13 +294,657 @@ CREATE TABLE IF NOT EXISTS relatorios (
     UNIQUE(aluno_id, trimestre, ano)
 );
 
+-- Agregados trimestrais por aluno, mantidos por triggers a cada escrita em
+-- avaliacoes/avaliacao_tags (só avaliações concluídas entram na conta)
+CREATE TABLE IF NOT EXISTS agregados_trimestrais (
+    aluno_id UUID REFERENCES alunos(id) ON DELETE CASCADE,
+    trimestre INTEGER CHECK (trimestre IN (1, 2, 3)) NOT NULL,
+    ano INTEGER NOT NULL,
+    avaliacoes INTEGER NOT NULL DEFAULT 0,             -- avaliações concluídas
+    contagens JSONB NOT NULL DEFAULT '{}'::jsonb,      -- {"Categoria": {"1": n, "2": n, "3": n}}
+    tags JSONB NOT NULL DEFAULT '{}'::jsonb,           -- {"tag_id": n}
+    recentes JSONB NOT NULL DEFAULT '[]'::jsonb,       -- últimas 10 concluídas [{"data", "campos"}]
+    primeira_avaliacao DATE,
+    ultima_avaliacao DATE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (aluno_id, trimestre, ano)
+);
+
+-- Uso de LLM por chamada (tokens e custo), para contabilidade por turma/escola
+CREATE TABLE IF NOT EXISTS uso_llm (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    escola_id UUID REFERENCES escolas(id) ON DELETE SET NULL,
+    turma_id UUID REFERENCES turmas(id) ON DELETE SET NULL,
+    aluno_id UUID REFERENCES alunos(id) ON DELETE SET NULL,
+    trimestre INTEGER CHECK (trimestre IN (1, 2, 3)),
+    ano INTEGER,
+    provedor VARCHAR(20) NOT NULL,
+    modelo VARCHAR(100) NOT NULL,
+    do_cache BOOLEAN DEFAULT FALSE,  -- Texto reaproveitado do cache de rascunhos
+    tokens_prompt INTEGER NOT NULL DEFAULT 0,
+    tokens_cache INTEGER NOT NULL DEFAULT 0,  -- Parte do prompt lida do cache do provedor
+    tokens_resposta INTEGER NOT NULL DEFAULT 0,
+    custo_usd NUMERIC(12, 6),  -- NULL: modelo sem preço cadastrado
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Fila durável de tarefas em segundo plano (geração de relatórios, reparos).
+-- Trabalhadores reservam com reservar_tarefa e mandam heartbeat; se um
+-- processo cai, recuperar_tarefas_orfas devolve a tarefa à fila
+CREATE TABLE IF NOT EXISTS tarefas (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    parametros JSONB NOT NULL DEFAULT '{}'::jsonb,
+    escola_id UUID REFERENCES escolas(id) ON DELETE CASCADE,  -- Justiça entre escolas
+    criado_por UUID REFERENCES usuarios(id) ON DELETE SET NULL,
+    prioridade INTEGER NOT NULL DEFAULT 5 CHECK (prioridade BETWEEN 0 AND 9),  -- 9 = mais urgente
+    status VARCHAR(20) NOT NULL DEFAULT 'pendente'
+        CHECK (status IN ('pendente', 'executando', 'concluida', 'falhou', 'cancelada')),
+    progresso_total INTEGER NOT NULL DEFAULT 0,
+    progresso_feito INTEGER NOT NULL DEFAULT 0,
+    progresso_falhas INTEGER NOT NULL DEFAULT 0,
+    resultado JSONB,
+    erro TEXT,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    max_tentativas INTEGER NOT NULL DEFAULT 3,
+    cancelamento_solicitado BOOLEAN NOT NULL DEFAULT FALSE,
+    trabalhador VARCHAR(100),  -- host:pid:n de quem está executando
+    heartbeat_em TIMESTAMP WITH TIME ZONE,
+    iniciada_em TIMESTAMP WITH TIME ZONE,
+    concluida_em TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Cada tentativa de entrega de relatório ao responsável (gravadas em lote).
+-- relatorios.enviado_em/enviado_por guardam só a última entrega bem-sucedida
+CREATE TABLE IF NOT EXISTS envios (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    relatorio_id UUID REFERENCES relatorios(id) ON DELETE CASCADE NOT NULL,
+    aluno_id UUID REFERENCES alunos(id) ON DELETE CASCADE,
+    canal VARCHAR(20) CHECK (canal IN ('email', 'whatsapp', 'api')) NOT NULL,
+    destino VARCHAR(255) NOT NULL,  -- E-mail, telefone ou id do aluno (api)
+    status VARCHAR(20) CHECK (status IN ('enviado', 'falhou')) NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 1,
+    erro TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Índices para performance
 CREATE INDEX idx_avaliacoes_aluno_data ON avaliacoes(aluno_id, data_avaliacao);
 CREATE INDEX idx_avaliacoes_trimestre ON avaliacoes(trimestre, ano);
 CREATE INDEX idx_alunos_turma ON alunos(turma_id);
 CREATE INDEX idx_turmas_professor ON turmas(professor_id);
+CREATE INDEX idx_turmas_professor_listagem ON turmas(professor_id, ativo, serie, turma);
+CREATE INDEX idx_usuarios_coordenador ON usuarios(coordenador_id) WHERE coordenador_id IS NOT NULL;
 CREATE INDEX idx_tags_usuario ON tags(usuario_id);
 CREATE INDEX idx_alunos_necessidades ON alunos(necessidades_especiais) WHERE necessidades_especiais = TRUE;
+CREATE INDEX idx_alunos_turma_ativos ON alunos(turma_id) WHERE ativo = TRUE;
+
+-- Índices compostos para paginação por cursor (ordenação + id como desempate)
+CREATE INDEX idx_alunos_ativo_nome_id ON alunos(ativo, nome, id);
+CREATE INDEX idx_alunos_ativo_nascimento_id ON alunos(ativo, data_nascimento, id);
+CREATE INDEX idx_alunos_ativo_matricula_id ON alunos(ativo, matricula, id);
+CREATE INDEX idx_alunos_turma_nome_id ON alunos(turma_id, ativo, nome, id);
+
+-- Multi-escola: toda consulta do usuário filtra pela escola dele, então os
+-- índices das listagens começam por escola_id (uma escola grande não pesa
+-- nas leituras das outras)
+CREATE INDEX idx_turmas_escola_listagem ON turmas(escola_id, ativo, serie, turma);
+CREATE INDEX idx_usuarios_escola_tipo ON usuarios(escola_id, tipo);
+CREATE INDEX idx_alunos_escola_ativo_nome_id ON alunos(escola_id, ativo, nome, id);
+CREATE INDEX idx_alunos_escola_ativo_nascimento_id ON alunos(escola_id, ativo, data_nascimento, id);
+CREATE INDEX idx_alunos_escola_ativo_matricula_id ON alunos(escola_id, ativo, matricula, id);
+CREATE INDEX idx_avaliacoes_escola_data ON avaliacoes(escola_id, data_avaliacao);
+CREATE INDEX idx_avaliacoes_escola_trimestre ON avaliacoes(escola_id, trimestre, ano);
+
+-- BRIN por data: as avaliações entram em ordem de dia, então faixas de datas
+-- (semana, trimestre) são lidas por blocos com um índice de poucos KB por
+-- partição (um B-tree de data teria o tamanho da tabela)
+CREATE INDEX idx_avaliacoes_data_brin ON avaliacoes USING brin (data_avaliacao) WITH (pages_per_range = 32);
+
+-- Busca de alunos: trigramas sem acento (nome e responsável) e prefixo de matrícula
+CREATE INDEX idx_alunos_busca_nome ON alunos USING gin (normalizar_busca(nome) gin_trgm_ops);
+CREATE INDEX idx_alunos_busca_responsavel ON alunos USING gin (normalizar_busca(responsavel_nome) gin_trgm_ops);
+CREATE INDEX idx_alunos_busca_matricula ON alunos (lower(matricula) text_pattern_ops);
+
+-- Contabilidade de LLM por escola/turma em um período
+CREATE INDEX idx_uso_llm_escola_data ON uso_llm(escola_id, created_at);
+CREATE INDEX idx_uso_llm_turma_data ON uso_llm(turma_id, created_at);
+
+-- Fila de tarefas: próxima pendente e tarefas em execução por escola
+CREATE INDEX idx_tarefas_fila ON tarefas(prioridade DESC, created_at) WHERE status = 'pendente';
+CREATE INDEX idx_tarefas_executando ON tarefas(escola_id, heartbeat_em) WHERE status = 'executando';
+CREATE INDEX idx_tarefas_escola_data ON tarefas(escola_id, created_at DESC);
+
+-- Histórico de entregas por relatório e falhas recentes para reenvio
+CREATE INDEX idx_envios_relatorio ON envios(relatorio_id, created_at DESC);
+CREATE INDEX idx_envios_falhas ON envios(created_at DESC) WHERE status = 'falhou';
+
+-- Contagem agregada de alunos ativos por turma (evita N+1 na listagem)
+CREATE OR REPLACE FUNCTION contar_alunos_ativos(turma_ids UUID[])
+RETURNS TABLE(turma_id UUID, total BIGINT) AS $$
+    SELECT a.turma_id, COUNT(*) AS total
+    FROM alunos a
+    WHERE a.ativo = TRUE
+      AND a.turma_id = ANY(turma_ids)
+    GROUP BY a.turma_id;
+$$ LANGUAGE sql STABLE;
+
+-- Professores sob um coordenador, seguindo usuarios.coordenador_id em
+-- qualquer profundidade (coordenador de coordenadores vê a rede inteira).
+-- Cada nível é uma busca em idx_usuarios_coordenador
+CREATE OR REPLACE FUNCTION professores_coordenados(p_coordenador_id UUID, p_escola_id UUID DEFAULT NULL)
+RETURNS TABLE(professor_id UUID) AS $$
+    WITH RECURSIVE equipe AS (
+        SELECT u.id, u.tipo, u.escola_id FROM usuarios u
+        WHERE u.coordenador_id = p_coordenador_id AND u.ativo = TRUE
+        UNION
+        SELECT u.id, u.tipo, u.escola_id FROM usuarios u
+        JOIN equipe e ON u.coordenador_id = e.id
+        WHERE e.tipo = 'coordenador' AND u.ativo = TRUE
+    )
+    SELECT e.id FROM equipe e
+    WHERE e.tipo = 'professor' AND (p_escola_id IS NULL OR e.escola_id = p_escola_id);
+$$ LANGUAGE sql STABLE;
+
+-- Resumo do dashboard por turma em uma chamada: alunos ativos, necessidades
+-- especiais, avaliações do dia e relatórios do trimestre por status. Cada
+-- parte é um GROUP BY sobre os alunos ativos das turmas (idx_alunos_turma_ativos,
+-- idx_avaliacoes_aluno_data e UNIQUE(aluno_id, trimestre, ano) de relatorios)
+CREATE OR REPLACE FUNCTION resumo_dashboard(
+    turma_ids UUID[], p_data DATE, p_trimestre INTEGER, p_ano INTEGER
+) RETURNS TABLE(
+    turma_id UUID, alunos_ativos BIGINT, necessidades_especiais BIGINT,
+    avaliacoes_concluidas BIGINT, avaliacoes_rascunho BIGINT, relatorios JSONB
+) AS $$
+    WITH alunos_turmas AS (
+        SELECT a.id, a.turma_id, a.necessidades_especiais
+        FROM alunos a
+        WHERE a.ativo = TRUE AND a.turma_id = ANY(turma_ids)
+    ),
+    contagem AS (
+        SELECT at.turma_id, COUNT(*) AS alunos_ativos,
+               COUNT(*) FILTER (WHERE at.necessidades_especiais) AS necessidades_especiais
+        FROM alunos_turmas at
+        GROUP BY at.turma_id
+    ),
+    avaliacoes_dia AS (
+        SELECT at.turma_id,
+               COUNT(*) FILTER (WHERE av.status = 'concluida') AS concluidas,
+               COUNT(*) FILTER (WHERE av.status = 'rascunho') AS rascunho
+        FROM alunos_turmas at
+        JOIN avaliacoes av ON av.aluno_id = at.id AND av.data_avaliacao = p_data
+                          AND av.ano = EXTRACT(YEAR FROM p_data)::INTEGER  -- Só a partição do ano
+        GROUP BY at.turma_id
+    ),
+    relatorios_status AS (
+        SELECT por_status.turma_id, jsonb_object_agg(por_status.status, por_status.total) AS relatorios
+        FROM (
+            SELECT at.turma_id, r.status, COUNT(*) AS total
+            FROM alunos_turmas at
+            JOIN relatorios r ON r.aluno_id = at.id AND r.trimestre = p_trimestre AND r.ano = p_ano
+            GROUP BY at.turma_id, r.status
+        ) por_status
+        GROUP BY por_status.turma_id
+    )
+    SELECT c.turma_id, c.alunos_ativos, c.necessidades_especiais,
+           COALESCE(ad.concluidas, 0), COALESCE(ad.rascunho, 0),
+           COALESCE(rs.relatorios, '{}'::jsonb)
+    FROM contagem c
+    LEFT JOIN avaliacoes_dia ad ON ad.turma_id = c.turma_id
+    LEFT JOIN relatorios_status rs ON rs.turma_id = c.turma_id;
+$$ LANGUAGE sql STABLE;
+
+-- Busca aproximada de alunos: prefixo de matrícula ou palavras parecidas
+-- (word_similarity >= pg_trgm.word_similarity_threshold, 0.6 por padrão) no
+-- nome ou no nome do responsável, ignorando acentos. Matrícula e nome
+-- valem mais que responsável; melhor campo por aluno. Com p_escola_id, só
+-- alunos da escola
+CREATE OR REPLACE FUNCTION buscar_alunos(
+    p_termo TEXT, p_limite INTEGER DEFAULT 20, p_turma_id UUID DEFAULT NULL, p_apenas_ativos BOOLEAN DEFAULT TRUE,
+    p_escola_id UUID DEFAULT NULL
+) RETURNS TABLE(
+    id UUID, nome VARCHAR, matricula VARCHAR, turma_id UUID, responsavel_nome VARCHAR, ativo BOOLEAN,
+    campo TEXT, pontuacao REAL
+) AS $$
+    WITH termo AS (
+        SELECT normalizar_busca(p_termo) AS t, lower(regexp_replace(p_termo, '[^[:alnum:]]', '', 'g')) AS m
+    ), candidatos AS (
+        -- Faixa [m, m || maior caractere) usa o índice text_pattern_ops
+        SELECT a.id, 'matricula' AS campo, 1.0::REAL AS pontuacao
+        FROM alunos a, termo
+        WHERE termo.m <> '' AND lower(a.matricula) ~>=~ termo.m AND lower(a.matricula) ~<~ (termo.m || chr(1114111))
+          AND (p_escola_id IS NULL OR a.escola_id = p_escola_id)
+        UNION ALL
+        SELECT a.id, 'nome', word_similarity(termo.t, normalizar_busca(a.nome))
+        FROM alunos a, termo
+        WHERE termo.t <% normalizar_busca(a.nome) AND (p_escola_id IS NULL OR a.escola_id = p_escola_id)
+        UNION ALL
+        SELECT a.id, 'responsavel', 0.6 * word_similarity(termo.t, normalizar_busca(a.responsavel_nome))
+        FROM alunos a, termo
+        WHERE termo.t <% normalizar_busca(a.responsavel_nome) AND (p_escola_id IS NULL OR a.escola_id = p_escola_id)
+    ), melhores AS (
+        SELECT DISTINCT ON (c.id) c.id, c.campo, c.pontuacao
+        FROM candidatos c
+        ORDER BY c.id, c.pontuacao DESC
+    )
+    SELECT a.id, a.nome, a.matricula, a.turma_id, a.responsavel_nome, a.ativo, m.campo, m.pontuacao
+    FROM melhores m
+    JOIN alunos a ON a.id = m.id
+    WHERE (p_turma_id IS NULL OR a.turma_id = p_turma_id)
+      AND (NOT p_apenas_ativos OR a.ativo)
+    ORDER BY m.pontuacao DESC, a.nome
+    LIMIT p_limite;
+$$ LANGUAGE sql STABLE;
+
+-- Totais de uso de LLM por (escola, turma), com filtros opcionais.
+-- SUM(custo_usd) ignora as chamadas sem preço (NULL): chamadas_sem_preco diz
+-- quantas ficaram de fora, e o serviço devolve custo NULL quando há alguma
+DROP FUNCTION IF EXISTS resumo_uso_llm(UUID, UUID, TIMESTAMPTZ);  -- Mudou o tipo de retorno
+CREATE OR REPLACE FUNCTION resumo_uso_llm(
+    p_escola_id UUID DEFAULT NULL, p_turma_id UUID DEFAULT NULL, p_desde TIMESTAMPTZ DEFAULT NULL
+) RETURNS TABLE(
+    escola_id UUID, turma_id UUID, geracoes BIGINT, cache_acertos BIGINT,
+    tokens_prompt BIGINT, tokens_cache BIGINT, tokens_resposta BIGINT, custo_usd NUMERIC,
+    chamadas_sem_preco BIGINT
+) AS $$
+    SELECT u.escola_id, u.turma_id, COUNT(*), COUNT(*) FILTER (WHERE u.do_cache),
+           SUM(u.tokens_prompt), SUM(u.tokens_cache), SUM(u.tokens_resposta), SUM(u.custo_usd),
+           COUNT(*) FILTER (WHERE u.custo_usd IS NULL)
+    FROM uso_llm u
+    WHERE (p_escola_id IS NULL OR u.escola_id = p_escola_id)
+      AND (p_turma_id IS NULL OR u.turma_id = p_turma_id)
+      AND (p_desde IS NULL OR u.created_at >= p_desde)
+    GROUP BY u.escola_id, u.turma_id;
+$$ LANGUAGE sql STABLE;
+
+-- Reserva a próxima tarefa pendente para um trabalhador: maior prioridade,
+-- depois a escola com menos tarefas em execução, depois a mais antiga.
+-- Escolas com p_max_por_escola tarefas em execução esperam (limite aproximado:
+-- duas reservas simultâneas podem passar do limite em uma)
+CREATE OR REPLACE FUNCTION reservar_tarefa(p_trabalhador TEXT, p_max_por_escola INTEGER DEFAULT 2)
+RETURNS SETOF tarefas AS $$
+    WITH em_execucao AS (
+        SELECT escola_id, COUNT(*) AS total
+        FROM tarefas
+        WHERE status = 'executando'
+        GROUP BY escola_id
+    ), proxima AS (
+        SELECT t.id
+        FROM tarefas t
+        LEFT JOIN em_execucao e ON e.escola_id IS NOT DISTINCT FROM t.escola_id
+        WHERE t.status = 'pendente'
+          AND COALESCE(e.total, 0) < p_max_por_escola
+        ORDER BY t.prioridade DESC, COALESCE(e.total, 0), t.created_at
+        LIMIT 1
+        FOR UPDATE OF t SKIP LOCKED
+    )
+    UPDATE tarefas
+    SET status = 'executando', trabalhador = p_trabalhador, tentativas = tentativas + 1,
+        iniciada_em = NOW(), heartbeat_em = NOW(), erro = NULL
+    FROM proxima
+    WHERE tarefas.id = proxima.id
+    RETURNING tarefas.*;
+$$ LANGUAGE sql;
+
+-- Tarefas em execução sem heartbeat há p_segundos (processo caiu): voltam à
+-- fila, ou falham se já esgotaram as tentativas
+CREATE OR REPLACE FUNCTION recuperar_tarefas_orfas(p_segundos INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    v_total INTEGER;
+BEGIN
+    UPDATE tarefas
+    SET status = CASE WHEN tentativas >= max_tentativas THEN 'falhou' ELSE 'pendente' END,
+        erro = 'Trabalhador parou de responder',
+        trabalhador = NULL,
+        concluida_em = CASE WHEN tentativas >= max_tentativas THEN NOW() END
+    WHERE status = 'executando'
+      AND heartbeat_em < NOW() - make_interval(secs => p_segundos);
+
+    GET DIAGNOSTICS v_total = ROW_COUNT;
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Avaliações de uma turma em um dia: upsert + tags em uma única chamada
+-- itens: [{aluno_id, data_avaliacao, trimestre, ano, status, campos_avaliados,
+--          observacao_livre, professor_id, tags_ids}]
+CREATE OR REPLACE FUNCTION salvar_avaliacoes_lote(itens JSONB)
+RETURNS SETOF avaliacoes AS $$
+BEGIN
+    INSERT INTO avaliacoes (aluno_id, data_avaliacao, trimestre, ano, status,
+                            campos_avaliados, observacao_livre, professor_id)
+    SELECT l.aluno_id, l.data_avaliacao, l.trimestre, l.ano, COALESCE(l.status, 'rascunho'),
+           l.campos_avaliados, l.observacao_livre, l.professor_id
+    FROM jsonb_to_recordset(itens) AS l(
+        aluno_id UUID, data_avaliacao DATE, trimestre INTEGER, ano INTEGER, status VARCHAR(20),
+        campos_avaliados JSONB, observacao_livre TEXT, professor_id UUID
+    )
+    ON CONFLICT (aluno_id, data_avaliacao, ano) DO UPDATE SET
+        trimestre = EXCLUDED.trimestre,
+        status = EXCLUDED.status,
+        campos_avaliados = EXCLUDED.campos_avaliados,
+        observacao_livre = EXCLUDED.observacao_livre,
+        professor_id = EXCLUDED.professor_id;
+
+    -- Tags do lote substituem as anteriores de cada avaliação
+    DELETE FROM avaliacao_tags t
+    USING avaliacoes a, jsonb_to_recordset(itens) AS l(aluno_id UUID, data_avaliacao DATE, ano INTEGER)
+    WHERE t.avaliacao_id = a.id AND t.ano = a.ano
+      AND a.aluno_id = l.aluno_id
+      AND a.data_avaliacao = l.data_avaliacao
+      AND a.ano = l.ano;
+
+    INSERT INTO avaliacao_tags (avaliacao_id, ano, tag_id)
+    SELECT DISTINCT a.id, a.ano, tag.id
+    FROM jsonb_to_recordset(itens) AS l(aluno_id UUID, data_avaliacao DATE, ano INTEGER, tags_ids UUID[])
+    JOIN avaliacoes a ON a.aluno_id = l.aluno_id AND a.data_avaliacao = l.data_avaliacao AND a.ano = l.ano
+    CROSS JOIN LATERAL unnest(COALESCE(l.tags_ids, '{}'::UUID[])) AS tag(id);
+
+    RETURN QUERY
+    SELECT a.*
+    FROM avaliacoes a
+    JOIN jsonb_to_recordset(itens) AS l(aluno_id UUID, data_avaliacao DATE, ano INTEGER)
+      ON a.aluno_id = l.aluno_id AND a.data_avaliacao = l.data_avaliacao AND a.ano = l.ano;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 🚨 ÂNCORA: CRÍTICO - Manutenção incremental de agregados_trimestrais
+-- Contexto: Cada escrita ajusta só o agregado do (aluno, trimestre, ano) afetado;
+--           ler os dados consolidados não depende do número de dias avaliados
+-- Cuidado: reconstruir_agregados() refaz tudo a partir de avaliacoes (reparo)
+CREATE OR REPLACE FUNCTION somar_contagens(base JSONB, campos JSONB, sinal INTEGER)
+RETURNS JSONB AS $$
+    SELECT base || COALESCE(jsonb_object_agg(
+        c.key,
+        COALESCE(base -> c.key, '{"1": 0, "2": 0, "3": 0}'::jsonb)
+            || jsonb_build_object(c.value::text, COALESCE((base -> c.key ->> c.value::text)::int, 0) + sinal)
+    ), '{}'::jsonb)
+    FROM jsonb_each(COALESCE(campos, '{}'::jsonb)) AS c;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION somar_tags(base JSONB, tag_ids UUID[], sinal INTEGER)
+RETURNS JSONB AS $$
+    SELECT base || COALESCE(jsonb_object_agg(
+        t.id::text, COALESCE((base ->> t.id::text)::int, 0) + sinal
+    ), '{}'::jsonb)
+    FROM unnest(COALESCE(tag_ids, '{}'::UUID[])) AS t(id);
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION ajustar_agregado(
+    p_aluno_id UUID, p_trimestre INTEGER, p_ano INTEGER,
+    p_campos JSONB, p_tag_ids UUID[], p_sinal INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO agregados_trimestrais (aluno_id, trimestre, ano)
+    VALUES (p_aluno_id, p_trimestre, p_ano)
+    ON CONFLICT (aluno_id, trimestre, ano) DO NOTHING;
+
+    UPDATE agregados_trimestrais SET
+        avaliacoes = avaliacoes + CASE WHEN p_campos IS NULL THEN 0 ELSE p_sinal END,
+        contagens = somar_contagens(contagens, p_campos, p_sinal),
+        tags = somar_tags(tags, p_tag_ids, p_sinal),
+        -- Janela das últimas 10: lida pelo índice (aluno_id, data_avaliacao)
+        recentes = (
+            SELECT COALESCE(jsonb_agg(jsonb_build_object('data', r.data_avaliacao, 'campos', r.campos_avaliados)
+                                      ORDER BY r.data_avaliacao), '[]'::jsonb)
+            FROM (
+                SELECT data_avaliacao, campos_avaliados
+                FROM avaliacoes
+                WHERE aluno_id = p_aluno_id AND trimestre = p_trimestre AND ano = p_ano
+                  AND status = 'concluida'
+                ORDER BY data_avaliacao DESC
+                LIMIT 10
+            ) r
+        ),
+        primeira_avaliacao = (
+            SELECT MIN(data_avaliacao) FROM avaliacoes
+            WHERE aluno_id = p_aluno_id AND trimestre = p_trimestre AND ano = p_ano
+              AND status = 'concluida'
+        ),
+        ultima_avaliacao = (
+            SELECT MAX(data_avaliacao) FROM avaliacoes
+            WHERE aluno_id = p_aluno_id AND trimestre = p_trimestre AND ano = p_ano
+              AND status = 'concluida'
+        ),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE aluno_id = p_aluno_id AND trimestre = p_trimestre AND ano = p_ano;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Avaliação criada, editada, concluída ou removida: desconta a versão antiga e soma a nova
+CREATE OR REPLACE FUNCTION atualizar_agregado_avaliacao()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_tags UUID[];
+BEGIN
+    IF TG_OP <> 'INSERT' AND OLD.status = 'concluida' THEN
+        SELECT array_agg(tag_id) INTO v_tags FROM avaliacao_tags WHERE avaliacao_id = OLD.id AND ano = OLD.ano;
+        PERFORM ajustar_agregado(OLD.aluno_id, OLD.trimestre, OLD.ano, OLD.campos_avaliados, v_tags, -1);
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.status = 'concluida' THEN
+        SELECT array_agg(tag_id) INTO v_tags FROM avaliacao_tags WHERE avaliacao_id = NEW.id AND ano = NEW.ano;
+        PERFORM ajustar_agregado(NEW.aluno_id, NEW.trimestre, NEW.ano, NEW.campos_avaliados, v_tags, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tag vinculada/desvinculada de uma avaliação concluída
+CREATE OR REPLACE FUNCTION atualizar_agregado_tag()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_vinculo avaliacao_tags%ROWTYPE;
+    v_avaliacao avaliacoes%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_vinculo := OLD;
+    ELSE
+        v_vinculo := NEW;
+    END IF;
+    SELECT * INTO v_avaliacao FROM avaliacoes WHERE id = v_vinculo.avaliacao_id AND ano = v_vinculo.ano;
+    IF FOUND AND v_avaliacao.status = 'concluida' THEN
+        PERFORM ajustar_agregado(v_avaliacao.aluno_id, v_avaliacao.trimestre, v_avaliacao.ano, NULL,
+                                 ARRAY[v_vinculo.tag_id], CASE WHEN TG_OP = 'DELETE' THEN -1 ELSE 1 END);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Antes de remover a avaliação, remove as tags enquanto ela ainda existe
+-- (o ON DELETE CASCADE rodaria depois, sem a avaliação para descontar)
+CREATE OR REPLACE FUNCTION remover_tags_avaliacao()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM avaliacao_tags WHERE avaliacao_id = OLD.id AND ano = OLD.ano;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER agregado_avaliacoes AFTER INSERT OR UPDATE OR DELETE ON avaliacoes FOR EACH ROW EXECUTE FUNCTION atualizar_agregado_avaliacao();
+CREATE TRIGGER agregado_avaliacoes_remover_tags BEFORE DELETE ON avaliacoes FOR EACH ROW EXECUTE FUNCTION remover_tags_avaliacao();
+CREATE TRIGGER agregado_avaliacao_tags AFTER INSERT OR DELETE ON avaliacao_tags FOR EACH ROW EXECUTE FUNCTION atualizar_agregado_tag();
+
+-- Reparo: recalcula os agregados (de todos ou de alguns alunos) a partir de avaliacoes.
+-- Anos arquivados não estão mais em avaliacoes: os agregados deles ficam como estão
+CREATE OR REPLACE FUNCTION reconstruir_agregados(aluno_ids UUID[] DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    v_total INTEGER;
+BEGIN
+    DELETE FROM agregados_trimestrais g
+    WHERE (aluno_ids IS NULL OR g.aluno_id = ANY(aluno_ids))
+      AND g.ano NOT IN (SELECT ano FROM avaliacoes_arquivadas);
+
+    INSERT INTO agregados_trimestrais (aluno_id, trimestre, ano, avaliacoes, contagens, tags, recentes,
+                                       primeira_avaliacao, ultima_avaliacao)
+    SELECT b.aluno_id, b.trimestre, b.ano, b.total,
+           COALESCE(c.contagens, '{}'::jsonb), COALESCE(t.tags, '{}'::jsonb), COALESCE(r.recentes, '[]'::jsonb),
+           b.primeira, b.ultima
+    FROM (
+        SELECT a.aluno_id, a.trimestre, a.ano, COUNT(*) AS total,
+               MIN(a.data_avaliacao) AS primeira, MAX(a.data_avaliacao) AS ultima
+        FROM avaliacoes a
+        WHERE a.status = 'concluida' AND (aluno_ids IS NULL OR a.aluno_id = ANY(aluno_ids))
+          AND a.ano NOT IN (SELECT ano FROM avaliacoes_arquivadas)
+        GROUP BY a.aluno_id, a.trimestre, a.ano
+    ) b
+    LEFT JOIN LATERAL (
+        SELECT jsonb_object_agg(x.categoria, x.notas) AS contagens
+        FROM (
+            SELECT campo.key AS categoria, jsonb_build_object(
+                '1', COUNT(*) FILTER (WHERE campo.value::text = '1'),
+                '2', COUNT(*) FILTER (WHERE campo.value::text = '2'),
+                '3', COUNT(*) FILTER (WHERE campo.value::text = '3')
+            ) AS notas
+            FROM avaliacoes a, jsonb_each(a.campos_avaliados) AS campo
+            WHERE a.aluno_id = b.aluno_id AND a.trimestre = b.trimestre AND a.ano = b.ano
+              AND a.status = 'concluida'
+            GROUP BY campo.key
+        ) x
+    ) c ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT jsonb_object_agg(y.tag_id, y.total) AS tags
+        FROM (
+            SELECT v.tag_id::text AS tag_id, COUNT(*) AS total
+            FROM avaliacoes a
+            JOIN avaliacao_tags v ON v.avaliacao_id = a.id AND v.ano = a.ano
+            WHERE a.aluno_id = b.aluno_id AND a.trimestre = b.trimestre AND a.ano = b.ano
+              AND a.status = 'concluida'
+            GROUP BY v.tag_id
+        ) y
+    ) t ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT jsonb_agg(jsonb_build_object('data', z.data_avaliacao, 'campos', z.campos_avaliados)
+                         ORDER BY z.data_avaliacao) AS recentes
+        FROM (
+            SELECT a.data_avaliacao, a.campos_avaliados
+            FROM avaliacoes a
+            WHERE a.aluno_id = b.aluno_id AND a.trimestre = b.trimestre AND a.ano = b.ano
+              AND a.status = 'concluida'
+            ORDER BY a.data_avaliacao DESC
+            LIMIT 10
+        ) z
+    ) r ON TRUE;
+
+    GET DIAGNOSTICS v_total = ROW_COUNT;
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Multi-escola: escola_id de alunos vem da turma e o de avaliacoes vem do
+-- aluno, para filtrar direto (sem JOIN) pelos índices idx_*_escola_*.
+-- Avaliações antigas ficam com a escola em que foram feitas
+CREATE OR REPLACE FUNCTION preencher_escola_aluno()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT t.escola_id INTO NEW.escola_id FROM turmas t WHERE t.id = NEW.turma_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION preencher_escola_avaliacao()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT a.escola_id INTO NEW.escola_id FROM alunos a WHERE a.id = NEW.aluno_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION propagar_escola_turma()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE alunos SET escola_id = NEW.escola_id WHERE turma_id = NEW.id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER escola_alunos BEFORE INSERT OR UPDATE OF turma_id ON alunos FOR EACH ROW EXECUTE FUNCTION preencher_escola_aluno();
+CREATE TRIGGER escola_avaliacoes BEFORE INSERT OR UPDATE OF aluno_id ON avaliacoes FOR EACH ROW EXECUTE FUNCTION preencher_escola_avaliacao();
+CREATE TRIGGER escola_turmas AFTER UPDATE OF escola_id ON turmas FOR EACH ROW
+    WHEN (OLD.escola_id IS DISTINCT FROM NEW.escola_id) EXECUTE FUNCTION propagar_escola_turma();
+
+-- 🚨 ÂNCORA: CRÍTICO - Partições de avaliacoes por ano e arquivamento
+-- Contexto: criar_particoes_avaliacoes cria avaliacoes_<ano> e
+--           avaliacao_tags_<ano> (índices e BRIN herdados do pai).
+--           arquivar_avaliacoes(ano) desanexa as duas partições de um ano
+--           encerrado e move para o schema arquivo (opcionalmente para um
+--           tablespace barato): sem DELETE, sem triggers de agregados, sem
+--           inchaço. agregados_trimestrais e relatorios do ano continuam
+--           onde estão; as avaliações seguem legíveis em arquivo.avaliacoes_<ano>
+-- Cuidado: DETACH pega lock exclusivo nas tabelas pai por instantes (rode
+--          fora do horário de aula). Recusa o ano corrente e os posteriores
+CREATE SCHEMA IF NOT EXISTS arquivo;
+
+CREATE OR REPLACE FUNCTION criar_particoes_avaliacoes(p_ano INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM avaliacoes_arquivadas WHERE ano = p_ano) THEN
+        RAISE EXCEPTION 'Avaliações de % já foram arquivadas', p_ano;
+    END IF;
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF avaliacoes FOR VALUES IN (%s)',
+                   'avaliacoes_' || p_ano, p_ano);
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF avaliacao_tags FOR VALUES IN (%s)',
+                   'avaliacao_tags_' || p_ano, p_ano);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION arquivar_avaliacoes(p_ano INTEGER, p_tablespace TEXT DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    v_avaliacoes INTEGER;
+    v_tags INTEGER;
+    v_fk RECORD;
+BEGIN
+    IF p_ano >= EXTRACT(YEAR FROM CURRENT_DATE) THEN
+        RAISE EXCEPTION 'Ano % ainda não terminou', p_ano;
+    END IF;
+    IF to_regclass('public.avaliacoes_' || p_ano) IS NULL THEN
+        RETURN NULL;  -- Sem partição (já arquivado ou nunca criado)
+    END IF;
+    EXECUTE format('SELECT COUNT(*) FROM %I', 'avaliacoes_' || p_ano) INTO v_avaliacoes;
+    EXECUTE format('SELECT COUNT(*) FROM %I', 'avaliacao_tags_' || p_ano) INTO v_tags;
+
+    -- Tags primeiro; a partição desanexada leva uma cópia da FK para
+    -- avaliacoes, que impediria desanexar as avaliações: sai junto
+    EXECUTE format('ALTER TABLE avaliacao_tags DETACH PARTITION %I', 'avaliacao_tags_' || p_ano);
+    FOR v_fk IN
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = ('public.avaliacao_tags_' || p_ano)::regclass
+          AND contype = 'f' AND confrelid = 'avaliacoes'::regclass
+    LOOP
+        EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', 'avaliacao_tags_' || p_ano, v_fk.conname);
+    END LOOP;
+    EXECUTE format('ALTER TABLE avaliacoes DETACH PARTITION %I', 'avaliacoes_' || p_ano);
+
+    EXECUTE format('ALTER TABLE %I SET SCHEMA arquivo', 'avaliacoes_' || p_ano);
+    EXECUTE format('ALTER TABLE %I SET SCHEMA arquivo', 'avaliacao_tags_' || p_ano);
+    IF p_tablespace IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE arquivo.%I SET TABLESPACE %I', 'avaliacoes_' || p_ano, p_tablespace);
+        EXECUTE format('ALTER TABLE arquivo.%I SET TABLESPACE %I', 'avaliacao_tags_' || p_ano, p_tablespace);
+    END IF;
+
+    INSERT INTO avaliacoes_arquivadas (ano, avaliacoes, tags, tablespace)
+    VALUES (p_ano, v_avaliacoes, v_tags, p_tablespace);
+    RETURN jsonb_build_object('ano', p_ano, 'avaliacoes', v_avaliacoes, 'tags', v_tags);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Anos com partição ativa (para o job decidir o que arquivar)
+CREATE OR REPLACE FUNCTION anos_avaliacoes()
+RETURNS TABLE(ano INTEGER) AS $$
+    SELECT substring(c.relname FROM 'avaliacoes_([0-9]+)$')::INTEGER
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'avaliacoes'::regclass
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- Partições iniciais: ano anterior, corrente e seguinte
+SELECT criar_particoes_avaliacoes(a)
+FROM generate_series(EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER - 1, EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER + 1) AS a;
 
 -- Triggers para updated_at
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -189,24 +961,37 @@ CREATE TRIGGER update_turmas_updated_at BEFORE UPDATE ON turmas FOR EACH ROW EXE
 CREATE TRIGGER update_alunos_updated_at BEFORE UPDATE ON alunos FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_avaliacoes_updated_at BEFORE UPDATE ON avaliacoes FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_relatorios_updated_at BEFORE UPDATE ON relatorios FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_tarefas_updated_at BEFORE UPDATE ON tarefas FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 -- Comentários nas tabelas para documentação
-COMMENT ON TABLE escolas IS 'Tabela de escolas para futuro multi-tenant';
+COMMENT ON TABLE escolas IS 'Escolas (multi-escola: dados filtrados por escola_id via header X-Escola-Id)';
 COMMENT ON TABLE usuarios IS 'Professores, coordenadores e administradores do sistema';
 COMMENT ON TABLE turmas IS 'Turmas/classes com série, turma e capacidade';
 COMMENT ON TABLE alunos IS 'Dados completos dos alunos incluindo necessidades especiais';
 COMMENT ON TABLE tags IS 'Tags comportamentais personalizadas por professor';
 COMMENT ON TABLE avaliacoes IS 'Avaliações diárias com status de rascunho/concluída';
 COMMENT ON TABLE relatorios IS 'Relatórios trimestrais com histórico de revisões';
+COMMENT ON TABLE uso_llm IS 'Tokens e custo de cada geração de relatório (contabilidade por turma/escola)';
+COMMENT ON TABLE envios IS 'Tentativas de entrega dos relatórios aos responsáveis (email, whatsapp, api)';
+COMMENT ON TABLE tarefas IS 'Fila durável de tarefas em segundo plano (prioridade, justiça por escola, progresso)';
+COMMENT ON TABLE avaliacoes_arquivadas IS 'Anos de avaliações movidos para o schema arquivo (arquivar_avaliacoes)';
+COMMENT ON TABLE agregados_trimestrais IS 'Contagens por aluno/trimestre mantidas por triggers (reparo: reconstruir_agregados)';
 
 -- Script para deletar todas as tabelas (use com cuidado!)
+-- DROP TABLE IF EXISTS envios CASCADE;
+-- DROP TABLE IF EXISTS tarefas CASCADE;
+-- DROP TABLE IF EXISTS uso_llm CASCADE;
+-- DROP TABLE IF EXISTS agregados_trimestrais CASCADE;
 -- DROP TABLE IF EXISTS avaliacao_tags CASCADE;
 -- DROP TABLE IF EXISTS relatorios CASCADE;
 -- DROP TABLE IF EXISTS avaliacoes CASCADE;
+-- DROP TABLE IF EXISTS avaliacoes_arquivadas CASCADE;
+-- DROP SCHEMA IF EXISTS arquivo CASCADE;
 -- DROP TABLE IF EXISTS tags CASCADE;
 -- DROP TABLE IF EXISTS alunos CASCADE;
 -- DROP TABLE IF EXISTS turmas CASCADE;
 -- DROP TABLE IF EXISTS usuarios CASCADE;
 -- DROP TABLE IF EXISTS escolas CASCADE;
 -- DROP FUNCTION IF EXISTS update_updated_at_column() CASCADE;
+-- DROP FUNCTION IF EXISTS normalizar_busca(TEXT) CASCADE;
 """
\ No newline at end of file
@@ -0,0 +1,1257 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Banco local compatível com PostgREST
+Contexto: Permite rodar a API, benchmarks e testes de carga sem um projeto
+          Supabase. O cliente Supabase real continua montando as requisições;
+          apenas o transporte HTTP é trocado por este, que responde em memória.
+Cuidado: Suporta o subconjunto da sintaxe PostgREST usado pelo sistema.
+         Sintaxe desconhecida gera erro PGRST100 (falha alta, não silenciosa).
+Dependências: get_supabase() usa este transporte quando settings.banco_local=True
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import unicodedata
+from copy import deepcopy
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+from uuid import uuid4
+
+import httpx
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _ano_atual() -> int:
+    return datetime.now().year
+
+
+def _copiar(linha: Dict[str, Any]) -> Dict[str, Any]:
+    """Cópia da linha; só colunas JSONB (dict/list) precisam de cópia profunda"""
+    return {k: deepcopy(v) if isinstance(v, (dict, list)) else v for k, v in linha.items()}
+
+
+# 🚨 ÂNCORA: CRÍTICO - Espelho do SQL_CREATE_TABLES
+# Contexto: Colunas, defaults, chaves únicas e foreign keys de cada tabela
+# Cuidado: Ao alterar SQL_CREATE_TABLES, atualizar aqui também
+TABELAS: Dict[str, Dict[str, Any]] = {
+    "escolas": {
+        "colunas": ("id", "nome", "created_at", "updated_at"),
+        "padroes": {},
+        "unicos": [],
+        "fks": {},
+    },
+    "usuarios": {
+        "colunas": ("id", "email", "nome", "senha_hash", "telefone", "tipo", "escola_id",
+                    "coordenador_id", "ativo", "created_at", "updated_at"),
+        "padroes": {"tipo": "professor", "ativo": True},
+        "unicos": [("email",)],
+        "fks": {"escola_id": "escolas", "coordenador_id": "usuarios"},
+    },
+    "turmas": {
+        "colunas": ("id", "serie", "turma", "ano_letivo", "periodo", "nivel",
+                    "capacidade_maxima", "professor_id", "escola_id", "ativo", "created_at",
+                    "updated_at"),
+        "padroes": {"ano_letivo": _ano_atual, "ativo": True},
+        "unicos": [("escola_id", "serie", "turma", "ano_letivo", "periodo")],
+        "fks": {"professor_id": "usuarios", "escola_id": "escolas"},
+    },
+    "alunos": {
+        "colunas": ("id", "matricula", "nome", "data_nascimento", "foto_url", "turma_id",
+                    "escola_id", "responsavel_nome", "responsavel_telefone", "responsavel_email",
+                    "responsavel_foto_url", "necessidades_especiais", "necessidades_descricao",
+                    "alergias", "restricoes_alimentares", "observacoes", "ativo", "data_saida",
+                    "created_at", "updated_at"),
+        "padroes": {"necessidades_especiais": False, "ativo": True},
+        "unicos": [("escola_id", "matricula")],
+        "fks": {"turma_id": "turmas", "escola_id": "escolas"},
+    },
+    "tags": {
+        "colunas": ("id", "nome", "tipo", "categoria", "cor", "nivel_ensino", "usuario_id",
+                    "created_at"),
+        "padroes": {"tipo": "neutra", "cor": "#0066cc", "nivel_ensino": "ambos"},
+        "unicos": [("nome", "usuario_id")],
+        "fks": {"usuario_id": "usuarios"},
+    },
+    "avaliacoes": {
+        "colunas": ("id", "aluno_id", "escola_id", "data_avaliacao", "trimestre", "ano", "status",
+                    "campos_avaliados", "observacao_livre", "professor_id", "created_at",
+                    "updated_at"),
+        "padroes": {"status": "rascunho"},
+        "unicos": [("aluno_id", "data_avaliacao", "ano")],
+        "fks": {"aluno_id": "alunos", "escola_id": "escolas", "professor_id": "usuarios"},
+        "particao": "ano",
+    },
+    "avaliacao_tags": {
+        "colunas": ("avaliacao_id", "ano", "tag_id"),
+        "padroes": {},
+        "chave_primaria": ("avaliacao_id", "tag_id", "ano"),
+        "unicos": [("avaliacao_id", "tag_id", "ano")],
+        "fks": {"avaliacao_id": "avaliacoes", "tag_id": "tags"},
+        "particao": "ano",
+    },
+    "avaliacoes_arquivadas": {
+        "colunas": ("ano", "avaliacoes", "tags", "tablespace", "arquivado_em"),
+        "padroes": {"arquivado_em": _agora},
+        "chave_primaria": ("ano",),
+        "unicos": [],
+        "fks": {},
+    },
+    "agregados_trimestrais": {
+        "colunas": ("aluno_id", "trimestre", "ano", "avaliacoes", "contagens", "tags", "recentes",
+                    "primeira_avaliacao", "ultima_avaliacao", "updated_at"),
+        "padroes": {"avaliacoes": 0, "contagens": dict, "tags": dict, "recentes": list},
+        "chave_primaria": ("aluno_id", "trimestre", "ano"),
+        "unicos": [("aluno_id", "trimestre", "ano")],
+        "fks": {"aluno_id": "alunos"},
+    },
+    "uso_llm": {
+        "colunas": ("id", "escola_id", "turma_id", "aluno_id", "trimestre", "ano", "provedor", "modelo",
+                    "do_cache", "tokens_prompt", "tokens_cache", "tokens_resposta", "custo_usd",
+                    "created_at"),
+        "padroes": {"do_cache": False, "tokens_prompt": 0, "tokens_cache": 0, "tokens_resposta": 0},
+        "unicos": [],
+        "fks": {"escola_id": "escolas", "turma_id": "turmas", "aluno_id": "alunos"},
+    },
+    "tarefas": {
+        "colunas": ("id", "tipo", "parametros", "escola_id", "criado_por", "prioridade", "status",
+                    "progresso_total", "progresso_feito", "progresso_falhas", "resultado", "erro",
+                    "tentativas", "max_tentativas", "cancelamento_solicitado", "trabalhador",
+                    "heartbeat_em", "iniciada_em", "concluida_em", "created_at", "updated_at"),
+        "padroes": {"parametros": dict, "prioridade": 5, "status": "pendente", "progresso_total": 0,
+                    "progresso_feito": 0, "progresso_falhas": 0, "tentativas": 0, "max_tentativas": 3,
+                    "cancelamento_solicitado": False},
+        "unicos": [],
+        "fks": {"escola_id": "escolas", "criado_por": "usuarios"},
+    },
+    "envios": {
+        "colunas": ("id", "relatorio_id", "aluno_id", "canal", "destino", "status", "tentativas", "erro",
+                    "created_at"),
+        "padroes": {"tentativas": 1},
+        "unicos": [],
+        "fks": {"relatorio_id": "relatorios", "aluno_id": "alunos"},
+    },
+    "relatorios": {
+        "colunas": ("id", "aluno_id", "trimestre", "ano", "texto_final", "historico_revisoes",
+                    "dados_consolidados", "status", "pdf_url", "enviado_em", "enviado_por",
+                    "professor_id", "coordenador_id", "aprovado_em", "created_at",
+                    "updated_at"),
+        "padroes": {"historico_revisoes": list, "status": "rascunho"},
+        "unicos": [("aluno_id", "trimestre", "ano")],
+        "fks": {"aluno_id": "alunos", "professor_id": "usuarios", "coordenador_id": "usuarios"},
+    },
+}
+
+# Funções RPC implementadas em Python (espelham as funções SQL)
+FUNCOES_RPC: Dict[str, Callable[["BancoLocal", Dict[str, Any]], Any]] = {}
+
+
+def funcao_rpc(nome: str):
+    """Registra a implementação local de uma função SQL chamada via rpc()"""
+    def registrar(funcao):
+        FUNCOES_RPC[nome] = funcao
+        return funcao
+    return registrar
+
+
+# Triggers implementados em Python (espelham os triggers SQL), por tabela
+GATILHOS: Dict[str, List[Callable[["BancoLocal", str, Optional[Dict], Optional[Dict]], None]]] = {}
+
+
+def gatilho(tabela: str):
+    """Registra função chamada após cada INSERT/UPDATE/DELETE de linha em `tabela`"""
+    def registrar(funcao):
+        GATILHOS.setdefault(tabela, []).append(funcao)
+        return funcao
+    return registrar
+
+
+# Triggers BEFORE INSERT/UPDATE: alteram a linha antes de validar chaves e FKs
+GATILHOS_ANTES: Dict[str, List[Callable[["BancoLocal", str, Optional[Dict], Dict], None]]] = {}
+
+
+def gatilho_antes(tabela: str):
+    """Registra função chamada com a linha nova antes das validações de INSERT/UPDATE em `tabela`"""
+    def registrar(funcao):
+        GATILHOS_ANTES.setdefault(tabela, []).append(funcao)
+        return funcao
+    return registrar
+
+
+class ErroPostgREST(Exception):
+    """Erro no formato de resposta do PostgREST"""
+
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.corpo = {"code": code, "message": message, "details": details, "hint": None}
+
+
+class BancoLocal:
+    """Armazenamento em memória das tabelas, protegido por lock"""
+
+    def __init__(self, particionar: bool = True):
+        self.tabelas: Dict[str, List[Dict[str, Any]]] = {nome: [] for nome in TABELAS}
+        self.requisicoes = 0
+        self._lock = threading.RLock()
+        # Índices hash das chaves únicas (inclui id), como no Postgres
+        self._indices: Dict[str, Dict[Tuple[str, ...], Dict[tuple, Dict[str, Any]]]] = {
+            nome: {chave: {} for chave in self._chaves(nome)} for nome in TABELAS
+        }
+        # 🚨 ÂNCORA: CRÍTICO - Partições das tabelas com "particao" (PARTITION BY LIST)
+        # Contexto: Além da lista completa, cada valor da chave tem sua lista;
+        #           leituras que informam a chave (ano=eq.X, particao=...) só
+        #           percorrem a partição, como o partition pruning do Postgres.
+        #           particionar=False desliga a poda (linha de base do benchmark)
+        # Cuidado: Diferente do Postgres, partição inexistente é criada no INSERT;
+        #          só anos arquivados recusam a linha
+        self.particionar = particionar
+        self._particoes: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {
+            nome: {} for nome, definicao in TABELAS.items() if "particao" in definicao
+        }
+        self.arquivo: Dict[str, List[Dict[str, Any]]] = {}  # Schema arquivo: "<tabela>_<valor>"
+
+    @staticmethod
+    def _chaves(tabela: str) -> List[Tuple[str, ...]]:
+        definicao = TABELAS[tabela]
+        chaves = [definicao.get("chave_primaria", ("id",))]
+        return chaves + [c for c in definicao["unicos"] if c not in chaves]
+
+    def _disparar_antes(self, tabela: str, operacao: str, antiga: Optional[Dict[str, Any]],
+                        nova: Dict[str, Any]) -> None:
+        for funcao in GATILHOS_ANTES.get(tabela, []):
+            funcao(self, operacao, antiga, nova)
+
+    def _disparar(self, tabela: str, operacao: str, antiga: Optional[Dict[str, Any]],
+                  nova: Optional[Dict[str, Any]]) -> None:
+        for funcao in GATILHOS.get(tabela, []):
+            funcao(self, operacao, antiga, nova)
+
+    def limpar(self) -> None:
+        with self._lock:
+            for nome, linhas in self.tabelas.items():
+                linhas.clear()
+                for indice in self._indices[nome].values():
+                    indice.clear()
+            for particoes in self._particoes.values():
+                particoes.clear()
+            self.arquivo.clear()
+            self.requisicoes = 0
+
+    def _tabela(self, nome: str) -> List[Dict[str, Any]]:
+        if nome not in self.tabelas:
+            raise ErroPostgREST(
+                404, "PGRST205",
+                f"Could not find the table 'public.{nome}' in the schema cache"
+            )
+        return self.tabelas[nome]
+
+    def _particao(self, tabela: str, linha: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Lista da partição da linha (None se a tabela não é particionada)"""
+        if tabela not in self._particoes:
+            return None
+        valor = linha.get(TABELAS[tabela]["particao"])
+        if valor not in self._particoes[tabela] and f"{tabela}_{valor}" in self.arquivo:
+            raise ErroPostgREST(
+                400, "23514",
+                f'no partition of relation "{tabela}" found for row',
+                f"Partition key of the failing row contains ({TABELAS[tabela]['particao']}) = ({valor})."
+            )
+        return self._particoes[tabela].setdefault(valor, [])
+
+    def _linhas(self, tabela: str, particao: Any = None) -> List[Dict[str, Any]]:
+        """Linhas a percorrer: só a partição quando informada (e a poda está ligada)"""
+        linhas = self._tabela(tabela)
+        if particao is None or not self.particionar or tabela not in self._particoes:
+            return linhas
+        return self._particoes[tabela].get(particao, [])
+
+    def criar_particao(self, tabela: str, valor: Any) -> None:
+        with self._lock:
+            self._particoes[tabela].setdefault(valor, [])
+
+    def desanexar_particao(self, tabela: str, valor: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        DETACH PARTITION + SET SCHEMA arquivo: as linhas saem da tabela sem
+        DELETE (nem gatilhos) e ficam em self.arquivo["<tabela>_<valor>"]
+        """
+        with self._lock:
+            linhas = self._particoes[tabela].pop(valor, None)
+            if linhas is None:
+                return None
+            for linha in linhas:
+                self._desindexar(tabela, linha)
+            saindo = {id(linha) for linha in linhas}
+            self.tabelas[tabela][:] = [linha for linha in self.tabelas[tabela] if id(linha) not in saindo]
+            self.arquivo[f"{tabela}_{valor}"] = linhas
+            return linhas
+
+    def _indexar(self, tabela: str, linha: Dict[str, Any]) -> None:
+        for colunas, indice in self._indices[tabela].items():
+            chave = tuple(linha.get(c) for c in colunas)
+            if None not in chave:
+                indice[chave] = linha
+
+    def _desindexar(self, tabela: str, linha: Dict[str, Any]) -> None:
+        for colunas, indice in self._indices[tabela].items():
+            chave = tuple(linha.get(c) for c in colunas)
+            if indice.get(chave) is linha:
+                del indice[chave]
+
+    @staticmethod
+    def _validar_colunas(tabela: str, linha: Dict[str, Any]) -> None:
+        for coluna in linha:
+            if coluna not in TABELAS[tabela]["colunas"]:
+                raise ErroPostgREST(
+                    400, "PGRST204",
+                    f"Could not find the '{coluna}' column of '{tabela}' in the schema cache"
+                )
+
+    def _aplicar_padroes(self, tabela: str, linha: Dict[str, Any]) -> Dict[str, Any]:
+        self._validar_colunas(tabela, linha)
+        nova: Dict[str, Any] = {coluna: None for coluna in TABELAS[tabela]["colunas"]}
+        if "chave_primaria" not in TABELAS[tabela]:
+            nova["id"] = str(uuid4())
+        for coluna, padrao in TABELAS[tabela]["padroes"].items():
+            nova[coluna] = padrao() if callable(padrao) else padrao
+        for coluna in ("created_at", "updated_at"):
+            if coluna in nova:
+                nova[coluna] = _agora()
+        nova.update(_copiar(linha))
+        return nova
+
+    def _validar_fks(self, tabela: str, linha: Dict[str, Any]) -> None:
+        for coluna, destino in TABELAS[tabela]["fks"].items():
+            valor = linha.get(coluna)
+            if valor is None:
+                continue
+            if (str(valor),) not in self._indices[destino][("id",)]:
+                raise ErroPostgREST(
+                    409, "23503",
+                    f'insert or update on table "{tabela}" violates foreign key constraint '
+                    f'"{tabela}_{coluna}_fkey"',
+                    f'Key ({coluna})=({valor}) is not present in table "{destino}".'
+                )
+
+    def _conflito(self, tabela: str, linha: Dict[str, Any], colunas: Tuple[str, ...],
+                  ignorar: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        chave = tuple(linha.get(c) for c in colunas)
+        if None in chave:
+            return None
+        if colunas in self._indices[tabela]:
+            existente = self._indices[tabela][colunas].get(chave)
+            return existente if existente is not ignorar else None
+        for existente in self.tabelas[tabela]:
+            if existente is not ignorar and tuple(existente.get(c) for c in colunas) == chave:
+                return existente
+        return None
+
+    def _validar_unicos(self, tabela: str, linha: Dict[str, Any],
+                        ignorar: Optional[Dict[str, Any]] = None) -> None:
+        for colunas in TABELAS[tabela]["unicos"]:
+            if self._conflito(tabela, linha, colunas, ignorar) is not None:
+                nome = f"{tabela}_{'_'.join(colunas)}_key"
+                valores = ", ".join(str(linha.get(c)) for c in colunas)
+                raise ErroPostgREST(
+                    409, "23505",
+                    f'duplicate key value violates unique constraint "{nome}"',
+                    f"Key ({', '.join(colunas)})=({valores}) already exists."
+                )
+
+    def inserir(self, tabela: str, linhas: List[Dict[str, Any]],
+                on_conflict: Optional[Tuple[str, ...]] = None,
+                resolucao: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Insere linhas (ou faz upsert quando `resolucao` é informada)"""
+        with self._lock:
+            destino = self._tabela(tabela)
+            if on_conflict is None:
+                on_conflict = TABELAS[tabela].get("chave_primaria", ("id",))
+            # Valida tudo antes de gravar (a instrução é atômica no Postgres)
+            pendentes = []
+            vistos: Dict[Tuple[str, ...], set] = {c: set() for c in TABELAS[tabela]["unicos"]}
+            for linha in linhas:
+                existente = self._conflito(tabela, linha, on_conflict) if resolucao else None
+                if existente is not None:
+                    if resolucao == "ignore":
+                        continue
+                    self._validar_colunas(tabela, linha)
+                    nova = {**existente, **_copiar(linha)}
+                    if "updated_at" in existente:
+                        nova["updated_at"] = _agora()
+                else:
+                    nova = self._aplicar_padroes(tabela, linha)
+                    self._particao(tabela, nova)  # Recusa ano arquivado antes de gravar
+                self._disparar_antes(tabela, "INSERT" if existente is None else "UPDATE", existente, nova)
+                self._validar_fks(tabela, nova)
+                self._validar_unicos(tabela, nova, ignorar=existente)
+                for colunas, chaves in vistos.items():
+                    chave = tuple(nova.get(c) for c in colunas)
+                    if None in chave:
+                        continue
+                    if chave in chaves:
+                        if resolucao:
+                            raise ErroPostgREST(
+                                409, "21000",
+                                "ON CONFLICT DO UPDATE command cannot affect row a second time"
+                            )
+                        raise ErroPostgREST(
+                            409, "23505",
+                            f'duplicate key value violates unique constraint "{tabela}_{"_".join(colunas)}_key"'
+                        )
+                    chaves.add(chave)
+                pendentes.append((existente, nova))
+            resultado = []
+            for existente, nova in pendentes:
+                antiga = None
+                if existente is None:
+                    destino.append(nova)
+                    particao = self._particao(tabela, nova)
+                    if particao is not None:
+                        particao.append(nova)
+                else:
+                    antiga = _copiar(existente)
+                    self._desindexar(tabela, existente)
+                    existente.clear()
+                    existente.update(nova)
+                    nova = existente
+                self._indexar(tabela, nova)
+                self._mover_particao(tabela, antiga, nova)
+                self._disparar(tabela, "INSERT" if antiga is None else "UPDATE", antiga, nova)
+                resultado.append(_copiar(nova))
+            return resultado
+
+    def _mover_particao(self, tabela: str, antiga: Optional[Dict[str, Any]], linha: Dict[str, Any]) -> None:
+        """UPDATE que muda a chave de partição move a linha (row movement)"""
+        if antiga is None or tabela not in self._particoes:
+            return
+        coluna = TABELAS[tabela]["particao"]
+        if antiga.get(coluna) == linha.get(coluna):
+            return
+        anterior = self._particoes[tabela].get(antiga.get(coluna), [])
+        anterior[:] = [l for l in anterior if l is not linha]
+        self._particao(tabela, linha).append(linha)
+
+    def selecionar(self, tabela: str, filtro: Callable[[Dict[str, Any]], bool],
+                   copiar: bool = True, particao: Any = None) -> List[Dict[str, Any]]:
+        """
+        Linhas que atendem ao filtro (copiar=False apenas para leitura interna)
+        `particao` restringe a leitura à partição (o filtro continua valendo)
+        """
+        with self._lock:
+            linhas = [linha for linha in self._linhas(tabela, particao) if filtro(linha)]
+            return [_copiar(linha) for linha in linhas] if copiar else linhas
+
+    def buscar_por_id(self, tabela: str, id_: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            linha = self._indices[tabela][("id",)].get((str(id_),))
+            return _copiar(linha) if linha is not None else None
+
+    def atualizar(self, tabela: str, filtro: Callable[[Dict[str, Any]], bool],
+                  dados: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            alvos = [linha for linha in self._tabela(tabela) if filtro(linha)]
+            self._validar_colunas(tabela, dados)
+            novas = []
+            for linha in alvos:
+                nova = {**linha, **_copiar(dados)}
+                if "updated_at" in linha:
+                    nova["updated_at"] = _agora()
+                self._disparar_antes(tabela, "UPDATE", linha, nova)
+                self._validar_fks(tabela, nova)
+                self._validar_unicos(tabela, nova, ignorar=linha)
+                novas.append(nova)
+            for linha, nova in zip(alvos, novas):
+                antiga = _copiar(linha)
+                self._desindexar(tabela, linha)
+                linha.clear()
+                linha.update(nova)
+                self._indexar(tabela, linha)
+                self._mover_particao(tabela, antiga, linha)
+                self._disparar(tabela, "UPDATE", antiga, linha)
+            return [_copiar(linha) for linha in alvos]
+
+    def remover(self, tabela: str, filtro: Callable[[Dict[str, Any]], bool],
+                particao: Any = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            linhas = self._tabela(tabela)
+            removidas = [linha for linha in self._linhas(tabela, particao) if filtro(linha)]
+            if not removidas:
+                return []
+            for linha in removidas:
+                self._desindexar(tabela, linha)
+            removidos = {id(linha) for linha in removidas}
+            linhas[:] = [linha for linha in linhas if id(linha) not in removidos]
+            if tabela in self._particoes:
+                coluna = TABELAS[tabela]["particao"]
+                for valor in {linha.get(coluna) for linha in removidas}:
+                    restantes = self._particoes[tabela].get(valor, [])
+                    restantes[:] = [linha for linha in restantes if id(linha) not in removidos]
+            for linha in removidas:
+                self._disparar(tabela, "DELETE", linha, None)
+            return removidas
+
+
+# ========== PARSER DA SINTAXE POSTGREST ==========
+
+def _dividir(texto: str, separador: str = ",") -> List[str]:
+    """Divide no separador ignorando parênteses e aspas"""
+    partes, atual, nivel, aspas = [], [], 0, False
+    for char in texto:
+        if char == '"':
+            aspas = not aspas
+        elif not aspas and char == "(":
+            nivel += 1
+        elif not aspas and char == ")":
+            nivel -= 1
+        elif not aspas and nivel == 0 and char == separador:
+            partes.append("".join(atual))
+            atual = []
+            continue
+        atual.append(char)
+    partes.append("".join(atual))
+    return [p for p in partes if p != ""]
+
+
+def _sem_aspas(valor: str) -> str:
+    if len(valor) >= 2 and valor[0] == valor[-1] == '"':
+        return valor[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return valor
+
+
+def _converter(armazenado: Any, texto: str) -> Any:
+    """Converte o texto da URL para o tipo do valor armazenado"""
+    if isinstance(armazenado, bool):
+        return texto.lower() == "true"
+    if isinstance(armazenado, (int, float)):
+        return float(texto)
+    return texto
+
+
+def _comparavel(valor: Any) -> Any:
+    if isinstance(valor, bool):
+        return valor
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    return str(valor)
+
+
+def _like(padrao: str, valor: str, ignorar_caixa: bool) -> bool:
+    regex = "^" + ".*".join(re.escape(p) for p in padrao.replace("%", "*").split("*")) + "$"
+    flags = re.DOTALL | (re.IGNORECASE if ignorar_caixa else 0)
+    return re.match(regex, valor, flags) is not None
+
+
+def _compilar_condicao(coluna: str, expressao: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compila `op.valor` (ex: eq.5, not.in.(1,2), is.null) em um predicado"""
+    negar = False
+    if expressao.startswith("not."):
+        negar = True
+        expressao = expressao[4:]
+    operador, _, bruto = expressao.partition(".")
+    opcoes = [_sem_aspas(v) for v in _dividir(bruto.strip("()"))] if operador == "in" else []
+    conjuntos: Dict[type, set] = {}  # Opções do in convertidas uma vez por tipo de valor
+
+    def avaliar(linha: Dict[str, Any]) -> bool:
+        valor = linha.get(coluna)
+        if operador == "is":
+            alvo = {"null": None, "true": True, "false": False}[bruto.lower()]
+            return valor is alvo if alvo is None else valor == alvo
+        if operador == "in":
+            if valor is None:
+                return False
+            if type(valor) not in conjuntos:
+                conjuntos[type(valor)] = {_comparavel(_converter(valor, o)) for o in opcoes}
+            return _comparavel(valor) in conjuntos[type(valor)]
+        if valor is None:
+            return False
+        texto = _sem_aspas(bruto)
+        if operador in ("like", "ilike"):
+            return _like(texto, str(valor), operador == "ilike")
+        if operador in ("cs", "cd"):
+            elementos = {_sem_aspas(e) for e in _dividir(texto.strip("{}"))}
+            atuais = {str(v) for v in (valor or [])}
+            return elementos <= atuais if operador == "cs" else atuais <= elementos
+        esquerda, direita = _comparavel(valor), _comparavel(_converter(valor, texto))
+        if operador == "eq":
+            return esquerda == direita
+        if operador == "neq":
+            return esquerda != direita
+        if operador == "gt":
+            return esquerda > direita
+        if operador == "gte":
+            return esquerda >= direita
+        if operador == "lt":
+            return esquerda < direita
+        if operador == "lte":
+            return esquerda <= direita
+        raise ErroPostgREST(400, "PGRST100", f"operador '{operador}' não suportado pelo banco local")
+
+    if operador not in ("is", "in", "like", "ilike", "cs", "cd", "eq", "neq", "gt", "gte", "lt", "lte"):
+        raise ErroPostgREST(400, "PGRST100", f"operador '{operador}' não suportado pelo banco local")
+
+    return (lambda linha: not avaliar(linha)) if negar else avaliar
+
+
+def _compilar_logico(operador: str, corpo: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compila or=(...)/and=(...) com grupos aninhados"""
+    condicoes = []
+    for item in _dividir(corpo):
+        negar = item.startswith("not.")
+        if negar:
+            item = item[4:]
+        if item.startswith(("and(", "or(")):
+            sub_operador, _, resto = item.partition("(")
+            condicao = _compilar_logico(sub_operador, resto[:-1])
+        else:
+            coluna, _, expressao = item.partition(".")
+            condicao = _compilar_condicao(coluna, expressao)
+        condicoes.append((lambda c: lambda linha: not c(linha))(condicao) if negar else condicao)
+    if operador == "or":
+        return lambda linha: any(c(linha) for c in condicoes)
+    return lambda linha: all(c(linha) for c in condicoes)
+
+
+_PARAMETROS_RESERVADOS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _compilar_filtros(params: List[Tuple[str, str]]) -> Callable[[Dict[str, Any]], bool]:
+    condicoes = []
+    for chave, valor in params:
+        if chave in _PARAMETROS_RESERVADOS:
+            continue
+        if chave in ("or", "and", "not.or", "not.and"):
+            condicao = _compilar_logico(chave.replace("not.", ""), valor.strip()[1:-1])
+            if chave.startswith("not."):
+                condicao = (lambda c: lambda linha: not c(linha))(condicao)
+        elif "." in chave:
+            raise ErroPostgREST(400, "PGRST100", f"filtro em recurso embutido '{chave}' não suportado pelo banco local")
+        else:
+            condicao = _compilar_condicao(chave, valor)
+        condicoes.append(condicao)
+    return lambda linha: all(c(linha) for c in condicoes)
+
+
+def _particao_do_filtro(tabela: str, params: List[Tuple[str, str]]) -> Any:
+    """Valor da chave de partição quando a consulta a fixa com eq (ano=eq.2025)"""
+    coluna = TABELAS.get(tabela, {}).get("particao")
+    for chave, valor in params:
+        if chave == coluna and valor.startswith("eq."):
+            try:
+                return int(valor[3:])
+            except ValueError:
+                return None
+    return None
+
+
+def _ordenar(linhas: List[Dict[str, Any]], ordem: Optional[str]) -> List[Dict[str, Any]]:
+    if not ordem:
+        return linhas
+    for termo in reversed(_dividir(ordem)):
+        partes = termo.split(".")
+        coluna = partes[0]
+        desc = "desc" in partes[1:]
+        nulos_primeiro = "nullsfirst" in partes[1:] or (desc and "nullslast" not in partes[1:])
+        com_valor = [l for l in linhas if l.get(coluna) is not None]
+        sem_valor = [l for l in linhas if l.get(coluna) is None]
+        com_valor.sort(key=lambda l: _comparavel(l[coluna]), reverse=desc)
+        linhas = sem_valor + com_valor if nulos_primeiro else com_valor + sem_valor
+    return linhas
+
+
+def _resolver_relacao(origem: str, destino: str, dica: Optional[str]) -> Tuple[str, str]:
+    """Retorna ('um', coluna_fk_na_origem) ou ('muitos', coluna_fk_no_destino)"""
+    if destino not in TABELAS:
+        raise ErroPostgREST(
+            400, "PGRST200",
+            f"Could not find a relationship between '{origem}' and '{destino}' in the schema cache"
+        )
+    if dica:
+        for col in TABELAS[origem]["fks"]:
+            if dica in (f"{origem}_{col}_fkey", col):
+                return "um", col
+        for col in TABELAS[destino]["fks"]:
+            if dica in (f"{destino}_{col}_fkey", col):
+                return "muitos", col
+    for col, alvo in TABELAS[origem]["fks"].items():
+        if alvo == destino:
+            return "um", col
+    for col, alvo in TABELAS[destino]["fks"].items():
+        if alvo == origem:
+            return "muitos", col
+    raise ErroPostgREST(
+        400, "PGRST200",
+        f"Could not find a relationship between '{origem}' and '{destino}' in the schema cache"
+    )
+
+
+def _filhos_por_pai(banco: BancoLocal, tabela: str, destino: str, coluna: str,
+                    linhas: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Filhos de todas as linhas em uma leitura (hash join, como o índice da FK
+    no Postgres); filho particionado junto com o pai só lê as partições das linhas
+    """
+    chave = TABELAS[destino].get("particao")
+    mesma_particao = chave is not None and TABELAS[tabela].get("particao") == chave
+    grupos: Dict[Any, set] = {}
+    for linha in linhas:
+        grupos.setdefault(linha.get(chave) if mesma_particao else None, set()).add(str(linha.get("id")))
+    por_pai: Dict[str, List[Dict[str, Any]]] = {}
+    for particao, ids in grupos.items():
+        for filho in banco.selecionar(destino, lambda r: str(r.get(coluna)) in ids, particao=particao):
+            por_pai.setdefault(str(filho.get(coluna)), []).append(filho)
+    return por_pai
+
+
+def _projetar(banco: BancoLocal, tabela: str, linhas: List[Dict[str, Any]],
+              select: str) -> List[Dict[str, Any]]:
+    """Aplica a projeção de colunas, incluindo recursos embutidos"""
+    itens = _dividir(select or "*")
+    filhos_embutidos: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    resultado = []
+    for linha in linhas:
+        nova: Dict[str, Any] = {}
+        for item in itens:
+            if "(" in item:
+                cabecalho, _, interno = item.partition("(")
+                interno = interno[:-1]
+                alias, _, referencia = cabecalho.rpartition(":")
+                destino, _, dica = referencia.partition("!")
+                tipo, coluna = _resolver_relacao(tabela, destino, dica or None)
+                if tipo == "um":
+                    pai = banco.buscar_por_id(destino, linha.get(coluna))
+                    projetados = _projetar(banco, destino, [pai] if pai else [], interno)
+                    nova[alias or destino] = projetados[0] if projetados else None
+                else:
+                    if item not in filhos_embutidos:
+                        filhos_embutidos[item] = _filhos_por_pai(banco, tabela, destino, coluna, linhas)
+                    filhos = filhos_embutidos[item].get(str(linha.get("id")), [])
+                    if interno == "count":
+                        nova[alias or destino] = [{"count": len(filhos)}]
+                    else:
+                        nova[alias or destino] = _projetar(banco, destino, filhos, interno)
+            elif item == "*":
+                nova.update(linha)
+            else:
+                alias, _, coluna = item.rpartition(":")
+                coluna = coluna.split("::")[0]
+                nova[alias or coluna] = linha.get(coluna)
+        resultado.append(nova)
+    return resultado
+
+
+# ========== FUNÇÕES RPC ==========
+
+@funcao_rpc("contar_alunos_ativos")
+def _rpc_contar_alunos_ativos(banco: BancoLocal, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ids = {str(i) for i in params.get("turma_ids") or []}
+    totais: Dict[str, int] = {}
+    for aluno in banco.selecionar("alunos", lambda a: a["ativo"] and a["turma_id"] in ids, copiar=False):
+        totais[str(aluno["turma_id"])] = totais.get(str(aluno["turma_id"]), 0) + 1
+    return [{"turma_id": turma_id, "total": total} for turma_id, total in totais.items()]
+
+
+@funcao_rpc("professores_coordenados")
+def _rpc_professores_coordenados(banco: BancoLocal, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    usuarios = banco.selecionar("usuarios", lambda u: u["ativo"] and u["coordenador_id"], copiar=False)
+    escola_id = params.get("p_escola_id")
+    vistos, fronteira, professores = set(), {str(params.get("p_coordenador_id"))}, []
+    while fronteira:
+        nivel = [u for u in usuarios if str(u["coordenador_id"]) in fronteira and u["id"] not in vistos]
+        vistos |= {u["id"] for u in nivel}
+        professores += [{"professor_id": u["id"]} for u in nivel
+                        if u["tipo"] == "professor" and (not escola_id or u["escola_id"] == str(escola_id))]
+        fronteira = {u["id"] for u in nivel if u["tipo"] == "coordenador"}
+    return professores
+
+
+@funcao_rpc("resumo_dashboard")
+def _rpc_resumo_dashboard(banco: BancoLocal, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ids = {str(i) for i in params.get("turma_ids") or []}
+    data, trimestre, ano = params.get("p_data"), params.get("p_trimestre"), params.get("p_ano")
+    alunos = banco.selecionar("alunos", lambda a: a["ativo"] and a["turma_id"] in ids, copiar=False)
+    turma_do_aluno = {a["id"]: a["turma_id"] for a in alunos}
+    resumo: Dict[str, Dict[str, Any]] = {}
+    for aluno in alunos:
+        linha = resumo.setdefault(aluno["turma_id"], {
+            "turma_id": aluno["turma_id"], "alunos_ativos": 0, "necessidades_especiais": 0,
+            "avaliacoes_concluidas": 0, "avaliacoes_rascunho": 0, "relatorios": {},
+        })
+        linha["alunos_ativos"] += 1
+        linha["necessidades_especiais"] += bool(aluno["necessidades_especiais"])
+    for av in banco.selecionar(
+        "avaliacoes", lambda av: av["aluno_id"] in turma_do_aluno and str(av["data_avaliacao"]) == str(data),
+        copiar=False, particao=int(str(data)[:4]),
+    ):
+        resumo[turma_do_aluno[av["aluno_id"]]][f"avaliacoes_{av['status']}"] += 1
+    for rel in banco.selecionar(
+        "relatorios",
+        lambda r: r["aluno_id"] in turma_do_aluno and r["trimestre"] == trimestre and r["ano"] == ano,
+        copiar=False,
+    ):
+        contagens = resumo[turma_do_aluno[rel["aluno_id"]]]["relatorios"]
+        contagens[rel["status"]] = contagens.get(rel["status"], 0) + 1
+    return list(resumo.values())
+
+
+def _normalizar_busca(texto: Optional[str]) -> str:
+    """normalizar_busca do SQL: unaccent + lower"""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto.lower() if not unicodedata.combining(c))
+
+
+def _trigramas(texto: str) -> List[str]:
+    """Trigramas do pg_trgm em ordem: cada palavra com dois espaços antes e um depois"""
+    return [
+        f"  {palavra} "[i:i + 3]
+        for palavra in re.findall(r"[^\W_]+", texto)
+        for i in range(len(palavra) + 1)
+    ]
+
+
+def _word_similarity(termo: str, texto: str) -> float:
+    """word_similarity: melhor trecho contíguo de trigramas do texto (comuns / união)"""
+    alvo = set(_trigramas(termo))
+    sequencia = _trigramas(texto)
+    melhor = 0.0
+    for inicio in range(len(sequencia)):
+        if sequencia[inicio] not in alvo:
+            continue  # Trecho começando fora do termo nunca é o melhor
+        trecho: set = set()
+        for trigrama in sequencia[inicio:]:
+            trecho.add(trigrama)
+            comuns = len(alvo & trecho)
+            melhor = max(melhor, comuns / (len(alvo) + len(trecho) - comuns))
+    return melhor
+
+
+@funcao_rpc("buscar_alunos")
+def _rpc_buscar_alunos(banco: BancoLocal, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    termo = _normalizar_busca(params.get("p_termo"))
+    matricula = re.sub(r"[^\w]|_", "", (params.get("p_termo") or "").lower())
+    turma_id, apenas_ativos = params.get("p_turma_id"), params.get("p_apenas_ativos", True)
+    escola_id = params.get("p_escola_id")
+    resultado = []
+    for a in banco.selecionar("alunos", lambda a: True, copiar=False):
+        if (turma_id and a["turma_id"] != turma_id) or (apenas_ativos and not a["ativo"]):
+            continue
+        if escola_id and a["escola_id"] != str(escola_id):
+            continue
+        opcoes = []
+        if matricula and (a["matricula"] or "").lower().startswith(matricula):
+            opcoes.append((1.0, "matricula"))
+        for coluna, campo, peso in (("nome", "nome", 1.0), ("responsavel_nome", "responsavel", 0.6)):
+            similaridade = _word_similarity(termo, _normalizar_busca(a[coluna]))
+            if similaridade >= 0.6:  # pg_trgm.word_similarity_threshold
+                opcoes.append((peso * similaridade, campo))
+        if opcoes:
+            pontuacao, campo = max(opcoes)
+            resultado.append({
+                "id": a["id"], "nome": a["nome"], "matricula": a["matricula"], "turma_id": a["turma_id"],
+                "responsavel_nome": a["responsavel_nome"], "ativo": a["ativo"],
+                "campo": campo, "pontuacao": round(pontuacao, 4),
+            })
+    resultado.sort(key=lambda r: (-r["pontuacao"], r["nome"]))
+    return resultado[:params.get("p_limite", 20)]
+
+
+@funcao_rpc("salvar_avaliacoes_lote")
+def _rpc_salvar_avaliacoes_lote(banco: BancoLocal, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    itens = params.get("itens") or []
+    with banco._lock:  # Uma transação, como a função plpgsql
+        colunas = TABELAS["avaliacoes"]["colunas"]
+        linhas = [
+            {**{k: v for k, v in item.items() if k in colunas}, "status": item.get("status") or "rascunho"}
+            for item in itens
+        ]
+        gravadas = banco.inserir("avaliacoes", linhas, on_conflict=("aluno_id", "data_avaliacao", "ano"),
+                                 resolucao="merge")
+        ids = {linha["id"] for linha in gravadas}
+        for ano in {linha["ano"] for linha in gravadas}:
+            banco.remover("avaliacao_tags", lambda t: t["avaliacao_id"] in ids, particao=ano)
+        tags = {
+            (linha["id"], linha["ano"], str(tag_id))
+            for linha, item in zip(gravadas, itens)
+            for tag_id in item.get("tags_ids") or []
+        }
+        banco.inserir("avaliacao_tags", [{"avaliacao_id": a, "ano": ano, "tag_id": t}
+                                         for a, ano, t in sorted(tags)])
+        return gravadas
+
+
+@funcao_rpc("resumo_uso_llm")
+def _rpc_resumo_uso_llm(banco: BancoLocal, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    escola_id, turma_id, desde = params.get("p_escola_id"), params.get("p_turma_id"), params.get("p_desde")
+    grupos: Dict[tuple, Dict[str, Any]] = {}
+    for u in banco.selecionar("uso_llm", lambda u: True, copiar=False):
+        if (escola_id and u["escola_id"] != escola_id) or (turma_id and u["turma_id"] != turma_id):
+            continue
+        if desde and u["created_at"] < desde:
+            continue
+        grupo = grupos.setdefault((u["escola_id"], u["turma_id"]), {
+            "escola_id": u["escola_id"], "turma_id": u["turma_id"], "geracoes": 0, "cache_acertos": 0,
+            "tokens_prompt": 0, "tokens_cache": 0, "tokens_resposta": 0, "custo_usd": None,
+            "chamadas_sem_preco": 0,
+        })
+        grupo["geracoes"] += 1
+        grupo["cache_acertos"] += bool(u["do_cache"])
+        for coluna in ("tokens_prompt", "tokens_cache", "tokens_resposta"):
+            grupo[coluna] += u[coluna]
+        if u["custo_usd"] is not None:
+            grupo["custo_usd"] = (grupo["custo_usd"] or 0) + u["custo_usd"]  # SUM ignora NULL
+        else:
+            grupo["chamadas_sem_preco"] += 1
+    return list(grupos.values())
+
+
+@funcao_rpc("reservar_tarefa")
+def _rpc_reservar_tarefa(banco: BancoLocal, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    maximo = params.get("p_max_por_escola", 2)
+    with banco._lock:  # Faz o papel do FOR UPDATE SKIP LOCKED
+        em_execucao: Dict[Optional[str], int] = {}
+        for t in banco.selecionar("tarefas", lambda t: t["status"] == "executando", copiar=False):
+            em_execucao[t["escola_id"]] = em_execucao.get(t["escola_id"], 0) + 1
+        candidatas = [
+            t for t in banco.selecionar("tarefas", lambda t: t["status"] == "pendente", copiar=False)
+            if em_execucao.get(t["escola_id"], 0) < maximo
+        ]
+        if not candidatas:
+            return []
+        proxima = min(candidatas, key=lambda t: (-t["prioridade"], em_execucao.get(t["escola_id"], 0),
+                                                 t["created_at"]))
+        agora = _agora()
+        return banco.atualizar("tarefas", lambda t: t is proxima, {
+            "status": "executando", "trabalhador": params.get("p_trabalhador"),
+            "tentativas": proxima["tentativas"] + 1, "iniciada_em": agora, "heartbeat_em": agora,
+            "erro": None,
+        })
+
+
+@funcao_rpc("recuperar_tarefas_orfas")
+def _rpc_recuperar_tarefas_orfas(banco: BancoLocal, params: Dict[str, Any]) -> int:
+    limite = datetime.fromtimestamp(time.time() - params["p_segundos"], timezone.utc).isoformat()
+    total = 0
+    with banco._lock:
+        for t in banco.selecionar(
+            "tarefas", lambda t: t["status"] == "executando" and (t["heartbeat_em"] or "") < limite, copiar=False
+        ):
+            esgotada = t["tentativas"] >= t["max_tentativas"]
+            banco.atualizar("tarefas", lambda x: x is t, {
+                "status": "falhou" if esgotada else "pendente",
+                "erro": "Trabalhador parou de responder",
+                "trabalhador": None,
+                "concluida_em": _agora() if esgotada else None,
+            })
+            total += 1
+    return total
+
+
+# ========== ESCOLA DE ALUNOS E AVALIAÇÕES (triggers SQL) ==========
+
+@gatilho_antes("alunos")
+def _gatilho_escola_aluno(banco: BancoLocal, operacao: str, antiga: Optional[Dict],
+                          nova: Dict) -> None:
+    """Espelho de preencher_escola_aluno (antes de UNIQUE(escola_id, matricula))"""
+    if antiga is not None and antiga["turma_id"] == nova["turma_id"]:
+        return
+    turma = banco._indices["turmas"][("id",)].get((nova["turma_id"],))
+    nova["escola_id"] = turma["escola_id"] if turma else None
+
+
+@gatilho_antes("avaliacoes")
+def _gatilho_escola_avaliacao(banco: BancoLocal, operacao: str, antiga: Optional[Dict],
+                              nova: Dict) -> None:
+    """Espelho de preencher_escola_avaliacao"""
+    if antiga is not None and antiga["aluno_id"] == nova["aluno_id"]:
+        return
+    aluno = banco._indices["alunos"][("id",)].get((nova["aluno_id"],))
+    nova["escola_id"] = aluno["escola_id"] if aluno else None
+
+
+@gatilho("turmas")
+def _gatilho_escola_turma(banco: BancoLocal, operacao: str, antiga: Optional[Dict],
+                          nova: Optional[Dict]) -> None:
+    """Espelho de propagar_escola_turma"""
+    if operacao == "UPDATE" and antiga["escola_id"] != nova["escola_id"]:
+        banco.atualizar("alunos", lambda a: a["turma_id"] == nova["id"], {"escola_id": nova["escola_id"]})
+
+
+# ========== AGREGADOS TRIMESTRAIS (triggers SQL) ==========
+
+JANELA_RECENTES = 10
+
+
+def _concluidas(banco: BancoLocal, aluno_id: str, trimestre: int, ano: int) -> List[Dict[str, Any]]:
+    concluidas = banco.selecionar(
+        "avaliacoes",
+        lambda a: (a["aluno_id"] == aluno_id and a["trimestre"] == trimestre and a["ano"] == ano
+                   and a["status"] == "concluida"),
+        copiar=False, particao=ano,
+    )
+    return sorted(concluidas, key=lambda a: str(a["data_avaliacao"]))
+
+
+def _janela(concluidas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """recentes + primeira/última data, a partir das concluídas ordenadas por data"""
+    return {
+        "recentes": [
+            {"data": str(a["data_avaliacao"]), "campos": deepcopy(a["campos_avaliados"])}
+            for a in concluidas[-JANELA_RECENTES:]
+        ],
+        "primeira_avaliacao": str(concluidas[0]["data_avaliacao"]) if concluidas else None,
+        "ultima_avaliacao": str(concluidas[-1]["data_avaliacao"]) if concluidas else None,
+    }
+
+
+def _ajustar_agregado(banco: BancoLocal, aluno_id: str, trimestre: int, ano: int,
+                      campos: Optional[Dict[str, int]], tag_ids: List[str], sinal: int) -> None:
+    """Espelho de ajustar_agregado()"""
+    chave = (aluno_id, trimestre, ano)
+    agregado = banco._indices["agregados_trimestrais"][("aluno_id", "trimestre", "ano")].get(chave)
+    if agregado is None:
+        banco.inserir("agregados_trimestrais", [{"aluno_id": aluno_id, "trimestre": trimestre, "ano": ano}])
+        agregado = banco._indices["agregados_trimestrais"][("aluno_id", "trimestre", "ano")][chave]
+    if campos is not None:
+        agregado["avaliacoes"] += sinal
+        for categoria, nota in campos.items():
+            notas = agregado["contagens"].setdefault(categoria, {"1": 0, "2": 0, "3": 0})
+            notas[str(nota)] = notas.get(str(nota), 0) + sinal
+    for tag_id in tag_ids:
+        agregado["tags"][str(tag_id)] = agregado["tags"].get(str(tag_id), 0) + sinal
+    agregado.update(_janela(_concluidas(banco, aluno_id, trimestre, ano)))
+    agregado["updated_at"] = _agora()
+
+
+def _tags_da_avaliacao(banco: BancoLocal, avaliacao_id: str, ano: int) -> List[str]:
+    return [v["tag_id"] for v in banco.selecionar(
+        "avaliacao_tags", lambda v: v["avaliacao_id"] == avaliacao_id, copiar=False, particao=ano
+    )]
+
+
+@gatilho("avaliacoes")
+def _gatilho_agregado_avaliacao(banco: BancoLocal, operacao: str, antiga: Optional[Dict],
+                                nova: Optional[Dict]) -> None:
+    if operacao == "DELETE":
+        # Espelha o BEFORE DELETE: tags saem enquanto a avaliação ainda conta
+        tags = _tags_da_avaliacao(banco, antiga["id"], antiga["ano"])
+        if antiga["status"] == "concluida":
+            _ajustar_agregado(banco, antiga["aluno_id"], antiga["trimestre"], antiga["ano"],
+                              antiga["campos_avaliados"], tags, -1)
+        banco.remover("avaliacao_tags", lambda v: v["avaliacao_id"] == antiga["id"], particao=antiga["ano"])
+        return
+    if antiga is not None and antiga["status"] == "concluida":
+        _ajustar_agregado(banco, antiga["aluno_id"], antiga["trimestre"], antiga["ano"],
+                          antiga["campos_avaliados"], _tags_da_avaliacao(banco, antiga["id"], antiga["ano"]), -1)
+    if nova["status"] == "concluida":
+        _ajustar_agregado(banco, nova["aluno_id"], nova["trimestre"], nova["ano"],
+                          nova["campos_avaliados"], _tags_da_avaliacao(banco, nova["id"], nova["ano"]), 1)
+
+
+@gatilho("avaliacao_tags")
+def _gatilho_agregado_tag(banco: BancoLocal, operacao: str, antiga: Optional[Dict],
+                          nova: Optional[Dict]) -> None:
+    vinculo = antiga if operacao == "DELETE" else nova
+    avaliacao = banco._indices["avaliacoes"][("id",)].get((vinculo["avaliacao_id"],))
+    if avaliacao is not None and avaliacao["status"] == "concluida":
+        _ajustar_agregado(banco, avaliacao["aluno_id"], avaliacao["trimestre"], avaliacao["ano"],
+                          None, [vinculo["tag_id"]], -1 if operacao == "DELETE" else 1)
+
+
+@funcao_rpc("reconstruir_agregados")
+def _rpc_reconstruir_agregados(banco: BancoLocal, params: Dict[str, Any]) -> int:
+    ids = params.get("aluno_ids")
+    alvo = None if ids is None else {str(i) for i in ids}
+    with banco._lock:
+        # Anos arquivados saíram de avaliacoes: os agregados deles ficam
+        arquivados = {a["ano"] for a in banco.selecionar("avaliacoes_arquivadas", lambda a: True, copiar=False)}
+        banco.remover("agregados_trimestrais",
+                      lambda g: (alvo is None or g["aluno_id"] in alvo) and g["ano"] not in arquivados)
+        tags_por_avaliacao: Dict[str, List[str]] = {}
+        for vinculo in banco.selecionar("avaliacao_tags", lambda v: True, copiar=False):
+            tags_por_avaliacao.setdefault(vinculo["avaliacao_id"], []).append(vinculo["tag_id"])
+        agregados: Dict[tuple, Dict[str, Any]] = {}
+        for a in banco.selecionar("avaliacoes", lambda a: a["status"] == "concluida", copiar=False):
+            if alvo is not None and a["aluno_id"] not in alvo:
+                continue
+            chave = (a["aluno_id"], a["trimestre"], a["ano"])
+            agregado = agregados.setdefault(chave, {"avaliacoes": 0, "contagens": {}, "tags": {}})
+            agregado["avaliacoes"] += 1
+            for categoria, nota in a["campos_avaliados"].items():
+                notas = agregado["contagens"].setdefault(categoria, {"1": 0, "2": 0, "3": 0})
+                notas[str(nota)] += 1
+            for tag_id in tags_por_avaliacao.get(a["id"], []):
+                agregado["tags"][tag_id] = agregado["tags"].get(tag_id, 0) + 1
+        banco.inserir("agregados_trimestrais", [
+            {"aluno_id": aluno_id, "trimestre": trimestre, "ano": ano, **agregado,
+             **_janela(_concluidas(banco, aluno_id, trimestre, ano))}
+            for (aluno_id, trimestre, ano), agregado in agregados.items()
+        ])
+        return len(agregados)
+
+
+# ========== PARTIÇÕES DE AVALIAÇÕES ==========
+
+@funcao_rpc("criar_particoes_avaliacoes")
+def _rpc_criar_particoes_avaliacoes(banco: BancoLocal, params: Dict[str, Any]) -> None:
+    ano = int(params["p_ano"])
+    with banco._lock:
+        if f"avaliacoes_{ano}" in banco.arquivo:
+            raise ErroPostgREST(400, "P0001", f"Avaliações de {ano} já foram arquivadas")
+        banco.criar_particao("avaliacoes", ano)
+        banco.criar_particao("avaliacao_tags", ano)
+
+
+@funcao_rpc("anos_avaliacoes")
+def _rpc_anos_avaliacoes(banco: BancoLocal, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    with banco._lock:
+        return [{"ano": ano} for ano in sorted(banco._particoes["avaliacoes"])]
+
+
+@funcao_rpc("arquivar_avaliacoes")
+def _rpc_arquivar_avaliacoes(banco: BancoLocal, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    ano = int(params["p_ano"])
+    if ano >= _ano_atual():
+        raise ErroPostgREST(400, "P0001", f"Ano {ano} ainda não terminou")
+    with banco._lock:
+        avaliacoes = banco.desanexar_particao("avaliacoes", ano)
+        if avaliacoes is None:
+            return None
+        tags = banco.desanexar_particao("avaliacao_tags", ano) or []
+        banco.inserir("avaliacoes_arquivadas", [{
+            "ano": ano, "avaliacoes": len(avaliacoes), "tags": len(tags),
+            "tablespace": params.get("p_tablespace"),
+        }])
+        return {"ano": ano, "avaliacoes": len(avaliacoes), "tags": len(tags)}
+
+
+# ========== TRANSPORTE HTTP ==========
+
+class TransportePostgRESTLocal(httpx.BaseTransport):
+    """
+    Transporte httpx que atende requisições PostgREST a partir do BancoLocal
+    A latência injetada bloqueia a thread, como uma chamada HTTP real
+    """
+
+    def __init__(self, banco: BancoLocal, latencia_ms: float = 0.0, jitter_ms: float = 0.0,
+                 semente: Optional[int] = None):
+        self.banco = banco
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self._aleatorio = random.Random(semente)
+
+    def _dormir(self) -> None:
+        atraso = self.latencia_ms
+        if self.jitter_ms:
+            atraso += self._aleatorio.uniform(0, self.jitter_ms)
+        if atraso > 0:
+            time.sleep(atraso / 1000)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._dormir()
+        with self.banco._lock:
+            self.banco.requisicoes += 1
+        try:
+            return self._atender(request)
+        except ErroPostgREST as erro:
+            return httpx.Response(erro.status, json=erro.corpo)
+
+    def _atender(self, request: httpx.Request) -> httpx.Response:
+        caminho = unquote(request.url.path)
+        if "/rest/v1/" not in caminho:
+            raise ErroPostgREST(404, "PGRST000", f"rota '{caminho}' não suportada pelo banco local")
+        recurso = caminho.split("/rest/v1/", 1)[1].strip("/")
+        params = list(request.url.params.multi_items())
+        consulta = dict(params)
+        prefer = {
+            chave: valor
+            for chave, _, valor in (p.strip().partition("=") for p in request.headers.get("prefer", "").split(","))
+            if chave
+        }
+        objeto_unico = "vnd.pgrst.object" in request.headers.get("accept", "")
+        corpo = json.loads(request.content) if request.content else None
+
+        if recurso.startswith("rpc/"):
+            nome = recurso[4:]
+            if nome not in FUNCOES_RPC:
+                raise ErroPostgREST(404, "PGRST202", f"Could not find the function public.{nome} in the schema cache")
+            argumentos = corpo if request.method == "POST" else consulta
+            retorno = FUNCOES_RPC[nome](self.banco, argumentos or {})
+            if not isinstance(retorno, list):
+                return httpx.Response(200, json=retorno)
+            linhas = [l for l in retorno if _compilar_filtros(params)(l)]
+            return self._responder(request, linhas, consulta, prefer, objeto_unico)
+
+        tabela = recurso
+        filtro = _compilar_filtros(params)
+
+        if request.method in ("GET", "HEAD"):
+            linhas = self.banco.selecionar(tabela, filtro, particao=_particao_do_filtro(tabela, params))
+            return self._responder(request, linhas, consulta, prefer, objeto_unico, tabela)
+
+        if request.method == "POST":
+            linhas = corpo if isinstance(corpo, list) else [corpo]
+            resolucao = prefer.get("resolution", "").replace("-duplicates", "") or None
+            on_conflict = tuple(consulta["on_conflict"].split(",")) if consulta.get("on_conflict") else None
+            if resolucao and on_conflict is None:
+                on_conflict = TABELAS.get(tabela, {}).get("chave_primaria", ("id",))
+            linhas = self.banco.inserir(tabela, linhas, on_conflict, resolucao)
+            return self._responder(request, linhas, consulta, prefer, objeto_unico, tabela, status=201)
+
+        if request.method == "PATCH":
+            linhas = self.banco.atualizar(tabela, filtro, corpo or {})
+            return self._responder(request, linhas, consulta, prefer, objeto_unico, tabela)
+
+        if request.method == "DELETE":
+            linhas = self.banco.remover(tabela, filtro)
+            return self._responder(request, linhas, consulta, prefer, objeto_unico, tabela)
+
+        raise ErroPostgREST(405, "PGRST000", f"método {request.method} não suportado")
+
+    def _responder(self, request: httpx.Request, linhas: List[Dict[str, Any]], consulta: Dict[str, str],
+                   prefer: Dict[str, str], objeto_unico: bool, tabela: Optional[str] = None,
+                   status: int = 200) -> httpx.Response:
+        escrita = tabela is not None and request.method in ("POST", "PATCH", "DELETE")
+        if escrita and prefer.get("return") != "representation":
+            return httpx.Response(201 if status == 201 else 204)
+
+        linhas = _ordenar(linhas, consulta.get("order"))
+        total = len(linhas)
+        inicio = int(consulta.get("offset", 0))
+        fim = inicio + int(consulta["limit"]) if "limit" in consulta else None
+        linhas = linhas[inicio:fim]
+        if tabela is not None:
+            linhas = _projetar(self.banco, tabela, linhas, consulta.get("select", "*"))
+
+        headers = {"content-type": "application/json"}
+        if prefer.get("count"):
+            faixa = f"{inicio}-{inicio + len(linhas) - 1}" if linhas else "*"
+            headers["content-range"] = f"{faixa}/{total}"
+
+        if objeto_unico:
+            if len(linhas) != 1:
+                raise ErroPostgREST(
+                    406, "PGRST116",
+                    "Cannot coerce the result to a single JSON object",
+                    f"The result contains {len(linhas)} rows"
+                )
+            return httpx.Response(status, headers=headers, content=json.dumps(linhas[0]).encode())
+
+        return httpx.Response(status, headers=headers, content=json.dumps(linhas).encode())
+
+
+# Instância única do banco local (compartilhada pelo processo)
+_banco_local: Optional[BancoLocal] = None
+
+
+def get_banco_local() -> BancoLocal:
+    """Retorna o banco em memória usado quando settings.banco_local=True (Singleton)"""
+    global _banco_local
+
+    if _banco_local is None:
+        _banco_local = BancoLocal()
+
+    return _banco_local
@@ -19,6 +19,13 @@ TipoTag = Literal["positiva", "negativa", "neutra"]
 NivelTag = Literal["infantil", "fundamental", "ambos"]
 TipoEnvio = Literal["email", "whatsapp", "api"]
 Trimestre = Literal[1, 2, 3]
+ProvedorLLM = Literal["openai", "anthropic", "google", "local"]
+ModoRascunho = Literal["llm", "modelo", "refinar"]
+TipoTarefa = Literal[
+    "gerar_relatorios_turma", "gerar_relatorios_escola", "reconstruir_agregados", "arquivar_avaliacoes",
+    "renderizar_pdfs_turma", "renderizar_pdfs_escola", "enviar_relatorios_turma", "enviar_relatorios_escola",
+]
+StatusTarefa = Literal["pendente", "executando", "concluida", "falhou", "cancelada"]
 
 # ========== SCHEMAS DE TURMA ==========
 
@@ -53,6 +60,7 @@ class TurmaBase(BaseModel):
 
 class TurmaCreate(TurmaBase):
     professor_id: Optional[UUID] = None
+    escola_id: Optional[UUID] = Field(None, description="Padrão: escola da requisição (X-Escola-Id)")
 
 class TurmaUpdate(BaseModel):
     serie: Optional[str] = None
@@ -66,6 +74,7 @@ class TurmaUpdate(BaseModel):
 class TurmaResponse(TurmaBase):
     id: UUID
     professor_id: Optional[UUID]
+    escola_id: Optional[UUID] = None
     ativo: bool
     created_at: datetime
     updated_at: datetime
@@ -129,14 +138,16 @@ class AlunoUpdate(BaseModel):
 class AlunoResponse(AlunoBase):
     id: UUID
     turma_id: UUID
+    escola_id: Optional[UUID] = None  # Da turma (trigger)
     ativo: bool
     data_saida: Optional[date] = None
     created_at: datetime
     updated_at: datetime
     
-    # Calculado
-    idade: Optional[int] = None
-    tem_restricoes: Optional[bool] = None
+    # Calculado (validate_default: os validadores rodam mesmo sem valor na linha)
+    # Listagens calculam em lote: services/serializacao.alunos_para_resposta
+    idade: Optional[int] = Field(None, validate_default=True)
+    tem_restricoes: Optional[bool] = Field(None, validate_default=True)
     
     model_config = ConfigDict(
         from_attributes=True,
@@ -163,6 +174,37 @@ class AlunoResponse(AlunoBase):
         )
 
 
+class ErroImportacaoAluno(BaseModel):
+    linha: int = Field(..., description="Linha no arquivo (1 = cabeçalho)")
+    matricula: Optional[str] = None
+    erros: List[str]
+
+class ImportacaoAlunosResponse(BaseModel):
+    total_linhas: int
+    validos: int
+    importados: int
+    simulacao: bool = False
+    erros: List[ErroImportacaoAluno] = []
+
+
+class AlunoBuscaResultado(BaseModel):
+    id: UUID
+    nome: str
+    matricula: str
+    turma_id: Optional[UUID] = None
+    responsavel_nome: Optional[str] = None
+    ativo: bool = True
+    campo: str  # Onde casou: nome, matricula ou responsavel
+    pontuacao: float
+
+
+class BuscaAlunosResponse(BaseModel):
+    termo: str
+    origem: str  # indice (prefixos em memória) ou banco (trigramas)
+    resultados: List[AlunoBuscaResultado]
+    duracao_ms: float
+
+
 # ========== SCHEMAS DE TAG ==========
 
 class TagBase(BaseModel):
@@ -196,6 +238,13 @@ class TagResponse(TagBase):
 
 # ========== SCHEMAS DE AVALIAÇÃO ==========
 
+def _validar_notas(campos: Dict[str, int]) -> Dict[str, int]:
+    """Valida que todas as notas estão entre 1 e 3"""
+    for campo, nota in campos.items():
+        if nota not in [1, 2, 3]:
+            raise ValueError(f"Nota do campo '{campo}' deve ser 1, 2 ou 3")
+    return campos
+
 class AvaliacaoBase(BaseModel):
     data_avaliacao: date
     trimestre: Trimestre
@@ -205,11 +254,7 @@ class AvaliacaoBase(BaseModel):
     
     @field_validator('campos_avaliados')
     def validar_notas(cls, v):
-        """Valida que todas as notas estão entre 1 e 3"""
-        for campo, nota in v.items():
-            if nota not in [1, 2, 3]:
-                raise ValueError(f"Nota do campo '{campo}' deve ser 1, 2 ou 3")
-        return v
+        return _validar_notas(v)
 
 class AvaliacaoCreate(AvaliacaoBase):
     aluno_id: UUID
@@ -233,6 +278,32 @@ class AvaliacaoResponse(AvaliacaoBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class AvaliacaoAlunoLote(BaseModel):
+    """Avaliação de um aluno dentro do lote da turma"""
+    aluno_id: UUID
+    campos_avaliados: Dict[str, int] = Field(..., description="Mapa campo->nota (1-3)")
+    observacao_livre: Optional[str] = None
+    tags_ids: List[UUID] = Field(default_factory=list)
+    
+    @field_validator('campos_avaliados')
+    def validar_notas(cls, v):
+        return _validar_notas(v)
+
+class AvaliacaoTurmaLote(BaseModel):
+    """Avaliações de toda a turma em um dia (tela de avaliação)"""
+    data_avaliacao: date
+    trimestre: Trimestre
+    status: StatusAvaliacao = "rascunho"
+    professor_id: Optional[UUID] = None
+    avaliacoes: List[AvaliacaoAlunoLote] = Field(..., min_length=1, max_length=60)
+
+class AvaliacaoLoteResponse(BaseModel):
+    turma_id: UUID
+    data_avaliacao: date
+    total: int
+    avaliacoes: List[AvaliacaoResponse]
+
+
 # ========== SCHEMAS DE RELATÓRIO ==========
 
 class RevisaoHistorico(BaseModel):
@@ -242,11 +313,139 @@ class RevisaoHistorico(BaseModel):
     comentario: Optional[str]
     versao_anterior: Optional[str]
 
+class ConsolidacaoTurmaResponse(BaseModel):
+    turma_id: UUID
+    trimestre: Trimestre
+    ano: int
+    alunos: Dict[str, Dict] = Field(..., description="aluno_id -> dados_consolidados")
+
+class ConsolidacaoAlunoResponse(BaseModel):
+    aluno_id: UUID
+    trimestre: Trimestre
+    ano: int
+    dados_consolidados: Dict = Field(..., description="Lido de agregados_trimestrais")
+
 class RelatorioCreate(BaseModel):
     aluno_id: UUID
     trimestre: Trimestre
     ano: int
 
+class GeracaoRelatoriosRequest(BaseModel):
+    """Geração dos rascunhos de uma turma ou escola"""
+    trimestre: Trimestre
+    ano: Optional[int] = None  # Padrão: ano atual
+    provedor: Optional[ProvedorLLM] = None  # Padrão: default_llm_provider
+    modelo: Optional[str] = None  # Padrão: default_llm_model
+    sobrescrever: bool = Field(False, description="Regera rascunhos existentes (revisão/aprovado nunca)")
+    ignorar_cache: bool = Field(False, description="Chama o LLM mesmo com texto em cache para os mesmos dados")
+    modo: Optional[ModoRascunho] = Field(None, description="llm, modelo (LLM só para dados incomuns) ou refinar; padrão: rascunho_modo")
+
+class FalhaGeracaoRelatorio(BaseModel):
+    aluno_id: UUID
+    erro: str
+
+class UsoLLMResumo(BaseModel):
+    """Tokens e custo somados (requisição, turma ou escola)"""
+    geracoes: int = 0
+    cache_acertos: int = Field(0, description="Rascunhos reaproveitados do cache, sem chamada ao LLM")
+    tokens_prompt: int = 0
+    tokens_cache: int = Field(0, description="Parte de tokens_prompt lida do cache de prompt do provedor")
+    tokens_resposta: int = 0
+    custo_usd: Optional[float] = Field(0.0, description="None se algum modelo não tem preço cadastrado")
+    chamadas_sem_preco: int = Field(0, description="Gerações de modelos sem preço cadastrado (custo desconhecido)")
+
+class GeracaoRelatoriosResponse(BaseModel):
+    total_alunos: int
+    gerados: int
+    ignorados: int = Field(..., description="Sem avaliação concluída ou com relatório protegido")
+    falhas: List[FalhaGeracaoRelatorio] = []
+    provedor: str
+    modelo: str
+    uso: UsoLLMResumo
+    uso_por_turma: Dict[str, UsoLLMResumo] = {}
+    por_provedor: Dict[str, int] = Field({}, description="Rascunhos gerados por provedor (failover/hedge)")
+    por_origem: Dict[str, int] = Field({}, description="Rascunhos por origem: modelo (sem LLM), cache ou llm")
+    duracao_segundos: float
+    relatorios_por_minuto: float
+
+class RenderizacaoPdfRequest(BaseModel):
+    """PDFs dos relatórios aprovados de uma turma ou escola"""
+    trimestre: Trimestre
+    ano: Optional[int] = None  # Padrão: ano atual
+    forcar: bool = Field(False, description="Renderiza de novo mesmo sem mudança no conteúdo")
+
+class FalhaRenderizacaoPdf(BaseModel):
+    relatorio_id: UUID
+    erro: str
+
+class RenderizacaoPdfResponse(BaseModel):
+    total: int = Field(..., description="Relatórios aprovados encontrados")
+    renderizados: int
+    reaproveitados: int = Field(..., description="Conteúdo igual ao do PDF já gravado (não renderizados)")
+    falhas: List[FalhaRenderizacaoPdf] = []
+    bytes_gravados: int
+    duracao_segundos: float
+    pdfs_por_minuto: float
+
+class EnvioRelatoriosRequest(BaseModel):
+    """Envio dos relatórios aprovados de uma turma ou escola aos responsáveis"""
+    trimestre: Trimestre
+    ano: Optional[int] = None  # Padrão: ano atual
+    canais: Optional[List[TipoEnvio]] = Field(
+        None, description="Ordem de preferência; usa o primeiro com contato do responsável. Padrão: email, whatsapp"
+    )
+    reenviar: bool = Field(False, description="Envia de novo os relatórios já enviados")
+
+class FalhaEnvio(BaseModel):
+    relatorio_id: UUID
+    canal: TipoEnvio
+    erro: str
+
+class EnvioRelatoriosResponse(BaseModel):
+    total: int = Field(..., description="Relatórios aprovados encontrados")
+    enviados: int
+    ja_enviados: int
+    sem_contato: int = Field(..., description="Responsável sem contato em nenhum dos canais pedidos")
+    falhas: List[FalhaEnvio] = []
+    por_canal: Dict[str, int] = {}
+    retentativas: int = 0
+    duracao_segundos: float
+    mensagens_por_minuto: float
+
+class UsoLLMResponse(BaseModel):
+    total: UsoLLMResumo
+    por_escola: Dict[str, UsoLLMResumo] = {}
+    por_turma: Dict[str, UsoLLMResumo] = {}
+
+class CacheRelatoriosResponse(BaseModel):
+    ativo: bool
+    entradas: int = 0
+    bytes: int = 0
+    max_entradas: int = 0
+    max_bytes: int = 0
+    acertos: int = 0
+    faltas: int = 0
+    taxa_acerto: float = 0.0
+    gravacoes: int = 0
+    remocoes: int = 0
+
+class EstatisticasProvedorLLM(BaseModel):
+    amostras: int
+    taxa_erro: float
+    latencia_p50: Optional[float] = None
+    latencia_p95: Optional[float] = None
+    prazo_hedge: float
+    falhas_seguidas: int
+    circuito_aberto: bool
+    hedges_disparados: int
+    hedges_vencidos: int
+
+class ProvedoresLLMResponse(BaseModel):
+    primario: str
+    ordem_failover: List[str]
+    hedge_ativo: bool
+    provedores: Dict[str, EstatisticasProvedorLLM] = {}
+
 class RelatorioUpdate(BaseModel):
     texto_final: Optional[str] = None
     status: Optional[StatusRelatorio] = None
@@ -273,6 +472,89 @@ class RelatorioResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+# ========== SCHEMAS DE TAREFA ==========
+
+class TarefaCreate(BaseModel):
+    tipo: TipoTarefa
+    parametros: Dict = Field(default_factory=dict, description="Ex: {escola_id, trimestre, ano, provedor}")
+    escola_id: Optional[UUID] = Field(None, description="Padrão: escola dos parâmetros ou da turma")
+    prioridade: int = Field(5, ge=0, le=9, description="9 = mais urgente")
+    criado_por: Optional[UUID] = None
+
+class TarefaResponse(BaseModel):
+    id: UUID
+    tipo: str
+    parametros: Dict = {}
+    escola_id: Optional[UUID] = None
+    criado_por: Optional[UUID] = None
+    prioridade: int
+    status: StatusTarefa
+    progresso_total: int = 0
+    progresso_feito: int = 0
+    progresso_falhas: int = 0
+    resultado: Optional[Dict] = None
+    erro: Optional[str] = None
+    tentativas: int = 0
+    max_tentativas: int
+    cancelamento_solicitado: bool = False
+    trabalhador: Optional[str] = None
+    heartbeat_em: Optional[datetime] = None
+    iniciada_em: Optional[datetime] = None
+    concluida_em: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+class TarefaProgressoResponse(BaseModel):
+    id: UUID
+    status: StatusTarefa
+    progresso_total: int
+    progresso_feito: int
+    progresso_falhas: int
+    percentual: float
+    itens_por_minuto: Optional[float] = None
+    restante_segundos: Optional[float] = Field(None, description="Estimativa pela vazão até agora")
+    cancelamento_solicitado: bool = False
+    erro: Optional[str] = None
+
+class TarefaEnfileiradaResponse(BaseModel):
+    """Resposta 202 dos endpoints que rodam pela fila de tarefas"""
+    tarefa_id: UUID
+    tipo: str
+    status: StatusTarefa
+    status_url: str = Field(..., description="Progresso em /tarefas/{id}/progresso; resultado em /tarefas/{id}")
+
+
+# ========== SCHEMAS DE DASHBOARD ==========
+
+class AvaliacoesDia(BaseModel):
+    concluidas: int = 0
+    rascunho: int = 0
+    pendentes: int = 0  # Alunos ativos sem avaliação no dia
+
+class DashboardTurma(BaseModel):
+    id: UUID
+    serie: str
+    turma: str
+    nome_completo: str
+    nivel: NivelEnsino
+    periodo: PeriodoAula
+    ano_letivo: int
+    professor_id: Optional[UUID] = None
+    professor_nome: Optional[str] = None
+    alunos_ativos: int = 0
+    necessidades_especiais: int = 0  # Alunos ativos com necessidades especiais
+    avaliacoes_hoje: AvaliacoesDia
+    relatorios: Dict[StatusRelatorio, int]  # Do trimestre, por status
+    sem_relatorio: int = 0  # Alunos ativos ainda sem relatório no trimestre
+
+class DashboardResponse(BaseModel):
+    data: date
+    trimestre: Trimestre
+    ano: int
+    turmas: List[DashboardTurma]
+    totais: Dict[str, int]
+
+
 # ========== SCHEMAS DE RESPOSTA PADRÃO ==========
 
 class MessageResponse(BaseModel):
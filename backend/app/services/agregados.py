@@ -0,0 +1,142 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Agregados trimestrais incrementais por aluno
+Contexto: agregados_trimestrais guarda contagens por categoria/nota, contagem
+          de tags e as últimas JANELA_TENDENCIA avaliações concluídas de cada
+          (aluno, trimestre, ano); triggers no banco os mantêm a cada escrita
+          em avaliacoes/avaliacao_tags
+Cuidado: Só avaliações concluídas entram; rascunho → concluída soma, edição
+         desconta a versão antiga. Tendência usa apenas a janela recente.
+         Observações livres não são agregadas (ver consolidacao.py)
+Dependências: numpy (via consolidacao)
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from app.config import ESCALA_AVALIACAO
+from app.models.database import get_supabase, executar
+from app.services.avaliacoes import categorias_do_nivel
+from app.services.consolidacao import NOTAS, calcular_agregados, montar_matriz
+
+JANELA_TENDENCIA = 10  # Igual ao LIMIT de ajustar_agregado() no SQL
+
+
+def _tendencias(aluno_id: str, recentes: List[Dict[str, Any]], categorias: List[str]) -> Dict[str, tuple]:
+    """Tendência/variação por categoria sobre a janela recente (mesmo cálculo da consolidação)"""
+    registros = [
+        {"aluno_id": aluno_id, "data_avaliacao": r["data"], "campos_avaliados": r["campos"]}
+        for r in recentes
+    ]
+    agregados = calcular_agregados(montar_matriz([aluno_id], registros, categorias))
+    tendencia = agregados["tendencia"][0].tolist()
+    variacao = agregados["variacao"][0].tolist()
+    return {
+        categoria: (tendencia[c], None if variacao[c] != variacao[c] else round(variacao[c], 2))
+        for c, categoria in enumerate(categorias)
+    }
+
+
+def montar_dados_consolidados(
+    agregado: Dict[str, Any],
+    categorias: List[str],
+    tags_info: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Converte uma linha de agregados_trimestrais no formato de dados_consolidados"""
+    aluno_id = str(agregado["aluno_id"])
+    tendencias = _tendencias(aluno_id, agregado.get("recentes") or [], categorias)
+    chaves_notas = [str(k) for k in NOTAS]
+
+    resultado_categorias = {}
+    soma_geral = total_geral = 0
+    for categoria in categorias:
+        contagens = (agregado.get("contagens") or {}).get(categoria) or {}
+        distribuicao = {k: int(contagens.get(k, 0)) for k in chaves_notas}
+        total = sum(distribuicao.values())
+        if not total:
+            continue
+        soma = sum(int(k) * n for k, n in distribuicao.items())
+        soma_geral += soma
+        total_geral += total
+        # Empate fica com a menor nota, como o argmax da consolidação
+        predominante = max(NOTAS, key=lambda k: (distribuicao[str(k)], -k))
+        tendencia, variacao = tendencias[categoria]
+        resultado_categorias[categoria] = {
+            "avaliacoes": total,
+            "distribuicao": distribuicao,
+            "percentual": {k: round(n / total * 100, 1) for k, n in distribuicao.items()},
+            "media": round(soma / total, 2),
+            "predominante": predominante,
+            "descricao": ESCALA_AVALIACAO[predominante],
+            "tendencia": tendencia,
+            "variacao": variacao,
+        }
+
+    tags = [
+        {
+            "tag_id": tag_id,
+            "nome": tags_info.get(tag_id, {}).get("nome"),
+            "tipo": tags_info.get(tag_id, {}).get("tipo"),
+            "ocorrencias": ocorrencias,
+        }
+        for tag_id, ocorrencias in (agregado.get("tags") or {}).items()
+        if ocorrencias
+    ]
+    tags.sort(key=lambda tag: (-tag["ocorrencias"], tag["nome"] or ""))
+
+    return {
+        "trimestre": agregado["trimestre"],
+        "ano": agregado["ano"],
+        "dias_avaliados": agregado["avaliacoes"],
+        "periodo": {
+            "inicio": agregado.get("primeira_avaliacao"),
+            "fim": agregado.get("ultima_avaliacao"),
+        },
+        "media_geral": round(soma_geral / total_geral, 2) if total_geral else None,
+        "categorias": resultado_categorias,
+        "tags": tags,
+        "janela_tendencia": JANELA_TENDENCIA,
+    }
+
+
+async def obter_dados_consolidados(aluno_id: str, trimestre: int, ano: int) -> Optional[Dict[str, Any]]:
+    """
+    🚨 ÂNCORA: CRÍTICO - Leitura O(1) em dias avaliados para RelatorioCreate
+    Contexto: Uma linha do agregado + nível da turma + nomes das tags usadas;
+              nenhuma leitura de avaliacoes
+    Retorna None se o aluno não tem avaliação concluída no trimestre
+    """
+    supabase = get_supabase()
+    agregado, aluno = await asyncio.gather(
+        executar(
+            supabase.table("agregados_trimestrais")
+            .select("*")
+            .eq("aluno_id", str(aluno_id))
+            .eq("trimestre", trimestre)
+            .eq("ano", ano)
+        ),
+        executar(
+            supabase.table("alunos")
+            .select("id, turmas(nivel)")
+            .eq("id", str(aluno_id))
+        ),
+    )
+    if not agregado.data or not aluno.data or not agregado.data[0]["avaliacoes"]:
+        return None
+
+    linha = agregado.data[0]
+    tag_ids = [tag_id for tag_id, n in (linha.get("tags") or {}).items() if n]
+    tags_info = {}
+    if tag_ids:
+        tags = await executar(supabase.table("tags").select("id, nome, tipo").in_("id", tag_ids))
+        tags_info = {tag["id"]: tag for tag in tags.data}
+
+    categorias = categorias_do_nivel((aluno.data[0].get("turmas") or {}).get("nivel"))
+    return await asyncio.to_thread(montar_dados_consolidados, linha, categorias, tags_info)
+
+
+async def reconstruir_agregados(aluno_ids: Optional[List[str]] = None) -> int:
+    """Reparo: recalcula os agregados a partir de avaliacoes (todos se aluno_ids é None)"""
+    supabase = get_supabase()
+    params = {"aluno_ids": [str(a) for a in aluno_ids] if aluno_ids is not None else None}
+    resultado = await executar(supabase.rpc("reconstruir_agregados", params))
+    return resultado.data or 0
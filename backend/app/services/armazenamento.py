@@ -0,0 +1,116 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Armazenamento de arquivos gerados (PDFs dos relatórios)
+Contexto: Interface única para gravar, ler e endereçar arquivos. O
+          backend "local" grava em disco; outro backend (S3, Supabase
+          Storage) entra com registrar_armazenamento, sem mudar quem grava.
+          A URL (pdf_url) só identifica o arquivo: o diretório não é
+          servido, a API entrega os PDFs conferindo a escola (ver links_pdf)
+Cuidado: Métodos síncronos (I/O de arquivo/rede): chame com asyncio.to_thread.
+         Chaves são caminhos relativos com "/" (ex: relatorios/2025/1/x.pdf)
+Dependências: Settings (armazenamento_*)
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from app.config import Settings, get_settings
+
+
+class Armazenamento:
+    """Interface comum: grava e lê bytes sob uma chave e devolve a URL que a identifica"""
+
+    nome: str = ""
+
+    def salvar(self, chave: str, dados: bytes, tipo_conteudo: str = "application/pdf") -> None:
+        raise NotImplementedError
+
+    def existe(self, chave: str) -> bool:
+        raise NotImplementedError
+
+    def ler(self, chave: str) -> Optional[bytes]:
+        """Conteúdo do arquivo (None se não existe)"""
+        raise NotImplementedError
+
+    def remover(self, chave: str) -> None:
+        raise NotImplementedError
+
+    def url(self, chave: str) -> str:
+        raise NotImplementedError
+
+    def chave_da_url(self, url: Optional[str]) -> Optional[str]:
+        """Chave de uma URL gerada por este armazenamento (None se não é daqui)"""
+        raise NotImplementedError
+
+
+class ArmazenamentoLocal(Armazenamento):
+    """Arquivos em `diretorio`; `url_base` é só o prefixo das URLs gravadas"""
+
+    nome = "local"
+
+    def __init__(self, diretorio: str, url_base: str):
+        self.diretorio = Path(diretorio)
+        self.url_base = url_base.rstrip("/")
+
+    def _caminho(self, chave: str) -> Path:
+        caminho = (self.diretorio / chave).resolve()
+        if self.diretorio.resolve() not in caminho.parents:
+            raise ValueError(f"Chave fora do diretório de armazenamento: {chave}")
+        return caminho
+
+    def salvar(self, chave: str, dados: bytes, tipo_conteudo: str = "application/pdf") -> None:
+        caminho = self._caminho(chave)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        # Gravação atômica: quem lê nunca vê um PDF pela metade
+        descritor, temporario = tempfile.mkstemp(dir=caminho.parent, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                arquivo.write(dados)
+            os.replace(temporario, caminho)
+        except BaseException:
+            Path(temporario).unlink(missing_ok=True)
+            raise
+
+    def existe(self, chave: str) -> bool:
+        return self._caminho(chave).is_file()
+
+    def ler(self, chave: str) -> Optional[bytes]:
+        caminho = self._caminho(chave)
+        return caminho.read_bytes() if caminho.is_file() else None
+
+    def remover(self, chave: str) -> None:
+        self._caminho(chave).unlink(missing_ok=True)
+
+    def url(self, chave: str) -> str:
+        return f"{self.url_base}/{chave}"
+
+    def chave_da_url(self, url: Optional[str]) -> Optional[str]:
+        prefixo = f"{self.url_base}/"
+        if not url or not url.startswith(prefixo):
+            return None
+        return url[len(prefixo):]
+
+
+_fabricas: Dict[str, Callable[[Settings], Armazenamento]] = {
+    "local": lambda settings: ArmazenamentoLocal(settings.armazenamento_dir, settings.armazenamento_url_base),
+}
+_armazenamento: Optional[Armazenamento] = None
+
+
+def registrar_armazenamento(nome: str, fabrica: Callable[[Settings], Armazenamento]) -> None:
+    """Disponibiliza um backend para Settings.armazenamento_tipo"""
+    global _armazenamento
+    _fabricas[nome] = fabrica
+    _armazenamento = None
+
+
+def obter_armazenamento() -> Armazenamento:
+    """Backend configurado (instância única)"""
+    global _armazenamento
+    settings = get_settings()
+    if _armazenamento is None or _armazenamento.nome != settings.armazenamento_tipo:
+        if settings.armazenamento_tipo not in _fabricas:
+            raise ValueError(f"Armazenamento desconhecido: {settings.armazenamento_tipo}")
+        _armazenamento = _fabricas[settings.armazenamento_tipo](settings)
+    return _armazenamento
@@ -0,0 +1,32 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Regras das avaliações diárias
+Contexto: Categorias válidas dependem do nível da turma (infantil/fundamental)
+Dependências: CATEGORIAS_FUNDAMENTAL e CATEGORIAS_INFANTIL em app.config
+"""
+
+from typing import Dict, List
+
+from app.config import CATEGORIAS_FUNDAMENTAL, CATEGORIAS_INFANTIL
+
+
+def categorias_do_nivel(nivel: str) -> List[str]:
+    """Categorias avaliadas no nível de ensino da turma"""
+    return CATEGORIAS_INFANTIL if nivel == "infantil" else CATEGORIAS_FUNDAMENTAL
+
+
+def validar_campos_avaliados(campos: Dict[str, int], nivel: str) -> List[str]:
+    """
+    Confere as chaves de campos_avaliados contra as categorias do nível
+    Retorna a lista de problemas (vazia se válido); as notas 1-3 já são
+    validadas pelo schema
+    """
+    if not campos:
+        return ["Nenhuma categoria avaliada"]
+
+    permitidas = set(categorias_do_nivel(nivel))
+    invalidas = [campo for campo in campos if campo not in permitidas]
+    if invalidas:
+        return [
+            f"Categoria(s) {', '.join(repr(c) for c in invalidas)} não pertencem ao nível {nivel}"
+        ]
+    return []
@@ -0,0 +1,437 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Busca de alunos por nome, matrícula e responsável
+Contexto: A secretaria procura "joao sil", "Luíza" ou o começo da matrícula.
+          Primeiro o índice de prefixos em memória (typeahead: cada palavra
+          digitada precisa ser começo de uma palavra do aluno, sem acento e
+          sem caixa); sem resultado ali (erro de digitação, índice ainda
+          carregando), a função buscar_alunos do banco faz a busca aproximada
+          com pg_trgm + unaccent
+Cuidado: O índice é por processo e por escola (o da escola grande não pesa
+         na busca das outras; sem escola na requisição, um índice de todas)
+         e acompanha as escritas de alunos.py (registrar/recarregar).
+         Escritas de fora (outro processo, SQL) entram na recarga periódica
+         (busca_indice_recarga_segundos)
+Dependências: Função SQL buscar_alunos e índices idx_alunos_busca_* (ver SQL_CREATE_TABLES)
+"""
+
+import asyncio
+import heapq
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar, executar_paginado
+
+COLUNAS_INDICE = "id, nome, matricula, turma_id, responsavel_nome, ativo"
+PESO_CAMPO = {"nome": 1.0, "matricula": 1.0, "responsavel": 0.6}
+MAX_VARREDURA = 50_000  # Entradas lidas por prefixo (as completações mais curtas vêm antes)
+FIM_PREFIXO = "\U0010ffff"
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas, sem acento, só letras/dígitos/espaço (mesma ideia de normalizar_busca no SQL)"""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(
+        c if c.isalnum() else " " for c in decomposto.lower() if not unicodedata.combining(c)
+    ).strip()
+
+
+@dataclass
+class AlunoIndexado:
+    id: str
+    nome: str
+    matricula: str
+    turma_id: Optional[str]
+    responsavel_nome: Optional[str]
+    ativo: bool
+    chave_nome: str  # Nome normalizado: desempate da ordem dos resultados
+    chave_matricula: str
+    entradas: Tuple[Tuple[str, str, str, str], ...]  # (palavra, campo, chave_nome, id) no índice
+
+    def como_dict(self, campo: str, pontuacao: float) -> Dict[str, Any]:
+        return {
+            "id": self.id, "nome": self.nome, "matricula": self.matricula, "turma_id": self.turma_id,
+            "responsavel_nome": self.responsavel_nome, "ativo": self.ativo,
+            "campo": campo, "pontuacao": round(pontuacao, 4),
+        }
+
+
+def _nota(palavra: str, token: str, campo: str) -> float:
+    """Peso do campo × (1 se a palavra digitada é inteira, senão fração do tamanho)"""
+    return PESO_CAMPO[campo] * (1.0 if token == palavra else 0.5 + 0.5 * len(palavra) / len(token))
+
+
+def _indexar(linha: Dict[str, Any]) -> AlunoIndexado:
+    aluno_id = str(linha["id"])
+    chave_nome = normalizar(linha.get("nome"))
+    palavras_nome = set(chave_nome.split())
+    palavras_responsavel = set(normalizar(linha.get("responsavel_nome")).split())
+    return AlunoIndexado(
+        id=aluno_id,
+        nome=linha.get("nome") or "",
+        matricula=linha.get("matricula") or "",
+        turma_id=str(linha["turma_id"]) if linha.get("turma_id") else None,
+        responsavel_nome=linha.get("responsavel_nome"),
+        ativo=bool(linha.get("ativo", True)),
+        chave_nome=chave_nome,
+        chave_matricula=normalizar(linha.get("matricula")).replace(" ", ""),
+        entradas=tuple(sorted(
+            [(palavra, "nome", chave_nome, aluno_id) for palavra in palavras_nome]
+            + [(palavra, "responsavel", chave_nome, aluno_id) for palavra in palavras_responsavel]
+        )),
+    )
+
+
+class IndicePrefixos:
+    """
+    🚨 ÂNCORA: CRÍTICO - Listas ordenadas de palavras e de matrículas
+    Contexto: Um prefixo é uma faixa contígua da lista (bisect). Dentro da
+              faixa, cada (palavra, campo) é um bloco de mesma nota já em
+              ordem de nome: os blocos são lidos da maior nota para a menor
+              e a busca para assim que os `limite` melhores estão garantidos
+              (não pontua os milhares de "maria" para devolver 20)
+    """
+
+    def __init__(self):
+        self._palavras: List[Tuple[str, str, str, str]] = []  # (palavra, campo, chave_nome, aluno_id)
+        self._matriculas: List[Tuple[str, str]] = []  # (chave_matricula, aluno_id)
+        self._alunos: Dict[str, AlunoIndexado] = {}
+        self._por_turma: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._alunos)
+
+    @classmethod
+    def construir(cls, linhas: List[Dict[str, Any]]) -> "IndicePrefixos":
+        indice = cls()
+        for linha in linhas:
+            aluno = _indexar(linha)
+            indice._alunos[aluno.id] = aluno
+            indice._palavras.extend(aluno.entradas)
+            if aluno.chave_matricula:
+                indice._matriculas.append((aluno.chave_matricula, aluno.id))
+            indice._por_turma.setdefault(aluno.turma_id, set()).add(aluno.id)
+        indice._palavras.sort()
+        indice._matriculas.sort()
+        return indice
+
+    @staticmethod
+    def _descartar(lista: list, entrada: tuple) -> None:
+        posicao = bisect_left(lista, entrada)
+        if posicao < len(lista) and lista[posicao] == entrada:
+            del lista[posicao]
+
+    def remover(self, aluno_id: str) -> None:
+        aluno = self._alunos.pop(str(aluno_id), None)
+        if aluno is None:
+            return
+        for entrada in aluno.entradas:
+            self._descartar(self._palavras, entrada)
+        self._descartar(self._matriculas, (aluno.chave_matricula, aluno.id))
+        self._por_turma.get(aluno.turma_id, set()).discard(aluno.id)
+
+    def registrar(self, linha: Dict[str, Any]) -> None:
+        """Insere ou substitui o aluno (linha com ao menos as COLUNAS_INDICE)"""
+        self.remover(str(linha["id"]))
+        aluno = _indexar(linha)
+        self._alunos[aluno.id] = aluno
+        for entrada in aluno.entradas:
+            insort(self._palavras, entrada)
+        if aluno.chave_matricula:
+            insort(self._matriculas, (aluno.chave_matricula, aluno.id))
+        self._por_turma.setdefault(aluno.turma_id, set()).add(aluno.id)
+
+    @staticmethod
+    def _faixa(lista: list, prefixo: str) -> Tuple[int, int]:
+        return bisect_left(lista, (prefixo,)), bisect_left(lista, (prefixo + FIM_PREFIXO,))
+
+    def _contar(self, palavra: str) -> int:
+        inicio, fim = self._faixa(self._palavras, palavra)
+        return fim - inicio
+
+    def _grupos(self, palavra: str) -> List[Tuple[float, List[Tuple[int, int]]]]:
+        """Blocos (palavra, campo) da faixa agrupados por nota, da maior para a menor"""
+        palavras = self._palavras
+        inicio, fim = self._faixa(palavras, palavra)
+        por_nota: Dict[float, List[Tuple[int, int]]] = {}
+        lidas = 0
+        while inicio < fim and lidas < MAX_VARREDURA:
+            token, campo = palavras[inicio][0], palavras[inicio][1]
+            fim_bloco = bisect_left(palavras, (token, campo, FIM_PREFIXO), inicio, fim)
+            por_nota.setdefault(_nota(palavra, token, campo), []).append((inicio, fim_bloco))
+            lidas += fim_bloco - inicio
+            inicio = fim_bloco
+        return sorted(por_nota.items(), reverse=True)
+
+    def _em_ordem(self, blocos: List[Tuple[int, int]]):
+        """Entradas dos blocos de um grupo em ordem de nome"""
+        fatias = [self._palavras[inicio:fim] for inicio, fim in blocos]
+        return fatias[0] if len(fatias) == 1 else heapq.merge(*fatias, key=lambda entrada: entrada[2])
+
+    def buscar(
+        self,
+        termo: str,
+        limite: int = 20,
+        turma_id: Optional[str] = None,
+        apenas_ativos: bool = True,
+    ) -> List[Dict[str, Any]]:
+        palavras = normalizar(termo).split()
+        if not palavras:
+            return []
+        junto = "".join(palavras)  # Matrícula digitada com espaço/traço ("2025 001")
+        achados: Dict[str, Tuple[float, str]] = {}  # aluno_id -> (pontuação, campo)
+
+        if turma_id:
+            # Turma inteira cabe numa passada: pontua cada aluno dela
+            for aluno_id in self._por_turma.get(str(turma_id), ()):
+                aluno = self._alunos[aluno_id]
+                if aluno.ativo or not apenas_ativos:
+                    pontuacao, campo = self._pontuar(aluno, palavras, junto)
+                    if pontuacao:
+                        achados[aluno_id] = (pontuacao, campo)
+        else:
+            # Matrícula começando pelo termo (em ordem de matrícula: basta o limite)
+            inicio, fim = self._faixa(self._matriculas, junto)
+            for chave, aluno_id in self._matriculas[inicio:min(fim, inicio + MAX_VARREDURA)]:
+                if self._alunos[aluno_id].ativo or not apenas_ativos:
+                    achados[aluno_id] = (1.0 if chave == junto else 0.5 + 0.5 * len(junto) / len(chave), "matricula")
+                    if len(achados) >= limite:
+                        break
+
+            # Palavras: blocos da palavra mais rara, da maior nota para a menor
+            menor = min(palavras, key=self._contar)
+            if len(palavras) > 1:
+                self._buscar_varias(palavras, menor, limite, apenas_ativos, achados)
+            else:
+                self._buscar_uma(menor, limite, apenas_ativos, achados)
+
+        def chave(aluno_id: str):
+            aluno, (pontuacao, campo) = self._alunos[aluno_id], achados[aluno_id]
+            return -pontuacao, aluno.chave_matricula if campo == "matricula" else aluno.chave_nome, aluno_id
+
+        return [
+            self._alunos[aluno_id].como_dict(achados[aluno_id][1], achados[aluno_id][0])
+            for aluno_id in heapq.nsmallest(limite, achados, key=chave)
+        ]
+
+    def _buscar_uma(self, palavra: str, limite: int, apenas_ativos: bool, achados: Dict[str, Tuple[float, str]]):
+        """Uma palavra: cada grupo já está em ordem de nome, então bastam os primeiros `limite`"""
+        for nota, blocos in self._grupos(palavra):
+            if len(achados) >= limite and nota < min(pontuacao for pontuacao, _ in achados.values()):
+                return
+            novos = 0
+            for _, campo, _, aluno_id in self._em_ordem(blocos):
+                if aluno_id in achados or not (self._alunos[aluno_id].ativo or not apenas_ativos):
+                    continue
+                achados[aluno_id] = (nota, campo)
+                novos += 1
+                if novos >= limite:
+                    break
+
+    def _buscar_varias(
+        self,
+        palavras: List[str],
+        menor: str,
+        limite: int,
+        apenas_ativos: bool,
+        achados: Dict[str, Tuple[float, str]],
+    ):
+        """
+        Várias palavras: candidatos de cada grupo da palavra mais rara
+        cruzados (conjuntos de ids, em C) com as faixas das outras palavras;
+        só a interseção é pontuada. Para quando o teto do próximo grupo (as
+        outras palavras casando inteiras) não alcança os `limite` melhores
+        """
+        outras = list(palavras)
+        outras.remove(menor)
+        filtros = []
+        for palavra in outras:
+            inicio, fim = self._faixa(self._palavras, palavra)
+            if fim - inicio <= MAX_VARREDURA:
+                filtros.append(set(map(itemgetter(3), self._palavras[inicio:fim])))
+        melhores: List[float] = []  # Heap das `limite` maiores pontuações
+        for nota, blocos in self._grupos(menor):
+            if len(melhores) >= limite and (nota + len(outras)) / len(palavras) < melhores[0]:
+                return
+            candidatos = set()
+            for inicio, fim in blocos:
+                candidatos.update(map(itemgetter(3), self._palavras[inicio:fim]))
+            for filtro in filtros:
+                candidatos &= filtro
+            for aluno_id in candidatos:
+                aluno = self._alunos[aluno_id]
+                if aluno_id in achados or not (aluno.ativo or not apenas_ativos):
+                    continue
+                total, campo = self._pontuar_palavras(aluno, palavras)
+                if not total:
+                    continue
+                pontuacao = total / len(palavras)
+                achados[aluno_id] = (pontuacao, campo)
+                heapq.heappush(melhores, pontuacao)
+                if len(melhores) > limite:
+                    heapq.heappop(melhores)
+
+    @staticmethod
+    def _pontuar_palavras(aluno: AlunoIndexado, palavras: List[str]) -> Tuple[float, str]:
+        """Soma, por palavra, do melhor casamento nas entradas do aluno e o campo que mais casou (0 se alguma não casa)"""
+        total, contagem = 0.0, {}
+        for palavra in palavras:
+            melhor, melhor_campo = 0.0, ""
+            for token, campo, _, _ in aluno.entradas:
+                if token.startswith(palavra):
+                    nota = _nota(palavra, token, campo)
+                    if nota > melhor:
+                        melhor, melhor_campo = nota, campo
+            if not melhor:
+                return 0.0, ""
+            total += melhor
+            contagem[melhor_campo] = contagem.get(melhor_campo, 0) + 1
+        return total, max(contagem, key=contagem.get)
+
+    def _pontuar(self, aluno: AlunoIndexado, palavras: List[str], junto: str) -> Tuple[float, str]:
+        """Pontuação completa de um aluno: matrícula vale por si, senão média das palavras"""
+        matricula = aluno.chave_matricula
+        if matricula and matricula.startswith(junto):
+            return (1.0 if matricula == junto else 0.5 + 0.5 * len(junto) / len(matricula)), "matricula"
+        total, campo = self._pontuar_palavras(aluno, palavras)
+        return total / len(palavras), campo
+
+
+class IndiceBuscaAlunos:
+    """Índice de uma escola (None = todas): carga em segundo plano, escritas aplicadas durante a carga, recarga periódica"""
+
+    def __init__(self, escola_id: Optional[str] = None):
+        self.escola_id = escola_id
+        self._indice: Optional[IndicePrefixos] = None
+        self._carregado_em = 0.0
+        self._carga: Optional[asyncio.Task] = None
+        self._pendentes: Optional[List[Tuple[str, Any]]] = None  # Escritas durante a carga
+
+    @property
+    def pronto(self) -> bool:
+        return self._indice is not None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "pronto": self.pronto,
+            "alunos": len(self._indice) if self._indice else 0,
+            "carregado_ha_segundos": round(time.monotonic() - self._carregado_em, 1) if self.pronto else None,
+        }
+
+    async def _carregar(self) -> None:
+        self._pendentes = []
+        try:
+            supabase = get_supabase()
+            def criar_query():
+                query = supabase.table("alunos").select(COLUNAS_INDICE)
+                if self.escola_id:
+                    query = query.eq("escola_id", self.escola_id)  # idx_alunos_escola_*
+                return query.order("id")
+
+            linhas = await executar_paginado(criar_query)
+            indice = await asyncio.to_thread(IndicePrefixos.construir, linhas)
+            for operacao, valor in self._pendentes:
+                indice.registrar(valor) if operacao == "registrar" else indice.remover(valor)
+            self._indice = indice
+            self._carregado_em = time.monotonic()
+        finally:
+            self._pendentes = None
+            self._carga = None
+
+    def garantir_carga(self) -> None:
+        """Dispara a (re)carga em segundo plano quando falta o índice ou ele passou da idade"""
+        idade = time.monotonic() - self._carregado_em
+        if self._carga is None and (not self.pronto or idade > get_settings().busca_indice_recarga_segundos):
+            self._carga = asyncio.get_running_loop().create_task(self._carregar())
+
+    async def aguardar_carga(self) -> None:
+        self.garantir_carga()
+        if self._carga is not None:
+            await asyncio.shield(self._carga)
+
+    def buscar(self, termo: str, **filtros) -> Optional[List[Dict[str, Any]]]:
+        """None se o índice ainda não está pronto"""
+        return self._indice.buscar(termo, **filtros) if self._indice else None
+
+    def registrar(self, linha: Dict[str, Any]) -> None:
+        if self._pendentes is not None:
+            self._pendentes.append(("registrar", linha))
+        if self._indice is not None:
+            self._indice.registrar(linha)
+
+    def remover(self, aluno_id: str) -> None:
+        if self._pendentes is not None:
+            self._pendentes.append(("remover", str(aluno_id)))
+        if self._indice is not None:
+            self._indice.remover(str(aluno_id))
+
+    def recarregar(self) -> None:
+        """Escrita em massa sem as linhas (importação): próxima busca recarrega"""
+        self._carregado_em = 0.0
+
+
+class IndicesPorEscola:
+    """Um IndiceBuscaAlunos por escola, criado na primeira busca dela; escritas vão aos índices afetados"""
+
+    def __init__(self):
+        self._indices: Dict[Optional[str], IndiceBuscaAlunos] = {}
+
+    def da_escola(self, escola_id: Optional[str]) -> IndiceBuscaAlunos:
+        indice = self._indices.get(escola_id)
+        if indice is None:
+            indice = self._indices[escola_id] = IndiceBuscaAlunos(escola_id)
+        return indice
+
+    def registrar(self, linha: Dict[str, Any]) -> None:
+        """Linha com escola_id: entra no índice dela e no geral, sai dos demais (troca de escola)"""
+        escola_id = str(linha["escola_id"]) if linha.get("escola_id") else None
+        for chave, indice in self._indices.items():
+            if chave is None or chave == escola_id:
+                indice.registrar(linha)
+            else:
+                indice.remover(str(linha["id"]))
+
+    def remover(self, aluno_id: str) -> None:
+        for indice in self._indices.values():
+            indice.remover(aluno_id)
+
+    def recarregar(self) -> None:
+        for indice in self._indices.values():
+            indice.recarregar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {str(escola_id or "todas"): indice.estatisticas() for escola_id, indice in self._indices.items()}
+
+
+_indices = IndicesPorEscola()
+
+
+def obter_indice_busca() -> IndicesPorEscola:
+    return _indices
+
+
+async def buscar_alunos(
+    termo: str,
+    limite: int = 20,
+    turma_id: Optional[str] = None,
+    apenas_ativos: bool = True,
+    escola_id: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """(resultados ordenados por pontuação, origem: "indice" ou "banco"), só da escola se informada"""
+    indice = obter_indice_busca().da_escola(str(escola_id) if escola_id else None)
+    indice.garantir_carga()
+    filtros = {"limite": limite, "turma_id": str(turma_id) if turma_id else None, "apenas_ativos": apenas_ativos}
+    resultados = indice.buscar(termo, **filtros)
+    if resultados:
+        return resultados, "indice"
+
+    # Sem casamento por prefixo (ou índice carregando): trigramas no banco
+    result = await executar(get_supabase().rpc("buscar_alunos", {
+        "p_termo": termo, "p_limite": limite, "p_turma_id": filtros["turma_id"], "p_apenas_ativos": apenas_ativos,
+        "p_escola_id": str(escola_id) if escola_id else None,
+    }))
+    return result.data or [], "banco"
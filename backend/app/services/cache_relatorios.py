@@ -0,0 +1,209 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Cache endereçado por conteúdo dos rascunhos gerados
+Contexto: Regerar um relatório sem que nada tenha mudado devolve o texto já
+          gerado em milissegundos, sem nova chamada ao LLM. A chave é o hash
+          de tudo que entra no prompt (dados consolidados normalizados, nome
+          e série do aluno), da versão do template e de provedor/modelo/
+          temperatura
+Cuidado: Mudou o texto do prompt → incremente VERSAO_PROMPT em
+         prompts_relatorio, senão o cache devolve textos do template antigo
+Dependências: Nenhuma (arquivos JSON em disco, um por entrada)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+
+
+def normalizar(valor: Any) -> Any:
+    """Forma canônica para o hash: floats arredondados, chaves de dict em texto"""
+    if isinstance(valor, dict):
+        return {str(k): normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [normalizar(v) for v in valor]
+    if isinstance(valor, float):
+        return round(valor, 4)
+    return valor
+
+
+def chave_cache(
+    conteudo: Dict[str, Any],
+    versao_prompt: str,
+    provedor: str,
+    modelo: str,
+    temperatura: float,
+) -> str:
+    """sha256 do conteúdo do prompt normalizado + versão + provedor/modelo/temperatura"""
+    serializado = json.dumps(
+        {
+            "conteudo": normalizar(conteudo),
+            "versao_prompt": versao_prompt,
+            "provedor": provedor,
+            "modelo": modelo,
+            "temperatura": round(float(temperatura), 4),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+
+class CacheDisco:
+    """
+    🚨 ÂNCORA: CRÍTICO - LRU limitado por entradas e por bytes, em disco
+    Contexto: Cada entrada é `<dir>/<2 primeiros>/<chave>.json`. O índice LRU
+              fica em memória (reconstruído pela data de modificação ao
+              abrir); um acerto atualiza o mtime, então a ordem sobrevive a
+              reinícios. Gravação atômica (arquivo temporário + rename)
+    """
+
+    def __init__(self, diretorio: Path, max_entradas: int, max_bytes: int):
+        self.diretorio = Path(diretorio)
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._indice: "OrderedDict[str, int]" = OrderedDict()  # chave -> tamanho (mais antiga primeiro)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._carregado = False
+        self.acertos = 0
+        self.faltas = 0
+        self.gravacoes = 0
+        self.remocoes = 0
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / chave[:2] / f"{chave}.json"
+
+    def _carregar(self) -> None:
+        if self._carregado:
+            return
+        entradas = []
+        if self.diretorio.exists():
+            for arquivo in self.diretorio.glob("*/*.json"):
+                try:
+                    info = arquivo.stat()
+                except FileNotFoundError:
+                    continue
+                entradas.append((info.st_mtime, arquivo.stem, info.st_size))
+        for _, chave, tamanho in sorted(entradas):
+            self._indice[chave] = tamanho
+            self._bytes += tamanho
+        self._carregado = True
+        self._despejar()
+
+    def _despejar(self) -> None:
+        while self._indice and (len(self._indice) > self.max_entradas or self._bytes > self.max_bytes):
+            chave, tamanho = self._indice.popitem(last=False)
+            self._bytes -= tamanho
+            self.remocoes += 1
+            try:
+                self._caminho(chave).unlink()
+            except FileNotFoundError:
+                pass
+
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._carregar()
+            if chave not in self._indice:
+                self.faltas += 1
+                return None
+            caminho = self._caminho(chave)
+            try:
+                entrada = json.loads(caminho.read_text(encoding="utf-8"))
+                os.utime(caminho)
+            except (OSError, ValueError):
+                # Arquivo removido/corrompido por fora: vira falta
+                self._bytes -= self._indice.pop(chave)
+                self.faltas += 1
+                return None
+            self._indice.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def gravar(self, chave: str, entrada: Dict[str, Any]) -> None:
+        conteudo = json.dumps(entrada, ensure_ascii=False).encode("utf-8")
+        if len(conteudo) > self.max_bytes:
+            return
+        with self._lock:
+            self._carregar()
+            caminho = self._caminho(chave)
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            descritor, temporario = tempfile.mkstemp(dir=caminho.parent, suffix=".tmp")
+            with os.fdopen(descritor, "wb") as arquivo:
+                arquivo.write(conteudo)
+            os.replace(temporario, caminho)
+
+            self._bytes -= self._indice.pop(chave, 0)
+            self._indice[chave] = len(conteudo)
+            self._bytes += len(conteudo)
+            self.gravacoes += 1
+            self._despejar()
+
+    def limpar(self) -> int:
+        with self._lock:
+            self._carregar()
+            total = len(self._indice)
+            for chave in list(self._indice):
+                try:
+                    self._caminho(chave).unlink()
+                except FileNotFoundError:
+                    pass
+            self._indice.clear()
+            self._bytes = 0
+            return total
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            self._carregar()
+            consultas = self.acertos + self.faltas
+            return {
+                "entradas": len(self._indice),
+                "bytes": self._bytes,
+                "max_entradas": self.max_entradas,
+                "max_bytes": self.max_bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "gravacoes": self.gravacoes,
+                "remocoes": self.remocoes,
+            }
+
+
+_cache: Optional[CacheDisco] = None
+
+
+def obter_cache() -> Optional[CacheDisco]:
+    """Cache único do processo (None se desativado em Settings)"""
+    global _cache
+    settings = get_settings()
+    if not settings.cache_relatorios_ativo:
+        return None
+    if _cache is None:
+        _cache = CacheDisco(
+            Path(settings.cache_relatorios_dir),
+            settings.cache_relatorios_max_entradas,
+            settings.cache_relatorios_max_mb * 1024 * 1024,
+        )
+    return _cache
+
+
+async def buscar(chave: str) -> Optional[Dict[str, Any]]:
+    cache = obter_cache()
+    if cache is None:
+        return None
+    return await asyncio.to_thread(cache.obter, chave)
+
+
+async def guardar(chave: str, entrada: Dict[str, Any]) -> None:
+    cache = obter_cache()
+    if cache is not None:
+        await asyncio.to_thread(cache.gravar, chave, entrada)
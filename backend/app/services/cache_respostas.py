@@ -0,0 +1,228 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Cache de respostas HTTP com ETag e invalidação por escrita
+Contexto: Listagens lidas a cada visita e raramente alteradas (GET /turmas,
+          GET /alunos/turma/{id}) ficam prontas em memória (corpo JSON já
+          serializado + ETag). Repetir a leitura não vai ao banco; com
+          If-None-Match igual ao ETag a resposta é 304 sem corpo. A ETag é
+          forte e vem da versão das linhas (id + updated_at) e dos campos
+          calculados. Cada entrada tem tags (turmas, turma:<id>, aluno:<id>,
+          coordenacao:<id>) e as escritas invalidam só as tags afetadas.
+          Há uma partição (LRU próprio) por escola da requisição
+Cuidado: Cache por processo. Escritas feitas fora destes endpoints (outro
+         processo, SQL direto, seed) só aparecem quando a entrada expira
+         (cache_respostas_ttl_segundos). Nova escrita em turmas/alunos →
+         chame invalidar() com as tags certas
+Dependências: services/escopo_escola (escola da requisição)
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request, Response
+
+from app.config import get_settings
+from app.services.escopo_escola import escola_atual
+
+TAG_TURMAS = "turmas"  # Qualquer listagem de turmas (criação/edição muda filtros e ordem)
+CACHE_CONTROL = "private, no-cache"  # Navegador guarda, mas sempre revalida com If-None-Match
+
+
+def tag_turma(turma_id: Any) -> str:
+    return f"turma:{turma_id}"
+
+
+def tag_aluno(aluno_id: Any) -> str:
+    return f"aluno:{aluno_id}"
+
+
+def tag_coordenacao(coordenador_id: Any) -> str:
+    return f"coordenacao:{coordenador_id}"
+
+
+@dataclass
+class EntradaResposta:
+    corpo: bytes
+    etag: str
+    tags: Tuple[str, ...]
+    expira_em: float
+
+
+def calcular_etag(linhas: Iterable[Dict[str, Any]], extra: Any = None) -> str:
+    """ETag forte a partir de (id, updated_at) das linhas + campos calculados da resposta"""
+    versoes = [(str(linha["id"]), str(linha.get("updated_at"))) for linha in linhas]
+    serializado = json.dumps([versoes, extra], sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(serializado.encode()).hexdigest()[:32] + '"'
+
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca do If-None-Match (RFC 9110): lista de ETags, W/ ou *"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidata.strip().removeprefix("W/") == etag for candidata in if_none_match.split(","))
+
+
+def responder(request: Request, entrada: EntradaResposta) -> Response:
+    """304 se o cliente já tem esta versão, senão o corpo pronto"""
+    cabecalhos = {"ETag": entrada.etag, "Cache-Control": CACHE_CONTROL}
+    if etag_corresponde(request.headers.get("if-none-match"), entrada.etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(content=entrada.corpo, media_type="application/json", headers=cabecalhos)
+
+
+class CacheRespostas:
+    """
+    🚨 ÂNCORA: CRÍTICO - LRU limitado por entradas, com índice de tags
+    Contexto: `versao` sobe a cada invalidação; quem leu o banco antes de
+              uma escrita concorrente passa a versão lida em guardar() e a
+              entrada (já desatualizada) não é gravada
+    """
+
+    def __init__(self, max_entradas: int, ttl_segundos: float):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._entradas: "OrderedDict[str, EntradaResposta]" = OrderedDict()  # Mais antiga primeiro
+        self._por_tag: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.versao = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidadas = 0
+
+    def _remover(self, chave: str) -> None:
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        for tag in entrada.tags:
+            chaves = self._por_tag.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tag[tag]
+
+    def obter(self, chave: str) -> Optional[EntradaResposta]:
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada.expira_em <= time.monotonic():
+                self._remover(chave)
+                entrada = None
+            if entrada is None:
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def guardar(self, chave: str, corpo: bytes, etag: str, tags: Iterable[str], versao_lida: int) -> EntradaResposta:
+        """Grava (se nada foi invalidado desde a leitura) e devolve a entrada para responder"""
+        entrada = EntradaResposta(corpo, etag, tuple(set(tags)), time.monotonic() + self.ttl_segundos)
+        with self._lock:
+            if versao_lida != self.versao:
+                return entrada
+            self._remover(chave)
+            self._entradas[chave] = entrada
+            for tag in entrada.tags:
+                self._por_tag.setdefault(tag, set()).add(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._remover(next(iter(self._entradas)))
+        return entrada
+
+    def invalidar(self, *tags: str) -> int:
+        """Remove as entradas com qualquer uma das tags; devolve quantas"""
+        with self._lock:
+            self.versao += 1
+            chaves = set()
+            for tag in tags:
+                chaves |= self._por_tag.get(tag, set())
+            for chave in chaves:
+                self._remover(chave)
+            self.invalidadas += len(chaves)
+            return len(chaves)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self.versao += 1
+            self._entradas.clear()
+            self._por_tag.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "invalidadas": self.invalidadas,
+            }
+
+
+# Uma partição por escola (None = requisições sem escola, visão de admin):
+# o LRU de uma escola grande não expulsa as entradas das outras
+_caches: Dict[Optional[str], CacheRespostas] = {}
+_caches_lock = threading.Lock()
+
+
+def obter_cache_respostas(escola_id: Optional[str] = None) -> Optional[CacheRespostas]:
+    """Cache da escola no processo (None se desativado em Settings)"""
+    settings = get_settings()
+    if not settings.cache_respostas_ativo:
+        return None
+    with _caches_lock:
+        cache = _caches.get(escola_id)
+        if cache is None:
+            cache = _caches[escola_id] = CacheRespostas(
+                settings.cache_respostas_max_entradas, settings.cache_respostas_ttl_segundos
+            )
+        return cache
+
+
+def buscar(chave: str) -> Tuple[Optional[EntradaResposta], int]:
+    """(entrada em cache ou None, versão a repassar para guardar), na partição da escola da requisição"""
+    cache = obter_cache_respostas(escola_atual())
+    if cache is None:
+        return None, 0
+    return cache.obter(chave), cache.versao
+
+
+def guardar(chave: str, corpo: bytes, etag: str, tags: Iterable[str], versao_lida: int) -> EntradaResposta:
+    cache = obter_cache_respostas(escola_atual())
+    if cache is None:
+        return EntradaResposta(corpo, etag, tuple(tags), 0.0)
+    return cache.guardar(chave, corpo, etag, tags, versao_lida)
+
+
+def invalidar(*tags: str) -> None:
+    """
+    Escrita com escola: partição dela + a sem escola (admin vê tudo).
+    Escrita sem escola (admin, importação, tarefas): todas as partições
+    """
+    if not get_settings().cache_respostas_ativo:
+        return
+    escola_id = escola_atual()
+    with _caches_lock:
+        caches = [_caches.get(escola_id), _caches.get(None)] if escola_id else list(_caches.values())
+    for cache in caches:
+        if cache is not None:
+            cache.invalidar(*tags)
+
+
+def invalidar_turmas(turma_ids: Iterable[Any] = (), aluno_ids: Iterable[Any] = (), listas: bool = False) -> None:
+    """
+    Escrita em alunos: tags das turmas afetadas (contagem e lista de alunos)
+    e dos próprios alunos (cobre a turma antiga numa troca de turma).
+    `listas` também invalida todas as listagens de turmas (escrita em turmas)
+    """
+    tags: List[str] = [tag_turma(turma_id) for turma_id in turma_ids if turma_id]
+    tags += [tag_aluno(aluno_id) for aluno_id in aluno_ids if aluno_id]
+    if listas:
+        tags.append(TAG_TURMAS)
+    if tags:
+        invalidar(*tags)
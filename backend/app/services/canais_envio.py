@@ -0,0 +1,309 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Canais de entrega dos relatórios (email, whatsapp, api)
+Contexto: Cada canal recebe um lote de mensagens por chamada e devolve o
+          resultado de cada uma. As conexões são reaproveitadas entre lotes:
+          sessões SMTP abertas (smtplib em threads próprias, um lote inteiro
+          por sessão) e httpx.AsyncClient com keep-alive para as APIs HTTP
+Cuidado: Erro transitório (4xx do SMTP, 429/5xx, queda de conexão) é
+         repetido por quem chama (envio_relatorios); definitivo não.
+         Só canais configurados em Settings existem (canal_configurado)
+Dependências: Settings (smtp_*, whatsapp_*, envio_api_*), httpx
+"""
+
+import asyncio
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.config import get_settings
+
+STATUS_TRANSITORIOS = {408, 425, 429, 500, 502, 503, 504}
+LOTES_SIMULTANEOS_HTTP = 2  # Próximo lote pronto enquanto o anterior termina
+
+
+class ErroEnvio(Exception):
+    def __init__(self, mensagem: str, transitorio: bool = False, espera_sugerida: Optional[float] = None):
+        super().__init__(mensagem)
+        self.transitorio = transitorio
+        self.espera_sugerida = espera_sugerida
+
+
+@dataclass
+class Mensagem:
+    relatorio_id: str
+    aluno_id: str
+    canal: str
+    destino: str  # E-mail, telefone (só dígitos) ou id do aluno
+    assunto: str
+    texto: str
+
+
+def classificar_erro(erro: Exception) -> ErroEnvio:
+    """Exceção qualquer do envio como ErroEnvio (transitório ou não)"""
+    if isinstance(erro, ErroEnvio):
+        return erro
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return ErroEnvio(f"SMTP {erro.smtp_code}: {erro.smtp_error!r}", transitorio=400 <= erro.smtp_code < 500)
+    transitorio = isinstance(erro, (httpx.TransportError, smtplib.SMTPServerDisconnected, OSError, asyncio.TimeoutError))
+    return ErroEnvio(f"{type(erro).__name__}: {erro}", transitorio=transitorio)
+
+
+def _erro_http(resposta: httpx.Response) -> ErroEnvio:
+    try:
+        espera = float(resposta.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        espera = None
+    return ErroEnvio(
+        f"HTTP {resposta.status_code}: {resposta.text[:200]}",
+        transitorio=resposta.status_code in STATUS_TRANSITORIOS,
+        espera_sugerida=espera,
+    )
+
+
+class CanalEnvio:
+    """Interface comum: `enviar_lote` devolve None (entregue) ou ErroEnvio por mensagem, na ordem"""
+
+    nome: str = ""
+    lote_maximo: int = 1  # Mensagens por chamada
+    concorrencia: int = 1  # Lotes em andamento ao mesmo tempo
+
+    async def enviar_lote(self, mensagens: List[Mensagem]) -> List[Optional[ErroEnvio]]:
+        raise NotImplementedError
+
+    async def fechar(self) -> None:
+        pass
+
+
+class CanalEmail(CanalEnvio):
+    """SMTP com pool de sessões: cada lote usa uma sessão aberta (sem novo handshake/login)"""
+
+    nome = "email"
+
+    def __init__(self, host: str, porta: int, usuario: Optional[str], senha: Optional[str],
+                 starttls: bool, conexoes: int, lote: int, remetente: str, timeout: float = 30.0):
+        self.host, self.porta = host, porta
+        self.usuario, self.senha = usuario, senha
+        self.starttls = starttls
+        self.remetente = remetente
+        self.timeout = timeout
+        self.lote_maximo = lote
+        self.concorrencia = conexoes
+        self._livres: List[smtplib.SMTP] = []
+        self._lock = threading.Lock()
+        self._threads = ThreadPoolExecutor(max_workers=conexoes, thread_name_prefix="smtp")
+
+    def _conectar(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.porta, timeout=self.timeout)
+        smtp.ehlo()
+        if self.starttls:
+            smtp.starttls()
+            smtp.ehlo()
+        if self.usuario:
+            smtp.login(self.usuario, self.senha or "")
+        return smtp
+
+    def _emprestar(self) -> smtplib.SMTP:
+        with self._lock:
+            if self._livres:
+                return self._livres.pop()
+        return self._conectar()
+
+    def _devolver(self, smtp: smtplib.SMTP) -> None:
+        with self._lock:
+            if len(self._livres) < self.concorrencia:
+                self._livres.append(smtp)
+                return
+        smtp.close()
+
+    def _email(self, mensagem: Mensagem) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = self.remetente
+        email["To"] = mensagem.destino
+        email["Subject"] = mensagem.assunto
+        email.set_content(mensagem.texto)
+        return email
+
+    def _enviar_sincrono(self, mensagens: List[Mensagem]) -> List[Optional[ErroEnvio]]:
+        smtp = self._emprestar()
+        resultados: List[Optional[ErroEnvio]] = []
+        try:
+            for mensagem in mensagens:
+                try:
+                    smtp.send_message(self._email(mensagem))
+                    resultados.append(None)
+                except smtplib.SMTPRecipientsRefused as e:
+                    codigo, texto = next(iter(e.recipients.values()))
+                    resultados.append(ErroEnvio(f"SMTP {codigo}: {texto!r}", transitorio=400 <= codigo < 500))
+                except smtplib.SMTPResponseException as e:
+                    resultados.append(classificar_erro(e))
+                    smtp.rset()
+        except (smtplib.SMTPServerDisconnected, OSError) as e:
+            # Sessão caiu: o restante do lote tenta de novo numa sessão nova
+            erro = ErroEnvio(f"Conexão SMTP: {e}", transitorio=True)
+            resultados += [erro] * (len(mensagens) - len(resultados))
+            smtp.close()
+            return resultados
+        self._devolver(smtp)
+        return resultados
+
+    async def enviar_lote(self, mensagens: List[Mensagem]) -> List[Optional[ErroEnvio]]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._threads, self._enviar_sincrono, mensagens)
+        except Exception as e:  # Falha ao abrir a sessão (conexão, login)
+            raise classificar_erro(e) from e
+
+    def _fechar_sincrono(self) -> None:
+        with self._lock:
+            livres, self._livres = self._livres, []
+        for smtp in livres:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+
+    async def fechar(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._threads, self._fechar_sincrono)
+        self._threads.shutdown(wait=False)
+
+
+class _CanalHttp(CanalEnvio):
+    """Base dos canais HTTP: um AsyncClient keep-alive por event loop"""
+
+    def __init__(self, url: str, token: Optional[str], conexoes: int, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.conexoes = conexoes
+        self.timeout = timeout
+        self._cliente: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def cliente(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._cliente is None or self._loop is not loop:
+            self._cliente = httpx.AsyncClient(
+                headers={"Authorization": f"Bearer {self.token}"} if self.token else {},
+                limits=httpx.Limits(max_connections=self.conexoes, max_keepalive_connections=self.conexoes),
+                # Sem prazo para esperar conexão livre: quem limita é o semáforo do canal
+                timeout=httpx.Timeout(self.timeout, pool=None),
+            )
+            self._loop = loop
+        return self._cliente
+
+    async def fechar(self) -> None:
+        if self._cliente is not None and self._loop is asyncio.get_running_loop():
+            await self._cliente.aclose()
+        self._cliente = None
+
+
+class CanalWhatsApp(_CanalHttp):
+    """WhatsApp Cloud API: uma requisição por mensagem, o lote sai em paralelo nas conexões abertas"""
+
+    nome = "whatsapp"
+
+    def __init__(self, url: str, token: Optional[str], conexoes: int, **kwargs):
+        super().__init__(url, token, conexoes, **kwargs)
+        self.lote_maximo = conexoes
+        self.concorrencia = LOTES_SIMULTANEOS_HTTP
+
+    async def _enviar(self, mensagem: Mensagem) -> Optional[ErroEnvio]:
+        try:
+            resposta = await self.cliente().post(f"{self.url}/messages", json={
+                "messaging_product": "whatsapp",
+                "to": mensagem.destino,
+                "type": "text",
+                "text": {"body": mensagem.texto, "preview_url": True},
+            })
+        except Exception as e:
+            return classificar_erro(e)
+        return None if resposta.is_success else _erro_http(resposta)
+
+    async def enviar_lote(self, mensagens: List[Mensagem]) -> List[Optional[ErroEnvio]]:
+        return list(await asyncio.gather(*(self._enviar(mensagem) for mensagem in mensagens)))
+
+
+class CanalApi(_CanalHttp):
+    """
+    Integração da escola: POST {"mensagens": [...]} com o lote inteiro
+
+    Resposta 2xx pode trazer {"resultados": [{"ok", "erro", "transitorio"}]}
+    na ordem do lote; sem ela, o lote todo foi aceito
+    """
+
+    nome = "api"
+
+    def __init__(self, url: str, token: Optional[str], lote: int, **kwargs):
+        super().__init__(url, token, LOTES_SIMULTANEOS_HTTP, **kwargs)
+        self.lote_maximo = lote
+        self.concorrencia = LOTES_SIMULTANEOS_HTTP
+
+    async def enviar_lote(self, mensagens: List[Mensagem]) -> List[Optional[ErroEnvio]]:
+        try:
+            resposta = await self.cliente().post(self.url, json={"mensagens": [
+                {"relatorio_id": m.relatorio_id, "aluno_id": m.aluno_id, "assunto": m.assunto, "texto": m.texto}
+                for m in mensagens
+            ]})
+        except Exception as e:
+            raise classificar_erro(e) from e
+        if not resposta.is_success:
+            raise _erro_http(resposta)
+        resultados = (resposta.json() or {}).get("resultados") if resposta.content else None
+        if not resultados:
+            return [None] * len(mensagens)
+        return [
+            None if item.get("ok") else ErroEnvio(item.get("erro") or "Recusada", bool(item.get("transitorio")))
+            for item in resultados
+        ]
+
+
+# ========== REGISTRO ==========
+
+_canais: Dict[str, CanalEnvio] = {}
+
+
+def registrar_canal(canal: CanalEnvio) -> None:
+    """Substitui/adiciona um canal (testes e benchmarks)"""
+    _canais[canal.nome] = canal
+
+
+def canal_configurado(nome: str) -> bool:
+    settings = get_settings()
+    return nome in _canais or {
+        "email": bool(settings.smtp_host),
+        "whatsapp": bool(settings.whatsapp_api_url),
+        "api": bool(settings.envio_api_url),
+    }.get(nome, False)
+
+
+def obter_canal(nome: str) -> CanalEnvio:
+    if nome in _canais:
+        return _canais[nome]
+    if not canal_configurado(nome):
+        raise ValueError(f"Canal de envio não configurado: {nome}")
+    settings = get_settings()
+    fabricas: Dict[str, Any] = {
+        "email": lambda: CanalEmail(
+            settings.smtp_host, settings.smtp_porta, settings.smtp_usuario, settings.smtp_senha,
+            settings.smtp_starttls, settings.smtp_conexoes, settings.smtp_lote, settings.envio_remetente,
+        ),
+        "whatsapp": lambda: CanalWhatsApp(settings.whatsapp_api_url, settings.whatsapp_token,
+                                          settings.whatsapp_conexoes),
+        "api": lambda: CanalApi(settings.envio_api_url, settings.envio_api_token, settings.envio_api_lote),
+    }
+    _canais[nome] = fabricas[nome]()
+    return _canais[nome]
+
+
+async def fechar_canais() -> None:
+    """Fecha sessões SMTP e clientes HTTP (shutdown da aplicação)"""
+    for canal in list(_canais.values()):
+        try:
+            await canal.fechar()
+        except Exception:
+            pass
+    _canais.clear()
@@ -0,0 +1,320 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Consolidação trimestral das avaliações
+Contexto: Gera relatorios.dados_consolidados a partir das avaliações diárias:
+          distribuição das notas da ESCALA_AVALIACAO por categoria, tendência
+          no trimestre e frequência de tags de cada aluno
+Cuidado: Nota 1 = autonomia (melhor) e 3 = intervenção; tendência "melhorando"
+         significa notas caindo ao longo do trimestre
+Dependências: numpy
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import ESCALA_AVALIACAO
+from app.models.database import get_supabase, executar, executar_paginado
+from app.services.avaliacoes import categorias_do_nivel
+
+NOTAS = (1, 2, 3)
+MIN_PONTOS_TENDENCIA = 3
+LIMIAR_TENDENCIA = 0.5  # Variação da nota prevista entre o primeiro e o último dia
+TAMANHO_LOTE_ALUNOS = 200
+
+
+@dataclass
+class MatrizAvaliacoes:
+    """
+    Avaliações de um conjunto de alunos em forma densa
+
+    notas[s, d, c] é a nota do aluno s no dia d na categoria c (0 = não avaliado);
+    tags[s, t] conta quantas vezes a tag t apareceu nas avaliações do aluno s
+    """
+    alunos: List[str]
+    dias: List[str]
+    categorias: List[str]
+    notas: np.ndarray
+    tag_ids: List[str]
+    tags: np.ndarray
+    tags_info: Dict[str, Dict[str, Any]]
+    observacoes: Dict[str, List[Dict[str, str]]]
+
+
+def montar_matriz(
+    alunos: List[str],
+    registros: List[Dict[str, Any]],
+    categorias: List[str],
+) -> MatrizAvaliacoes:
+    """
+    Desempacota campos_avaliados (JSONB) para a matriz aluno × dia × categoria
+
+    O laço em Python só coleta índices (aluno, dia) de cada linha; as notas
+    entram por categoria em atribuições vetorizadas. Categorias fora da
+    lista do nível são ignoradas.
+    """
+    pos_aluno = {str(a): i for i, a in enumerate(alunos)}
+    pos_categoria = {c: i for i, c in enumerate(categorias)}
+    dias = sorted({str(r["data_avaliacao"]) for r in registros if str(r["aluno_id"]) in pos_aluno})
+    pos_dia = {d: i for i, d in enumerate(dias)}
+
+    idx_aluno: List[int] = []
+    idx_dia: List[int] = []
+    campos: List[Dict[str, int]] = []
+    tag_aluno: List[int] = []
+    tag_ids: List[str] = []
+    tags_info: Dict[str, Dict[str, Any]] = {}
+    observacoes: Dict[str, List[Dict[str, str]]] = {}
+
+    for registro in registros:
+        aluno_id = str(registro["aluno_id"])
+        s = pos_aluno.get(aluno_id)
+        if s is None:
+            continue
+        idx_aluno.append(s)
+        idx_dia.append(pos_dia[str(registro["data_avaliacao"])])
+        campos.append(registro.get("campos_avaliados") or {})
+        for vinculo in registro.get("avaliacao_tags") or []:
+            tag_aluno.append(s)
+            tag_ids.append(str(vinculo["tag_id"]))
+            if vinculo.get("tags"):
+                tags_info[str(vinculo["tag_id"])] = vinculo["tags"]
+        if registro.get("observacao_livre"):
+            observacoes.setdefault(aluno_id, []).append(
+                {"data": str(registro["data_avaliacao"]), "texto": registro["observacao_livre"]}
+            )
+
+    # Uma coluna por categoria: list comprehension + atribuição vetorizada
+    notas = np.zeros((len(alunos), len(dias), len(categorias)), dtype=np.int8)
+    linhas = np.array(idx_aluno, dtype=np.intp)
+    colunas = np.array(idx_dia, dtype=np.intp)
+    for c, categoria in enumerate(categorias):
+        notas[linhas, colunas, c] = np.array([campo.get(categoria, 0) for campo in campos], dtype=np.int8)
+
+    tags_distintas = sorted(set(tag_ids))
+    pos_tag = {t: i for i, t in enumerate(tags_distintas)}
+    contagem_tags = np.zeros((len(alunos), len(tags_distintas)), dtype=np.int32)
+    if tag_ids:
+        np.add.at(contagem_tags, (tag_aluno, [pos_tag[t] for t in tag_ids]), 1)
+
+    for lista in observacoes.values():
+        lista.sort(key=lambda o: o["data"])
+
+    return MatrizAvaliacoes(
+        alunos=[str(a) for a in alunos],
+        dias=dias,
+        categorias=list(categorias),
+        notas=notas,
+        tag_ids=tags_distintas,
+        tags=contagem_tags,
+        tags_info=tags_info,
+        observacoes=observacoes,
+    )
+
+
+TENDENCIAS = np.array(["insuficiente", "melhorando", "estavel", "regredindo"])
+
+
+def calcular_agregados(matriz: MatrizAvaliacoes) -> Dict[str, np.ndarray]:
+    """
+    🚨 ÂNCORA: CRÍTICO - Agregados de todos os alunos em passadas vetorizadas
+    Contexto: Cada resultado é um array (alunos × categorias [× nota]);
+              nenhum laço por aluno ou por dia
+
+    Tendência: inclinação da regressão linear nota ~ dia (apenas dias avaliados),
+    convertida em variação prevista entre o primeiro e o último dia do período.
+    A classificação usa só inteiros, então não oscila no limiar por arredondamento.
+    """
+    notas = matriz.notas.astype(np.int64)
+    avaliado = notas > 0
+    n_dias = notas.shape[1]
+
+    contagens = np.stack([(notas == k).sum(axis=1) for k in NOTAS], axis=-1)  # (S, C, 3)
+    total = contagens.sum(axis=-1)                                              # (S, C)
+    soma = notas.sum(axis=1)                                                    # (S, C)
+    divisor = np.maximum(total, 1)
+
+    media = np.where(total > 0, soma / divisor, np.nan)
+    percentual = contagens / divisor[..., None]
+
+    # Regressão linear por (aluno, categoria) com somas mascaradas (inteiras)
+    x = np.arange(n_dias, dtype=np.int64)[None, :, None]
+    soma_x = (avaliado * x).sum(axis=1)
+    soma_xx = (avaliado * x * x).sum(axis=1)
+    soma_xy = (notas * x).sum(axis=1)
+    numerador = (total * soma_xy - soma_x * soma) * max(n_dias - 1, 1)
+    denominador = total * soma_xx - soma_x ** 2
+    valida = (total >= MIN_PONTOS_TENDENCIA) & (denominador > 0)
+    variacao = np.where(valida, numerador / np.where(valida, denominador, 1), np.nan)
+
+    # variacao <= -L  <=>  numerador <= -L * denominador (denominador > 0)
+    limiar = LIMIAR_TENDENCIA * denominador
+    tendencia = np.where(
+        ~valida, 0,
+        np.where(numerador <= -limiar, 1, np.where(numerador >= limiar, 3, 2))
+    )
+
+    dias_com_avaliacao = avaliado.any(axis=2)                                   # (S, D)
+    tem_avaliacao = dias_com_avaliacao.any(axis=1)
+    if n_dias:
+        primeiro_dia = np.where(tem_avaliacao, dias_com_avaliacao.argmax(axis=1), -1)
+        ultimo_dia = np.where(tem_avaliacao, n_dias - 1 - dias_com_avaliacao[:, ::-1].argmax(axis=1), -1)
+    else:  # Trimestre sem avaliações: argmax não aceita eixo vazio
+        primeiro_dia = ultimo_dia = np.full(len(tem_avaliacao), -1)
+
+    total_aluno = total.sum(axis=1)
+    media_geral = np.where(total_aluno > 0, soma.sum(axis=1) / np.maximum(total_aluno, 1), np.nan)
+
+    return {
+        "contagens": contagens,
+        "total": total,
+        "media": media,
+        "percentual": percentual,
+        "predominante": contagens.argmax(axis=-1) + 1,
+        "variacao": variacao,
+        "tendencia": TENDENCIAS[tendencia],
+        "dias_avaliados": dias_com_avaliacao.sum(axis=1),
+        "primeiro_dia": primeiro_dia,
+        "ultimo_dia": ultimo_dia,
+        "media_geral": media_geral,
+    }
+
+
+def _lista_arredondada(valores: np.ndarray, casas: int) -> list:
+    """Arredonda no numpy e troca NaN por None (JSON)"""
+    arredondados = np.round(valores, casas).astype(object)
+    arredondados[np.isnan(valores)] = None
+    return arredondados.tolist()
+
+
+def consolidar(matriz: MatrizAvaliacoes, trimestre: int, ano: int) -> Dict[str, Dict[str, Any]]:
+    """Monta dados_consolidados (JSON) de cada aluno a partir dos agregados"""
+    agregados = calcular_agregados(matriz)
+    # .tolist() uma vez por array: acesso a listas é bem mais barato que a escalares numpy
+    contagens = agregados["contagens"].tolist()
+    total = agregados["total"].tolist()
+    percentual = np.round(agregados["percentual"] * 100, 1).tolist()
+    media = _lista_arredondada(agregados["media"], 2)
+    variacao = _lista_arredondada(agregados["variacao"], 2)
+    media_geral = _lista_arredondada(agregados["media_geral"], 2)
+    predominante = agregados["predominante"].tolist()
+    tendencia = agregados["tendencia"].tolist()
+    dias_avaliados = agregados["dias_avaliados"].tolist()
+    primeiro_dia = agregados["primeiro_dia"].tolist()
+    ultimo_dia = agregados["ultimo_dia"].tolist()
+    tags = matriz.tags.tolist()
+    chaves_notas = [str(k) for k in NOTAS]
+
+    resultado = {}
+    for s, aluno_id in enumerate(matriz.alunos):
+        categorias = {}
+        for c, categoria in enumerate(matriz.categorias):
+            if not total[s][c]:
+                continue
+            nota = predominante[s][c]
+            categorias[categoria] = {
+                "avaliacoes": total[s][c],
+                "distribuicao": dict(zip(chaves_notas, contagens[s][c])),
+                "percentual": dict(zip(chaves_notas, percentual[s][c])),
+                "media": media[s][c],
+                "predominante": nota,
+                "descricao": ESCALA_AVALIACAO[nota],
+                "tendencia": tendencia[s][c],
+                "variacao": variacao[s][c],
+            }
+
+        tags_aluno = [
+            {
+                "tag_id": tag_id,
+                "nome": matriz.tags_info.get(tag_id, {}).get("nome"),
+                "tipo": matriz.tags_info.get(tag_id, {}).get("tipo"),
+                "ocorrencias": tags[s][t],
+            }
+            for t, tag_id in enumerate(matriz.tag_ids)
+            if tags[s][t]
+        ]
+        tags_aluno.sort(key=lambda tag: (-tag["ocorrencias"], tag["nome"] or ""))
+
+        resultado[aluno_id] = {
+            "trimestre": trimestre,
+            "ano": ano,
+            "dias_avaliados": dias_avaliados[s],
+            "periodo": {
+                "inicio": matriz.dias[primeiro_dia[s]] if primeiro_dia[s] >= 0 else None,
+                "fim": matriz.dias[ultimo_dia[s]] if ultimo_dia[s] >= 0 else None,
+            },
+            "media_geral": media_geral[s],
+            "categorias": categorias,
+            "tags": tags_aluno,
+            "observacoes": matriz.observacoes.get(aluno_id, []),
+        }
+    return resultado
+
+
+async def carregar_avaliacoes(
+    alunos: List[str],
+    trimestre: int,
+    ano: int,
+    incluir_rascunhos: bool = False,
+) -> List[Dict[str, Any]]:
+    """Avaliações do trimestre (com tags embutidas), em lotes de alunos paginados"""
+    supabase = get_supabase()
+
+    def consulta(lote: List[str]):
+        def criar():
+            query = (
+                supabase.table("avaliacoes")
+                .select("aluno_id, data_avaliacao, campos_avaliados, observacao_livre, "
+                        "avaliacao_tags(tag_id, tags(nome, tipo))")
+                .in_("aluno_id", lote)
+                .eq("trimestre", trimestre)
+                .eq("ano", ano)
+            )
+            if not incluir_rascunhos:
+                query = query.eq("status", "concluida")
+            return query.order("id")
+        return criar
+
+    lotes = [alunos[i:i + TAMANHO_LOTE_ALUNOS] for i in range(0, len(alunos), TAMANHO_LOTE_ALUNOS)]
+    paginas = await asyncio.gather(*(executar_paginado(consulta(lote)) for lote in lotes))
+    return [registro for pagina in paginas for registro in pagina]
+
+
+async def consolidar_turma(
+    turma_id: str,
+    trimestre: int,
+    ano: int,
+    incluir_rascunhos: bool = False,
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Consolida o trimestre de todos os alunos ativos da turma
+    Retorna None se a turma não existe
+    """
+    supabase = get_supabase()
+    turma, alunos = await asyncio.gather(
+        executar(
+            supabase.table("turmas")
+            .select("id, nivel")
+            .eq("id", str(turma_id))
+        ),
+        executar(
+            supabase.table("alunos")
+            .select("id")
+            .eq("turma_id", str(turma_id))
+            .eq("ativo", True)
+            .order("nome")
+        ),
+    )
+    if not turma.data:
+        return None
+
+    alunos_ids = [aluno["id"] for aluno in alunos.data]
+    registros = await carregar_avaliacoes(alunos_ids, trimestre, ano, incluir_rascunhos)
+
+    def processar():
+        matriz = montar_matriz(alunos_ids, registros, categorias_do_nivel(turma.data[0]["nivel"]))
+        return consolidar(matriz, trimestre, ano)
+
+    # Trabalho de CPU fora do event loop
+    return await asyncio.to_thread(processar)
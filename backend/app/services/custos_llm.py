@@ -0,0 +1,135 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Custo das chamadas de LLM
+Contexto: Preço em USD por milhão de tokens: entrada, entrada lida do cache
+          de prompt do provedor e saída. Modelos são casados pelo prefixo
+          mais longo do nome (ex: "gpt-4o-mini-2024-07-18" → "gpt-4o-mini")
+Cuidado: Tabela de referência; conferir a página de preços do provedor ao
+         trocar de modelo. Modelo desconhecido tem custo None (não zero)
+"""
+
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app.models.database import get_supabase, executar
+
+# modelo (prefixo) -> (entrada, entrada em cache, saída) em USD / 1M tokens
+PRECOS_POR_MILHAO: Dict[str, Tuple[float, float, float]] = {
+    "gpt-3.5-turbo": (0.50, 0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "claude-3-5-haiku": (0.80, 0.08, 4.00),
+    "claude-3-5-sonnet": (3.00, 0.30, 15.00),
+    "claude-sonnet-4": (3.00, 0.30, 15.00),
+    "gemini-1.5-flash": (0.075, 0.01875, 0.30),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+}
+
+
+def precos_do_modelo(provedor: str, modelo: str) -> Optional[Tuple[float, float, float]]:
+    if provedor == "local":
+        return (0.0, 0.0, 0.0)
+    candidatos = [prefixo for prefixo in PRECOS_POR_MILHAO if modelo.startswith(prefixo)]
+    if not candidatos:
+        return None
+    return PRECOS_POR_MILHAO[max(candidatos, key=len)]
+
+
+def calcular_custo(
+    provedor: str,
+    modelo: str,
+    tokens_prompt: int,
+    tokens_cache: int,
+    tokens_resposta: int,
+) -> Optional[float]:
+    """Custo em USD; tokens_cache é a parte de tokens_prompt lida do cache do provedor"""
+    precos = precos_do_modelo(provedor, modelo)
+    if precos is None:
+        return None
+    entrada, cache, saida = precos
+    return round(
+        ((tokens_prompt - tokens_cache) * entrada + tokens_cache * cache + tokens_resposta * saida) / 1_000_000,
+        6,
+    )
+
+
+@dataclass
+class UsoTokens:
+    """Totais de tokens e custo (de uma requisição, turma ou escola)"""
+    geracoes: int = 0
+    cache_acertos: int = 0  # Rascunhos servidos pelo cache (sem chamada ao LLM)
+    tokens_prompt: int = 0
+    tokens_cache: int = 0
+    tokens_resposta: int = 0
+    custo_usd: Optional[float] = 0.0  # None: algum modelo sem preço cadastrado
+    chamadas_sem_preco: int = 0  # Gerações com custo desconhecido (motivo do None acima)
+
+    def registrar(self, tokens_prompt: int, tokens_cache: int, tokens_resposta: int,
+                  custo: Optional[float], do_cache: bool = False) -> None:
+        self.geracoes += 1
+        self.cache_acertos += do_cache
+        self.tokens_prompt += tokens_prompt
+        self.tokens_cache += tokens_cache
+        self.tokens_resposta += tokens_resposta
+        self._somar_custo(custo, 0 if custo is not None else 1)
+
+    def somar_linha(self, linha: Dict[str, Any]) -> None:
+        """Soma uma linha agregada de resumo_uso_llm"""
+        self.geracoes += linha["geracoes"]
+        self.cache_acertos += linha["cache_acertos"]
+        self.tokens_prompt += linha["tokens_prompt"] or 0
+        self.tokens_cache += linha["tokens_cache"] or 0
+        self.tokens_resposta += linha["tokens_resposta"] or 0
+        custo = linha["custo_usd"]
+        self._somar_custo(float(custo) if custo is not None else 0.0, linha.get("chamadas_sem_preco") or 0)
+
+    def _somar_custo(self, custo: Optional[float], sem_preco: int) -> None:
+        # Total parcial seria enganoso: com qualquer chamada sem preço, o custo fica None
+        self.chamadas_sem_preco += sem_preco
+        if custo is None or self.custo_usd is None or self.chamadas_sem_preco:
+            self.custo_usd = None
+        else:
+            self.custo_usd = round(self.custo_usd + custo, 6)
+
+    def como_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+async def resumo_uso(
+    escola_id: Optional[str] = None,
+    turma_id: Optional[str] = None,
+    desde: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Totais de uso_llm (geral, por escola e por turma) via RPC agregada
+
+    custo_usd é None nos grupos com chamadas_sem_preco > 0 (modelo sem
+    preço cadastrado), em vez de somar só as chamadas com preço.
+    """
+    supabase = get_supabase()
+    resultado = await executar(supabase.rpc("resumo_uso_llm", {
+        "p_escola_id": escola_id,
+        "p_turma_id": turma_id,
+        "p_desde": desde.isoformat() if desde else None,
+    }))
+
+    total = UsoTokens()
+    por_escola: Dict[str, UsoTokens] = {}
+    por_turma: Dict[str, UsoTokens] = {}
+    for linha in resultado.data or []:
+        grupos = [total]
+        if linha["escola_id"]:
+            grupos.append(por_escola.setdefault(str(linha["escola_id"]), UsoTokens()))
+        if linha["turma_id"]:
+            grupos.append(por_turma.setdefault(str(linha["turma_id"]), UsoTokens()))
+        for grupo in grupos:
+            grupo.somar_linha(linha)
+
+    return {
+        "total": total.como_dict(),
+        "por_escola": {k: v.como_dict() for k, v in por_escola.items()},
+        "por_turma": {k: v.como_dict() for k, v in por_turma.items()},
+    }
@@ -0,0 +1,87 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Dashboard do usuário logado em uma chamada
+Contexto: A tela inicial mostra as turmas do usuário com alunos ativos,
+          avaliações do dia, relatórios do trimestre e necessidades
+          especiais. Em vez de uma requisição por informação (e por turma),
+          são duas consultas: as turmas visíveis (mesmo escopo de GET
+          /turmas) e a função resumo_dashboard, que agrega tudo por turma
+Cuidado: Trimestre padrão vem do mês (jan-abr, mai-ago, set-dez); escolas
+         com outro calendário passam trimestre/ano explícitos
+Dependências: Função SQL resumo_dashboard (ver SQL_CREATE_TABLES)
+"""
+
+from datetime import date
+from typing import Any, Dict, Optional
+
+from app.models.database import get_supabase, executar
+from app.services.turmas import filtrar_por_usuario
+
+STATUS_RELATORIO = ("rascunho", "revisao", "aprovado")
+COLUNAS_TURMA = "id, serie, turma, ano_letivo, periodo, nivel, professor_id, professor:usuarios!turmas_professor_id_fkey(nome)"
+
+
+def trimestre_da_data(data: date) -> int:
+    return (data.month - 1) // 4 + 1
+
+
+async def montar_dashboard(
+    usuario_id: Optional[str],
+    usuario_tipo: Optional[str],
+    data: Optional[date] = None,
+    trimestre: Optional[int] = None,
+    ano: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Turmas ativas visíveis ao usuário com os resumos do dia e do trimestre"""
+    data = data or date.today()
+    trimestre = trimestre or trimestre_da_data(data)
+    ano = ano or data.year
+    supabase = get_supabase()
+
+    query = supabase.table("turmas").select(COLUNAS_TURMA).eq("ativo", True)
+    query = (await filtrar_por_usuario(query, usuario_id, usuario_tipo)).order("serie").order("turma")
+    turmas = (await executar(query)).data or []
+
+    resumos: Dict[str, Dict[str, Any]] = {}
+    if turmas:
+        result = await executar(supabase.rpc("resumo_dashboard", {
+            "turma_ids": [t["id"] for t in turmas],
+            "p_data": data.isoformat(),
+            "p_trimestre": trimestre,
+            "p_ano": ano,
+        }))
+        resumos = {str(linha["turma_id"]): linha for linha in result.data or []}
+
+    itens = []
+    totais = {"turmas": len(turmas), "alunos_ativos": 0, "necessidades_especiais": 0,
+              "avaliacoes_concluidas": 0, "avaliacoes_rascunho": 0, "avaliacoes_pendentes": 0,
+              "relatorios_aprovados": 0, "sem_relatorio": 0}
+    for turma in turmas:
+        resumo = resumos.get(str(turma["id"]), {})
+        alunos_ativos = resumo.get("alunos_ativos") or 0
+        concluidas = resumo.get("avaliacoes_concluidas") or 0
+        rascunho = resumo.get("avaliacoes_rascunho") or 0
+        relatorios = {status: (resumo.get("relatorios") or {}).get(status, 0) for status in STATUS_RELATORIO}
+        item = {
+            **{k: v for k, v in turma.items() if k != "professor"},
+            "nome_completo": f"{turma['serie']} {turma['turma']}",
+            "professor_nome": (turma.get("professor") or {}).get("nome"),
+            "alunos_ativos": alunos_ativos,
+            "necessidades_especiais": resumo.get("necessidades_especiais") or 0,
+            "avaliacoes_hoje": {
+                "concluidas": concluidas,
+                "rascunho": rascunho,
+                "pendentes": max(alunos_ativos - concluidas - rascunho, 0),
+            },
+            "relatorios": relatorios,
+            "sem_relatorio": max(alunos_ativos - sum(relatorios.values()), 0),
+        }
+        itens.append(item)
+        totais["alunos_ativos"] += alunos_ativos
+        totais["necessidades_especiais"] += item["necessidades_especiais"]
+        totais["avaliacoes_concluidas"] += concluidas
+        totais["avaliacoes_rascunho"] += rascunho
+        totais["avaliacoes_pendentes"] += item["avaliacoes_hoje"]["pendentes"]
+        totais["relatorios_aprovados"] += relatorios["aprovado"]
+        totais["sem_relatorio"] += item["sem_relatorio"]
+
+    return {"data": data, "trimestre": trimestre, "ano": ano, "turmas": itens, "totais": totais}
@@ -0,0 +1,179 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Servidores locais de SMTP e HTTP para testar o envio
+Contexto: Recebem e contam as mensagens dos canais de envio sem entregar
+          nada: SMTP mínimo (EHLO/MAIL/RCPT/DATA/RSET/QUIT, sem TLS) e HTTP/1.1
+          com keep-alive que responde como a WhatsApp Cloud API (POST
+          .../messages) e como a API de integração (POST com lote). Rodam
+          num event loop em thread própria, então absorvem milhares de
+          mensagens enquanto o processo de teste envia
+Cuidado: Só para testes e benchmarks (127.0.0.1). `taxa_erro` devolve 451
+         no RCPT / 429 no HTTP para exercitar as retentativas.
+         Uso: ServidoresEnvioLocal().iniciar() → variaveis_ambiente()
+Dependências: Nenhuma
+"""
+
+import asyncio
+import json
+import random
+import threading
+from typing import Dict, Optional, Tuple
+
+RESPOSTAS_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests"}
+
+
+class ServidoresEnvioLocal:
+    def __init__(self, taxa_erro: float = 0.0, latencia_ms: float = 0.0, seed: Optional[int] = None):
+        self.taxa_erro = taxa_erro
+        self.latencia_ms = latencia_ms
+        self._rng = random.Random(seed)
+        self.porta_smtp = 0
+        self.porta_http = 0
+        self.contagem: Dict[str, int] = {
+            "email": 0, "whatsapp": 0, "api": 0, "recusadas": 0, "conexoes_smtp": 0, "conexoes_http": 0,
+        }
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._servidores = []
+
+    # ---------- SMTP ----------
+
+    async def _atender_smtp(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        self.contagem["conexoes_smtp"] += 1
+        escritor.write(b"220 envio-local ESMTP\r\n")
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                verbo = linha[:4].upper()
+                if verbo == b"EHLO":
+                    escritor.write(b"250-envio-local\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+                elif verbo in (b"HELO", b"MAIL", b"RSET", b"NOOP"):
+                    escritor.write(b"250 OK\r\n")
+                elif verbo == b"RCPT":
+                    if self._rng.random() < self.taxa_erro:
+                        self.contagem["recusadas"] += 1
+                        escritor.write(b"451 4.7.1 Tente novamente mais tarde\r\n")
+                    else:
+                        escritor.write(b"250 OK\r\n")
+                elif verbo == b"DATA":
+                    escritor.write(b"354 Fim com <CRLF>.<CRLF>\r\n")
+                    await escritor.drain()
+                    while (await leitor.readline()) not in (b".\r\n", b""):
+                        pass
+                    if self.latencia_ms:
+                        await asyncio.sleep(self.latencia_ms / 1000)
+                    self.contagem["email"] += 1
+                    escritor.write(b"250 OK enfileirada\r\n")
+                elif verbo == b"QUIT":
+                    escritor.write(b"221 Tchau\r\n")
+                    await escritor.drain()
+                    break
+                else:
+                    escritor.write(b"502 Comando nao implementado\r\n")
+                await escritor.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            escritor.close()
+
+    # ---------- HTTP ----------
+
+    def _responder_http(self, caminho: str, corpo: bytes) -> Tuple[int, dict]:
+        if self._rng.random() < self.taxa_erro:
+            self.contagem["recusadas"] += 1
+            return 429, {"error": "rate limit"}
+        try:
+            dados = json.loads(corpo or b"{}")
+        except ValueError:
+            return 400, {"error": "json inválido"}
+        if caminho.rstrip("/").endswith("/messages"):
+            self.contagem["whatsapp"] += 1
+            return 200, {"messages": [{"id": f"wamid.local{self.contagem['whatsapp']}"}]}
+        mensagens = dados.get("mensagens") or []
+        self.contagem["api"] += len(mensagens)
+        return 200, {"resultados": [{"ok": True} for _ in mensagens]}
+
+    async def _atender_http(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        self.contagem["conexoes_http"] += 1
+        try:
+            while True:  # Keep-alive: várias requisições por conexão
+                try:
+                    cabecalho = await leitor.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                linhas = cabecalho.decode("latin-1").split("\r\n")
+                _, caminho, _ = linhas[0].split(" ", 2)
+                cabecalhos = {
+                    nome.strip().lower(): valor.strip()
+                    for nome, _, valor in (linha.partition(":") for linha in linhas[1:] if linha)
+                }
+                corpo = await leitor.readexactly(int(cabecalhos.get("content-length") or 0))
+                if self.latencia_ms:
+                    await asyncio.sleep(self.latencia_ms / 1000)
+                status, resposta = self._responder_http(caminho, corpo)
+                conteudo = json.dumps(resposta).encode()
+                extra = "Retry-After: 0.05\r\n" if status == 429 else ""
+                escritor.write(
+                    f"HTTP/1.1 {status} {RESPOSTAS_HTTP[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(conteudo)}\r\n{extra}\r\n".encode() + conteudo
+                )
+                await escritor.drain()
+                if cabecalhos.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            escritor.close()
+
+    # ---------- Ciclo de vida ----------
+
+    def _executar(self, pronto: threading.Event, porta_smtp: int, porta_http: int) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        async def subir():
+            smtp = await asyncio.start_server(self._atender_smtp, "127.0.0.1", porta_smtp)
+            http = await asyncio.start_server(self._atender_http, "127.0.0.1", porta_http)
+            self._servidores = [smtp, http]
+            self.porta_smtp = smtp.sockets[0].getsockname()[1]
+            self.porta_http = http.sockets[0].getsockname()[1]
+
+        self._loop.run_until_complete(subir())
+        pronto.set()
+        self._loop.run_forever()
+        # Encerra as conexões ainda abertas antes de fechar o loop
+        pendentes = asyncio.all_tasks(self._loop)
+        for tarefa in pendentes:
+            tarefa.cancel()
+        self._loop.run_until_complete(asyncio.gather(*pendentes, return_exceptions=True))
+        self._loop.close()
+
+    def iniciar(self, porta_smtp: int = 0, porta_http: int = 0) -> "ServidoresEnvioLocal":
+        """Sobe os dois servidores (porta 0 = qualquer livre) e espera ficarem prontos"""
+        pronto = threading.Event()
+        self._thread = threading.Thread(
+            target=self._executar, args=(pronto, porta_smtp, porta_http), name="envio-local", daemon=True
+        )
+        self._thread.start()
+        pronto.wait()
+        return self
+
+    def parar(self) -> None:
+        if self._loop is not None:
+            for servidor in self._servidores:
+                self._loop.call_soon_threadsafe(servidor.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    def variaveis_ambiente(self) -> Dict[str, str]:
+        """Settings que apontam os três canais para estes servidores"""
+        return {
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORTA": str(self.porta_smtp),
+            "SMTP_STARTTLS": "false",
+            "WHATSAPP_API_URL": f"http://127.0.0.1:{self.porta_http}/v20.0/local",
+            "WHATSAPP_TOKEN": "local",
+            "ENVIO_API_URL": f"http://127.0.0.1:{self.porta_http}/relatorios",
+            "ENVIO_API_TOKEN": "local",
+        }
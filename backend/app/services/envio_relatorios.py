@@ -0,0 +1,294 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Envio em lote dos relatórios aprovados aos responsáveis
+Contexto: Para cada relatório aprovado da turma/escola escolhe o primeiro
+          canal da preferência com contato do responsável (email →
+          responsavel_email, whatsapp → responsavel_telefone, api → sempre),
+          monta a mensagem (texto + link do PDF) e envia em lotes por canal:
+          limite de mensagens por minuto e de lotes simultâneos por canal,
+          retentativa só das mensagens com erro transitório
+Cuidado: O estado é gravado em lote enquanto os envios continuam: linhas em
+         `envios` (uma por mensagem, com tentativas e erro) e enviado_em/
+         enviado_por nos relatórios entregues. Já enviados são pulados,
+         exceto com `reenviar` (a família recebe de novo)
+Dependências: canais_envio, provedores_llm.LimitadorProvedor (mesmo balde por minuto)
+"""
+
+import asyncio
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+from app.services.canais_envio import (
+    CanalEnvio, ErroEnvio, Mensagem, canal_configurado, classificar_erro, obter_canal
+)
+from app.services.links_pdf import link_assinado
+from app.services.provedores_llm import LimitadorProvedor
+
+CANAIS_PADRAO = ("email", "whatsapp")
+TAMANHO_LOTE_GRAVACAO = 200
+TAMANHO_LOTE_CONSULTA = 200  # Limita o tamanho da URL em filtros `in`
+MAX_TURMAS_SIMULTANEAS = 8
+
+_limitadores: Dict[str, Tuple[asyncio.AbstractEventLoop, LimitadorProvedor]] = {}
+
+
+@dataclass
+class ResultadoEnvio:
+    total: int = 0  # Relatórios aprovados encontrados
+    enviados: int = 0
+    ja_enviados: int = 0
+    sem_contato: int = 0
+    falhas: List[Dict[str, str]] = field(default_factory=list)
+    por_canal: Dict[str, int] = field(default_factory=dict)  # Entregues por canal
+    retentativas: int = 0
+    duracao_segundos: float = 0.0
+
+    @property
+    def mensagens_por_minuto(self) -> float:
+        if not self.duracao_segundos:
+            return 0.0
+        return round(self.enviados / self.duracao_segundos * 60, 1)
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Formato de EnvioRelatoriosResponse (também é o resultado das tarefas)"""
+        return {
+            "total": self.total,
+            "enviados": self.enviados,
+            "ja_enviados": self.ja_enviados,
+            "sem_contato": self.sem_contato,
+            "falhas": self.falhas,
+            "por_canal": self.por_canal,
+            "retentativas": self.retentativas,
+            "duracao_segundos": self.duracao_segundos,
+            "mensagens_por_minuto": self.mensagens_por_minuto,
+        }
+
+
+def obter_limitador_canal(canal: CanalEnvio) -> LimitadorProvedor:
+    """Lotes simultâneos + mensagens por minuto do canal (recriado se o event loop mudar)"""
+    loop = asyncio.get_running_loop()
+    atual = _limitadores.get(canal.nome)
+    if atual is None or atual[0] is not loop:
+        taxa = getattr(get_settings(), f"envio_taxa_{canal.nome}", 600)
+        _limitadores[canal.nome] = (loop, LimitadorProvedor(canal.concorrencia, taxa))
+    return _limitadores[canal.nome][1]
+
+
+def _telefone(valor: Optional[str]) -> Optional[str]:
+    """Só dígitos, com DDI 55 quando vier apenas DDD + número"""
+    digitos = re.sub(r"\D", "", valor or "")
+    if len(digitos) in (10, 11):
+        digitos = "55" + digitos
+    return digitos or None
+
+
+def _destino(canal: str, aluno: Dict[str, Any]) -> Optional[str]:
+    if canal == "email":
+        return (aluno.get("responsavel_email") or "").strip() or None
+    if canal == "whatsapp":
+        return _telefone(aluno.get("responsavel_telefone"))
+    return aluno["id"]
+
+
+def montar_mensagem(canal: str, destino: str, relatorio: Dict[str, Any], aluno: Dict[str, Any]) -> Mensagem:
+    settings = get_settings()
+    url = None
+    if relatorio.get("pdf_url"):
+        # Link assinado: o responsável abre sem X-Escola-Id (ver links_pdf)
+        url = settings.envio_url_publica.rstrip("/") + link_assinado(relatorio["id"])
+    familia = aluno.get("responsavel_nome") or "família"
+    periodo = f"{relatorio['trimestre']}º trimestre de {relatorio['ano']}"
+    assunto = f"Relatório do {periodo} - {aluno['nome']}"
+    if canal == "whatsapp" and url:
+        texto = f"Olá, {familia}! O relatório do {periodo} de {aluno['nome']} está disponível: {url}"
+    else:
+        texto = f"Olá, {familia}!\n\nSegue o relatório do {periodo} de {aluno['nome']}.\n\n{relatorio['texto_final']}"
+        if url:
+            texto += f"\n\nVersão em PDF: {url}"
+    return Mensagem(relatorio["id"], aluno["id"], canal, destino, assunto, texto)
+
+
+async def _itens_da_turma(turma_id: str, trimestre: int, ano: int) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(relatório aprovado, aluno com contatos do responsável) da turma"""
+    supabase = get_supabase()
+    alunos = await executar(
+        supabase.table("alunos")
+        .select("id, nome, responsavel_nome, responsavel_email, responsavel_telefone")
+        .eq("turma_id", turma_id)
+    )
+    por_id = {aluno["id"]: aluno for aluno in alunos.data}
+    ids = list(por_id)
+    respostas = await asyncio.gather(*(
+        executar(
+            supabase.table("relatorios")
+            .select("id, aluno_id, trimestre, ano, texto_final, pdf_url, enviado_em")
+            .in_("aluno_id", ids[i:i + TAMANHO_LOTE_CONSULTA])
+            .eq("trimestre", trimestre)
+            .eq("ano", ano)
+            .eq("status", "aprovado")
+        )
+        for i in range(0, len(ids), TAMANHO_LOTE_CONSULTA)
+    ))
+    return [(relatorio, por_id[relatorio["aluno_id"]]) for resposta in respostas for relatorio in resposta.data]
+
+
+async def _enviar_com_retentativas(
+    canal: CanalEnvio, lote: List[Mensagem]
+) -> List[Tuple[Mensagem, Optional[ErroEnvio], int]]:
+    """(mensagem, erro final ou None, tentativas); repete só as que falharam com erro transitório"""
+    settings = get_settings()
+    limitador = obter_limitador_canal(canal)
+    erros: List[Optional[ErroEnvio]] = [None] * len(lote)
+    tentativas = [0] * len(lote)
+    pendentes = list(range(len(lote)))
+
+    for tentativa in range(1, settings.envio_max_tentativas + 1):
+        atuais = [lote[i] for i in pendentes]
+        try:
+            async with limitador.reservar(len(atuais)):
+                resultados = await canal.enviar_lote(atuais)
+        except Exception as e:  # Lote inteiro (conexão, 429 da API em lote)
+            resultados = [classificar_erro(e)] * len(atuais)
+
+        repetir, espera = [], None
+        for indice, erro in zip(pendentes, resultados):
+            tentativas[indice] = tentativa
+            erros[indice] = erro
+            if erro is not None and erro.transitorio:
+                repetir.append(indice)
+                if erro.espera_sugerida is not None:
+                    espera = max(espera or 0.0, erro.espera_sugerida)
+        if not repetir or tentativa == settings.envio_max_tentativas:
+            break
+        pendentes = repetir
+        if espera is None:
+            espera = settings.envio_backoff_segundos * 2 ** (tentativa - 1) * random.uniform(0.5, 1.0)
+        await asyncio.sleep(espera)
+
+    return [(lote[i], erros[i], tentativas[i]) for i in range(len(lote))]
+
+
+async def _gravar_estado(linhas: List[Dict[str, Any]]) -> None:
+    """Uma inserção em `envios` + um update por canal nos relatórios entregues"""
+    supabase = get_supabase()
+    agora = datetime.now(timezone.utc).isoformat()
+    entregues: Dict[str, List[str]] = {}
+    for linha in linhas:
+        if linha["status"] == "enviado":
+            entregues.setdefault(linha["canal"], []).append(linha["relatorio_id"])
+    await asyncio.gather(
+        executar(supabase.table("envios").insert(linhas)),
+        *(
+            executar(
+                supabase.table("relatorios")
+                .update({"enviado_em": agora, "enviado_por": canal})
+                .in_("id", ids[i:i + TAMANHO_LOTE_CONSULTA])
+            )
+            for canal, ids in entregues.items()
+            for i in range(0, len(ids), TAMANHO_LOTE_CONSULTA)
+        ),
+    )
+
+
+async def enviar_relatorios(
+    itens: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+    canais: Optional[List[str]] = None,
+    reenviar: bool = False,
+    progresso: Optional[Callable[[int, int, int], None]] = None,
+) -> ResultadoEnvio:
+    """
+    Envia os relatórios (relatório, aluno) pelos canais em ordem de preferência
+
+    ValueError se nenhum dos canais pedidos está configurado.
+    """
+    inicio = time.perf_counter()
+    preferencia = [nome for nome in (canais or CANAIS_PADRAO) if canal_configurado(nome)]
+    if not preferencia:
+        raise ValueError(f"Nenhum canal de envio configurado entre: {', '.join(canais or CANAIS_PADRAO)}")
+
+    resultado = ResultadoEnvio(total=len(itens))
+    por_canal: Dict[str, List[Mensagem]] = {}
+    for relatorio, aluno in itens:
+        if relatorio.get("enviado_em") and not reenviar:
+            resultado.ja_enviados += 1
+            continue
+        for nome in preferencia:
+            destino = _destino(nome, aluno)
+            if destino:
+                por_canal.setdefault(nome, []).append(montar_mensagem(nome, destino, relatorio, aluno))
+                break
+        else:
+            resultado.sem_contato += 1
+
+    lotes = []
+    for nome, mensagens in por_canal.items():
+        canal = obter_canal(nome)
+        lotes += [(canal, mensagens[i:i + canal.lote_maximo]) for i in range(0, len(mensagens), canal.lote_maximo)]
+    total = sum(len(mensagens) for mensagens in por_canal.values())
+
+    buffer: List[Dict[str, Any]] = []
+    gravacoes = []
+    processados = 0
+    for tarefa in asyncio.as_completed([_enviar_com_retentativas(canal, lote) for canal, lote in lotes]):
+        for mensagem, erro, tentativas in await tarefa:
+            processados += 1
+            resultado.retentativas += tentativas - 1
+            if erro is None:
+                resultado.enviados += 1
+                resultado.por_canal[mensagem.canal] = resultado.por_canal.get(mensagem.canal, 0) + 1
+            else:
+                resultado.falhas.append({"relatorio_id": mensagem.relatorio_id, "canal": mensagem.canal,
+                                         "erro": str(erro)})
+            buffer.append({
+                "relatorio_id": mensagem.relatorio_id,
+                "aluno_id": mensagem.aluno_id,
+                "canal": mensagem.canal,
+                "destino": mensagem.destino,
+                "status": "enviado" if erro is None else "falhou",
+                "tentativas": tentativas,
+                "erro": None if erro is None else str(erro),
+            })
+        if len(buffer) >= TAMANHO_LOTE_GRAVACAO:
+            gravacoes.append(asyncio.create_task(_gravar_estado(buffer)))
+            buffer = []
+        if progresso:
+            progresso(processados, total, len(resultado.falhas))
+    if buffer:
+        gravacoes.append(asyncio.create_task(_gravar_estado(buffer)))
+    await asyncio.gather(*gravacoes)
+
+    resultado.duracao_segundos = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+async def enviar_relatorios_turma(turma_id: str, trimestre: int, ano: int, **opcoes) -> Optional[ResultadoEnvio]:
+    """Relatórios aprovados da turma (None se a turma não existe)"""
+    turma = await executar(get_supabase().table("turmas").select("id").eq("id", str(turma_id)))
+    if not turma.data:
+        return None
+    return await enviar_relatorios(await _itens_da_turma(str(turma_id), trimestre, ano), **opcoes)
+
+
+async def enviar_relatorios_escola(escola_id: str, trimestre: int, ano: int, **opcoes) -> Optional[ResultadoEnvio]:
+    """Relatórios aprovados das turmas ativas da escola (None se a escola não existe)"""
+    supabase = get_supabase()
+    escola, turmas = await asyncio.gather(
+        executar(supabase.table("escolas").select("id").eq("id", str(escola_id))),
+        executar(supabase.table("turmas").select("id").eq("escola_id", str(escola_id)).eq("ativo", True)),
+    )
+    if not escola.data:
+        return None
+
+    limite = asyncio.Semaphore(MAX_TURMAS_SIMULTANEAS)
+
+    async def coletar(turma_id):
+        async with limite:
+            return await _itens_da_turma(turma_id, trimestre, ano)
+
+    por_turma = await asyncio.gather(*(coletar(turma["id"]) for turma in turmas.data))
+    return await enviar_relatorios([item for lista in por_turma for item in lista], **opcoes)
@@ -0,0 +1,76 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Escopo por escola (multi-escola em uma implantação)
+Contexto: Cada requisição diz a escola no header X-Escola-Id. A dependência
+          escopo_escola (registrada em todos os routers no main.py) guarda a
+          escola em um ContextVar e as consultas passam por escopar(), que
+          adiciona escola_id = ... (usuarios, turmas, alunos, avaliacoes,
+          uso_llm e tarefas têm a coluna; os índices idx_*_escola_* começam
+          por ela). Tabelas sem a coluna (relatorios, envios, agregados)
+          são alcançadas pelo aluno, verificado com pertence_a_escola().
+          Sem header a requisição vê todas as escolas (admin), a menos que
+          escola_obrigatoria esteja ligado
+Cuidado: Rota nova que lê por id (GET /x/{id}) também precisa escopar() ou
+         pertence_a_escola(): id de outra escola responde 404, não 403, para
+         não revelar que existe. O ContextVar só vale no código async da
+         requisição (não em threads do executor)
+Dependências: alunos.escola_id e avaliacoes.escola_id preenchidos por
+              trigger (ver SQL_CREATE_TABLES)
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+from uuid import UUID
+
+from fastapi import Header, HTTPException, Query
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+
+_escola_atual: ContextVar[Optional[str]] = ContextVar("escola_atual", default=None)
+
+
+async def escopo_escola(
+    x_escola_id: Optional[UUID] = Header(None, description="Escola da requisição (multi-escola)"),
+    escola: Optional[UUID] = Query(None, description="Mesmo que X-Escola-Id, para EventSource (sem headers)")
+) -> Optional[str]:
+    """Dependência dos routers: define a escola da requisição"""
+    if x_escola_id and escola and x_escola_id != escola:
+        raise HTTPException(status_code=400, detail="X-Escola-Id e escola divergem")
+    escolhida = x_escola_id or escola
+    if escolhida is None and get_settings().escola_obrigatoria:
+        raise HTTPException(status_code=400, detail="Header X-Escola-Id é obrigatório")
+    escola_id = str(escolhida) if escolhida else None
+    _escola_atual.set(escola_id)
+    return escola_id
+
+
+def escola_atual() -> Optional[str]:
+    """Escola da requisição em andamento (None = todas)"""
+    return _escola_atual.get()
+
+
+def escopar(query, coluna: str = "escola_id"):
+    """Filtra a query pela escola da requisição (se houver)"""
+    escola_id = _escola_atual.get()
+    return query.eq(coluna, escola_id) if escola_id else query
+
+
+def verificar_escola(escola_id: Optional[str]) -> None:
+    """404 se a escola informada (path/corpo) não é a da requisição"""
+    atual = _escola_atual.get()
+    if atual and escola_id and str(escola_id) != atual:
+        raise HTTPException(status_code=404, detail="Escola não encontrada")
+
+
+async def pertence_a_escola(tabela: str, id_: str) -> bool:
+    """Linha `id_` de `tabela` existe e é da escola da requisição"""
+    result = await executar(
+        escopar(get_supabase().table(tabela).select("id").eq("id", str(id_)))
+    )
+    return bool(result.data)
+
+
+async def garantir_da_escola(tabela: str, id_, detalhe: str) -> None:
+    """404 com `detalhe` se a linha não é da escola da requisição (sem escola: não consulta)"""
+    if _escola_atual.get() and not await pertence_a_escola(tabela, str(id_)):
+        raise HTTPException(status_code=404, detail=detalhe)
@@ -0,0 +1,559 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Geração dos rascunhos de relatórios trimestrais
+Contexto: No fim do trimestre todos os alunos da turma (ou da escola) precisam
+          de um rascunho; as chamadas ao LLM saem em paralelo, limitadas por
+          provedor (ver provedores_llm) e roteadas com hedge/failover (ver
+          roteador_llm); os rascunhos são gravados em lotes
+Cuidado: Relatórios em revisão ou aprovados nunca são sobrescritos; rascunhos
+         existentes só com `sobrescrever`. Alunos sem avaliação concluída
+         no trimestre são ignorados
+Dependências: consolidacao (dados_consolidados), provedores_llm, roteador_llm,
+              rascunho_modelo (texto por regras, sem LLM, para dados comuns)
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from postgrest import ReturnMethod
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+from app.services import cache_relatorios
+from app.services.agregados import obter_dados_consolidados
+from app.services.consolidacao import consolidar_turma
+from app.services.custos_llm import UsoTokens, calcular_custo
+from app.services.prompts_relatorio import VERSAO_PROMPT, prefixo_prompt, sufixo_prompt, sufixo_refinamento
+from app.services.rascunho_modelo import motivos_incomuns, redigir_rascunho
+from app.services.provedores_llm import RequisicaoLLM, RespostaLLM, obter_provedor
+from app.services.roteador_llm import gerar_roteado, transmitir_roteado
+
+TAMANHO_LOTE_GRAVACAO = 50
+TAMANHO_LOTE_CONSULTA = 200  # Limita o tamanho da URL em filtros `in`
+MAX_TURMAS_SIMULTANEAS = 8  # Consolidação da escola: turmas lidas em paralelo
+
+
+@dataclass
+class AlvoRelatorio:
+    """Um aluno a ter o rascunho gerado"""
+    aluno_id: str
+    nome: str
+    serie: str
+    nivel: str
+    turma_id: str
+    escola_id: Optional[str]
+    professor_id: Optional[str]
+    dados_consolidados: Dict[str, Any]
+
+
+@dataclass
+class ResultadoGeracao:
+    total_alunos: int = 0
+    gerados: int = 0
+    ignorados: int = 0
+    falhas: List[Dict[str, str]] = field(default_factory=list)
+    provedor: str = ""
+    modelo: str = ""
+    uso: UsoTokens = field(default_factory=UsoTokens)
+    uso_por_turma: Dict[str, UsoTokens] = field(default_factory=dict)
+    por_provedor: Dict[str, int] = field(default_factory=dict)  # Quem respondeu (failover/hedge)
+    por_origem: Dict[str, int] = field(default_factory=dict)  # modelo, cache ou llm
+    duracao_segundos: float = 0.0
+
+    @property
+    def relatorios_por_minuto(self) -> float:
+        if not self.duracao_segundos:
+            return 0.0
+        return round(self.gerados / self.duracao_segundos * 60, 1)
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Formato de GeracaoRelatoriosResponse (também é o resultado das tarefas)"""
+        return {
+            "total_alunos": self.total_alunos,
+            "gerados": self.gerados,
+            "ignorados": self.ignorados,
+            "falhas": self.falhas,
+            "provedor": self.provedor,
+            "modelo": self.modelo,
+            "uso": self.uso.como_dict(),
+            "uso_por_turma": {turma_id: uso.como_dict() for turma_id, uso in self.uso_por_turma.items()},
+            "por_provedor": self.por_provedor,
+            "por_origem": self.por_origem,
+            "duracao_segundos": self.duracao_segundos,
+            "relatorios_por_minuto": self.relatorios_por_minuto,
+        }
+
+
+def montar_prompt(alvo: AlvoRelatorio, rascunho_base: Optional[str] = None) -> Tuple[str, str]:
+    """Prompt (prefixo estável do nível, sufixo do aluno); com `rascunho_base`, pede refinamento"""
+    if rascunho_base is not None:
+        return prefixo_prompt(alvo.nivel), sufixo_refinamento(
+            alvo.nome, alvo.serie, alvo.dados_consolidados, rascunho_base
+        )
+    return prefixo_prompt(alvo.nivel), sufixo_prompt(alvo.nome, alvo.serie, alvo.dados_consolidados)
+
+
+def rascunho_sem_llm(alvo: AlvoRelatorio, modo: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (texto pronto, rascunho base para o LLM refinar) conforme o modo
+
+    "modelo": texto pronto se os dados são comuns, senão LLM do zero;
+    "refinar": o LLM sempre revisa o texto do modelo; "llm": nada pronto
+    """
+    if modo == "llm":
+        return None, None
+    texto = redigir_rascunho(alvo.nome, alvo.dados_consolidados)
+    if modo == "refinar":
+        return None, texto
+    if motivos_incomuns(alvo.dados_consolidados):
+        return None, None
+    return texto, None
+
+
+def chave_rascunho(alvo: AlvoRelatorio, provedor: str, modelo: str, rascunho_base: Optional[str]) -> str:
+    conteudo = {"nome": alvo.nome, "serie": alvo.serie, "nivel": alvo.nivel, "dados": alvo.dados_consolidados}
+    if rascunho_base is not None:
+        conteudo["rascunho_base"] = rascunho_base
+    return cache_relatorios.chave_cache(
+        conteudo, VERSAO_PROMPT, provedor, modelo, get_settings().llm_temperature
+    )
+
+
+# ========== COLETA DOS DADOS ==========
+
+async def _alvos_da_turma(turma: Dict[str, Any], trimestre: int, ano: int) -> List[AlvoRelatorio]:
+    supabase = get_supabase()
+    consolidados, alunos = await asyncio.gather(
+        consolidar_turma(turma["id"], trimestre, ano),
+        executar(
+            supabase.table("alunos")
+            .select("id, nome")
+            .eq("turma_id", turma["id"])
+            .eq("ativo", True)
+            .order("nome")
+        ),
+    )
+    serie = f"{turma['serie']} {turma['turma']}"
+    return [
+        AlvoRelatorio(
+            aluno_id=aluno["id"],
+            nome=aluno["nome"],
+            serie=serie,
+            nivel=turma["nivel"],
+            turma_id=turma["id"],
+            escola_id=turma.get("escola_id"),
+            professor_id=turma.get("professor_id"),
+            dados_consolidados=(consolidados or {})[aluno["id"]],
+        )
+        for aluno in alunos.data
+        if aluno["id"] in (consolidados or {})
+    ]
+
+
+async def _filtrar_existentes(
+    alvos: List[AlvoRelatorio], trimestre: int, ano: int, sobrescrever: bool
+) -> Tuple[List[AlvoRelatorio], int]:
+    """Remove alunos sem avaliação e os que já têm relatório protegido"""
+    supabase = get_supabase()
+    com_dados = [alvo for alvo in alvos if alvo.dados_consolidados["dias_avaliados"]]
+    ids = [alvo.aluno_id for alvo in com_dados]
+    existentes = await asyncio.gather(*(
+        executar(
+            supabase.table("relatorios")
+            .select("aluno_id, status")
+            .in_("aluno_id", ids[i:i + TAMANHO_LOTE_CONSULTA])
+            .eq("trimestre", trimestre)
+            .eq("ano", ano)
+        )
+        for i in range(0, len(ids), TAMANHO_LOTE_CONSULTA)
+    ))
+    bloqueados = {
+        r["aluno_id"] for resposta in existentes for r in resposta.data
+        if r["status"] != "rascunho" or not sobrescrever
+    }
+    pendentes = [alvo for alvo in com_dados if alvo.aluno_id not in bloqueados]
+    return pendentes, len(alvos) - len(pendentes)
+
+
+# ========== PIPELINE ==========
+
+async def _gravar_lote(linhas: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Upsert dos rascunhos; devolve as falhas (o lote inteiro é revertido pelo banco)"""
+    supabase = get_supabase()
+    try:
+        await executar(
+            supabase.table("relatorios")
+            .upsert(linhas, on_conflict="aluno_id,trimestre,ano", returning=ReturnMethod.minimal)
+        )
+        return []
+    except Exception as e:
+        return [{"aluno_id": linha["aluno_id"], "erro": f"Falha ao gravar lote: {e}"} for linha in linhas]
+
+
+async def _gravar_uso(linhas: List[Dict[str, Any]]) -> None:
+    """Contabilidade em uso_llm; falha aqui não invalida os rascunhos já gravados"""
+    supabase = get_supabase()
+    try:
+        await executar(supabase.table("uso_llm").insert(linhas, returning=ReturnMethod.minimal))
+    except Exception as e:
+        print(f"⚠️ Falha ao registrar uso de LLM ({len(linhas)} linhas): {e}")
+
+
+async def gerar_rascunhos(
+    alvos: List[AlvoRelatorio],
+    trimestre: int,
+    ano: int,
+    provedor: Optional[str] = None,
+    modelo: Optional[str] = None,
+    sobrescrever: bool = False,
+    ignorar_cache: bool = False,
+    progresso: Optional[Callable[[int, int, int], None]] = None,
+    modo: Optional[str] = None,
+) -> ResultadoGeracao:
+    """
+    🚨 ÂNCORA: CRÍTICO - Fan-out das chamadas ao LLM
+    Contexto: Uma tarefa por aluno; quem regula o ritmo é o limitador do
+              provedor (concorrência + TPM). Os rascunhos prontos são
+              gravados a cada TAMANHO_LOTE_GRAVACAO, então uma falha no meio
+              não perde o que já foi gerado
+    Cache: o mesmo conteúdo de prompt reaproveita o texto já gerado;
+           `ignorar_cache` força nova chamada (e substitui a entrada)
+    Uso: tokens (prompt, cache do provedor, resposta) e custo somados na
+         requisição e por turma, e gravados por aluno em uso_llm com o
+         provedor/modelo que de fato respondeu
+    Roteamento: `provedor` é o primário; em lentidão ou queda a resposta
+                pode vir de outro provedor configurado. O cache continua
+                indexado pelo primário
+    Progresso: `progresso(processados, total, falhas)` a cada aluno concluído
+               (síncrono e barato; usado pelas tarefas em segundo plano)
+    Modo: ver rascunho_sem_llm (padrão: rascunho_modo). Textos do modelo não
+          geram linha em uso_llm (não há tokens nem custo)
+    """
+    settings = get_settings()
+    provedor = provedor or settings.default_llm_provider
+    modelo = modelo or settings.default_llm_model
+    modo = modo or settings.rascunho_modo
+    obter_provedor(provedor)  # Nome inválido falha antes do fan-out
+
+    inicio = time.perf_counter()
+    resultado = ResultadoGeracao(total_alunos=len(alvos), provedor=provedor, modelo=modelo)
+    pendentes, resultado.ignorados = await _filtrar_existentes(alvos, trimestre, ano, sobrescrever)
+    if progresso:
+        progresso(0, len(pendentes), 0)
+
+    async def gerar(alvo: AlvoRelatorio):
+        try:
+            pronto, base = rascunho_sem_llm(alvo, modo)
+            if pronto is not None:
+                return alvo, RespostaLLM(pronto, "modelo", "regras", tentativas=0), None, "modelo"
+
+            chave = chave_rascunho(alvo, provedor, modelo, base)
+            if not ignorar_cache:
+                entrada = await cache_relatorios.buscar(chave)
+                if entrada is not None:
+                    return alvo, RespostaLLM(
+                        entrada["texto"], entrada.get("provedor", provedor), entrada.get("modelo", modelo),
+                        tentativas=0, do_cache=True,
+                    ), None, "cache"
+
+            sistema, usuario = montar_prompt(alvo, base)
+            requisicao = RequisicaoLLM(sistema, usuario, modelo, settings.llm_temperature, settings.llm_max_tokens)
+            resposta = await gerar_roteado(requisicao, provedor)
+            await cache_relatorios.guardar(chave, {
+                "texto": resposta.texto,
+                "provedor": resposta.provedor,
+                "modelo": resposta.modelo,
+                "versao_prompt": VERSAO_PROMPT,
+                "tokens_prompt": resposta.tokens_prompt,
+                "tokens_cache": resposta.tokens_cache,
+                "tokens_resposta": resposta.tokens_resposta,
+            })
+            return alvo, resposta, None, "llm"
+        except Exception as e:
+            return alvo, None, str(e), None
+
+    buffer: List[Dict[str, Any]] = []
+    uso: List[Dict[str, Any]] = []
+    gravacoes = []
+    for processados, tarefa in enumerate(asyncio.as_completed([gerar(alvo) for alvo in pendentes]), 1):
+        alvo, resposta, erro, origem = await tarefa
+        if progresso:
+            progresso(processados, len(pendentes), len(resultado.falhas) + (erro is not None))
+        if erro is not None:
+            resultado.falhas.append({"aluno_id": alvo.aluno_id, "erro": erro})
+            continue
+        resultado.por_origem[origem] = resultado.por_origem.get(origem, 0) + 1
+        buffer.append({
+            "aluno_id": alvo.aluno_id,
+            "trimestre": trimestre,
+            "ano": ano,
+            "texto_final": resposta.texto,
+            "dados_consolidados": alvo.dados_consolidados,
+            "status": "rascunho",
+            "professor_id": alvo.professor_id,
+        })
+        if len(buffer) >= TAMANHO_LOTE_GRAVACAO:
+            gravacoes.append(asyncio.create_task(_gravar_lote(buffer)))
+            buffer = []
+        if origem == "modelo":
+            continue
+        if not resposta.do_cache:
+            resultado.por_provedor[resposta.provedor] = resultado.por_provedor.get(resposta.provedor, 0) + 1
+        custo = 0.0 if resposta.do_cache else calcular_custo(
+            resposta.provedor, resposta.modelo, resposta.tokens_prompt, resposta.tokens_cache, resposta.tokens_resposta
+        )
+        for totais in (resultado.uso, resultado.uso_por_turma.setdefault(alvo.turma_id, UsoTokens())):
+            totais.registrar(resposta.tokens_prompt, resposta.tokens_cache, resposta.tokens_resposta,
+                             custo, resposta.do_cache)
+        uso.append({
+            "escola_id": alvo.escola_id,
+            "turma_id": alvo.turma_id,
+            "aluno_id": alvo.aluno_id,
+            "trimestre": trimestre,
+            "ano": ano,
+            "provedor": resposta.provedor,
+            "modelo": resposta.modelo,
+            "do_cache": resposta.do_cache,
+            "tokens_prompt": resposta.tokens_prompt,
+            "tokens_cache": resposta.tokens_cache,
+            "tokens_resposta": resposta.tokens_resposta,
+            "custo_usd": custo,
+        })
+    if buffer:
+        gravacoes.append(asyncio.create_task(_gravar_lote(buffer)))
+
+    for falhas_lote in await asyncio.gather(*gravacoes):
+        resultado.falhas.extend(falhas_lote)
+    if uso:
+        await _gravar_uso(uso)
+    resultado.gerados = len(pendentes) - len(resultado.falhas)
+    resultado.duracao_segundos = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+async def gerar_relatorios_turma(turma_id: str, trimestre: int, ano: int, **opcoes) -> Optional[ResultadoGeracao]:
+    """Rascunhos de todos os alunos ativos da turma (None se a turma não existe)"""
+    supabase = get_supabase()
+    turma = await executar(
+        supabase.table("turmas")
+        .select("id, serie, turma, nivel, escola_id, professor_id")
+        .eq("id", str(turma_id))
+    )
+    if not turma.data:
+        return None
+    alvos = await _alvos_da_turma(turma.data[0], trimestre, ano)
+    return await gerar_rascunhos(alvos, trimestre, ano, **opcoes)
+
+
+async def gerar_relatorios_escola(escola_id: str, trimestre: int, ano: int, **opcoes) -> Optional[ResultadoGeracao]:
+    """Rascunhos de todos os alunos das turmas ativas da escola (None se a escola não existe)"""
+    supabase = get_supabase()
+    escola, turmas = await asyncio.gather(
+        executar(supabase.table("escolas").select("id").eq("id", str(escola_id))),
+        executar(
+            supabase.table("turmas")
+            .select("id, serie, turma, nivel, escola_id, professor_id")
+            .eq("escola_id", str(escola_id))
+            .eq("ativo", True)
+        ),
+    )
+    if not escola.data:
+        return None
+
+    limite = asyncio.Semaphore(MAX_TURMAS_SIMULTANEAS)
+
+    async def coletar(turma):
+        async with limite:
+            return await _alvos_da_turma(turma, trimestre, ano)
+
+    por_turma = await asyncio.gather(*(coletar(turma) for turma in turmas.data))
+    alvos = [alvo for lista in por_turma for alvo in lista]
+    return await gerar_rascunhos(alvos, trimestre, ano, **opcoes)
+
+
+# ========== RASCUNHO INDIVIDUAL EM FLUXO ==========
+
+async def preparar_rascunho_aluno(
+    aluno_id: str, trimestre: int, ano: int
+) -> Tuple[Optional[AlvoRelatorio], Optional[Dict[str, Any]]]:
+    """
+    (alvo, relatório existente) de um aluno; alvo None se o aluno não existe
+    ou não tem avaliação concluída no trimestre (dados dos agregados)
+    """
+    supabase = get_supabase()
+    aluno, dados, existente = await asyncio.gather(
+        executar(
+            supabase.table("alunos")
+            .select("id, nome, turma_id, turmas(serie, turma, nivel, escola_id, professor_id)")
+            .eq("id", str(aluno_id))
+        ),
+        obter_dados_consolidados(str(aluno_id), trimestre, ano),
+        executar(
+            supabase.table("relatorios")
+            .select("id, status, texto_final, historico_revisoes")
+            .eq("aluno_id", str(aluno_id))
+            .eq("trimestre", trimestre)
+            .eq("ano", ano)
+        ),
+    )
+    if not aluno.data or dados is None:
+        return None, None
+    linha = aluno.data[0]
+    turma = linha.get("turmas") or {}
+    alvo = AlvoRelatorio(
+        aluno_id=linha["id"],
+        nome=linha["nome"],
+        serie=f"{turma.get('serie')} {turma.get('turma')}",
+        nivel=turma.get("nivel"),
+        turma_id=linha["turma_id"],
+        escola_id=turma.get("escola_id"),
+        professor_id=turma.get("professor_id"),
+        dados_consolidados=dados,
+    )
+    return alvo, existente.data[0] if existente.data else None
+
+
+async def _salvar_rascunho(
+    alvo: AlvoRelatorio,
+    existente: Optional[Dict[str, Any]],
+    trimestre: int,
+    ano: int,
+    texto: str,
+    revisao: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    """Grava texto_final + entrada no histórico; None se o relatório saiu de rascunho no meio"""
+    supabase = get_supabase()
+    if existente is None:
+        criado = await executar(supabase.table("relatorios").insert({
+            "aluno_id": alvo.aluno_id,
+            "trimestre": trimestre,
+            "ano": ano,
+            "texto_final": texto,
+            "historico_revisoes": [revisao],
+            "dados_consolidados": alvo.dados_consolidados,
+            "status": "rascunho",
+            "professor_id": alvo.professor_id,
+        }))
+        return criado.data[0]
+
+    atualizado = await executar(
+        supabase.table("relatorios")
+        .update({
+            "texto_final": texto,
+            "historico_revisoes": (existente.get("historico_revisoes") or []) + [revisao],
+            "dados_consolidados": alvo.dados_consolidados,
+            "professor_id": alvo.professor_id,
+        })
+        .eq("id", existente["id"])
+        .eq("status", "rascunho")  # Não atropela revisão aberta durante a geração
+    )
+    return atualizado.data[0] if atualizado.data else None
+
+
+async def transmitir_rascunho(
+    alvo: AlvoRelatorio,
+    existente: Optional[Dict[str, Any]],
+    trimestre: int,
+    ano: int,
+    usuario: Dict[str, Any],
+    provedor: Optional[str] = None,
+    modelo: Optional[str] = None,
+    ignorar_cache: bool = False,
+    modo: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    🚨 ÂNCORA: CRÍTICO - Rascunho de um aluno em fluxo (eventos para SSE)
+    Contexto: Emite ("inicio", ...), vários ("texto", {"texto": trecho}) e
+              ("fim", ...) depois de gravar texto_final e a entrada em
+              historico_revisoes (versao_anterior = texto substituído)
+    Cuidado: Quem chama valida o status (só rascunho pode ser regerado).
+             Se o cliente desconecta, a geração é cancelada e nada é gravado.
+             Texto do modelo (dados comuns) sai num único trecho, sem uso_llm
+    """
+    settings = get_settings()
+    provedor = provedor or settings.default_llm_provider
+    modelo = modelo or settings.default_llm_model
+    pronto, base = rascunho_sem_llm(alvo, modo or settings.rascunho_modo)
+    chave = chave_rascunho(alvo, provedor, modelo, base)
+
+    entrada = None if ignorar_cache or pronto is not None else await cache_relatorios.buscar(chave)
+    if pronto is not None:
+        resposta = RespostaLLM(pronto, "modelo", "regras", tentativas=0)
+        yield "inicio", {"provedor": resposta.provedor, "modelo": resposta.modelo, "do_cache": False}
+        yield "texto", {"texto": resposta.texto}
+    elif entrada is not None:
+        resposta = RespostaLLM(
+            entrada["texto"], entrada.get("provedor", provedor), entrada.get("modelo", modelo),
+            tentativas=0, do_cache=True,
+        )
+        yield "inicio", {"provedor": resposta.provedor, "modelo": resposta.modelo, "do_cache": True}
+        yield "texto", {"texto": resposta.texto}
+    else:
+        yield "inicio", {"provedor": provedor, "modelo": modelo, "do_cache": False}
+        sistema, usuario_prompt = montar_prompt(alvo, base)
+        requisicao = RequisicaoLLM(sistema, usuario_prompt, modelo, settings.llm_temperature, settings.llm_max_tokens)
+        resposta = None
+        async for item in transmitir_roteado(requisicao, provedor):
+            if isinstance(item, RespostaLLM):
+                resposta = item
+            else:
+                yield "texto", {"texto": item}
+        await cache_relatorios.guardar(chave, {
+            "texto": resposta.texto,
+            "provedor": resposta.provedor,
+            "modelo": resposta.modelo,
+            "versao_prompt": VERSAO_PROMPT,
+            "tokens_prompt": resposta.tokens_prompt,
+            "tokens_cache": resposta.tokens_cache,
+            "tokens_resposta": resposta.tokens_resposta,
+        })
+
+    revisao = {
+        "data": datetime.now(timezone.utc).isoformat(),
+        "usuario_id": usuario["id"],
+        "usuario_nome": usuario["nome"],
+        "comentario": f"Rascunho gerado automaticamente ({resposta.provedor}/{resposta.modelo})",
+        "versao_anterior": existente["texto_final"] if existente else None,
+    }
+    relatorio = await _salvar_rascunho(alvo, existente, trimestre, ano, resposta.texto, revisao)
+    if relatorio is None:
+        raise ValueError("O relatório saiu de rascunho durante a geração; texto não gravado")
+
+    uso = UsoTokens()
+    if pronto is not None:
+        yield "fim", {
+            "relatorio_id": relatorio["id"],
+            "provedor": resposta.provedor,
+            "modelo": resposta.modelo,
+            "texto_final": resposta.texto,
+            "uso": uso.como_dict(),
+        }
+        return
+
+    custo = 0.0 if resposta.do_cache else calcular_custo(
+        resposta.provedor, resposta.modelo, resposta.tokens_prompt, resposta.tokens_cache, resposta.tokens_resposta
+    )
+    uso.registrar(resposta.tokens_prompt, resposta.tokens_cache, resposta.tokens_resposta, custo, resposta.do_cache)
+    await _gravar_uso([{
+        "escola_id": alvo.escola_id,
+        "turma_id": alvo.turma_id,
+        "aluno_id": alvo.aluno_id,
+        "trimestre": trimestre,
+        "ano": ano,
+        "provedor": resposta.provedor,
+        "modelo": resposta.modelo,
+        "do_cache": resposta.do_cache,
+        "tokens_prompt": resposta.tokens_prompt,
+        "tokens_cache": resposta.tokens_cache,
+        "tokens_resposta": resposta.tokens_resposta,
+        "custo_usd": custo,
+    }])
+    yield "fim", {
+        "relatorio_id": relatorio["id"],
+        "provedor": resposta.provedor,
+        "modelo": resposta.modelo,
+        "texto_final": resposta.texto,
+        "uso": uso.como_dict(),
+    }
@@ -0,0 +1,303 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Importação em massa de alunos (CSV/XLSX)
+Contexto: Cadastro inicial de uma escola cria milhares de alunos de uma vez;
+          as mesmas regras de criar_aluno são aplicadas ao arquivo inteiro com
+          poucas consultas em conjunto em vez de 4 round trips por aluno
+Cuidado: Linhas com erro são relatadas e ignoradas; as demais são inseridas
+Dependências: openpyxl (apenas para .xlsx)
+"""
+
+import asyncio
+import csv
+import io
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from postgrest import ReturnMethod
+from pydantic import ValidationError
+
+from app.models.database import get_supabase, executar
+from app.models.schemas import AlunoCreate, ErroImportacaoAluno, ImportacaoAlunosResponse
+from app.services.busca_alunos import obter_indice_busca
+from app.services.cache_respostas import invalidar_turmas
+from app.services.escopo_escola import escopar
+from app.services.turmas import contar_alunos_ativos
+
+TAMANHO_LOTE_INSERCAO = 1000
+TAMANHO_LOTE_CONSULTA = 200  # Limita o tamanho da URL em filtros `in`
+MAX_LINHAS_IMPORTACAO = 20000
+
+VALORES_VERDADEIROS = {"sim", "s", "true", "verdadeiro", "1", "x", "yes"}
+VALORES_FALSOS = {"nao", "não", "n", "false", "falso", "0", "no"}
+
+
+class ArquivoImportacaoInvalido(ValueError):
+    """Arquivo ilegível, sem cabeçalho ou grande demais"""
+
+
+# ========== LEITURA DO ARQUIVO ==========
+
+def _normalizar_cabecalho(nome: Any) -> str:
+    return str(nome or "").strip().lower().replace(" ", "_")
+
+
+def _normalizar_valor(valor: Any) -> Any:
+    """Células vazias viram None; datas do Excel viram date"""
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        valor = valor.strip()
+        return valor or None
+    return valor
+
+
+def _ler_csv(conteudo: bytes) -> List[Dict[str, Any]]:
+    try:
+        texto = conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texto = conteudo.decode("latin-1")  # Planilhas exportadas pelo Excel em pt-BR
+
+    try:
+        dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialeto = csv.excel
+
+    leitor = csv.reader(io.StringIO(texto), dialeto)
+    return _linhas_com_cabecalho(leitor)
+
+
+def _ler_xlsx(conteudo: bytes) -> List[Dict[str, Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ArquivoImportacaoInvalido("Suporte a .xlsx requer o pacote openpyxl")
+
+    try:
+        planilha = load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True).active
+    except Exception as e:
+        raise ArquivoImportacaoInvalido(f"Planilha inválida: {e}")
+
+    return _linhas_com_cabecalho(planilha.iter_rows(values_only=True))
+
+
+def _linhas_com_cabecalho(linhas: Iterable[Iterable[Any]]) -> List[Dict[str, Any]]:
+    iterador = iter(linhas)
+    cabecalho = next(iterador, None)
+    if not cabecalho or not any(cabecalho):
+        raise ArquivoImportacaoInvalido("Arquivo sem cabeçalho")
+
+    colunas = [_normalizar_cabecalho(c) for c in cabecalho]
+    registros = []
+    for valores in iterador:
+        registro = {
+            coluna: _normalizar_valor(valor)
+            for coluna, valor in zip(colunas, valores)
+            if coluna
+        }
+        if not any(v is not None for v in registro.values()):
+            continue  # Linha em branco
+        registros.append(registro)
+        if len(registros) > MAX_LINHAS_IMPORTACAO:
+            raise ArquivoImportacaoInvalido(
+                f"Arquivo excede o limite de {MAX_LINHAS_IMPORTACAO} alunos"
+            )
+    return registros
+
+
+def ler_arquivo(nome_arquivo: str, conteudo: bytes) -> List[Dict[str, Any]]:
+    """Lê CSV (`,` `;` ou tab) ou XLSX em uma lista de dicionários por linha"""
+    if (nome_arquivo or "").lower().endswith(".xlsx"):
+        return _ler_xlsx(conteudo)
+    return _ler_csv(conteudo)
+
+
+# ========== VALIDAÇÃO ==========
+
+def _converter_booleano(valor: Any) -> Any:
+    if isinstance(valor, str):
+        texto = valor.lower()
+        if texto in VALORES_VERDADEIROS:
+            return True
+        if texto in VALORES_FALSOS:
+            return False
+    return valor
+
+
+def _mensagens_validacao(erro: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(p) for p in e['loc']) or 'linha'}: {e['msg']}"
+        for e in erro.errors()
+    ]
+
+
+def validar_linhas(
+    registros: List[Dict[str, Any]],
+) -> Tuple[List[Tuple[int, AlunoCreate]], List[ErroImportacaoAluno]]:
+    """
+    Valida cada linha contra AlunoCreate e as regras locais de criar_aluno
+    (descrição de necessidades, nascimento no passado). Linha 2 é a primeira
+    após o cabeçalho. Matrícula repetida no arquivo depende da escola da
+    turma: conferida em _validar_contra_banco
+    """
+    validos: List[Tuple[int, AlunoCreate]] = []
+    erros: List[ErroImportacaoAluno] = []
+    hoje = date.today()
+
+    for indice, registro in enumerate(registros):
+        linha = indice + 2
+        matricula = registro.get("matricula")
+        # Células vazias ficam de fora para valerem os padrões do schema
+        dados = {k: v for k, v in registro.items() if v is not None}
+        if "matricula" in dados:
+            dados["matricula"] = str(dados["matricula"])  # Excel lê códigos numéricos como int
+        if "necessidades_especiais" in dados:
+            dados["necessidades_especiais"] = _converter_booleano(dados["necessidades_especiais"])
+
+        try:
+            aluno = AlunoCreate.model_validate(dados)
+        except ValidationError as e:
+            erros.append(ErroImportacaoAluno(
+                linha=linha,
+                matricula=str(matricula) if matricula is not None else None,
+                erros=_mensagens_validacao(e),
+            ))
+            continue
+
+        problemas = []
+        if aluno.necessidades_especiais and not aluno.necessidades_descricao:
+            problemas.append("Descrição das necessidades especiais é obrigatória")
+        if aluno.data_nascimento >= hoje:
+            problemas.append("Data de nascimento não pode ser futura")
+
+        if problemas:
+            erros.append(ErroImportacaoAluno(linha=linha, matricula=aluno.matricula, erros=problemas))
+        else:
+            validos.append((linha, aluno))
+
+    return validos, erros
+
+
+async def _buscar_em_lotes(tabela: str, colunas: str, coluna_filtro: str, valores: List[str],
+                           por_escola: bool = False) -> List[Dict]:
+    """Consulta `coluna IN (...)` em lotes concorrentes (`por_escola`: só da escola da requisição)"""
+    supabase = get_supabase()
+    lotes = [
+        valores[i:i + TAMANHO_LOTE_CONSULTA]
+        for i in range(0, len(valores), TAMANHO_LOTE_CONSULTA)
+    ]
+    resultados = await asyncio.gather(*(
+        executar(
+            (escopar if por_escola else lambda query: query)(supabase.table(tabela).select(colunas).in_(coluna_filtro, lote))
+        )
+        for lote in lotes
+    ))
+    return [linha for resultado in resultados for linha in resultado.data]
+
+
+async def _validar_contra_banco(
+    validos: List[Tuple[int, AlunoCreate]],
+) -> Tuple[List[Tuple[int, AlunoCreate]], List[ErroImportacaoAluno]]:
+    """
+    🚨 ÂNCORA: CRÍTICO - Regras que dependem do banco, em conjunto
+    Contexto: Matrículas existentes, turmas e ocupação atual são lidas uma vez
+              para o arquivo inteiro; a capacidade é controlada em memória
+              somando os alunos aceitos na ordem do arquivo. Matrícula é
+              única por escola: no banco e no próprio arquivo a chave é
+              (escola da turma, matrícula), o que importa para o admin
+              (sem X-Escola-Id) carregando turmas de várias escolas
+    """
+    matriculas = [aluno.matricula for _, aluno in validos]
+    turma_ids = sorted({str(aluno.turma_id) for _, aluno in validos})
+
+    existentes, turmas, ocupacao = await asyncio.gather(
+        _buscar_em_lotes("alunos", "matricula, escola_id", "matricula", matriculas, por_escola=True),
+        _buscar_em_lotes("turmas", "id, capacidade_maxima, escola_id", "id", turma_ids, por_escola=True),
+        contar_alunos_ativos(turma_ids),
+    )
+    matriculas_existentes = {(linha["escola_id"], linha["matricula"]) for linha in existentes}
+    matriculas_vistas: Dict[Tuple[Any, str], int] = {}
+    capacidades = {linha["id"]: linha.get("capacidade_maxima") for linha in turmas}
+    escola_da_turma = {linha["id"]: linha.get("escola_id") for linha in turmas}
+    ocupacao = defaultdict(int, ocupacao)
+
+    aceitos: List[Tuple[int, AlunoCreate]] = []
+    erros: List[ErroImportacaoAluno] = []
+    for linha, aluno in validos:
+        turma_id = str(aluno.turma_id)
+        chave = (escola_da_turma.get(turma_id), aluno.matricula)
+        if turma_id not in capacidades:
+            problema = f"Turma com ID '{turma_id}' não encontrada"
+        elif chave in matriculas_existentes:
+            problema = f"Matrícula '{aluno.matricula}' já está em uso"
+        elif chave in matriculas_vistas:
+            problema = f"Matrícula '{aluno.matricula}' repetida no arquivo (linha {matriculas_vistas[chave]})"
+        else:
+            matriculas_vistas[chave] = linha
+            if capacidades[turma_id] and ocupacao[turma_id] >= capacidades[turma_id]:
+                problema = "Turma já atingiu a capacidade máxima"
+            else:
+                ocupacao[turma_id] += 1
+                aceitos.append((linha, aluno))
+                continue
+        erros.append(ErroImportacaoAluno(linha=linha, matricula=aluno.matricula, erros=[problema]))
+
+    return aceitos, erros
+
+
+# ========== INSERÇÃO ==========
+
+async def _inserir_lote(lote: List[Tuple[int, AlunoCreate]]) -> List[ErroImportacaoAluno]:
+    supabase = get_supabase()
+    try:
+        await executar(
+            supabase.table("alunos")
+            .insert([aluno.model_dump(mode="json") for _, aluno in lote], returning=ReturnMethod.minimal)
+        )
+        return []
+    except Exception as e:
+        # Lote inteiro é revertido pelo banco (ex: matrícula criada em paralelo)
+        return [
+            ErroImportacaoAluno(linha=linha, matricula=aluno.matricula, erros=[f"Falha ao inserir lote: {e}"])
+            for linha, aluno in lote
+        ]
+
+
+async def importar_alunos(nome_arquivo: str, conteudo: bytes, simular: bool = False) -> ImportacaoAlunosResponse:
+    """
+    Importa alunos de um arquivo CSV/XLSX
+
+    Fluxo: leitura + validação (thread) → regras do banco em conjunto →
+    inserção em lotes de TAMANHO_LOTE_INSERCAO. Com `simular`, nada é gravado.
+    """
+    registros = await asyncio.to_thread(ler_arquivo, nome_arquivo, conteudo)
+    validos, erros = await asyncio.to_thread(validar_linhas, registros)
+
+    if validos:
+        validos, erros_banco = await _validar_contra_banco(validos)
+        erros.extend(erros_banco)
+
+    importados = 0
+    if validos and not simular:
+        lotes = [
+            validos[i:i + TAMANHO_LOTE_INSERCAO]
+            for i in range(0, len(validos), TAMANHO_LOTE_INSERCAO)
+        ]
+        falhas = await asyncio.gather(*(_inserir_lote(lote) for lote in lotes))
+        for erros_lote in falhas:
+            erros.extend(erros_lote)
+        importados = len(validos) - sum(len(f) for f in falhas)
+        if importados:
+            invalidar_turmas({aluno.turma_id for _, aluno in validos})
+            obter_indice_busca().recarregar()  # Inserção sem representation: relê tudo
+
+    erros.sort(key=lambda e: e.linha)
+    return ImportacaoAlunosResponse(
+        total_linhas=len(registros),
+        validos=len(validos),
+        importados=importados,
+        simulacao=simular,
+        erros=erros,
+    )
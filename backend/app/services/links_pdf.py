@@ -0,0 +1,75 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Acesso aos PDFs dos relatórios
+Contexto: O armazenamento não é servido direto (a URL não diz a escola e
+          qualquer um com o caminho baixaria o PDF). A equipe baixa por
+          GET /relatorios/{id}/pdf, que confere a escola do aluno antes de
+          ler o arquivo. Os responsáveis recebem no envio um link assinado
+          (HMAC com secret_key, com prazo de validade) que abre sem
+          X-Escola-Id em GET /arquivos/relatorios/{id}.pdf
+Cuidado: Trocar secret_key invalida os links já enviados. O link vale para
+         o relatório, não para o arquivo: PDF regerado continua acessível
+Dependências: armazenamento, Settings (secret_key, pdf_link_validade_horas)
+"""
+
+import asyncio
+import hashlib
+import hmac
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+from app.services.armazenamento import obter_armazenamento
+
+ROTA_LINK_ASSINADO = "/api/v1/arquivos/relatorios/{relatorio_id}.pdf"  # api/endpoints/arquivos.py
+
+
+def _assinatura(relatorio_id: str, expira: int) -> str:
+    mensagem = f"pdf:{relatorio_id}:{expira}".encode()
+    return hmac.new(get_settings().secret_key.encode(), mensagem, hashlib.sha256).hexdigest()[:32]
+
+
+def link_assinado(relatorio_id: str, validade_horas: Optional[int] = None) -> str:
+    """Caminho (sem host) do PDF com expira/assinatura na query"""
+    horas = validade_horas or get_settings().pdf_link_validade_horas
+    expira = int(time.time()) + horas * 3600
+    caminho = ROTA_LINK_ASSINADO.format(relatorio_id=relatorio_id)
+    return f"{caminho}?expira={expira}&assinatura={_assinatura(str(relatorio_id), expira)}"
+
+
+def assinatura_valida(relatorio_id: str, expira: int, assinatura: str) -> bool:
+    if expira < time.time():
+        return False
+    return hmac.compare_digest(_assinatura(str(relatorio_id), expira), assinatura)
+
+
+async def obter_relatorio_pdf(relatorio_id: str) -> Optional[Dict[str, Any]]:
+    """Relatório com PDF gerado (None se não existe ou ainda não tem PDF)"""
+    resultado = await executar(
+        get_supabase().table("relatorios")
+        .select("id, aluno_id, trimestre, ano, pdf_url")
+        .eq("id", str(relatorio_id))
+    )
+    if not resultado.data or not resultado.data[0].get("pdf_url"):
+        return None
+    return resultado.data[0]
+
+
+async def ler_pdf(relatorio: Dict[str, Any]) -> Optional[bytes]:
+    """Bytes do PDF apontado por pdf_url (None se o arquivo sumiu)"""
+    armazenamento = obter_armazenamento()
+    chave = armazenamento.chave_da_url(relatorio.get("pdf_url"))
+    if chave is None:
+        return None
+    return await asyncio.to_thread(armazenamento.ler, chave)
+
+
+def resposta_pdf(relatorio: Dict[str, Any], dados: bytes) -> Response:
+    """PDF para abrir no navegador; cache só no cliente (conteúdo de um aluno)"""
+    nome = f"relatorio-{relatorio['ano']}-{relatorio['trimestre']}-{relatorio['id']}.pdf"
+    return Response(content=dados, media_type="application/pdf", headers={
+        "Content-Disposition": f'inline; filename="{nome}"',
+        "Cache-Control": "private, max-age=300",
+    })
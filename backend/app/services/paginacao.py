@@ -0,0 +1,68 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Paginação por cursor (keyset)
+Contexto: Substitui limit/offset em listas grandes; o custo de cada página
+          é constante porque o banco continua do último (valor, id) visto
+Cuidado: O cursor é opaco para o cliente; o formato interno pode mudar
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+
+def codificar_cursor(coluna: str, valor: Any, id_: Any) -> str:
+    """Gera cursor opaco a partir da chave de ordenação da última linha"""
+    dados = json.dumps({"c": coluna, "v": valor, "id": str(id_)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, coluna: str) -> Dict[str, Any]:
+    """
+    Lê o cursor e confere se pertence à mesma ordenação
+    Levanta HTTP 400 para cursor inválido
+    """
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+    if not isinstance(dados, dict) or dados.get("c") != coluna or "v" not in dados or "id" not in dados:
+        raise HTTPException(
+            status_code=400,
+            detail="Cursor não corresponde à ordenação solicitada"
+        )
+
+    return dados
+
+
+def _literal(valor: Any) -> str:
+    """Valor entre aspas para filtros lógicos do PostgREST (or/and)"""
+    texto = str(valor).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{texto}"'
+
+
+def filtro_keyset(coluna: str, valor: Any, id_: Any, desc: bool = False) -> str:
+    """
+    Monta o filtro `or` do PostgREST equivalente a (coluna, id) > (valor, id_)
+    Ex: nome.gt."Ana",and(nome.eq."Ana",id.gt."<uuid>")
+    """
+    operador = "lt" if desc else "gt"
+    return (
+        f"{coluna}.{operador}.{_literal(valor)},"
+        f"and({coluna}.eq.{_literal(valor)},id.{operador}.{_literal(id_)})"
+    )
+
+
+def proximo_cursor(linhas: list, limite: int, coluna: str) -> Optional[str]:
+    """
+    Retorna cursor da próxima página quando a consulta trouxe limite + 1 linhas
+    (a linha extra só indica que existe continuação e deve ser descartada)
+    """
+    if len(linhas) <= limite:
+        return None
+    ultima = linhas[limite - 1]
+    return codificar_cursor(coluna, ultima[coluna], ultima["id"])
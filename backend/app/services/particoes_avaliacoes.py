@@ -0,0 +1,65 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Partições anuais de avaliacoes e arquivamento
+Contexto: avaliacoes e avaliacao_tags são particionadas por ano, e quase
+          toda leitura é do ano corrente. O job (tarefa arquivar_avaliacoes)
+          mantém ativas as partições dos últimos avaliacoes_anos_ativos
+          anos, desanexa as mais antigas para o schema arquivo (sem DELETE)
+          e garante a partição do ano seguinte, para a virada de ano não
+          recusar avaliações
+Cuidado: Avaliações arquivadas saem das consolidações e do
+         reconstruir_agregados; agregados_trimestrais e relatórios desses
+         anos ficam como estão. Voltar um ano exige ATTACH PARTITION manual
+Dependências: Funções SQL criar_particoes_avaliacoes, anos_avaliacoes e
+              arquivar_avaliacoes (ver SQL_CREATE_TABLES)
+"""
+
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+
+
+async def anos_com_particao() -> List[int]:
+    """Anos com partição ativa em avaliacoes"""
+    resultado = await executar(get_supabase().rpc("anos_avaliacoes", {}))
+    return sorted(linha["ano"] for linha in resultado.data or [])
+
+
+async def garantir_particoes(ano: int) -> None:
+    """Cria as partições do ano em avaliacoes e avaliacao_tags (idempotente)"""
+    await executar(get_supabase().rpc("criar_particoes_avaliacoes", {"p_ano": ano}))
+
+
+async def arquivar_anos_encerrados(
+    anos_ativos: Optional[int] = None,
+    tablespace: Optional[str] = None,
+    progresso: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Arquiva os anos anteriores aos `anos_ativos` mais recentes (padrão:
+    settings.avaliacoes_anos_ativos) e cria a partição do ano seguinte
+    """
+    settings = get_settings()
+    anos_ativos = max(1, anos_ativos or settings.avaliacoes_anos_ativos)
+    tablespace = tablespace or settings.avaliacoes_tablespace_arquivo
+    ano_atual = date.today().year
+    supabase = get_supabase()
+
+    await garantir_particoes(ano_atual)
+    await garantir_particoes(ano_atual + 1)
+
+    encerrados = [ano for ano in await anos_com_particao() if ano <= ano_atual - anos_ativos]
+    arquivados = []
+    for n, ano in enumerate(encerrados, start=1):
+        resultado = await executar(supabase.rpc("arquivar_avaliacoes", {"p_ano": ano, "p_tablespace": tablespace}))
+        if resultado.data:
+            arquivados.append(resultado.data)
+        if progresso:
+            progresso(n, len(encerrados))
+
+    return {
+        "arquivados": arquivados,
+        "avaliacoes": sum(a["avaliacoes"] for a in arquivados),
+        "anos_ativos": await anos_com_particao(),
+    }
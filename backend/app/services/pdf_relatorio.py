@@ -0,0 +1,233 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - PDF do relatório trimestral (layout da marca)
+Contexto: Gera o PDF de um relatório aprovado: faixa com o nome da escola na
+          cor da marca, identificação do aluno, texto em parágrafos e rodapé
+          com a data de aprovação e a paginação. Escreve o PDF direto (fontes
+          padrão Helvetica, WinAnsiEncoding), sem biblioteca externa
+Cuidado: Roda dentro dos processos do pool (renderizacao_pdf): só biblioteca
+         padrão e entrada/saída picláveis. A saída é determinística (sem
+         data de criação), então o mesmo conteúdo gera os mesmos bytes.
+         Mudou o layout → incremente VERSAO_LAYOUT (o hash de conteúdo muda
+         e os PDFs são regerados)
+Dependências: Nenhuma
+"""
+
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+VERSAO_LAYOUT = "1"
+
+LARGURA_PAGINA, ALTURA_PAGINA = 595.28, 841.89  # A4 em pontos
+MARGEM = 56.0
+ALTURA_FAIXA = 78.0
+CORPO_TAMANHO, CORPO_ENTRELINHA = 11.0, 16.0
+RODAPE_Y = 32.0
+
+# Larguras (em 1/1000 do tamanho da fonte) dos caracteres 32..126 das fontes padrão
+_LARGURAS_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_LARGURAS_NEGRITO = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+_LARGURAS_EXTRAS = {"“": 333, "”": 333, "‘": 222, "’": 222, "–": 556, "—": 1000, "•": 350,
+                    "º": 365, "ª": 370, "·": 278, "…": 1000}
+
+
+@dataclass
+class DocumentoRelatorio:
+    """Tudo que aparece no PDF (o hash de conteúdo é calculado sobre estes campos)"""
+    escola: str
+    aluno: str
+    turma: str
+    professor: Optional[str]
+    trimestre: int
+    ano: int
+    texto: str
+    aprovado_em: Optional[str]  # dd/mm/aaaa
+    cor_marca: str = "#E8891C"
+
+
+def _largura(texto: str, tamanho: float, negrito: bool = False) -> float:
+    tabela = _LARGURAS_NEGRITO if negrito else _LARGURAS_HELVETICA
+    total = 0
+    for caractere in texto:
+        codigo = ord(caractere)
+        if 32 <= codigo <= 126:
+            total += tabela[codigo - 32]
+        elif caractere in _LARGURAS_EXTRAS:
+            total += _LARGURAS_EXTRAS[caractere]
+        else:
+            base = unicodedata.normalize("NFD", caractere)[0]  # "ã" mede como "a"
+            total += tabela[ord(base) - 32] if 32 <= ord(base) <= 126 else 556
+    return total * tamanho / 1000
+
+
+def _quebrar(texto: str, largura: float, tamanho: float) -> List[str]:
+    """Quebra um parágrafo em linhas que cabem na largura (palavra longa demais fica sozinha)"""
+    linhas, atual = [], ""
+    for palavra in texto.split():
+        candidata = f"{atual} {palavra}" if atual else palavra
+        if atual and _largura(candidata, tamanho) > largura:
+            linhas.append(atual)
+            atual = palavra
+        else:
+            atual = candidata
+    if atual:
+        linhas.append(atual)
+    return linhas
+
+
+def _literal(texto: str) -> str:
+    """String PDF em WinAnsi (caracteres fora dela viram '?')"""
+    bruto = texto.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + bruto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _cor(hexadecimal: str) -> Tuple[float, float, float]:
+    valor = hexadecimal.lstrip("#")
+    try:
+        return tuple(int(valor[i:i + 2], 16) / 255 for i in (0, 2, 4))
+    except ValueError:
+        return (0.91, 0.54, 0.11)
+
+
+def _texto(x: float, y: float, conteudo: str, tamanho: float, negrito: bool = False) -> str:
+    fonte = "/F2" if negrito else "/F1"
+    return f"BT {fonte} {tamanho:g} Tf {x:.2f} {y:.2f} Td {_literal(conteudo)} Tj ET"
+
+
+def _paginar(documento: DocumentoRelatorio) -> List[List[str]]:
+    """Linhas do corpo distribuídas pelas páginas (a primeira tem o cabeçalho completo)"""
+    largura = LARGURA_PAGINA - 2 * MARGEM
+    topo_primeira = ALTURA_PAGINA - ALTURA_FAIXA - 104
+    topo_demais = ALTURA_PAGINA - MARGEM - 24
+    base = MARGEM + 12
+
+    paginas: List[List[str]] = [[]]
+    y = topo_primeira
+    for paragrafo in [p.strip() for p in documento.texto.split("\n\n") if p.strip()]:
+        for linha in _quebrar(" ".join(paragrafo.split()), largura, CORPO_TAMANHO):
+            if y < base:
+                paginas.append([])
+                y = topo_demais
+            paginas[-1].append(linha)
+            y -= CORPO_ENTRELINHA
+        paginas[-1].append("")  # Espaço entre parágrafos
+        y -= CORPO_ENTRELINHA * 0.6
+    return paginas
+
+
+def _conteudo_pagina(documento: DocumentoRelatorio, linhas: List[str], numero: int, total: int) -> str:
+    r, g, b = _cor(documento.cor_marca)
+    largura_util = LARGURA_PAGINA - 2 * MARGEM
+    comandos = []
+    if numero == 1:
+        faixa_y = ALTURA_PAGINA - ALTURA_FAIXA
+        comandos += [
+            f"{r:.3f} {g:.3f} {b:.3f} rg 0 {faixa_y:.2f} {LARGURA_PAGINA:.2f} {ALTURA_FAIXA:.2f} re f",
+            "1 1 1 rg",
+            _texto(MARGEM, faixa_y + 44, documento.escola, 18, negrito=True),
+            _texto(MARGEM, faixa_y + 22, f"Relatório do {documento.trimestre}º trimestre de {documento.ano}", 11),
+            "0.15 0.15 0.15 rg",
+            _texto(MARGEM, faixa_y - 36, documento.aluno, 14, negrito=True),
+        ]
+        turma = f"Turma: {documento.turma}"
+        if documento.professor:
+            turma += f"  ·  Professor(a): {documento.professor}"
+        comandos += [
+            "0.4 0.4 0.4 rg",
+            _texto(MARGEM, faixa_y - 54, turma, 10),
+            f"{r:.3f} {g:.3f} {b:.3f} RG 1.2 w {MARGEM:.2f} {faixa_y - 70:.2f} m "
+            f"{LARGURA_PAGINA - MARGEM:.2f} {faixa_y - 70:.2f} l S",
+        ]
+        y = ALTURA_PAGINA - ALTURA_FAIXA - 104
+    else:
+        comandos += [
+            f"{r:.3f} {g:.3f} {b:.3f} rg",
+            _texto(MARGEM, ALTURA_PAGINA - MARGEM, f"{documento.escola} · {documento.aluno}", 9, negrito=True),
+        ]
+        y = ALTURA_PAGINA - MARGEM - 24
+
+    comandos.append("0.1 0.1 0.1 rg")
+    for linha in linhas:
+        if linha:
+            comandos.append(_texto(MARGEM, y, linha, CORPO_TAMANHO))
+            y -= CORPO_ENTRELINHA
+        else:
+            y -= CORPO_ENTRELINHA * 0.6
+
+    rodape = f"Aprovado em {documento.aprovado_em}" if documento.aprovado_em else ""
+    paginacao = f"Página {numero} de {total}"
+    comandos += [
+        f"0.8 0.8 0.8 RG 0.5 w {MARGEM:.2f} {RODAPE_Y + 14:.2f} m {LARGURA_PAGINA - MARGEM:.2f} {RODAPE_Y + 14:.2f} l S",
+        "0.45 0.45 0.45 rg",
+        _texto(MARGEM, RODAPE_Y, rodape, 8),
+        _texto(MARGEM + largura_util - _largura(paginacao, 8), RODAPE_Y, paginacao, 8),
+    ]
+    return "\n".join(comandos)
+
+
+def renderizar_pdf(documento: DocumentoRelatorio) -> bytes:
+    """Bytes do PDF (A4, uma ou mais páginas)"""
+    paginas = _paginar(documento)
+    total = len(paginas)
+
+    # Objetos: 1 catálogo, 2 árvore de páginas, 3-4 fontes, 5 info, depois (página, conteúdo) por página
+    objetos: List[bytes] = [b"", b""]
+    for base in ("Helvetica", "Helvetica-Bold"):
+        objetos.append(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>".encode())
+    titulo = _literal(f"Relatório {documento.trimestre}º trimestre {documento.ano} - {documento.aluno}")
+    objetos.append(f"<< /Title {titulo} /Producer (Colegio Solare) >>".encode("latin-1"))
+    filhos = []
+    for numero, linhas in enumerate(paginas, 1):
+        pagina_id = len(objetos) + 1
+        filhos.append(f"{pagina_id} 0 R")
+        fluxo = zlib.compress(_conteudo_pagina(documento, linhas, numero, total).encode("latin-1"))
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {LARGURA_PAGINA} {ALTURA_PAGINA}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {pagina_id + 1} 0 R >>".encode()
+        )
+        objetos.append(
+            f"<< /Length {len(fluxo)} /Filter /FlateDecode >>\nstream\n".encode() + fluxo + b"\nendstream"
+        )
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(filhos)}] /Count {total} >>".encode()
+
+    saida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posicoes = []
+    for indice, objeto in enumerate(objetos, 1):
+        posicoes.append(len(saida))
+        saida += f"{indice} 0 obj\n".encode() + objeto + b"\nendobj\n"
+    inicio_xref = len(saida)
+    saida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    for posicao in posicoes:
+        saida += f"{posicao:010d} 00000 n \n".encode()
+    saida += (
+        f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R /Info 5 0 R >>\n"
+        f"startxref\n{inicio_xref}\n%%EOF\n"
+    ).encode()
+    return bytes(saida)
+
+
+def renderizar_lote(documentos: List[DocumentoRelatorio]) -> List[Tuple[Optional[bytes], Optional[str]]]:
+    """Executado no processo do pool: (pdf, None) ou (None, erro) por documento, na mesma ordem"""
+    resultados = []
+    for documento in documentos:
+        try:
+            resultados.append((renderizar_pdf(documento), None))
+        except Exception as e:
+            resultados.append((None, str(e)))
+    return resultados
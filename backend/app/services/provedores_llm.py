@@ -0,0 +1,456 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Provedores de LLM com limites de taxa
+Contexto: Toda chamada a modelo de linguagem passa por aqui: um limitador
+          por provedor (chamadas simultâneas + tokens por minuto) e
+          retentativas com backoff exponencial nos erros transitórios
+Cuidado: Os limitadores são compartilhados pelo processo inteiro; os valores
+         vêm de Settings (llm_concorrencia_* e llm_tpm_*)
+Dependências: langchain-openai / langchain-anthropic / langchain-google-genai
+              (importados apenas quando o provedor é usado)
+"""
+
+import asyncio
+import hashlib
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+
+import httpx
+
+from app.config import get_settings
+
+PROVEDORES = ("openai", "anthropic", "google", "local")
+
+FRACAO_PRIMEIRO_TRECHO = 0.1  # ProvedorLocal: parte da latência até o primeiro trecho
+
+# Status HTTP que valem nova tentativa (limite, sobrecarga, falha temporária)
+STATUS_TRANSITORIOS = {408, 409, 429, 500, 502, 503, 504, 529}
+ERROS_TRANSITORIOS = ("RateLimit", "Timeout", "APIConnection", "Overloaded",
+                      "ResourceExhausted", "ServiceUnavailable", "InternalServerError")
+
+
+class ErroProvedorLLM(Exception):
+    """Falha de chamada ao provedor; `transitorio` indica se vale tentar de novo"""
+
+    def __init__(self, mensagem: str, transitorio: bool = False,
+                 espera_sugerida: Optional[float] = None):
+        super().__init__(mensagem)
+        self.transitorio = transitorio
+        self.espera_sugerida = espera_sugerida
+
+
+@dataclass
+class RequisicaoLLM:
+    """`sistema` é o prefixo estável (cacheável); `usuario`, a parte variável"""
+    sistema: str
+    usuario: str
+    modelo: str
+    temperatura: float
+    max_tokens: int
+    cachear_prefixo: bool = True
+
+    def tokens_estimados(self) -> int:
+        """Estimativa para reservar TPM antes da chamada (~4 caracteres por token)"""
+        return (len(self.sistema) + len(self.usuario)) // 4 + self.max_tokens
+
+
+@dataclass
+class RespostaLLM:
+    texto: str
+    provedor: str
+    modelo: str
+    tokens_prompt: int = 0
+    tokens_cache: int = 0  # Parte de tokens_prompt lida do cache de prompt do provedor
+    tokens_resposta: int = 0
+    tentativas: int = 1
+    do_cache: bool = False  # Texto reaproveitado do cache (sem chamada ao provedor)
+
+    @property
+    def tokens_total(self) -> int:
+        return self.tokens_prompt + self.tokens_resposta
+
+
+# ========== LIMITADOR POR PROVEDOR ==========
+
+class LimitadorProvedor:
+    """
+    Semáforo de chamadas simultâneas + balde de tokens por minuto
+
+    O balde é reabastecido continuamente (tpm / 60 por segundo). Cada chamada
+    reserva a estimativa antes de sair e devolve a diferença para o uso real.
+    """
+
+    def __init__(self, concorrencia: int, tokens_por_minuto: int):
+        self.concorrencia = concorrencia
+        self.capacidade = float(tokens_por_minuto)
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._fila_tokens = asyncio.Lock()  # Atende as reservas por ordem de chegada
+        self._disponivel = self.capacidade
+        self._atualizado = time.monotonic()
+
+    def _repor(self) -> None:
+        agora = time.monotonic()
+        self._disponivel = min(
+            self.capacidade,
+            self._disponivel + (agora - self._atualizado) * self.capacidade / 60
+        )
+        self._atualizado = agora
+
+    async def _reservar(self, tokens: int) -> float:
+        tokens = min(float(tokens), self.capacidade)
+        async with self._fila_tokens:
+            self._repor()
+            while self._disponivel < tokens:
+                await asyncio.sleep((tokens - self._disponivel) * 60 / self.capacidade)
+                self._repor()
+            self._disponivel -= tokens
+        return tokens
+
+    def _devolver(self, reservado: float, usado: int) -> None:
+        self._repor()
+        self._disponivel = min(self.capacidade, self._disponivel + reservado - usado)
+
+    @asynccontextmanager
+    async def reservar(self, tokens_estimados: int):
+        """
+        Uso: `async with limitador.reservar(n) as uso: ...; uso["tokens"] = real`
+        """
+        async with self._semaforo:
+            reservado = await self._reservar(tokens_estimados)
+            uso = {"tokens": reservado}
+            try:
+                yield uso
+            finally:
+                self._devolver(reservado, uso["tokens"])
+
+
+_limitadores: Dict[str, Tuple[asyncio.AbstractEventLoop, LimitadorProvedor]] = {}
+
+
+def obter_limitador(provedor: str) -> LimitadorProvedor:
+    """Limitador único por provedor (recriado se o event loop mudar, ex: testes)"""
+    loop = asyncio.get_running_loop()
+    atual = _limitadores.get(provedor)
+    if atual is None or atual[0] is not loop:
+        settings = get_settings()
+        limitador = LimitadorProvedor(
+            getattr(settings, f"llm_concorrencia_{provedor}"),
+            getattr(settings, f"llm_tpm_{provedor}"),
+        )
+        _limitadores[provedor] = (loop, limitador)
+        return limitador
+    return atual[1]
+
+
+# ========== PROVEDORES ==========
+
+def _classificar_erro(erro: Exception) -> ErroProvedorLLM:
+    """Converte exceções dos SDKs em ErroProvedorLLM (transitório ou não)"""
+    if isinstance(erro, ErroProvedorLLM):
+        return erro
+    resposta = getattr(erro, "response", None)
+    status = getattr(erro, "status_code", None) or getattr(resposta, "status_code", None)
+    nome = type(erro).__name__
+    transitorio = (
+        status in STATUS_TRANSITORIOS
+        or isinstance(erro, (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError))
+        or any(trecho in nome for trecho in ERROS_TRANSITORIOS)
+    )
+    espera = None
+    cabecalhos = getattr(resposta, "headers", None)
+    if cabecalhos is not None:
+        try:
+            espera = float(cabecalhos.get("retry-after"))
+        except (TypeError, ValueError):
+            espera = None
+    return ErroProvedorLLM(f"{nome}: {erro}", transitorio=transitorio, espera_sugerida=espera)
+
+
+class ProvedorLLM:
+    """Interface comum: `gerar` recebe a requisição e devolve texto + uso de tokens"""
+
+    nome: str = ""
+
+    async def gerar(self, requisicao: RequisicaoLLM) -> RespostaLLM:
+        raise NotImplementedError
+
+    async def transmitir(self, requisicao: RequisicaoLLM) -> AsyncIterator[Union[str, RespostaLLM]]:
+        """Trechos do texto conforme chegam; o último item é a RespostaLLM completa"""
+        resposta = await self.gerar(requisicao)
+        yield resposta.texto
+        yield resposta
+
+
+def _conteudo_texto(conteudo: Any) -> str:
+    """Conteúdo de mensagem do LangChain (texto ou lista de blocos) como texto"""
+    if isinstance(conteudo, str):
+        return conteudo
+    return "".join(
+        bloco.get("text", "") if isinstance(bloco, dict) else str(bloco)
+        for bloco in conteudo or []
+    )
+
+
+class ProvedorLangChain(ProvedorLLM):
+    """OpenAI, Anthropic e Google via modelos de chat do LangChain"""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self._modelos: Dict[Tuple[str, float, int], Any] = {}
+
+    def _criar_modelo(self, modelo: str, temperatura: float, max_tokens: int):
+        settings = get_settings()
+        # Retentativas ficam por conta de gerar_texto (respeitando o limitador)
+        if self.nome == "openai":
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(model=modelo, temperature=temperatura, max_tokens=max_tokens,
+                              api_key=settings.openai_api_key, max_retries=0, stream_usage=True)
+        if self.nome == "anthropic":
+            from langchain_anthropic import ChatAnthropic
+            return ChatAnthropic(model=modelo, temperature=temperatura, max_tokens=max_tokens,
+                                 api_key=settings.anthropic_api_key, max_retries=0)
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model=modelo, temperature=temperatura, max_output_tokens=max_tokens,
+                                      google_api_key=settings.google_api_key, max_retries=0)
+
+    def _modelo(self, requisicao: RequisicaoLLM):
+        chave = (requisicao.modelo, requisicao.temperatura, requisicao.max_tokens)
+        if chave not in self._modelos:
+            self._modelos[chave] = self._criar_modelo(*chave)
+        return self._modelos[chave]
+
+    def _mensagem_sistema(self, requisicao: RequisicaoLLM):
+        """
+        Prefixo estável como mensagem de sistema. OpenAI e Gemini reaproveitam
+        prefixos repetidos sozinhos; a Anthropic só com cache_control no bloco
+        """
+        from langchain_core.messages import SystemMessage
+
+        if self.nome == "anthropic" and requisicao.cachear_prefixo:
+            return SystemMessage(content=[{
+                "type": "text",
+                "text": requisicao.sistema,
+                "cache_control": {"type": "ephemeral"},
+            }])
+        return SystemMessage(content=requisicao.sistema)
+
+    def _mensagens(self, requisicao: RequisicaoLLM):
+        from langchain_core.messages import HumanMessage
+
+        return [self._mensagem_sistema(requisicao), HumanMessage(content=requisicao.usuario)]
+
+    async def gerar(self, requisicao: RequisicaoLLM) -> RespostaLLM:
+        resposta = await self._modelo(requisicao).ainvoke(self._mensagens(requisicao))
+        return self._resposta(resposta, requisicao)
+
+    async def transmitir(self, requisicao: RequisicaoLLM) -> AsyncIterator[Union[str, RespostaLLM]]:
+        acumulado = None  # Soma dos chunks: o uso de tokens chega no último
+        async for trecho in self._modelo(requisicao).astream(self._mensagens(requisicao)):
+            acumulado = trecho if acumulado is None else acumulado + trecho
+            texto = _conteudo_texto(trecho.content)
+            if texto:
+                yield texto
+        if acumulado is None:
+            raise ErroProvedorLLM("Resposta vazia do provedor", transitorio=True)
+        yield self._resposta(acumulado, requisicao)
+
+    def _resposta(self, mensagem, requisicao: RequisicaoLLM) -> RespostaLLM:
+        uso = getattr(mensagem, "usage_metadata", None) or {}
+        detalhes = uso.get("input_token_details") or {}
+        return RespostaLLM(
+            texto=_conteudo_texto(mensagem.content),
+            provedor=self.nome,
+            modelo=requisicao.modelo,
+            tokens_prompt=uso.get("input_tokens", 0),
+            tokens_cache=detalhes.get("cache_read") or 0,
+            tokens_resposta=uso.get("output_tokens", 0),
+        )
+
+
+class ProvedorLocal(ProvedorLLM):
+    """
+    Provedor simulado: latência configurável, falhas 429 opcionais e texto
+    determinístico derivado do prompt. Não faz chamadas externas. Simula o
+    cache de prompt: um prefixo já visto conta como tokens em cache.
+
+    Para testar roteamento, pode se passar por outro provedor (`nome`) e ter
+    cauda de latência: com probabilidade `lentidao_prob` a chamada demora
+    `lentidao_fator` vezes mais.
+    """
+
+    def __init__(self, latencia_ms: float = 0.0, taxa_erro: float = 0.0, seed: Optional[int] = None,
+                 nome: str = "local", lentidao_prob: float = 0.0, lentidao_fator: float = 10.0):
+        self.nome = nome
+        self.latencia_ms = latencia_ms
+        self.taxa_erro = taxa_erro
+        self.lentidao_prob = lentidao_prob
+        self.lentidao_fator = lentidao_fator
+        self._rng = random.Random(seed)
+        self._prefixos_vistos: set = set()
+
+    def _latencia(self) -> float:
+        if not self.latencia_ms:
+            return 0.0
+        latencia = self.latencia_ms / 1000 * self._rng.uniform(0.7, 1.3)
+        if self._rng.random() < self.lentidao_prob:
+            latencia *= self.lentidao_fator
+        return latencia
+
+    def _talvez_falhar(self) -> None:
+        if self._rng.random() < self.taxa_erro:
+            raise ErroProvedorLLM("Limite de taxa simulado (429)", transitorio=True)
+
+    async def gerar(self, requisicao: RequisicaoLLM) -> RespostaLLM:
+        latencia = self._latencia()
+        if latencia:
+            await asyncio.sleep(latencia)
+        self._talvez_falhar()
+        return self._responder(requisicao)
+
+    async def transmitir(self, requisicao: RequisicaoLLM) -> AsyncIterator[Union[str, RespostaLLM]]:
+        """Primeiro trecho após FRACAO_PRIMEIRO_TRECHO da latência; o resto se espalha até o fim"""
+        latencia = self._latencia()
+        await asyncio.sleep(latencia * FRACAO_PRIMEIRO_TRECHO)
+        self._talvez_falhar()
+        resposta = self._responder(requisicao)
+        palavras = resposta.texto.split(" ")
+        trechos = [" ".join(palavras[i:i + 4]) for i in range(0, len(palavras), 4)]
+        intervalo = latencia * (1 - FRACAO_PRIMEIRO_TRECHO) / max(1, len(trechos) - 1)
+        for i, trecho in enumerate(trechos):
+            if i:
+                await asyncio.sleep(intervalo)
+            yield trecho if i == len(trechos) - 1 else trecho + " "
+        yield resposta
+
+    def _responder(self, requisicao: RequisicaoLLM) -> RespostaLLM:
+        resumo = hashlib.sha256(f"{requisicao.sistema}\n{requisicao.usuario}".encode()).hexdigest()[:8]
+        linhas = [linha.strip() for linha in requisicao.usuario.splitlines() if linha.strip()]
+        texto = (
+            f"[Rascunho simulado {resumo}] "
+            + " ".join(linhas)[: requisicao.max_tokens * 4]
+        )
+        prefixo = hashlib.sha256(requisicao.sistema.encode()).hexdigest()
+        em_cache = requisicao.cachear_prefixo and prefixo in self._prefixos_vistos
+        if requisicao.cachear_prefixo:
+            self._prefixos_vistos.add(prefixo)
+        return RespostaLLM(
+            texto=texto,
+            provedor=self.nome,
+            modelo=requisicao.modelo,
+            tokens_prompt=(len(requisicao.sistema) + len(requisicao.usuario)) // 4,
+            tokens_cache=len(requisicao.sistema) // 4 if em_cache else 0,
+            tokens_resposta=len(texto) // 4,
+        )
+
+
+_provedores: Dict[str, ProvedorLLM] = {}
+
+
+def registrar_provedor(provedor: ProvedorLLM) -> None:
+    """Substitui a instância de um provedor (ex: ProvedorLocal fazendo papel de openai em testes)"""
+    _provedores[provedor.nome] = provedor
+
+
+def provedor_configurado(nome: str) -> bool:
+    """Tem chave de API (ou instância registrada); o local só entra se registrado"""
+    if nome in _provedores:
+        return True
+    if nome == "local":
+        return False
+    return bool(getattr(get_settings(), f"{nome}_api_key"))
+
+
+def obter_provedor(nome: str) -> ProvedorLLM:
+    """Instância única por provedor"""
+    if nome not in PROVEDORES:
+        raise ValueError(f"Provedor de LLM desconhecido: {nome}")
+    if nome not in _provedores:
+        settings = get_settings()
+        if nome == "local":
+            _provedores[nome] = ProvedorLocal(settings.llm_local_latencia_ms, settings.llm_local_taxa_erro)
+        else:
+            _provedores[nome] = ProvedorLangChain(nome)
+    return _provedores[nome]
+
+
+async def gerar_texto(
+    provedor: ProvedorLLM, requisicao: RequisicaoLLM, max_tentativas: Optional[int] = None
+) -> RespostaLLM:
+    """
+    Chama o provedor respeitando seu limitador, com retentativas
+
+    Erros transitórios (429, 5xx, timeout) esperam `retry-after` quando o
+    provedor informa, senão backoff exponencial com jitter
+    (base * 2^tentativa * U[0.5, 1)). Erros definitivos sobem na hora.
+    `max_tentativas` padrão: llm_max_tentativas.
+    """
+    settings = get_settings()
+    limitador = obter_limitador(provedor.nome)
+    max_tentativas = max_tentativas or settings.llm_max_tentativas
+
+    for tentativa in range(1, max_tentativas + 1):
+        try:
+            async with limitador.reservar(requisicao.tokens_estimados()) as uso:
+                resposta = await asyncio.wait_for(provedor.gerar(requisicao), settings.llm_timeout_segundos)
+                uso["tokens"] = resposta.tokens_total or uso["tokens"]
+            resposta.tentativas = tentativa
+            return resposta
+        except Exception as e:
+            erro = _classificar_erro(e)
+            if not erro.transitorio or tentativa == max_tentativas:
+                raise erro from e
+            espera = erro.espera_sugerida
+            if espera is None:
+                espera = settings.llm_backoff_segundos * 2 ** (tentativa - 1) * random.uniform(0.5, 1.0)
+            await asyncio.sleep(espera)
+
+
+async def transmitir_texto(
+    provedor: ProvedorLLM, requisicao: RequisicaoLLM, max_tentativas: Optional[int] = None
+) -> AsyncIterator[Union[str, RespostaLLM]]:
+    """
+    Versão em fluxo de gerar_texto: trechos do texto e, por último, a RespostaLLM
+
+    Só há nova tentativa enquanto nenhum trecho foi entregue; depois disso o
+    erro sobe (o texto parcial já saiu). `llm_timeout_segundos` vale entre
+    trechos, não para a resposta inteira.
+    """
+    settings = get_settings()
+    limitador = obter_limitador(provedor.nome)
+    max_tentativas = max_tentativas or settings.llm_max_tentativas
+
+    for tentativa in range(1, max_tentativas + 1):
+        emitido = False
+        try:
+            async with limitador.reservar(requisicao.tokens_estimados()) as uso:
+                resposta = None
+                fluxo = provedor.transmitir(requisicao)
+                try:
+                    while True:
+                        try:
+                            item = await asyncio.wait_for(fluxo.__anext__(), settings.llm_timeout_segundos)
+                        except StopAsyncIteration:
+                            break
+                        if isinstance(item, RespostaLLM):
+                            resposta = item
+                            uso["tokens"] = resposta.tokens_total or uso["tokens"]
+                        else:
+                            emitido = True
+                            yield item
+                finally:
+                    await fluxo.aclose()
+            if resposta is None:
+                raise ErroProvedorLLM("Fluxo encerrado sem resposta final", transitorio=True)
+            resposta.tentativas = tentativa
+            yield resposta
+            return
+        except Exception as e:
+            erro = _classificar_erro(e)
+            if emitido or not erro.transitorio or tentativa == max_tentativas:
+                raise erro from e
+            espera = erro.espera_sugerida
+            if espera is None:
+                espera = settings.llm_backoff_segundos * 2 ** (tentativa - 1) * random.uniform(0.5, 1.0)
+            await asyncio.sleep(espera)
@@ -0,0 +1,163 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Rascunho determinístico a partir de modelos de texto
+Contexto: A maioria dos alunos tem dados parecidos (autonomia na maior parte
+          das áreas, poucas intervenções). Para eles o rascunho sai de regras
+          e frases prontas em microssegundos, sem LLM. O LLM fica para os
+          dados incomuns (limites em Settings: rascunho_*) ou para refinar
+          este texto (modo "refinar")
+Cuidado: Segue as mesmas regras do prompt (INSTRUCOES_TOM): tom acolhedor,
+         sem notas numéricas, intervenção sempre com sugestão para casa, sem
+         inventar fatos. Frases neutras em gênero (o sistema não sabe o
+         gênero do aluno); tags entram entre aspas, como cadastradas
+Dependências: Nenhuma (dados_consolidados de consolidacao/agregados)
+"""
+
+import hashlib
+from typing import Any, Dict, List
+
+from app.config import get_settings
+
+MAX_TAGS_TEXTO = 3
+
+# Sugestão de apoio em casa por área ({nome} = primeiro nome do aluno)
+SUGESTOES_CASA = {
+    "Português": "ler junto com {nome} alguns minutos por dia e conversar sobre a história",
+    "Matemática": "propor pequenos desafios de contagem e cálculo no dia a dia, como nas compras ou na cozinha",
+    "História": "conversar sobre a história da família e visitar museus e espaços culturais",
+    "Geografia": "explorar mapas e observar juntos o bairro e os caminhos do dia a dia",
+    "Ciências": "fazer pequenas experiências e observar a natureza, incentivando perguntas",
+    "Artes": "oferecer materiais para desenhar, pintar e criar livremente",
+    "Educação Física": "incentivar brincadeiras ao ar livre e atividades físicas em família",
+    "Música": "ouvir e cantar músicas juntos, explorando ritmos e sons",
+    "Inglês": "assistir a desenhos e ouvir músicas em inglês, repetindo as palavras novas",
+    "Eu no Mundo": "conversar sobre sentimentos, convivência e cuidado com o outro",
+    "Integração e Adaptação": "manter uma rotina previsível e conversar com carinho sobre o dia na escola",
+    "Socioemocional": "nomear as emoções junto com {nome} e valorizar atitudes de cuidado e partilha",
+    "Linguagem": "contar histórias, cantar e conversar bastante, ampliando o vocabulário",
+    "Cognição": "propor quebra-cabeças e jogos de encaixe e de memória",
+    "Motricidade Fina": "oferecer massinha, recortes e atividades de encaixe e de pinça",
+}
+SUGESTAO_PADRAO = "retomar em casa, com calma e incentivo, as atividades propostas em sala"
+
+ABERTURAS_AUTONOMIA = (
+    "{nome} concluiu o {trimestre}º trimestre demonstrando muita autonomia nas atividades propostas.",
+    "Foi muito bom acompanhar {nome} neste {trimestre}º trimestre, com conquistas importantes e muita autonomia.",
+    "{nome} viveu um {trimestre}º trimestre de bons avanços, realizando com segurança a maior parte das atividades.",
+)
+ABERTURAS_MISTAS = (
+    "{nome} seguiu construindo novas aprendizagens ao longo do {trimestre}º trimestre.",
+    "Neste {trimestre}º trimestre, {nome} teve um percurso de descobertas e de muitos aprendizados.",
+    "Ao longo do {trimestre}º trimestre, {nome} se dedicou às atividades e conquistou novos aprendizados.",
+)
+FECHAMENTOS = (
+    "Seguimos juntos, escola e família, para que o próximo trimestre seja ainda mais rico em descobertas!",
+    "Contamos com a parceria da família para que {nome} continue crescendo com alegria no próximo trimestre!",
+    "Temos certeza de que {nome} tem muito a conquistar no próximo trimestre, e estaremos juntos nessa caminhada!",
+)
+
+
+def _lista(itens: List[str]) -> str:
+    """'a', 'a e b', 'a, b e c'"""
+    if len(itens) <= 1:
+        return "".join(itens)
+    return ", ".join(itens[:-1]) + " e " + itens[-1]
+
+
+def _escolher(opcoes: tuple, semente: str) -> str:
+    """Variação estável por aluno (o mesmo aluno sempre recebe a mesma frase)"""
+    indice = int(hashlib.md5(semente.encode("utf-8")).hexdigest()[:8], 16) % len(opcoes)
+    return opcoes[indice]
+
+
+def motivos_incomuns(dados: Dict[str, Any]) -> List[str]:
+    """Por que estes dados pedem o LLM (lista vazia = o modelo de texto resolve)"""
+    settings = get_settings()
+    categorias = dados.get("categorias") or {}
+    motivos = []
+    if not categorias:
+        motivos.append("nenhuma área avaliada")
+    if (dados.get("dias_avaliados") or 0) < settings.rascunho_min_dias:
+        motivos.append(f"menos de {settings.rascunho_min_dias} dias avaliados")
+    intervencao = sum(1 for info in categorias.values() if info["predominante"] == 3)
+    if intervencao > settings.rascunho_max_intervencao:
+        motivos.append(f"{intervencao} áreas precisando de intervenção")
+    regressoes = sum(1 for info in categorias.values() if info.get("tendencia") == "regredindo")
+    if regressoes > settings.rascunho_max_regressoes:
+        motivos.append(f"{regressoes} áreas regredindo")
+    tags = dados.get("tags") or []
+    total_tags = sum(tag["ocorrencias"] for tag in tags)
+    negativas = sum(tag["ocorrencias"] for tag in tags if tag.get("tipo") == "negativa")
+    if total_tags and negativas / total_tags > settings.rascunho_max_fracao_tags_negativas:
+        motivos.append("predominância de comportamentos negativos")
+    if len(dados.get("observacoes") or []) > settings.rascunho_max_observacoes:
+        motivos.append("muitas observações livres do professor")
+    return motivos
+
+
+def redigir_rascunho(nome: str, dados: Dict[str, Any]) -> str:
+    """Rascunho completo (3 a 4 parágrafos) a partir de dados_consolidados"""
+    primeiro_nome = (nome or "").split(" ")[0] or "O aluno"
+    categorias = dados.get("categorias") or {}
+    trimestre = dados.get("trimestre")
+
+    autonomia = [c for c, info in categorias.items() if info["predominante"] == 1]
+    desenvolvimento = [c for c, info in categorias.items() if info["predominante"] == 2]
+    intervencao = [c for c, info in categorias.items() if info["predominante"] == 3]
+    melhorando = [c for c, info in categorias.items() if info.get("tendencia") == "melhorando"]
+    regredindo = [c for c, info in categorias.items() if info.get("tendencia") == "regredindo"]
+    tags = dados.get("tags") or []
+    positivas = [t["nome"] for t in tags if t.get("tipo") == "positiva" and t.get("nome")][:MAX_TAGS_TEXTO]
+    negativas = [t["nome"] for t in tags if t.get("tipo") == "negativa" and t.get("nome")][:MAX_TAGS_TEXTO]
+
+    # 1º parágrafo: abertura + o que já realiza com autonomia + avanços
+    aberturas = ABERTURAS_AUTONOMIA if len(autonomia) * 2 >= len(categorias) else ABERTURAS_MISTAS
+    frases = [_escolher(aberturas, nome).format(nome=primeiro_nome, trimestre=trimestre)]
+    if autonomia:
+        frases.append(f"Já realiza com autonomia as atividades de {_lista(autonomia)}.")
+    if melhorando:
+        frases.append(f"Merecem destaque os avanços ao longo do trimestre em {_lista(melhorando)}.")
+    paragrafos = [" ".join(frases)]
+
+    # 2º parágrafo: comportamentos observados + próximos passos
+    frases = []
+    if positivas:
+        aspas = [f"“{tag}”" for tag in positivas]
+        verbo = "estão" if len(aspas) > 1 else "está"
+        frases.append(f"Entre os comportamentos observados com mais frequência {verbo} {_lista(aspas)}.")
+    if desenvolvimento:
+        frases.append(
+            f"Em {_lista(desenvolvimento)}, {primeiro_nome} está em pleno desenvolvimento, e o próximo passo é "
+            "ganhar mais segurança e autonomia nessas atividades."
+        )
+    oscilacoes = [c for c in regredindo if c not in intervencao]
+    if oscilacoes:
+        frases.append(
+            f"Em {_lista(oscilacoes)}, percebemos oscilações na reta final do trimestre e vamos acompanhar "
+            "de perto para retomar o ritmo."
+        )
+    if frases:
+        paragrafos.append(" ".join(frases))
+
+    # 3º parágrafo: intervenção, sempre com sugestão concreta para casa
+    if intervencao or negativas:
+        frases = []
+        if intervencao:
+            sugestoes = []
+            for categoria in intervencao:
+                sugestao = SUGESTOES_CASA.get(categoria, SUGESTAO_PADRAO).format(nome=primeiro_nome)
+                if sugestao not in sugestoes:
+                    sugestoes.append(sugestao)
+            frases.append(
+                f"{primeiro_nome} precisa de um apoio mais próximo em {_lista(intervencao)}, e já estamos "
+                "trabalhando com estratégias específicas em sala."
+            )
+            frases.append(f"Em casa, ajuda muito {_lista(sugestoes)}.")
+        if negativas:
+            aspas = [f"“{tag}”" for tag in negativas]
+            frases.append(
+                f"Também estamos atentos a {_lista(aspas)}, com combinados claros e muito acolhimento."
+            )
+        paragrafos.append(" ".join(frases))
+
+    paragrafos.append(_escolher(FECHAMENTOS, nome + "|fim").format(nome=primeiro_nome))
+    return "\n\n".join(paragrafos)
@@ -0,0 +1,267 @@
+"""
+🚨 ÂNCORA: CRÍTICO - PDFs dos relatórios aprovados em lote (turma ou escola)
+Contexto: Busca os relatórios aprovados, monta o DocumentoRelatorio de cada
+          um e renderiza em um pool de processos (um por núcleo: o PDF é
+          trabalho de CPU e não pode disputar o GIL com a API). Os bytes vão
+          para o armazenamento configurado e a URL para relatorios.pdf_url
+Cuidado: Deduplicação por hash de conteúdo: a chave do arquivo leva o hash
+         do documento + VERSAO_LAYOUT. Se pdf_url já aponta para a chave
+         atual, nada é feito; se o arquivo já existe (execução anterior
+         interrompida), só o pdf_url é gravado. PDF antigo de um relatório
+         alterado é removido depois que o novo é gravado
+Dependências: pdf_relatorio (processos), armazenamento, relatorios/alunos/turmas
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+from app.services.armazenamento import obter_armazenamento
+from app.services.pdf_relatorio import VERSAO_LAYOUT, DocumentoRelatorio, renderizar_lote
+
+TAMANHO_LOTE_PDF = 20  # Documentos por envio ao pool (menos idas e voltas entre processos)
+TAMANHO_LOTE_CONSULTA = 200  # Limita o tamanho da URL em filtros `in`
+ESCOLA_PADRAO = "Colégio Solare"  # Turmas sem escola cadastrada
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass
+class ResultadoRenderizacao:
+    total: int = 0  # Relatórios aprovados encontrados
+    renderizados: int = 0
+    reaproveitados: int = 0  # Conteúdo igual ao do PDF já gravado
+    falhas: List[Dict[str, str]] = field(default_factory=list)
+    bytes_gravados: int = 0
+    duracao_segundos: float = 0.0
+
+    @property
+    def pdfs_por_minuto(self) -> float:
+        if not self.duracao_segundos:
+            return 0.0
+        return round(self.renderizados / self.duracao_segundos * 60, 1)
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Formato de RenderizacaoPdfResponse (também é o resultado das tarefas)"""
+        return {
+            "total": self.total,
+            "renderizados": self.renderizados,
+            "reaproveitados": self.reaproveitados,
+            "falhas": self.falhas,
+            "bytes_gravados": self.bytes_gravados,
+            "duracao_segundos": self.duracao_segundos,
+            "pdfs_por_minuto": self.pdfs_por_minuto,
+        }
+
+
+def _obter_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        processos = get_settings().pdf_processos or os.cpu_count() or 1
+        # spawn: fork de um processo com threads (asyncio, pool do banco) pode travar.
+        # Scripts que renderizam precisam do `if __name__ == "__main__"`
+        _pool = ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def encerrar_pool_pdf() -> None:
+    """Chamado no shutdown da aplicação"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def hash_documento(documento: DocumentoRelatorio) -> str:
+    serializado = json.dumps(
+        {"documento": asdict(documento), "versao_layout": VERSAO_LAYOUT},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+
+def chave_pdf(relatorio: Dict[str, Any], documento: DocumentoRelatorio) -> str:
+    """Caminho no armazenamento, separado por escola (turma sem escola: sem-escola)"""
+    return (
+        f"relatorios/{relatorio.get('escola_id') or 'sem-escola'}/{relatorio['ano']}/{relatorio['trimestre']}/"
+        f"{relatorio['aluno_id']}-{hash_documento(documento)[:20]}.pdf"
+    )
+
+
+def _data_br(valor: Optional[str]) -> Optional[str]:
+    if not valor:
+        return None
+    return datetime.fromisoformat(str(valor)[:10]).strftime("%d/%m/%Y")
+
+
+async def _itens_da_turma(
+    turma: Dict[str, Any], escola: str, professores: Dict[str, str], trimestre: int, ano: int
+) -> List[Tuple[Dict[str, Any], DocumentoRelatorio]]:
+    """(relatório aprovado, documento) de cada aluno da turma"""
+    supabase = get_supabase()
+    alunos = await executar(supabase.table("alunos").select("id, nome").eq("turma_id", turma["id"]))
+    nomes = {aluno["id"]: aluno["nome"] for aluno in alunos.data}
+    ids = list(nomes)
+    respostas = await asyncio.gather(*(
+        executar(
+            supabase.table("relatorios")
+            .select("id, aluno_id, trimestre, ano, texto_final, pdf_url, aprovado_em")
+            .in_("aluno_id", ids[i:i + TAMANHO_LOTE_CONSULTA])
+            .eq("trimestre", trimestre)
+            .eq("ano", ano)
+            .eq("status", "aprovado")
+        )
+        for i in range(0, len(ids), TAMANHO_LOTE_CONSULTA)
+    ))
+    cor = get_settings().pdf_cor_marca
+    itens = []
+    for resposta in respostas:
+        for relatorio in resposta.data:
+            relatorio["escola_id"] = turma.get("escola_id")  # relatorios não tem a coluna (chave_pdf)
+            itens.append((relatorio, DocumentoRelatorio(
+                escola=escola,
+                aluno=nomes[relatorio["aluno_id"]],
+                turma=f"{turma['serie']} {turma['turma']}",
+                professor=professores.get(turma.get("professor_id")),
+                trimestre=relatorio["trimestre"],
+                ano=relatorio["ano"],
+                texto=relatorio["texto_final"],
+                aprovado_em=_data_br(relatorio.get("aprovado_em")),
+                cor_marca=cor,
+            )))
+    return itens
+
+
+async def _nomes_professores(turmas: List[Dict[str, Any]]) -> Dict[str, str]:
+    ids = sorted({turma["professor_id"] for turma in turmas if turma.get("professor_id")})
+    if not ids:
+        return {}
+    usuarios = await executar(get_supabase().table("usuarios").select("id, nome").in_("id", ids))
+    return {usuario["id"]: usuario["nome"] for usuario in usuarios.data}
+
+
+async def renderizar_pdfs(
+    itens: List[Tuple[Dict[str, Any], DocumentoRelatorio]],
+    forcar: bool = False,
+    progresso: Optional[Callable[[int, int, int], None]] = None,
+) -> ResultadoRenderizacao:
+    """
+    🚨 ÂNCORA: CRÍTICO - Renderiza (no pool), grava e atualiza pdf_url
+    Contexto: Lotes de TAMANHO_LOTE_PDF documentos vão ao pool em paralelo;
+              cada lote concluído é gravado no armazenamento e no banco
+              enquanto os outros ainda renderizam
+    Cuidado: `forcar` ignora a deduplicação (ex: arquivo removido à mão)
+    """
+    inicio = time.perf_counter()
+    supabase = get_supabase()
+    armazenamento = obter_armazenamento()
+    resultado = ResultadoRenderizacao(total=len(itens))
+
+    candidatos = []
+    for relatorio, documento in itens:
+        chave = chave_pdf(relatorio, documento)
+        if not forcar and relatorio.get("pdf_url") == armazenamento.url(chave):
+            resultado.reaproveitados += 1
+        else:
+            candidatos.append((relatorio, documento, chave))
+
+    # Arquivo já gravado (execução interrompida antes do pdf_url): só aponta
+    existentes = set() if forcar else await asyncio.to_thread(
+        lambda: {chave for _, _, chave in candidatos if armazenamento.existe(chave)}
+    )
+    pendentes = [item for item in candidatos if item[2] not in existentes]
+
+    async def apontar(relatorio: Dict[str, Any], chave: str) -> None:
+        await executar(
+            supabase.table("relatorios").update({"pdf_url": armazenamento.url(chave)}).eq("id", relatorio["id"])
+        )
+        anterior = armazenamento.chave_da_url(relatorio.get("pdf_url"))
+        if anterior and anterior != chave:
+            await asyncio.to_thread(armazenamento.remover, anterior)
+
+    await asyncio.gather(*(apontar(relatorio, chave) for relatorio, _, chave in candidatos if chave in existentes))
+    resultado.reaproveitados += len(existentes)
+
+    loop = asyncio.get_running_loop()
+    lotes = [pendentes[i:i + TAMANHO_LOTE_PDF] for i in range(0, len(pendentes), TAMANHO_LOTE_PDF)]
+
+    async def processar(lote):
+        try:
+            pdfs = await loop.run_in_executor(_obter_pool(), renderizar_lote, [documento for _, documento, _ in lote])
+        except BrokenProcessPool as e:  # Processo do pool morreu: o lote falha e o pool é recriado
+            encerrar_pool_pdf()
+            pdfs = [(None, str(e))] * len(lote)
+        return lote, pdfs
+
+    processados = 0
+    for tarefa in asyncio.as_completed([processar(lote) for lote in lotes]):
+        lote, pdfs = await tarefa
+        gravados = []
+        for (relatorio, _, chave), (pdf, erro) in zip(lote, pdfs):
+            if erro is not None:
+                resultado.falhas.append({"relatorio_id": relatorio["id"], "erro": erro})
+                continue
+            try:
+                await asyncio.to_thread(armazenamento.salvar, chave, pdf)
+            except Exception as e:
+                resultado.falhas.append({"relatorio_id": relatorio["id"], "erro": str(e)})
+                continue
+            resultado.bytes_gravados += len(pdf)
+            gravados.append((relatorio, chave))
+        await asyncio.gather(*(apontar(relatorio, chave) for relatorio, chave in gravados))
+        resultado.renderizados += len(gravados)
+        processados += len(lote)
+        if progresso:
+            progresso(processados, len(pendentes), len(resultado.falhas))
+
+    resultado.duracao_segundos = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+async def renderizar_pdfs_turma(turma_id: str, trimestre: int, ano: int, **opcoes) -> Optional[ResultadoRenderizacao]:
+    """PDFs dos relatórios aprovados da turma (None se a turma não existe)"""
+    supabase = get_supabase()
+    turma = await executar(
+        supabase.table("turmas").select("id, serie, turma, escola_id, professor_id").eq("id", str(turma_id))
+    )
+    if not turma.data:
+        return None
+    turma = turma.data[0]
+    escola = ESCOLA_PADRAO
+    if turma.get("escola_id"):
+        linha = await executar(supabase.table("escolas").select("nome").eq("id", turma["escola_id"]))
+        escola = linha.data[0]["nome"] if linha.data else escola
+    itens = await _itens_da_turma(turma, escola, await _nomes_professores([turma]), trimestre, ano)
+    return await renderizar_pdfs(itens, **opcoes)
+
+
+async def renderizar_pdfs_escola(escola_id: str, trimestre: int, ano: int, **opcoes) -> Optional[ResultadoRenderizacao]:
+    """PDFs dos relatórios aprovados das turmas ativas da escola (None se a escola não existe)"""
+    supabase = get_supabase()
+    escola, turmas = await asyncio.gather(
+        executar(supabase.table("escolas").select("id, nome").eq("id", str(escola_id))),
+        executar(
+            supabase.table("turmas")
+            .select("id, serie, turma, escola_id, professor_id")
+            .eq("escola_id", str(escola_id))
+            .eq("ativo", True)
+        ),
+    )
+    if not escola.data:
+        return None
+    professores = await _nomes_professores(turmas.data)
+    por_turma = await asyncio.gather(*(
+        _itens_da_turma(turma, escola.data[0]["nome"], professores, trimestre, ano) for turma in turmas.data
+    ))
+    itens = [item for lista in por_turma for item in lista]
+    return await renderizar_pdfs(itens, **opcoes)
@@ -0,0 +1,236 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Roteamento entre provedores de LLM (hedge + failover)
+Contexto: Cada provedor tem estatísticas móveis (latência das últimas
+          chamadas e falhas). A chamada vai ao primário; se ele passar do
+          próprio p95 sem responder, uma requisição "hedge" sai para o próximo
+          provedor e vale a primeira resposta. Falhas passam para o próximo
+          da lista, e falhas seguidas abrem o circuito do provedor por
+          llm_circuito_segundos (sai da rota durante a queda)
+Cuidado: A chamada perdedora é cancelada, mas o provedor pode cobrar os
+         tokens já processados. Cada provedor usa o próprio modelo
+         (llm_modelo_*), então o texto pode vir de outro modelo que o pedido
+         Com outro provedor na fila, o primário tenta uma vez só (falha vai
+         direto para o failover); o último da fila usa llm_max_tentativas
+Dependências: provedores_llm (limitadores e retentativas de cada provedor)
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from app.config import get_settings
+from app.services.provedores_llm import (
+    ErroProvedorLLM, RequisicaoLLM, RespostaLLM, gerar_texto, obter_provedor, provedor_configurado,
+    transmitir_texto
+)
+
+
+class EstatisticasProvedor:
+    """Janela móvel de latências e falhas + circuito de um provedor"""
+
+    def __init__(self, janela: int):
+        self.latencias: deque = deque(maxlen=janela)  # Só chamadas com sucesso
+        self.resultados: deque = deque(maxlen=janela)  # True = sucesso
+        self.falhas_seguidas = 0
+        self.circuito_aberto_ate = 0.0
+        self.hedges_disparados = 0
+        self.hedges_vencidos = 0  # Hedge respondeu antes do primário
+
+    def registrar(self, latencia: float, sucesso: bool) -> None:
+        settings = get_settings()
+        self.resultados.append(sucesso)
+        if sucesso:
+            self.latencias.append(latencia)
+            self.falhas_seguidas = 0
+            return
+        self.falhas_seguidas += 1
+        if self.falhas_seguidas >= settings.llm_circuito_falhas:
+            # Meia-abertura: passado o prazo volta à rota; nova falha reabre na hora
+            self.circuito_aberto_ate = time.monotonic() + settings.llm_circuito_segundos
+
+    @property
+    def disponivel(self) -> bool:
+        return time.monotonic() >= self.circuito_aberto_ate
+
+    def percentil(self, p: float) -> Optional[float]:
+        if not self.latencias:
+            return None
+        ordenadas = sorted(self.latencias)
+        return ordenadas[min(len(ordenadas) - 1, math.ceil(p * len(ordenadas)) - 1)]
+
+    def prazo_hedge(self) -> float:
+        settings = get_settings()
+        if len(self.latencias) < settings.llm_hedge_min_amostras:
+            return settings.llm_hedge_prazo_padrao_segundos
+        return self.percentil(settings.llm_hedge_percentil)
+
+    def resumo(self) -> Dict:
+        p50, p95 = self.percentil(0.5), self.percentil(0.95)
+        return {
+            "amostras": len(self.resultados),
+            "taxa_erro": round(1 - sum(self.resultados) / len(self.resultados), 4) if self.resultados else 0.0,
+            "latencia_p50": round(p50, 3) if p50 is not None else None,
+            "latencia_p95": round(p95, 3) if p95 is not None else None,
+            "prazo_hedge": round(self.prazo_hedge(), 3),
+            "falhas_seguidas": self.falhas_seguidas,
+            "circuito_aberto": not self.disponivel,
+            "hedges_disparados": self.hedges_disparados,
+            "hedges_vencidos": self.hedges_vencidos,
+        }
+
+
+_estatisticas: Dict[str, EstatisticasProvedor] = {}
+
+
+def estatisticas(provedor: str) -> EstatisticasProvedor:
+    if provedor not in _estatisticas:
+        _estatisticas[provedor] = EstatisticasProvedor(get_settings().llm_janela_estatisticas)
+    return _estatisticas[provedor]
+
+
+def resumo_estatisticas() -> Dict[str, Dict]:
+    return {provedor: dados.resumo() for provedor, dados in _estatisticas.items()}
+
+
+def ordem_provedores(primario: str) -> List[str]:
+    """Primário + failover configurado, sem provedores com circuito aberto"""
+    settings = get_settings()
+    reserva = [p.strip() for p in settings.llm_failover.split(",") if p.strip()]
+    ordem = [primario] + [p for p in reserva if p != primario and provedor_configurado(p)]
+    disponiveis = [p for p in ordem if estatisticas(p).disponivel]
+    # Todos fora do ar: tenta mesmo assim, na ordem, em vez de falhar sem chamar ninguém
+    return disponiveis or ordem
+
+
+def modelo_do_provedor(provedor: str, primario: str, modelo: Optional[str]) -> str:
+    settings = get_settings()
+    if provedor == primario and modelo:
+        return modelo
+    if provedor == settings.default_llm_provider:
+        return settings.default_llm_model
+    return getattr(settings, f"llm_modelo_{provedor}")
+
+
+@dataclass
+class _Chamada:
+    provedor: str
+    hedge: bool
+    inicio: float
+    tentativas: Optional[int]  # None = llm_max_tentativas
+
+
+async def _chamar(chamada: _Chamada, requisicao: RequisicaoLLM) -> RespostaLLM:
+    try:
+        resposta = await gerar_texto(obter_provedor(chamada.provedor), requisicao, chamada.tentativas)
+    except asyncio.CancelledError:
+        raise  # Perdeu a corrida: não conta como falha
+    except Exception:
+        estatisticas(chamada.provedor).registrar(time.monotonic() - chamada.inicio, False)
+        raise
+    estatisticas(chamada.provedor).registrar(time.monotonic() - chamada.inicio, True)
+    return resposta
+
+
+async def gerar_roteado(
+    requisicao: RequisicaoLLM,
+    primario: Optional[str] = None,
+    failover: bool = True,
+) -> RespostaLLM:
+    """
+    Gera o texto pelo primário com hedge e failover
+
+    `requisicao.modelo` vale para o primário; os demais usam o modelo
+    configurado para eles. Sem `failover`, só o primário é chamado.
+    """
+    settings = get_settings()
+    primario = primario or settings.default_llm_provider
+    ordem = ordem_provedores(primario) if failover else [primario]
+    proximos = iter(enumerate(ordem))
+    tarefas: Dict[asyncio.Task, _Chamada] = {}
+    erros: List[str] = []
+    hedge_usado = False
+
+    def iniciar(hedge: bool = False) -> bool:
+        posicao, provedor = next(proximos, (None, None))
+        if provedor is None:
+            return False
+        ultimo = posicao == len(ordem) - 1
+        chamada = _Chamada(provedor, hedge, time.monotonic(), None if ultimo else 1)
+        pedido = replace(requisicao, modelo=modelo_do_provedor(provedor, primario, requisicao.modelo))
+        tarefas[asyncio.create_task(_chamar(chamada, pedido))] = chamada
+        if hedge:
+            estatisticas(provedor).hedges_disparados += 1
+        return True
+
+    iniciar()
+    try:
+        while tarefas:
+            prazo = None
+            if settings.llm_hedge_ativo and failover and not hedge_usado and len(tarefas) == 1:
+                (chamada,) = tarefas.values()
+                decorrido = time.monotonic() - chamada.inicio
+                prazo = max(0.0, estatisticas(chamada.provedor).prazo_hedge() - decorrido)
+
+            prontas, _ = await asyncio.wait(tarefas, timeout=prazo, return_when=asyncio.FIRST_COMPLETED)
+            if not prontas:
+                # Primário passou do p95: dispara o hedge e segue esperando os dois
+                hedge_usado = True
+                iniciar(hedge=True)
+                continue
+
+            for tarefa in prontas:
+                chamada = tarefas.pop(tarefa)
+                if tarefa.exception() is None:
+                    if chamada.hedge and tarefas:
+                        estatisticas(chamada.provedor).hedges_vencidos += 1
+                    return tarefa.result()
+                erros.append(f"{chamada.provedor}: {tarefa.exception()}")
+
+            if not tarefas:
+                iniciar()  # Failover: todas as chamadas em voo falharam
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+
+    raise ErroProvedorLLM("Nenhum provedor respondeu (" + "; ".join(erros) + ")")
+
+
+async def transmitir_roteado(
+    requisicao: RequisicaoLLM,
+    primario: Optional[str] = None,
+    failover: bool = True,
+) -> AsyncIterator[Union[str, RespostaLLM]]:
+    """
+    Versão em fluxo de gerar_roteado: trechos do texto e, por último, a RespostaLLM
+
+    Failover só enquanto nenhum trecho saiu. Sem hedge: duplicar o fluxo
+    dobraria os tokens, e o primeiro trecho já chega em fração da latência.
+    """
+    settings = get_settings()
+    primario = primario or settings.default_llm_provider
+    ordem = ordem_provedores(primario) if failover else [primario]
+    erros: List[str] = []
+
+    for posicao, provedor in enumerate(ordem):
+        ultimo = posicao == len(ordem) - 1
+        pedido = replace(requisicao, modelo=modelo_do_provedor(provedor, primario, requisicao.modelo))
+        inicio = time.monotonic()
+        emitido = False
+        try:
+            async for item in transmitir_texto(obter_provedor(provedor), pedido, None if ultimo else 1):
+                if isinstance(item, RespostaLLM):
+                    estatisticas(provedor).registrar(time.monotonic() - inicio, True)
+                else:
+                    emitido = True
+                yield item
+            return
+        except Exception as e:
+            estatisticas(provedor).registrar(time.monotonic() - inicio, False)
+            if emitido:
+                raise
+            erros.append(f"{provedor}: {e}")
+
+    raise ErroProvedorLLM("Nenhum provedor respondeu (" + "; ".join(erros) + ")")
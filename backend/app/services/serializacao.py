@@ -0,0 +1,99 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Serialização rápida das listagens (alunos e turmas)
+Contexto: As linhas do banco já foram validadas na escrita (schemas de
+          criação + constraints do banco). Nas listagens grandes, montar um
+          AlunoResponse/TurmaResponse por linha e deixar o FastAPI validar de
+          novo pelo response_model custa mais que a consulta. Aqui cada linha
+          vira um dict com os campos do schema de resposta, os campos
+          calculados (idade, tem_restricoes, nome_completo...) saem numa
+          passada só (date.today() uma vez) e o JSON é gerado pelo orjson
+Cuidado: Campo novo em AlunoResponse/TurmaResponse entra sozinho (a lista de
+         campos vem do schema); campo calculado novo precisa ser calculado
+         aqui também, senão sai com o valor padrão. Datas/horas saem como o
+         banco devolve (ISO 8601, "+00:00" onde o pydantic escreveria "Z")
+Dependências: orjson (opcional; sem ele usa json da biblioteca padrão)
+"""
+
+import json
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi.responses import Response
+
+from app.models.schemas import AlunoResponse, TurmaResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está em requirements.txt
+    orjson = None
+
+
+def _padroes(modelo) -> Dict[str, Any]:
+    """Campo -> valor padrão (None para obrigatórios, que sempre vêm do banco)"""
+    return {
+        nome: None if campo.is_required() else campo.get_default(call_default_factory=True)
+        for nome, campo in modelo.model_fields.items()
+    }
+
+
+PADROES_ALUNO = _padroes(AlunoResponse)
+PADROES_TURMA = _padroes(TurmaResponse)
+
+
+def json_bytes(conteudo: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(conteudo)
+    return json.dumps(conteudo, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class RespostaJSONRapida(Response):
+    """JSONResponse com orjson; o conteúdo já deve estar em tipos JSON (dicts das funções abaixo)"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return json_bytes(content)
+
+
+def _projetar(linha: Dict[str, Any], padroes: Dict[str, Any]) -> Dict[str, Any]:
+    return {campo: linha.get(campo, padrao) for campo, padrao in padroes.items()}
+
+
+def alunos_para_resposta(linhas: Iterable[Dict[str, Any]], hoje: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Linhas de `alunos` no formato de AlunoResponse, com idade e tem_restricoes calculadas"""
+    hoje = hoje or date.today()
+    resultado = []
+    for linha in linhas:
+        aluno = _projetar(linha, PADROES_ALUNO)
+        nascimento = aluno["data_nascimento"]
+        if nascimento:
+            if isinstance(nascimento, str):
+                nascimento = date.fromisoformat(nascimento[:10])
+            aluno["idade"] = (
+                hoje.year - nascimento.year - ((hoje.month, hoje.day) < (nascimento.month, nascimento.day))
+            )
+        aluno["tem_restricoes"] = bool(
+            aluno["necessidades_especiais"] or aluno["alergias"] or aluno["restricoes_alimentares"]
+        )
+        resultado.append(aluno)
+    return resultado
+
+
+def turmas_para_resposta(
+    linhas: Iterable[Dict[str, Any]],
+    contagens: Dict[str, int],
+) -> List[Dict[str, Any]]:
+    """
+    Linhas de `turmas` no formato de TurmaResponse
+    Aceita o embed `professor` do select (vira professor_nome)
+    """
+    resultado = []
+    for linha in linhas:
+        turma = _projetar(linha, PADROES_TURMA)
+        turma["nome_completo"] = f"{turma['serie']} {turma['turma']}"
+        turma["quantidade_atual"] = contagens.get(str(turma["id"]), 0)
+        professor = linha.get("professor")
+        if professor:
+            turma["professor_nome"] = professor.get("nome", "Sem professor")
+        resultado.append(turma)
+    return resultado
@@ -0,0 +1,475 @@
+"""
+🚨 ÂNCORA: CRÍTICO - Fila de tarefas em segundo plano
+Contexto: Geração de relatórios da escola inteira, reparo de agregados etc.
+          não rodam dentro do handler: o endpoint grava a tarefa em
+          `tarefas` e devolve o id; um pool de trabalhadores (iniciado no
+          lifespan) reserva com reservar_tarefa (prioridade + justiça por
+          escola), executa, manda heartbeat com o progresso e grava o
+          resultado. O estado está no Postgres, então vários processos
+          podem trabalhar na mesma fila e uma queda não perde tarefas
+Cuidado: Tarefa órfã (sem heartbeat) volta à fila e roda de novo; os
+         executores precisam ser idempotentes (a geração pula relatórios
+         protegidos e reaproveita o cache de rascunhos)
+Dependências: geracao_relatorios, renderizacao_pdf, envio_relatorios, agregados,
+              particoes_avaliacoes
+"""
+
+import asyncio
+import os
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+from app.services.agregados import reconstruir_agregados
+from app.services.envio_relatorios import enviar_relatorios_escola, enviar_relatorios_turma
+from app.services.geracao_relatorios import gerar_relatorios_escola, gerar_relatorios_turma
+from app.services.particoes_avaliacoes import arquivar_anos_encerrados
+from app.services.renderizacao_pdf import renderizar_pdfs_escola, renderizar_pdfs_turma
+
+STATUS_FINAIS = ("concluida", "falhou", "cancelada")
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ContextoTarefa:
+    """Progresso da tarefa em memória; o heartbeat leva para o banco"""
+
+    def __init__(self):
+        self.feito = 0
+        self.total = 0
+        self.falhas = 0
+
+    def progresso(self, feito: int, total: int, falhas: int = 0) -> None:
+        self.feito, self.total, self.falhas = feito, total, falhas
+
+
+@dataclass
+class TipoTarefa:
+    executar: Callable[[Dict[str, Any], ContextoTarefa], Awaitable[Dict[str, Any]]]
+    obrigatorios: Tuple[str, ...]
+
+
+TIPOS_TAREFA: Dict[str, TipoTarefa] = {}
+
+
+def tipo_tarefa(nome: str, obrigatorios: Tuple[str, ...] = ()):
+    """Registra o executor de um tipo de tarefa (recebe parametros e contexto, devolve o resultado)"""
+    def registrar(funcao):
+        TIPOS_TAREFA[nome] = TipoTarefa(funcao, obrigatorios)
+        return funcao
+    return registrar
+
+
+# ========== EXECUTORES ==========
+
+def _opcoes_geracao(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        chave: parametros[chave]
+        for chave in ("provedor", "modelo", "sobrescrever", "ignorar_cache", "modo")
+        if parametros.get(chave) is not None
+    }
+
+
+@tipo_tarefa("gerar_relatorios_turma", ("turma_id", "trimestre"))
+async def _gerar_relatorios_turma(parametros: Dict[str, Any], contexto: ContextoTarefa) -> Dict[str, Any]:
+    resultado = await gerar_relatorios_turma(
+        parametros["turma_id"], parametros["trimestre"], parametros.get("ano") or datetime.now().year,
+        progresso=contexto.progresso, **_opcoes_geracao(parametros)
+    )
+    if resultado is None:
+        raise ValueError("Turma não encontrada")
+    return resultado.como_dict()
+
+
+@tipo_tarefa("gerar_relatorios_escola", ("escola_id", "trimestre"))
+async def _gerar_relatorios_escola(parametros: Dict[str, Any], contexto: ContextoTarefa) -> Dict[str, Any]:
+    resultado = await gerar_relatorios_escola(
+        parametros["escola_id"], parametros["trimestre"], parametros.get("ano") or datetime.now().year,
+        progresso=contexto.progresso, **_opcoes_geracao(parametros)
+    )
+    if resultado is None:
+        raise ValueError("Escola não encontrada")
+    return resultado.como_dict()
+
+
+@tipo_tarefa("renderizar_pdfs_turma", ("turma_id", "trimestre"))
+async def _renderizar_pdfs_turma(parametros: Dict[str, Any], contexto: ContextoTarefa) -> Dict[str, Any]:
+    resultado = await renderizar_pdfs_turma(
+        parametros["turma_id"], parametros["trimestre"], parametros.get("ano") or datetime.now().year,
+        forcar=bool(parametros.get("forcar")), progresso=contexto.progresso
+    )
+    if resultado is None:
+        raise ValueError("Turma não encontrada")
+    return resultado.como_dict()
+
+
+@tipo_tarefa("renderizar_pdfs_escola", ("escola_id", "trimestre"))
+async def _renderizar_pdfs_escola(parametros: Dict[str, Any], contexto: ContextoTarefa) -> Dict[str, Any]:
+    resultado = await renderizar_pdfs_escola(
+        parametros["escola_id"], parametros["trimestre"], parametros.get("ano") or datetime.now().year,
+        forcar=bool(parametros.get("forcar")), progresso=contexto.progresso
+    )
+    if resultado is None:
+        raise ValueError("Escola não encontrada")
+    return resultado.como_dict()
+
+
+def _opcoes_envio(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    return {"canais": parametros.get("canais"), "reenviar": bool(parametros.get("reenviar"))}
+
+
+@tipo_tarefa("enviar_relatorios_turma", ("turma_id", "trimestre"))
+async def _enviar_relatorios_turma(parametros: Dict[str, Any], contexto: ContextoTarefa) -> Dict[str, Any]:
+    resultado = await enviar_relatorios_turma(
+        parametros["turma_id"], parametros["trimestre"], parametros.get("ano") or datetime.now().year,
+        progresso=contexto.progresso, **_opcoes_envio(parametros)
+    )
+    if resultado is None:
+        raise ValueError("Turma não encontrada")
+    return resultado.como_dict()
+
+
+@tipo_tarefa("enviar_relatorios_escola", ("escola_id", "trimestre"))
+async def _enviar_relatorios_escola(parametros: Dict[str, Any], contexto: ContextoTarefa) -> Dict[str, Any]:
+    resultado = await enviar_relatorios_escola(
+        parametros["escola_id"], parametros["trimestre"], parametros.get("ano") or datetime.now().year,
+        progresso=contexto.progresso, **_opcoes_envio(parametros)
+    )
+    if resultado is None:
+        raise ValueError("Escola não encontrada")
+    return resultado.como_dict()
+
+
+@tipo_tarefa("reconstruir_agregados")
+async def _reconstruir_agregados(parametros: Dict[str, Any], contexto: ContextoTarefa) -> Dict[str, Any]:
+    linhas = await reconstruir_agregados(parametros.get("aluno_ids"))
+    contexto.progresso(linhas, linhas)
+    return {"agregados": linhas}
+
+
+@tipo_tarefa("arquivar_avaliacoes")
+async def _arquivar_avaliacoes(parametros: Dict[str, Any], contexto: ContextoTarefa) -> Dict[str, Any]:
+    return await arquivar_anos_encerrados(
+        parametros.get("anos_ativos"), parametros.get("tablespace"), progresso=contexto.progresso
+    )
+
+
+# ========== FILA ==========
+
+async def enfileirar(
+    tipo: str,
+    parametros: Dict[str, Any],
+    escola_id: Optional[str] = None,
+    prioridade: int = 5,
+    criado_por: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Grava a tarefa como pendente e acorda os trabalhadores deste processo
+
+    Sem `escola_id`, usa o dos parâmetros ou o da turma, para a justiça
+    entre escolas. ValueError se o tipo é desconhecido ou faltam parâmetros.
+    """
+    if tipo not in TIPOS_TAREFA:
+        raise ValueError(f"Tipo de tarefa desconhecido: {tipo}")
+    faltando = [p for p in TIPOS_TAREFA[tipo].obrigatorios if parametros.get(p) is None]
+    if faltando:
+        raise ValueError(f"Parâmetros obrigatórios ausentes: {', '.join(faltando)}")
+
+    supabase = get_supabase()
+    escola_id = escola_id or parametros.get("escola_id")
+    if escola_id is None and parametros.get("turma_id"):
+        turma = await executar(supabase.table("turmas").select("escola_id").eq("id", str(parametros["turma_id"])))
+        escola_id = turma.data[0]["escola_id"] if turma.data else None
+
+    criada = await executar(supabase.table("tarefas").insert({
+        "tipo": tipo,
+        "parametros": parametros,
+        "escola_id": str(escola_id) if escola_id else None,
+        "prioridade": prioridade,
+        "criado_por": str(criado_por) if criado_por else None,
+        "max_tentativas": get_settings().tarefas_max_tentativas,
+    }))
+    if _pool is not None:
+        _pool.acordar()
+    return criada.data[0]
+
+
+async def obter_tarefa(tarefa_id: str) -> Optional[Dict[str, Any]]:
+    supabase = get_supabase()
+    resultado = await executar(supabase.table("tarefas").select("*").eq("id", str(tarefa_id)))
+    return resultado.data[0] if resultado.data else None
+
+
+async def listar_tarefas(
+    escola_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limite: int = 50,
+) -> List[Dict[str, Any]]:
+    """Tarefas mais recentes primeiro (sem o resultado, que pode ser grande)"""
+    supabase = get_supabase()
+    query = (
+        supabase.table("tarefas")
+        .select("id, tipo, parametros, escola_id, criado_por, prioridade, status, progresso_total, "
+                "progresso_feito, progresso_falhas, erro, tentativas, max_tentativas, "
+                "cancelamento_solicitado, trabalhador, heartbeat_em, iniciada_em, concluida_em, "
+                "created_at, updated_at")
+        .order("created_at", desc=True)
+        .limit(limite)
+    )
+    if escola_id:
+        query = query.eq("escola_id", str(escola_id))
+    if status:
+        query = query.eq("status", status)
+    resultado = await executar(query)
+    return resultado.data
+
+
+async def cancelar_tarefa(tarefa_id: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Pendente: cancelada na hora. Em execução: marca o pedido, e o trabalhador
+    interrompe no próximo heartbeat. Devolve (tarefa, cancelou); tarefa None
+    se não existe, cancelou False se já estava finalizada
+    """
+    supabase = get_supabase()
+    cancelada = await executar(
+        supabase.table("tarefas")
+        .update({"status": "cancelada", "concluida_em": _agora()})
+        .eq("id", str(tarefa_id))
+        .eq("status", "pendente")
+    )
+    if cancelada.data:
+        return cancelada.data[0], True
+    pedida = await executar(
+        supabase.table("tarefas")
+        .update({"cancelamento_solicitado": True})
+        .eq("id", str(tarefa_id))
+        .eq("status", "executando")
+    )
+    if pedida.data:
+        return pedida.data[0], True
+    return await obter_tarefa(tarefa_id), False
+
+
+def progresso_tarefa(tarefa: Dict[str, Any]) -> Dict[str, Any]:
+    """Percentual, vazão e estimativa de término a partir da linha da tarefa"""
+    feito, total = tarefa["progresso_feito"], tarefa["progresso_total"]
+    percentual = round(feito / total * 100, 1) if total else (100.0 if tarefa["status"] == "concluida" else 0.0)
+    itens_por_minuto = None
+    restante = None
+    if tarefa.get("iniciada_em") and feito:
+        fim = tarefa.get("concluida_em") if tarefa["status"] in STATUS_FINAIS else None
+        fim = datetime.fromisoformat(fim) if fim else datetime.now(timezone.utc)
+        decorrido = (fim - datetime.fromisoformat(tarefa["iniciada_em"])).total_seconds()
+        if decorrido > 0:
+            itens_por_minuto = round(feito / decorrido * 60, 1)
+            if tarefa["status"] == "executando" and total:
+                restante = round((total - feito) / (feito / decorrido), 1)
+    return {
+        "id": tarefa["id"],
+        "status": tarefa["status"],
+        "progresso_total": total,
+        "progresso_feito": feito,
+        "progresso_falhas": tarefa["progresso_falhas"],
+        "percentual": percentual,
+        "itens_por_minuto": itens_por_minuto,
+        "restante_segundos": restante,
+        "cancelamento_solicitado": tarefa["cancelamento_solicitado"],
+        "erro": tarefa.get("erro"),
+    }
+
+
+# ========== TRABALHADORES ==========
+
+async def _reservar(trabalhador: str) -> Optional[Dict[str, Any]]:
+    supabase = get_supabase()
+    resultado = await executar(supabase.rpc("reservar_tarefa", {
+        "p_trabalhador": trabalhador,
+        "p_max_por_escola": get_settings().tarefas_max_por_escola,
+    }))
+    return resultado.data[0] if resultado.data else None
+
+
+async def _atualizar(
+    tarefa_id: str, trabalhador: str, dados: Dict[str, Any], status: str = "executando"
+) -> Optional[Dict[str, Any]]:
+    """
+    Atualiza só se a tarefa ainda está em `status` com este `trabalhador`
+    (o vigia pode tê-la devolvido à fila e outro trabalhador reservado de novo)
+    """
+    supabase = get_supabase()
+    resultado = await executar(
+        supabase.table("tarefas").update(dados)
+        .eq("id", tarefa_id).eq("status", status).eq("trabalhador", trabalhador)
+    )
+    return resultado.data[0] if resultado.data else None
+
+
+def _dados_progresso(contexto: ContextoTarefa) -> Dict[str, Any]:
+    return {
+        "progresso_feito": contexto.feito,
+        "progresso_total": contexto.total,
+        "progresso_falhas": contexto.falhas,
+    }
+
+
+class PoolTrabalhadores:
+    """
+    N laços que reservam e executam tarefas, mais um vigia que devolve à
+    fila as tarefas órfãs. Fila vazia: espera `tarefas_intervalo_segundos`
+    ou até enfileirar() acordar o pool
+    """
+
+    def __init__(self, tamanho: int):
+        self.tamanho = tamanho
+        self._lacos: List[asyncio.Task] = []
+        self._sinal = asyncio.Event()
+        self._prefixo = f"{socket.gethostname()}:{os.getpid()}"
+
+    def iniciar(self) -> None:
+        self._lacos = [asyncio.create_task(self._trabalhador(f"{self._prefixo}:{i}")) for i in range(self.tamanho)]
+        self._lacos.append(asyncio.create_task(self._vigiar()))
+
+    async def parar(self) -> None:
+        """Interrompe as execuções em andamento e devolve essas tarefas à fila"""
+        for laco in self._lacos:
+            laco.cancel()
+        await asyncio.gather(*self._lacos, return_exceptions=True)
+        self._lacos = []
+
+    def acordar(self) -> None:
+        self._sinal.set()
+
+    async def _vigiar(self) -> None:
+        settings = get_settings()
+        supabase = get_supabase()
+        while True:
+            try:
+                recuperadas = await executar(
+                    supabase.rpc("recuperar_tarefas_orfas", {"p_segundos": settings.tarefas_orfa_segundos})
+                )
+                if recuperadas.data:
+                    print(f"♻️ {recuperadas.data} tarefa(s) órfã(s) devolvida(s) à fila")
+                    self.acordar()
+            except Exception as e:
+                print(f"⚠️ Falha ao recuperar tarefas órfãs: {e}")
+            await asyncio.sleep(settings.tarefas_orfa_segundos / 2)
+
+    async def _trabalhador(self, nome: str) -> None:
+        settings = get_settings()
+        while True:
+            try:
+                tarefa = await _reservar(nome)
+            except Exception as e:
+                print(f"⚠️ Falha ao reservar tarefa ({nome}): {e}")
+                tarefa = None
+            if tarefa is None:
+                self._sinal.clear()
+                try:
+                    await asyncio.wait_for(self._sinal.wait(), settings.tarefas_intervalo_segundos)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._executar(tarefa, nome)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Falha ao gravar o fim: o vigia recupera a tarefa pelo heartbeat
+                print(f"⚠️ Falha ao finalizar tarefa {tarefa['id']}: {e}")
+
+    async def _executar(self, tarefa: Dict[str, Any], trabalhador: str) -> None:
+        settings = get_settings()
+        tipo = TIPOS_TAREFA.get(tarefa["tipo"])
+        if tipo is None:
+            await _atualizar(tarefa["id"], trabalhador, {
+                "status": "falhou", "erro": f"Tipo de tarefa desconhecido: {tarefa['tipo']}",
+                "concluida_em": _agora(),
+            })
+            return
+
+        contexto = ContextoTarefa()
+        execucao = asyncio.create_task(tipo.executar(tarefa["parametros"] or {}, contexto))
+        cancelada = perdida = False
+        try:
+            while not execucao.done():
+                await asyncio.wait({execucao}, timeout=settings.tarefas_heartbeat_segundos)
+                if execucao.done():
+                    break
+                try:
+                    atual = await _atualizar(
+                        tarefa["id"], trabalhador, {"heartbeat_em": _agora(), **_dados_progresso(contexto)}
+                    )
+                except Exception as e:
+                    # Falha passageira do banco: tenta de novo no próximo tick
+                    print(f"⚠️ Falha no heartbeat da tarefa {tarefa['id']}: {e}")
+                    continue
+                # None: recuperada pelo vigia (heartbeat atrasado) e talvez já com
+                # outro trabalhador; interrompe e não grava mais nada nela
+                perdida = atual is None
+                if (perdida or atual["cancelamento_solicitado"]) and not cancelada:
+                    cancelada = True
+                    execucao.cancel()
+                if perdida:
+                    break
+        except asyncio.CancelledError:
+            # Processo desligando: interrompe e devolve à fila sem gastar tentativa
+            execucao.cancel()
+            await asyncio.gather(execucao, return_exceptions=True)
+            await _atualizar(tarefa["id"], trabalhador, {
+                "status": "pendente", "trabalhador": None, "tentativas": tarefa["tentativas"] - 1,
+                **_dados_progresso(contexto),
+            })
+            raise
+        except BaseException:
+            # Nenhum caminho pode deixar a execução rodando sem dono
+            execucao.cancel()
+            await asyncio.gather(execucao, return_exceptions=True)
+            raise
+
+        if perdida:
+            await asyncio.gather(execucao, return_exceptions=True)
+            print(f"⚠️ Tarefa {tarefa['id']} recuperada por outro trabalhador; resultado de {trabalhador} descartado")
+        elif execucao.cancelled():
+            await _atualizar(tarefa["id"], trabalhador, {
+                "status": "cancelada", "concluida_em": _agora(), **_dados_progresso(contexto)
+            })
+        elif execucao.exception() is not None:
+            erro = execucao.exception()
+            esgotada = tarefa["tentativas"] >= tarefa["max_tentativas"]
+            await _atualizar(tarefa["id"], trabalhador, {
+                "status": "falhou" if esgotada else "pendente",
+                "erro": f"{type(erro).__name__}: {erro}",
+                "trabalhador": None,
+                "concluida_em": _agora() if esgotada else None,
+                **_dados_progresso(contexto),
+            })
+        else:
+            await _atualizar(tarefa["id"], trabalhador, {
+                "status": "concluida", "resultado": execucao.result(), "concluida_em": _agora(),
+                **_dados_progresso(contexto),
+            })
+
+
+_pool: Optional[PoolTrabalhadores] = None
+
+
+def iniciar_trabalhadores() -> None:
+    """Chamado no startup (lifespan); tarefas_trabalhadores=0 desliga"""
+    global _pool
+    tamanho = get_settings().tarefas_trabalhadores
+    if tamanho > 0 and _pool is None:
+        _pool = PoolTrabalhadores(tamanho)
+        _pool.iniciar()
+        print(f"⚙️ {tamanho} trabalhador(es) de tarefas iniciado(s)")
+
+
+async def parar_trabalhadores() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.parar()
+        _pool = None
@@ -0,0 +1,113 @@
+"""
+📋 ÂNCORA: REGRA-NEGÓCIO - Serviços de apoio às turmas
+Contexto: Consultas agregadas e escopo por usuário compartilhados entre
+          endpoints de turmas, alunos e dashboard
+Cuidado: Mudou usuarios.coordenador_id (ou ativo/tipo de quem coordena)?
+         Chame invalidar_coordenacao() (ver endpoints/usuarios.py)
+Dependências: Funções SQL contar_alunos_ativos e professores_coordenados (ver SQL_CREATE_TABLES)
+"""
+
+import json
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+from app.services.cache_respostas import CacheRespostas, invalidar, invalidar_turmas, tag_coordenacao
+from app.services.escopo_escola import escola_atual, escopar
+
+# "escola_id:coordenador_id" -> professores (JSON), com tag coordenacao:<id>.
+# Mesmo LRU do cache de respostas: limitado em entradas e com versão contra
+# gravar uma leitura feita antes de uma invalidação concorrente
+_professores_coordenados: Optional[CacheRespostas] = None
+_professores_lock = threading.Lock()
+
+
+def _cache_coordenacao() -> CacheRespostas:
+    global _professores_coordenados
+    with _professores_lock:
+        if _professores_coordenados is None:
+            settings = get_settings()
+            _professores_coordenados = CacheRespostas(
+                settings.coordenacao_cache_max_entradas, settings.coordenacao_cache_ttl_segundos
+            )
+        return _professores_coordenados
+
+
+async def contar_alunos_ativos(turma_ids: Iterable[str]) -> Dict[str, int]:
+    """
+    Conta alunos ativos de várias turmas em uma única consulta agregada
+    Retorna mapa turma_id -> total (turmas sem alunos ficam com 0)
+    """
+    ids = [str(turma_id) for turma_id in turma_ids]
+    if not ids:
+        return {}
+    
+    supabase = get_supabase()
+    
+    # 🚨 ÂNCORA: CRÍTICO - Evita N+1 na listagem de turmas
+    # Contexto: Uma chamada RPC com GROUP BY substitui um count por turma
+    result = await executar(supabase.rpc("contar_alunos_ativos", {"turma_ids": ids}))
+    
+    contagens = {turma_id: 0 for turma_id in ids}
+    for linha in result.data or []:
+        contagens[str(linha["turma_id"])] = linha["total"] or 0
+    
+    return contagens
+
+
+async def professores_coordenados(coordenador_id: str) -> List[str]:
+    """
+    Professores sob o coordenador (em qualquer nível da hierarquia de
+    usuarios.coordenador_id) na escola da requisição, em cache até
+    invalidar_coordenacao() ou o TTL
+    """
+    escola_id, coordenador_id = escola_atual(), str(coordenador_id)
+    cache = _cache_coordenacao()
+    chave = f"{escola_id}:{coordenador_id}"
+    versao = cache.versao
+    em_cache = cache.obter(chave)
+    if em_cache is not None:
+        return json.loads(em_cache.corpo)
+
+    result = await executar(get_supabase().rpc(
+        "professores_coordenados", {"p_coordenador_id": coordenador_id, "p_escola_id": escola_id}
+    ))
+    professores = sorted({str(linha["professor_id"]) for linha in result.data or []})
+    cache.guardar(chave, json.dumps(professores).encode(), "", [tag_coordenacao(coordenador_id)], versao)
+    return professores
+
+
+def invalidar_coordenacao(*coordenador_ids: str) -> None:
+    """
+    Esquece os professores dos coordenadores e as listagens de turmas em
+    cache deles. Sem argumentos, todos os coordenadores e todas as listagens
+    (invalidar_turmas(listas=True)): o caso de escritas em usuarios, porque a
+    hierarquia é recursiva e quem coordena o coordenador afetado também muda
+    """
+    tags = [tag_coordenacao(c) for c in coordenador_ids]
+    if tags:
+        _cache_coordenacao().invalidar(*tags)
+        invalidar(*tags)
+    else:
+        _cache_coordenacao().limpar()
+        invalidar_turmas(listas=True)  # Todas as listagens, de qualquer coordenador
+
+
+async def filtrar_por_usuario(query, usuario_id: Optional[str], usuario_tipo: Optional[str]):
+    """
+    Aplica à query de turmas o que o usuário logado pode ver
+    (mesma regra na listagem de turmas e no dashboard), na escola da requisição
+    """
+    query = escopar(query)
+    if usuario_tipo == "professor" and usuario_id:
+        # Professor vê apenas suas turmas
+        return query.eq("professor_id", usuario_id)
+    if usuario_tipo == "coordenador" and usuario_id:
+        # 🚨 ÂNCORA: CRÍTICO - Coordenador vê turmas dos professores que coordena
+        # (e as próprias, se também dá aula). O filtro vai para o banco
+        # (idx_turmas_professor_listagem): só a fatia dele é lida
+        professores = await professores_coordenados(usuario_id)
+        return query.in_("professor_id", [str(usuario_id), *professores])
+    # Admin vê tudo da escola (ou todas, sem escola na requisição)
+    return query
@@ -0,0 +1,160 @@
+"""
+Benchmark da busca de alunos (índice de prefixos em memória)
+Colégio Solare - Sistema de Avaliação
+
+Monta alunos sintéticos com os nomes de scripts/gerar_dados_sinteticos.py
+(poucos nomes muito repetidos: "joao" casa com milhares de alunos, o pior
+caso do índice) e mede, por termo, a latência p50/p95 de:
+
+  varredura  normaliza e compara cada aluno a cada busca (o que um
+             ILIKE '%termo%' sem índice faz no banco)
+  índice     services/busca_alunos.IndicePrefixos (bisect nas faixas de prefixo)
+
+Mede também a construção do índice e o custo de registrar um aluno (escrita
+pelos endpoints). Não usa banco: o fallback por trigramas roda no Postgres
+sobre os índices GIN idx_alunos_busca_*.
+
+Uso:
+    python scripts/benchmark_busca_alunos.py
+    python scripts/benchmark_busca_alunos.py --alunos 200000 --repeticoes 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+TERMOS = ["joao sil", "Luíza", "ana sou", "maria", "helena oliv", "2025000", "20250012", "2025 0000 42", "xyz"]
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+def print_error(msg):
+    print(f"{Colors.RED}✗ {msg}{Colors.END}")
+
+
+def gerar_alunos(quantidade: int, turmas: int, rng: random.Random) -> List[Dict]:
+    from scripts.gerar_dados_sinteticos import NOMES, SOBRENOMES
+
+    turma_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(turmas)]
+    return [{
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "matricula": f"2025{i:07d}",
+        "nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}",
+        "turma_id": turma_ids[i % turmas],
+        "responsavel_nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}",
+        "ativo": rng.random() > 0.05,
+    } for i in range(quantidade)]
+
+
+def varredura(alunos: List[Dict], termo: str, limite: int = 20) -> List[Dict]:
+    """Sem índice: cada palavra do termo contida em nome/responsável ou matrícula com o prefixo"""
+    from app.services.busca_alunos import normalizar
+
+    palavras = normalizar(termo).split()
+    junto = "".join(palavras)
+    resultados = []
+    for aluno in alunos:
+        if not aluno["ativo"]:
+            continue
+        texto = normalizar(f"{aluno['nome']} {aluno['responsavel_nome']}")
+        if normalizar(aluno["matricula"]).startswith(junto) or all(p in texto for p in palavras):
+            resultados.append(aluno)
+    resultados.sort(key=lambda a: a["nome"])
+    return resultados[:limite]
+
+
+def percentis(tempos: List[float]):
+    ordenados = sorted(tempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
+    return statistics.median(ordenados) * 1000, p95 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mede a busca de alunos com e sem o índice de prefixos",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--alunos", type=int, default=100_000)
+    parser.add_argument("--turmas", type=int, default=4_000)
+    parser.add_argument("--repeticoes", type=int, default=30)
+    parser.add_argument("--repeticoes-varredura", type=int, default=3)
+    parser.add_argument("--meta-ms", type=float, default=20.0, help="p95 máximo aceito no índice")
+    args = parser.parse_args()
+
+    from app.services.busca_alunos import IndicePrefixos
+
+    rng = random.Random(42)
+    alunos = gerar_alunos(args.alunos, args.turmas, rng)
+    print_info(f"{len(alunos):,} alunos sintéticos")
+
+    inicio = time.perf_counter()
+    indice = IndicePrefixos.construir(alunos)
+    print_info(f"Construção do índice: {time.perf_counter() - inicio:.2f}s")
+
+    tempos_registro = []
+    for aluno in rng.sample(alunos, 200):
+        inicio = time.perf_counter()
+        indice.registrar({**aluno, "nome": aluno["nome"] + " Neto"})
+        tempos_registro.append(time.perf_counter() - inicio)
+    p50, p95 = percentis(tempos_registro)
+    print_info(f"Registrar aluno (escrita): p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+
+    print("\n" + "=" * 92)
+    print(f"{'Termo':<16} | {'Resultados':>10} | {'Varredura p50':>13} | {'Índice p50':>10} | "
+          f"{'Índice p95':>10} | {'Ganho':>7} | Primeiro")
+    print("-" * 92)
+    pior_p95 = 0.0
+    for termo in TERMOS:
+        tempos_varredura = []
+        for _ in range(args.repeticoes_varredura):
+            inicio = time.perf_counter()
+            varredura(alunos, termo)
+            tempos_varredura.append(time.perf_counter() - inicio)
+        tempos_indice = []
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            resultados = indice.buscar(termo)
+            tempos_indice.append(time.perf_counter() - inicio)
+        varredura_p50, _ = percentis(tempos_varredura)
+        indice_p50, indice_p95 = percentis(tempos_indice)
+        pior_p95 = max(pior_p95, indice_p95)
+        primeiro = f"{resultados[0]['nome']} ({resultados[0]['campo']})" if resultados else "-"
+        print(f"{termo:<16} | {len(resultados):>10} | {varredura_p50:>10.1f} ms | {indice_p50:>7.2f} ms | "
+              f"{indice_p95:>7.2f} ms | {varredura_p50 / indice_p50:>6.0f}x | {primeiro}")
+    print("=" * 92)
+
+    if pior_p95 <= args.meta_ms:
+        print_success(f"Pior p95 no índice: {pior_p95:.2f} ms (meta {args.meta_ms:.0f} ms)")
+    else:
+        print_error(f"Pior p95 no índice: {pior_p95:.2f} ms acima da meta de {args.meta_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
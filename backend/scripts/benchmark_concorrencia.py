@@ -0,0 +1,102 @@
+"""
+Benchmark de concorrência dos endpoints async
+Mede a vazão (requisições/s) de GET /alunos/turma/{id} conforme aumenta o
+número de requisições simultâneas, comparando a execução bloqueante
+(.execute() direto no event loop) com o pool de threads de `executar`.
+
+Uso:
+    python scripts/benchmark_concorrencia.py --latencia-ms 30
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def configurar_ambiente(latencia_ms: float) -> None:
+    """Aponta get_supabase() para o banco local com latência bloqueante injetada"""
+    os.environ["BANCO_LOCAL"] = "true"
+    os.environ["BANCO_LOCAL_LATENCIA_MS"] = str(latencia_ms)
+    os.environ["CACHE_RESPOSTAS_ATIVO"] = "false"  # Mede as consultas, não o cache de respostas
+    os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+    os.environ.setdefault("SUPABASE_KEY", "local")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+def popular_turma(banco) -> str:
+    banco.limpar()
+    turma = banco.inserir("turmas", [{
+        "serie": "1º Ano", "turma": "A", "ano_letivo": 2025, "periodo": "manha", "nivel": "fundamental"
+    }])[0]
+    banco.inserir("alunos", [
+        {
+            "matricula": f"2025{i:04d}",
+            "nome": f"Aluno {i:02d}",
+            "data_nascimento": "2019-05-10",
+            "turma_id": turma["id"],
+        }
+        for i in range(28)
+    ])
+    return turma["id"]
+
+
+async def _executar_bloqueante(query):
+    """Comportamento anterior: .execute() síncrono dentro do event loop"""
+    return query.execute()
+
+
+async def medir_vazao(listar_alunos_turma, turma_id: str, em_voo: int, total: int) -> float:
+    from starlette.requests import Request
+
+    fila = asyncio.Queue()
+    for _ in range(total):
+        fila.put_nowait(None)
+
+    async def trabalhador():
+        while not fila.empty():
+            fila.get_nowait()
+            await listar_alunos_turma(Request({"type": "http", "headers": []}), turma_id, apenas_ativos=True)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(em_voo)))
+    return total / (time.perf_counter() - inicio)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latencia-ms", type=float, default=30.0, help="Latência simulada por consulta")
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--em-voo", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    configurar_ambiente(args.latencia_ms)
+
+    from app.api.endpoints import alunos
+    from app.models import database
+    from app.models.postgrest_local import get_banco_local
+
+    turma_id = popular_turma(get_banco_local())
+    executar_original = alunos.executar
+
+    print(f"Latência simulada por consulta: {args.latencia_ms:.1f} ms (2 consultas por requisição)")
+    print(f"Pool de threads: {database.get_settings().db_max_concorrencia} workers\n")
+    print(f"{'em voo':>8} {'bloqueante (req/s)':>20} {'executar (req/s)':>18}")
+
+    for em_voo in args.em_voo:
+        alunos.executar = _executar_bloqueante
+        bloqueante = await medir_vazao(alunos.listar_alunos_turma, turma_id, em_voo, args.requisicoes)
+        alunos.executar = executar_original
+        offload = await medir_vazao(alunos.listar_alunos_turma, turma_id, em_voo, args.requisicoes)
+        print(f"{em_voo:>8} {bloqueante:>20.1f} {offload:>18.1f}")
+
+    database.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+"""
+Benchmark da consolidação trimestral
+Compara o motor vetorizado (app.services.consolidacao) com a abordagem
+anterior de laços por aluno/categoria, conferindo que os resultados batem.
+
+Uso:
+    python scripts/benchmark_consolidacao.py
+    python scripts/benchmark_consolidacao.py --escola-alunos 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.config import CATEGORIAS_FUNDAMENTAL
+from app.services.consolidacao import (
+    montar_matriz, calcular_agregados, consolidar, LIMIAR_TENDENCIA, MIN_PONTOS_TENDENCIA
+)
+
+
+def gerar_registros(n_alunos: int, n_dias: int, categorias, seed: int = 7):
+    """Linhas no formato devolvido pelo PostgREST (com tags embutidas)"""
+    rng = random.Random(seed)
+    alunos = [f"aluno-{i:05d}" for i in range(n_alunos)]
+    tags = [{"tag_id": f"tag-{t}", "tags": {"nome": f"Tag {t}", "tipo": "neutra"}} for t in range(10)]
+    inicio = date(2025, 2, 3)
+    registros = []
+    for aluno in alunos:
+        base = rng.uniform(1.2, 2.8)
+        for d in range(n_dias):
+            registros.append({
+                "aluno_id": aluno,
+                "data_avaliacao": (inicio + timedelta(days=d)).isoformat(),
+                "campos_avaliados": {
+                    c: min(3, max(1, round(base - d * 0.01 + rng.uniform(-0.8, 0.8))))
+                    for c in categorias
+                },
+                "observacao_livre": None,
+                "avaliacao_tags": rng.sample(tags, rng.randint(0, 2)),
+            })
+    return alunos, registros
+
+
+def consolidar_por_aluno(alunos, registros, categorias):
+    """Referência: laços Python por aluno, categoria e dia (abordagem anterior)"""
+    por_aluno = {}
+    for registro in registros:
+        por_aluno.setdefault(registro["aluno_id"], []).append(registro)
+    dias = sorted({r["data_avaliacao"] for r in registros})
+    pos_dia = {d: i for i, d in enumerate(dias)}
+
+    resultado = {}
+    for aluno in alunos:
+        avaliacoes = sorted(por_aluno.get(aluno, []), key=lambda r: r["data_avaliacao"])
+        categorias_aluno = {}
+        for categoria in categorias:
+            pontos = [
+                (pos_dia[r["data_avaliacao"]], r["campos_avaliados"][categoria])
+                for r in avaliacoes if categoria in r["campos_avaliados"]
+            ]
+            if not pontos:
+                continue
+            n = len(pontos)
+            distribuicao = {str(k): sum(1 for _, v in pontos if v == k) for k in (1, 2, 3)}
+            media = sum(v for _, v in pontos) / n
+            tendencia = "insuficiente"
+            if n >= MIN_PONTOS_TENDENCIA:
+                # Mesma regressão em inteiros, aluno a aluno
+                sx = sum(x for x, _ in pontos)
+                sy = sum(y for _, y in pontos)
+                sxx = sum(x * x for x, _ in pontos)
+                sxy = sum(x * y for x, y in pontos)
+                denominador = n * sxx - sx * sx
+                if denominador > 0:
+                    numerador = (n * sxy - sx * sy) * max(len(dias) - 1, 1)
+                    tendencia = ("melhorando" if numerador <= -LIMIAR_TENDENCIA * denominador
+                                 else "regredindo" if numerador >= LIMIAR_TENDENCIA * denominador
+                                 else "estavel")
+            categorias_aluno[categoria] = {
+                "distribuicao": distribuicao,
+                "media": round(media, 2),
+                "tendencia": tendencia,
+            }
+        resultado[aluno] = categorias_aluno
+    return resultado
+
+
+def medir(funcao, repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+
+def executar_cenario(nome: str, n_alunos: int, n_dias: int, repeticoes: int) -> None:
+    categorias = CATEGORIAS_FUNDAMENTAL
+    alunos, registros = gerar_registros(n_alunos, n_dias, categorias)
+
+    matriz = montar_matriz(alunos, registros, categorias)
+    vetorizado = consolidar(matriz, 1, 2025)
+    referencia = consolidar_por_aluno(alunos, registros, categorias)
+    divergencias = sum(
+        1
+        for aluno in alunos
+        for categoria, esperado in referencia[aluno].items()
+        if any(vetorizado[aluno]["categorias"][categoria][k] != v for k, v in esperado.items())
+    )
+
+    t_montar = medir(lambda: montar_matriz(alunos, registros, categorias), repeticoes)
+    t_numerico = medir(lambda: calcular_agregados(matriz), repeticoes)
+    t_agregar = medir(lambda: consolidar(matriz, 1, 2025), repeticoes)
+    t_laco = medir(lambda: consolidar_por_aluno(alunos, registros, categorias), max(1, repeticoes // 3))
+
+    print(f"\n{nome}: {n_alunos} alunos × {n_dias} dias × {len(categorias)} categorias "
+          f"({len(registros):,} avaliações)")
+    print(f"  desempacotar JSONB → matriz : {t_montar:9.1f} ms")
+    print(f"  agregados vetorizados       : {t_numerico:9.1f} ms")
+    print(f"  agregados + JSON por aluno  : {t_agregar:9.1f} ms")
+    print(f"  total vetorizado            : {t_montar + t_agregar:9.1f} ms")
+    print(f"  laços por aluno (anterior)  : {t_laco:9.1f} ms  ({t_laco / (t_montar + t_agregar):.1f}x)")
+    print(f"  divergências                : {divergencias}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dias", type=int, default=60)
+    parser.add_argument("--turma-alunos", type=int, default=30)
+    parser.add_argument("--escola-alunos", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    executar_cenario("Turma", args.turma_alunos, args.dias, args.repeticoes)
+    executar_cenario("Escola", args.escola_alunos, args.dias, max(1, args.repeticoes // 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark do envio em lote dos relatórios aos responsáveis
+Colégio Solare - Sistema de Avaliação
+
+Gera uma escola sintética no banco local em memória, grava um relatório
+aprovado por aluno e envia a escola inteira para servidores SMTP/HTTP locais
+(app/services/envio_local.py) por canal: email (sessões SMTP reaproveitadas),
+whatsapp (uma requisição por mensagem em conexões keep-alive), api (lotes
+em JSON) e a preferência padrão email → whatsapp (um terço dos responsáveis
+sem e-mail). Os cenários com erro recusam uma fração das mensagens (451 no
+SMTP, 429 no HTTP) para medir o custo das retentativas.
+
+As taxas por minuto dos canais ficam altas (--taxa) para medir o próprio
+pipeline; em produção o limite do provedor é quem define a vazão.
+
+Uso:
+    python scripts/benchmark_envio_relatorios.py
+    python scripts/benchmark_envio_relatorios.py --turmas 80 --alunos-por-turma 25 --taxa-erro 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["BANCO_LOCAL"] = "true"
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Mede o envio dos relatórios da escola por canal",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--turmas", type=int, default=40)
+    parser.add_argument("--alunos-por-turma", type=int, default=25)
+    parser.add_argument("--taxa", type=int, default=1_000_000, help="Mensagens por minuto por canal")
+    parser.add_argument("--taxa-erro", type=float, default=0.05)
+    parser.add_argument("--latencia-ms", type=float, default=2.0, help="Latência simulada do servidor")
+    args = parser.parse_args()
+
+    from app.services.envio_local import ServidoresEnvioLocal
+
+    servidores = ServidoresEnvioLocal(latencia_ms=args.latencia_ms, seed=42).iniciar()
+    os.environ.update(servidores.variaveis_ambiente())
+    for canal in ("email", "whatsapp", "api"):
+        os.environ[f"ENVIO_TAXA_{canal.upper()}"] = str(args.taxa)
+    os.environ["ENVIO_BACKOFF_SEGUNDOS"] = "0.05"
+
+    from scripts.gerar_dados_sinteticos import DestinoBanco, gerar
+    from app.config import get_settings
+    from app.models.postgrest_local import get_banco_local
+    from app.services.canais_envio import fechar_canais
+    from app.services.envio_relatorios import enviar_relatorios_escola
+
+    get_settings.cache_clear()
+    dados = argparse.Namespace(
+        escolas=1, turmas_por_escola=args.turmas, alunos_por_turma=args.alunos_por_turma,
+        dias=1, tags_por_professor=5, prob_tag=0.1, ano=2025, seed=42,
+    )
+    print_info(f"Gerando escola sintética: {args.turmas * args.alunos_por_turma} alunos")
+    await gerar(dados, DestinoBanco(1000, 4))
+    banco = get_banco_local()
+    escola_id = banco.selecionar("escolas", lambda e: True)[0]["id"]
+
+    alunos = banco.selecionar("alunos", lambda a: True)
+    banco.inserir("relatorios", [{
+        "id": str(uuid.uuid4()), "aluno_id": aluno["id"], "trimestre": 1, "ano": 2025,
+        "texto_final": f"{aluno['nome']} teve um trimestre de bom desenvolvimento. " * 8,
+        "dados_consolidados": {}, "status": "aprovado", "aprovado_em": "2025-04-30T12:00:00+00:00",
+        "pdf_url": f"/arquivos/relatorios/{aluno['id']}.pdf",
+    } for aluno in alunos])
+    sem_email = {aluno["id"] for aluno in alunos[::3]}
+    banco.atualizar("alunos", lambda a: a["id"] in sem_email, {"responsavel_email": None})
+
+    cenarios = [
+        ("Email", ["email"], 0.0),
+        ("WhatsApp", ["whatsapp"], 0.0),
+        ("API em lote", ["api"], 0.0),
+        ("Email → WhatsApp", ["email", "whatsapp"], 0.0),
+        (f"Email → WhatsApp {args.taxa_erro:.0%} erro", ["email", "whatsapp"], args.taxa_erro),
+        (f"API {args.taxa_erro:.0%} erro", ["api"], args.taxa_erro),
+    ]
+    print("\n" + "=" * 104)
+    print(f"{'Cenário':<28} | {'Enviados':>8} | {'Sem contato':>11} | {'Por canal':<26} | {'Retent.':>7} | "
+          f"{'Falhas':>6} | {'Msgs/min':>9}")
+    print("-" * 104)
+    for rotulo, canais, taxa_erro in cenarios:
+        servidores.taxa_erro = taxa_erro
+        resultado = await enviar_relatorios_escola(escola_id, 1, 2025, canais=canais, reenviar=True)
+        por_canal = ", ".join(f"{canal} {total}" for canal, total in sorted(resultado.por_canal.items()))
+        print(f"{rotulo:<28} | {resultado.enviados:>8} | {resultado.sem_contato:>11} | {por_canal:<26} | "
+              f"{resultado.retentativas:>7} | {len(resultado.falhas):>6} | {resultado.mensagens_por_minuto:>9,.0f}")
+    print("=" * 104)
+
+    await fechar_canais()
+    servidores.parar()
+    print_info(f"Servidores locais: {servidores.contagem}")
+    print_info(f"Linhas em envios: {len(banco.selecionar('envios', lambda e: True))}")
+    print_success("Benchmark concluído")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
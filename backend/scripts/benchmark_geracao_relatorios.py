@@ -0,0 +1,102 @@
+"""
+Benchmark da geração de relatórios em lote
+Colégio Solare - Sistema de Avaliação
+
+Gera uma escola sintética no banco local em memória e mede a vazão
+(relatórios por minuto) da geração com o provedor LLM simulado, variando
+a concorrência permitida. Nenhuma chamada externa é feita.
+
+Uso:
+    python scripts/benchmark_geracao_relatorios.py
+    python scripts/benchmark_geracao_relatorios.py --turmas 20 --latencia-ms 2000 --concorrencia 8 32 128
+    python scripts/benchmark_geracao_relatorios.py --taxa-erro 0.1 --tpm 200000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["BANCO_LOCAL"] = "true"
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Mede a vazão da geração de relatórios com o provedor simulado",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--turmas", type=int, default=8)
+    parser.add_argument("--alunos-por-turma", type=int, default=25)
+    parser.add_argument("--dias", type=int, default=20)
+    parser.add_argument("--latencia-ms", type=float, default=1500.0, help="Latência simulada por chamada")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="Fração de chamadas com 429 simulado")
+    parser.add_argument("--tpm", type=int, default=10_000_000, help="Limite de tokens por minuto")
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    os.environ["LLM_LOCAL_LATENCIA_MS"] = str(args.latencia_ms)
+    os.environ["LLM_LOCAL_TAXA_ERRO"] = str(args.taxa_erro)
+    os.environ["LLM_TPM_LOCAL"] = str(args.tpm)
+    os.environ["LLM_BACKOFF_SEGUNDOS"] = "0.2"
+
+    from scripts.gerar_dados_sinteticos import DestinoBanco, gerar
+    from app.config import get_settings
+    from app.models.postgrest_local import get_banco_local
+    from app.services import provedores_llm
+    from app.services.geracao_relatorios import gerar_relatorios_escola
+
+    dados = argparse.Namespace(
+        escolas=1, turmas_por_escola=args.turmas, alunos_por_turma=args.alunos_por_turma,
+        dias=args.dias, tags_por_professor=10, prob_tag=0.3, ano=2025, seed=42,
+    )
+    print_info(f"Gerando escola sintética: {args.turmas * args.alunos_por_turma} alunos, {args.dias} dias")
+    await gerar(dados, DestinoBanco(1000, 4))
+    escola_id = get_banco_local().selecionar("escolas", lambda e: True)[0]["id"]
+
+    print("\n" + "=" * 60)
+    print(f"{'Concorrência':>12} | {'Gerados':>8} | {'Falhas':>6} | {'Tempo':>8} | {'Relatórios/min':>14}")
+    print("-" * 60)
+    for concorrencia in args.concorrencia:
+        os.environ["LLM_CONCORRENCIA_LOCAL"] = str(concorrencia)
+        get_settings.cache_clear()
+        provedores_llm._provedores.clear()
+        provedores_llm._limitadores.clear()
+
+        inicio = time.perf_counter()
+        resultado = await gerar_relatorios_escola(
+            escola_id, 1, 2025, provedor="local", modelo="simulado", sobrescrever=True, ignorar_cache=True,
+            modo="llm"
+        )
+        decorrido = time.perf_counter() - inicio
+        print(f"{concorrencia:>12} | {resultado.gerados:>8} | {len(resultado.falhas):>6} | "
+              f"{decorrido:>7.1f}s | {resultado.relatorios_por_minuto:>14,.1f}")
+    print("=" * 60)
+    print_success("Benchmark concluído")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
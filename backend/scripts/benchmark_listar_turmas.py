@@ -0,0 +1,119 @@
+"""
+Benchmark da listagem de turmas (GET /api/v1/turmas)
+Mostra que a latência fica estável conforme o número de turmas cresce,
+já que a contagem de alunos é feita em uma única consulta agregada, e que
+as repetições servidas pelo cache de respostas (ETag) não vão ao banco.
+
+Uso:
+    python scripts/benchmark_listar_turmas.py --latencia-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def configurar_ambiente(latencia_ms: float) -> None:
+    """Aponta get_supabase() para o banco local com latência injetada"""
+    os.environ["BANCO_LOCAL"] = "true"
+    os.environ["BANCO_LOCAL_LATENCIA_MS"] = str(latencia_ms)
+    os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+    os.environ.setdefault("SUPABASE_KEY", "local")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+def popular_turmas(banco, num_turmas: int, alunos_por_turma: int = 25) -> None:
+    banco.limpar()
+    turmas = banco.inserir("turmas", [
+        {
+            "serie": f"{i // 4 + 1}º Ano",
+            "turma": "ABCD"[i % 4],
+            "ano_letivo": 2025,
+            "periodo": "manha",
+            "nivel": "fundamental",
+            "capacidade_maxima": 30,
+        }
+        for i in range(num_turmas)
+    ])
+    banco.inserir("alunos", [
+        {
+            "matricula": f"{t:04d}{i:02d}",
+            "nome": f"Aluno {t}-{i}",
+            "data_nascimento": "2019-05-10",
+            "turma_id": turma["id"],
+        }
+        for t, turma in enumerate(turmas)
+        for i in range(alunos_por_turma)
+    ])
+
+
+async def listar(listar_turmas, etag=None):
+    from starlette.requests import Request
+
+    cabecalhos = [(b"if-none-match", etag.encode())] if etag else []
+    return await listar_turmas(
+        Request({"type": "http", "method": "GET", "headers": cabecalhos}),
+        nivel=None, periodo=None, ano_letivo=None, ativo=True,
+        usuario_id=None, usuario_tipo=None
+    )
+
+
+async def medir(listar_turmas, banco, num_turmas: int, repeticoes: int):
+    from app.services.cache_respostas import invalidar_turmas
+
+    popular_turmas(banco, num_turmas)
+
+    # Sem cache: toda listagem consulta o banco
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        invalidar_turmas(listas=True)
+        resposta = await listar(listar_turmas)
+    duracao_ms = (time.perf_counter() - inicio) * 1000 / repeticoes
+    round_trips = banco.requisicoes // repeticoes
+    assert len(json.loads(resposta.body)) == num_turmas
+
+    # Repetições: corpo pronto da memória e 304 com If-None-Match
+    banco.requisicoes = 0
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resposta = await listar(listar_turmas)
+    repetida_ms = (time.perf_counter() - inicio) * 1000 / repeticoes
+    nao_modificada = await listar(listar_turmas, resposta.headers["etag"])
+    assert nao_modificada.status_code == 304 and banco.requisicoes == 0
+    return duracao_ms, round_trips, repetida_ms
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latencia-ms", type=float, default=20.0, help="Latência simulada por round trip")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--turmas", type=int, nargs="+", default=[10, 30, 60, 120, 240])
+    args = parser.parse_args()
+
+    configurar_ambiente(args.latencia_ms)
+
+    from app.api.endpoints.turmas import listar_turmas
+    from app.models.database import fechar_conexoes
+    from app.models.postgrest_local import get_banco_local
+
+    banco = get_banco_local()
+
+    print(f"Latência simulada por round trip: {args.latencia_ms:.1f} ms\n")
+    print(f"{'turmas':>8} {'round trips':>12} {'latência (ms)':>14} {'N+1 estimado (ms)':>18} {'repetida (ms)':>14}")
+    for num_turmas in args.turmas:
+        duracao_ms, round_trips, repetida_ms = await medir(listar_turmas, banco, num_turmas, args.repeticoes)
+        estimado_n1 = (num_turmas + 1) * args.latencia_ms
+        print(f"{num_turmas:>8} {round_trips:>12} {duracao_ms:>14.1f} {estimado_n1:>18.1f} {repetida_ms:>14.2f}")
+
+    fechar_conexoes()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+"""
+Benchmark das partições anuais de avaliacoes
+Colégio Solare - Sistema de Avaliação
+
+Carrega no banco local em memória 1, 2 e 4 anos de histórico sintético
+(scripts/gerar_dados_sinteticos.py, --dias por ano) e mede, com e sem poda
+de partições, a latência p50/p95 dos caminhos quentes do ano corrente:
+
+  consolidação  avaliações do trimestre corrente de uma turma, com tags
+                embutidas (services/consolidacao.carregar_avaliacoes)
+  dashboard     função resumo_dashboard do último dia letivo
+
+Sem poda, o custo cresce com o histórico; com poda, as consultas leem só a
+partição do ano corrente (o resto do crescimento no banco local vem das
+linhas do ano espalhadas num heap Python maior). Falha se, no maior
+histórico, a poda não ganhar pelo menos --ganho-minimo no p50. Por fim
+arquiva os anos encerrados (services/particoes_avaliacoes) e mede o tempo
+do arquivamento e os caminhos quentes depois dele.
+
+O banco local só reproduz a poda (leitura restrita à partição do ano). Os
+ganhos do BRIN em data_avaliacao e o plano real (Append só com a partição
+do ano) precisam ser conferidos com EXPLAIN no Postgres, carregando os CSVs
+de gerar_dados_sinteticos.py --destino csv --anos N.
+
+Uso:
+    python scripts/benchmark_particoes_avaliacoes.py
+    python scripts/benchmark_particoes_avaliacoes.py --anos 1 2 4 8 --dias 100 --repeticoes 20
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["BANCO_LOCAL"] = "true"
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("TAREFAS_TRABALHADORES", "0")
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+def print_error(msg):
+    print(f"{Colors.RED}✗ {msg}{Colors.END}")
+
+
+def percentis(tempos: List[float]):
+    ordenados = sorted(tempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
+    return statistics.median(ordenados) * 1000, p95 * 1000
+
+
+async def medir(consulta: Callable[[], Awaitable], repeticoes: int):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        await consulta()
+        tempos.append(time.perf_counter() - inicio)
+    return percentis(tempos)
+
+
+async def caminhos_quentes(args: argparse.Namespace) -> Dict[str, Callable[[], Awaitable]]:
+    """Consultas do ano corrente: consolidação de uma turma e dashboard do último dia letivo"""
+    from app.models.database import get_supabase, executar
+    from app.services.consolidacao import carregar_avaliacoes
+    from scripts.gerar_dados_sinteticos import dias_letivos, trimestre_da_data
+
+    supabase = get_supabase()
+    hoje = dias_letivos(args.ano, args.dias)[-1]
+    turmas = (await executar(supabase.table("turmas").select("id").order("id"))).data
+    alunos = [a["id"] for a in (await executar(
+        supabase.table("alunos").select("id").eq("turma_id", turmas[0]["id"])
+    )).data]
+    turma_ids = [t["id"] for t in turmas]
+
+    async def consolidacao():
+        return await carregar_avaliacoes(alunos, trimestre_da_data(hoje), args.ano)
+
+    async def dashboard():
+        return await executar(supabase.rpc("resumo_dashboard", {
+            "turma_ids": turma_ids, "p_data": hoje.isoformat(),
+            "p_trimestre": trimestre_da_data(hoje), "p_ano": args.ano,
+        }))
+
+    return {"consolidação": consolidacao, "dashboard": dashboard}
+
+
+async def executar_benchmark(args: argparse.Namespace) -> bool:
+    from app.models.postgrest_local import get_banco_local
+    from app.services.particoes_avaliacoes import arquivar_anos_encerrados
+    from scripts.gerar_dados_sinteticos import DestinoBanco, gerar
+
+    banco = get_banco_local()
+    linhas = []
+    for anos in args.anos:
+        banco.limpar()
+        gc.unfreeze()
+        banco.particionar = True
+        inicio = time.perf_counter()
+        contagem = await gerar(argparse.Namespace(
+            escolas=args.escolas, turmas_por_escola=args.turmas_por_escola,
+            alunos_por_turma=args.alunos_por_turma, dias=args.dias, anos=anos,
+            tags_por_professor=10, prob_tag=0.3, ano=args.ano, seed=42,
+        ), DestinoBanco(1000, 4))
+        print_info(f"{anos} ano(s): {contagem['avaliacoes']:,} avaliações, "
+                   f"{contagem.get('avaliacao_tags', 0):,} tags em {time.perf_counter() - inicio:.1f}s")
+
+        # As linhas do banco em memória não entram na medida: sem isso, cada
+        # coleta do GC percorre o histórico inteiro (custo que o Postgres não tem)
+        gc.collect()
+        gc.freeze()
+        consultas = await caminhos_quentes(args)
+        for nome, consulta in consultas.items():
+            banco.particionar = False
+            sem_p50, sem_p95 = await medir(consulta, args.repeticoes)
+            banco.particionar = True
+            com_p50, com_p95 = await medir(consulta, args.repeticoes)
+            linhas.append((f"{anos} ano(s)", nome, contagem["avaliacoes"], sem_p50, sem_p95, com_p50, com_p95))
+
+        if anos == max(args.anos) and anos > 1:
+            inicio = time.perf_counter()
+            resultado = await arquivar_anos_encerrados(anos_ativos=1)
+            print_info(f"Arquivamento de {len(resultado['arquivados'])} ano(s) "
+                       f"({resultado['avaliacoes']:,} avaliações): {(time.perf_counter() - inicio) * 1000:.0f} ms")
+            banco.particionar = False  # Sem poda: só o ano corrente sobrou na tabela
+            restantes = len(banco.tabelas["avaliacoes"])
+            for nome, consulta in consultas.items():
+                p50, p95 = await medir(consulta, args.repeticoes)
+                linhas.append(("arquivado", nome, restantes, p50, p95, p50, p95))
+
+    print("\n" + "=" * 96)
+    print(f"{'Histórico':<11} | {'Consulta':<12} | {'Avaliações':>10} | {'Sem poda p50':>12} | "
+          f"{'p95':>9} | {'Com poda p50':>12} | {'p95':>9} | {'Ganho':>6}")
+    print("-" * 96)
+    for historico, nome, total, sem_p50, sem_p95, com_p50, com_p95 in linhas:
+        print(f"{historico:<11} | {nome:<12} | {total:>10,} | {sem_p50:>9.1f} ms | {sem_p95:>6.1f} ms | "
+              f"{com_p50:>9.1f} ms | {com_p95:>6.1f} ms | {sem_p50 / com_p50:>5.1f}x")
+    print("=" * 96)
+
+    base = {nome: com_p95 for historico, nome, _, _, _, _, com_p95 in linhas if historico == f"{min(args.anos)} ano(s)"}
+    maior = {nome: (sem_p50 / com_p50, com_p95) for historico, nome, _, sem_p50, _, com_p50, com_p95 in linhas
+             if historico == f"{max(args.anos)} ano(s)"}
+    for nome in base:
+        print_info(f"{nome}: p95 com poda {base[nome]:.1f} ms ({min(args.anos)} ano) → "
+                   f"{maior[nome][1]:.1f} ms ({max(args.anos)} anos), ganho {maior[nome][0]:.1f}x")
+    return all(ganho >= args.ganho_minimo for ganho, _ in maior.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mede os caminhos quentes de avaliacoes com e sem poda de partições",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--anos", type=int, nargs="+", default=[1, 2, 4], help="Históricos a medir")
+    parser.add_argument("--dias", type=int, default=60, help="Dias letivos por ano")
+    parser.add_argument("--escolas", type=int, default=1)
+    parser.add_argument("--turmas-por-escola", type=int, default=8)
+    parser.add_argument("--alunos-por-turma", type=int, default=25)
+    parser.add_argument("--ano", type=int, default=date.today().year, help="Ano corrente")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--ganho-minimo", type=float, default=1.3,
+                        help="p50 sem poda / com poda exigido no maior histórico")
+    args = parser.parse_args()
+
+    if asyncio.run(executar_benchmark(args)):
+        print_success(f"Poda de partições ganha pelo menos {args.ganho_minimo}x com {max(args.anos)} anos de histórico")
+    else:
+        print_error(f"Poda de partições ganhou menos de {args.ganho_minimo}x com {max(args.anos)} anos de histórico")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark da renderização dos PDFs dos relatórios aprovados
+Colégio Solare - Sistema de Avaliação
+
+Gera uma escola sintética no banco local em memória, cria os rascunhos com
+o modelo de texto, aprova todos e mede a renderização dos PDFs da escola
+inteira com diferentes números de processos. Uma última rodada sem mudanças
+mostra a deduplicação por hash de conteúdo (nada é renderizado). Os PDFs
+vão para um diretório temporário.
+
+Uso:
+    python scripts/benchmark_pdf_relatorios.py
+    python scripts/benchmark_pdf_relatorios.py --turmas 80 --alunos-por-turma 25 --processos 1 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["BANCO_LOCAL"] = "true"
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+
+def imprimir(rotulo, resultado, decorrido):
+    print(f"{rotulo:<22} | {resultado.renderizados:>12} | {resultado.reaproveitados:>14} | "
+          f"{len(resultado.falhas):>6} | {resultado.bytes_gravados / 1e6:>6.1f} MB | {decorrido:>7.1f}s | "
+          f"{resultado.pdfs_por_minuto:>9,.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Mede a renderização dos PDFs da escola com o pool de processos",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--turmas", type=int, default=80)
+    parser.add_argument("--alunos-por-turma", type=int, default=25)
+    parser.add_argument("--dias", type=int, default=20)
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    os.environ["ARMAZENAMENTO_DIR"] = tempfile.mkdtemp(prefix="pdfs-")
+    os.environ["LLM_LOCAL_LATENCIA_MS"] = "1"
+
+    from scripts.gerar_dados_sinteticos import DestinoBanco, gerar
+    from app.config import get_settings
+    from app.models.postgrest_local import get_banco_local
+    from app.services import renderizacao_pdf
+    from app.services.geracao_relatorios import gerar_relatorios_escola
+
+    get_settings.cache_clear()
+    dados = argparse.Namespace(
+        escolas=1, turmas_por_escola=args.turmas, alunos_por_turma=args.alunos_por_turma,
+        dias=args.dias, tags_por_professor=10, prob_tag=0.3, ano=2025, seed=42,
+    )
+    print_info(f"Gerando escola sintética: {args.turmas * args.alunos_por_turma} alunos, {args.dias} dias")
+    await gerar(dados, DestinoBanco(1000, 4))
+    banco = get_banco_local()
+    escola_id = banco.selecionar("escolas", lambda e: True)[0]["id"]
+
+    print_info("Gerando e aprovando os rascunhos")
+    await gerar_relatorios_escola(escola_id, 1, 2025, provedor="local", modelo="simulado", modo="modelo")
+    banco.atualizar("relatorios", lambda r: True, {"status": "aprovado", "aprovado_em": "2025-04-30T12:00:00+00:00"})
+    print_info(f"PDFs em {get_settings().armazenamento_dir}")
+
+    print("\n" + "=" * 96)
+    print(f"{'Cenário':<22} | {'Renderizados':>12} | {'Reaproveitados':>14} | {'Falhas':>6} | "
+          f"{'Gravado':>9} | {'Tempo':>8} | {'PDFs/min':>9}")
+    print("-" * 96)
+    for processos in args.processos:
+        os.environ["PDF_PROCESSOS"] = str(processos)
+        get_settings.cache_clear()
+        renderizacao_pdf.encerrar_pool_pdf()
+        # Aquecimento: sobe os processos do pool fora da medição
+        await asyncio.gather(*(
+            asyncio.get_running_loop().run_in_executor(renderizacao_pdf._obter_pool(), time.sleep, 0.2)
+            for _ in range(processos)
+        ))
+        inicio = time.perf_counter()
+        resultado = await renderizacao_pdf.renderizar_pdfs_escola(escola_id, 1, 2025, forcar=True)
+        imprimir(f"{processos} processo(s)", resultado, time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    resultado = await renderizacao_pdf.renderizar_pdfs_escola(escola_id, 1, 2025)
+    imprimir("Sem mudanças (dedup)", resultado, time.perf_counter() - inicio)
+
+    alterado = banco.selecionar("relatorios", lambda r: True)[0]
+    banco.atualizar("relatorios", lambda r: r["id"] == alterado["id"], {"texto_final": alterado["texto_final"] + " "})
+    inicio = time.perf_counter()
+    resultado = await renderizacao_pdf.renderizar_pdfs_escola(escola_id, 1, 2025)
+    imprimir("1 relatório alterado", resultado, time.perf_counter() - inicio)
+    print("=" * 96)
+    renderizacao_pdf.encerrar_pool_pdf()
+    print_success("Benchmark concluído")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
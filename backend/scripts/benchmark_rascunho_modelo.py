@@ -0,0 +1,122 @@
+"""
+Benchmark do rascunho por modelo de texto x LLM
+Colégio Solare - Sistema de Avaliação
+
+Gera uma escola sintética no banco local em memória e compara a geração
+dos rascunhos só com o LLM simulado (modo "llm") e com o modelo de texto
+(modo "modelo": LLM só para dados incomuns). Mostra tempo, chamadas ao LLM,
+tokens e a origem de cada rascunho, além do custo por rascunho do modelo
+de texto isolado. Nenhuma chamada externa é feita.
+
+Uso:
+    python scripts/benchmark_rascunho_modelo.py
+    python scripts/benchmark_rascunho_modelo.py --turmas 20 --latencia-ms 2000
+    python scripts/benchmark_rascunho_modelo.py --modos llm modelo refinar --mostrar 2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ["BANCO_LOCAL"] = "true"
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Compara a geração de rascunhos com modelo de texto e só com LLM",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--turmas", type=int, default=8)
+    parser.add_argument("--alunos-por-turma", type=int, default=25)
+    parser.add_argument("--dias", type=int, default=20)
+    parser.add_argument("--latencia-ms", type=float, default=1500.0, help="Latência simulada por chamada")
+    parser.add_argument("--concorrencia", type=int, default=32, help="Chamadas simultâneas ao LLM")
+    parser.add_argument("--modos", nargs="+", default=["llm", "modelo"], choices=["llm", "modelo", "refinar"])
+    parser.add_argument("--mostrar", type=int, default=0, help="Imprime N rascunhos do modelo de texto")
+    args = parser.parse_args()
+
+    os.environ["LLM_LOCAL_LATENCIA_MS"] = str(args.latencia_ms)
+    os.environ["LLM_CONCORRENCIA_LOCAL"] = str(args.concorrencia)
+
+    from scripts.gerar_dados_sinteticos import DestinoBanco, gerar
+    from app.config import get_settings
+    from app.models.postgrest_local import get_banco_local
+    from app.services.geracao_relatorios import gerar_relatorios_escola
+    from app.services.rascunho_modelo import motivos_incomuns, redigir_rascunho
+
+    get_settings.cache_clear()
+    dados = argparse.Namespace(
+        escolas=1, turmas_por_escola=args.turmas, alunos_por_turma=args.alunos_por_turma,
+        dias=args.dias, tags_por_professor=10, prob_tag=0.3, ano=2025, seed=42,
+    )
+    print_info(f"Gerando escola sintética: {args.turmas * args.alunos_por_turma} alunos, {args.dias} dias")
+    await gerar(dados, DestinoBanco(1000, 4))
+    banco = get_banco_local()
+    escola_id = banco.selecionar("escolas", lambda e: True)[0]["id"]
+
+    print("\n" + "=" * 100)
+    print(f"{'Modo':<8} | {'Gerados':>7} | {'Chamadas LLM':>12} | {'Tokens':>9} | {'Tempo':>7} | "
+          f"{'Relatórios/min':>14} | Origem")
+    print("-" * 100)
+    for modo in args.modos:
+        inicio = time.perf_counter()
+        resultado = await gerar_relatorios_escola(
+            escola_id, 1, 2025, provedor="local", modelo="simulado", sobrescrever=True, ignorar_cache=True,
+            modo=modo
+        )
+        decorrido = time.perf_counter() - inicio
+        tokens = resultado.uso.tokens_prompt + resultado.uso.tokens_resposta
+        print(f"{modo:<8} | {resultado.gerados:>7} | {resultado.uso.geracoes:>12} | {tokens:>9,} | "
+              f"{decorrido:>6.1f}s | {resultado.relatorios_por_minuto:>14,.1f} | {resultado.por_origem}")
+    print("=" * 100)
+
+    # Modelo de texto isolado: custo por rascunho e motivos que mandam ao LLM
+    # Os rascunhos gravados guardam os dados_consolidados usados na geração
+    relatorios = banco.selecionar("relatorios", lambda r: r["trimestre"] == 1 and r["ano"] == 2025)
+    alunos = {a["id"]: a["nome"] for a in banco.selecionar("alunos", lambda a: True)}
+    entradas = [(alunos.get(r["aluno_id"], ""), r["dados_consolidados"]) for r in relatorios]
+    motivos = {}
+    for _, dados_aluno in entradas:
+        for motivo in motivos_incomuns(dados_aluno):
+            chave = motivo.split(" ", 1)[1] if motivo[0].isdigit() else motivo
+            motivos[chave] = motivos.get(chave, 0) + 1
+    repeticoes = 20
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for nome, dados_aluno in entradas:
+            redigir_rascunho(nome, dados_aluno)
+    por_rascunho = (time.perf_counter() - inicio) / (repeticoes * max(len(entradas), 1))
+    print_info(f"Modelo de texto: {por_rascunho * 1e6:,.0f} µs por rascunho ({len(entradas)} alunos)")
+    print_info(f"Motivos para o LLM: {motivos or 'nenhum'}")
+    for nome, dados_aluno in entradas[:args.mostrar]:
+        print("\n" + redigir_rascunho(nome, dados_aluno) + "\n")
+    print_success("Benchmark concluído")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
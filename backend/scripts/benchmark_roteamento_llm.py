@@ -0,0 +1,130 @@
+"""
+Benchmark do roteamento entre provedores de LLM (hedge + failover)
+Colégio Solare - Sistema de Avaliação
+
+Registra dois provedores simulados no lugar de "openai" (primário, com cauda
+de latência) e "anthropic" (secundário) e compara a latência por chamada
+(p50/p95/p99) sem roteamento e com hedge. Um terceiro cenário derruba o
+primário no meio da execução para medir o failover. Nenhuma chamada
+externa é feita.
+
+Uso:
+    python scripts/benchmark_roteamento_llm.py
+    python scripts/benchmark_roteamento_llm.py --chamadas 1000 --lentidao 0.05 --fator 20
+    python scripts/benchmark_roteamento_llm.py --latencia-ms 800 --concorrencia 32
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+async def executar_cenario(args, nome, hedge, queda_em=None):
+    """Roda `args.chamadas` chamadas e imprime latências, falhas e quem respondeu"""
+    os.environ["LLM_HEDGE_ATIVO"] = "true" if hedge else "false"
+    os.environ["LLM_FAILOVER"] = "openai,anthropic"
+    os.environ["DEFAULT_LLM_PROVIDER"] = "openai"
+    os.environ["LLM_MAX_TENTATIVAS"] = "2"
+    os.environ["LLM_BACKOFF_SEGUNDOS"] = "0.05"
+    os.environ["LLM_HEDGE_MIN_AMOSTRAS"] = "20"
+
+    from app.config import get_settings
+    from app.services import provedores_llm, roteador_llm
+    from app.services.provedores_llm import ProvedorLocal, RequisicaoLLM, registrar_provedor
+
+    get_settings.cache_clear()
+    provedores_llm._provedores.clear()
+    provedores_llm._limitadores.clear()
+    roteador_llm._estatisticas.clear()
+
+    primario = ProvedorLocal(args.latencia_ms, seed=1, nome="openai",
+                             lentidao_prob=args.lentidao, lentidao_fator=args.fator)
+    registrar_provedor(primario)
+    registrar_provedor(ProvedorLocal(args.latencia_ms * 1.3, seed=2, nome="anthropic",
+                                     lentidao_prob=args.lentidao, lentidao_fator=args.fator))
+
+    limite = asyncio.Semaphore(args.concorrencia)
+    latencias, falhas, por_provedor = [], 0, {}
+
+    async def chamar(i):
+        nonlocal falhas
+        async with limite:
+            if queda_em is not None and i == queda_em:
+                primario.taxa_erro = 1.0  # Primário sai do ar
+            requisicao = RequisicaoLLM("sistema", f"aluno {i}", "simulado", 0.7, 200)
+            inicio = time.perf_counter()
+            try:
+                resposta = await roteador_llm.gerar_roteado(requisicao, failover=hedge or queda_em is not None)
+            except Exception:
+                falhas += 1
+                return
+            latencias.append(time.perf_counter() - inicio)
+            por_provedor[resposta.provedor] = por_provedor.get(resposta.provedor, 0) + 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(chamar(i) for i in range(args.chamadas)))
+    decorrido = time.perf_counter() - inicio
+
+    hedges = roteador_llm.estatisticas("anthropic").hedges_disparados
+    print(f"{nome:<22} | {percentil(latencias, 0.5):>6.2f}s | {percentil(latencias, 0.95):>6.2f}s | "
+          f"{percentil(latencias, 0.99):>6.2f}s | {falhas:>6} | {hedges:>6} | "
+          f"{decorrido:>6.1f}s | {por_provedor}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Compara latência de cauda com e sem hedge/failover entre provedores simulados",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--chamadas", type=int, default=400)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--latencia-ms", type=float, default=300.0, help="Latência típica do primário")
+    parser.add_argument("--lentidao", type=float, default=0.05, help="Fração de chamadas lentas")
+    parser.add_argument("--fator", type=float, default=15.0, help="Multiplicador da latência nas chamadas lentas")
+    args = parser.parse_args()
+
+    print_info(f"{args.chamadas} chamadas, {args.concorrencia} simultâneas, "
+               f"{args.lentidao:.0%} lentas ({args.fator:.0f}x)")
+    print("\n" + "=" * 100)
+    print(f"{'Cenário':<22} | {'p50':>7} | {'p95':>7} | {'p99':>7} | {'Falhas':>6} | {'Hedges':>6} | {'Tempo':>7} | Respostas")
+    print("-" * 100)
+    await executar_cenario(args, "Só primário", hedge=False)
+    await executar_cenario(args, "Hedge p95", hedge=True)
+    await executar_cenario(args, "Queda do primário", hedge=True, queda_em=args.chamadas // 2)
+    print("=" * 100)
+    print_success("Benchmark concluído")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,202 @@
+"""
+Benchmark da serialização das listagens de alunos e turmas
+Colégio Solare - Sistema de Avaliação
+
+Compara, sobre as mesmas linhas (no formato que o PostgREST devolve):
+
+  antes   um AlunoResponse/TurmaResponse por linha + validação de novo pelo
+          response_model do FastAPI + json da biblioteca padrão
+  depois  services/serializacao: dicts com os campos do schema, campos
+          calculados numa passada e orjson
+
+e confere que os dois JSONs são iguais (datas/horas comparadas como
+instantes: o caminho rápido mantém o texto do banco, "+00:00" onde o
+pydantic escreve "Z"). Não usa banco: mede só a parte que roda no processo
+da API depois da consulta.
+
+Uso:
+    python scripts/benchmark_serializacao_listagens.py
+    python scripts/benchmark_serializacao_listagens.py --linhas 5000 20000 --repeticoes 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+os.environ.setdefault("SUPABASE_KEY", "local")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+def print_error(msg):
+    print(f"{Colors.RED}✗ {msg}{Colors.END}")
+
+
+def linhas_alunos(quantidade: int, rng: random.Random) -> List[dict]:
+    turma_id = str(uuid.uuid4())
+    return [{
+        "id": str(uuid.uuid4()),
+        "matricula": f"2025{i:05d}",
+        "nome": f"Aluno Sintético {i:05d}",
+        "data_nascimento": f"{rng.randint(2014, 2021)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "foto_url": None,
+        "turma_id": turma_id,
+        "responsavel_nome": f"Responsável {i:05d}",
+        "responsavel_telefone": "(11) 98765-4321",
+        "responsavel_email": f"responsavel.{i}@email.com",
+        "responsavel_foto_url": None,
+        "necessidades_especiais": rng.random() < 0.05,
+        "necessidades_descricao": None,
+        "alergias": "Amendoim" if rng.random() < 0.1 else None,
+        "restricoes_alimentares": None,
+        "observacoes": None,
+        "ativo": True,
+        "data_saida": None,
+        "created_at": "2025-02-03T12:00:00.123456+00:00",
+        "updated_at": "2025-03-10T08:30:00.654321+00:00",
+    } for i in range(quantidade)]
+
+
+def linhas_turmas(quantidade: int) -> List[dict]:
+    return [{
+        "id": str(uuid.uuid4()),
+        "serie": f"{i // 4 % 9 + 1}º Ano",
+        "turma": "ABCD"[i % 4],
+        "ano_letivo": 2025,
+        "periodo": "manha",
+        "nivel": "fundamental",
+        "capacidade_maxima": 30,
+        "professor_id": None,
+        "escola_id": str(uuid.uuid4()),
+        "ativo": True,
+        "created_at": "2025-02-03T12:00:00.123456+00:00",
+        "updated_at": "2025-03-10T08:30:00.654321+00:00",
+        "professor": {"id": str(uuid.uuid4()), "nome": "Professora Ana", "email": "ana@escola.com"},
+    } for i in range(quantidade)]
+
+
+async def antes_alunos(campo, linhas):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from app.models.schemas import AlunoResponse
+
+    alunos = [AlunoResponse(**aluno) for aluno in linhas]
+    return JSONResponse(await serialize_response(field=campo, response_content=alunos)).body
+
+
+async def antes_turmas(campo, linhas, contagens):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from app.models.schemas import TurmaResponse
+
+    turmas = []
+    for turma_data in linhas:
+        turma_data = dict(turma_data)
+        professor_data = turma_data.pop("professor", None)
+        turma = TurmaResponse(**turma_data)
+        turma.nome_completo = f"{turma.serie} {turma.turma}"
+        if professor_data:
+            turma.professor_nome = professor_data.get("nome", "Sem professor")
+        turma.quantidade_atual = contagens.get(str(turma.id), 0)
+        turmas.append(turma)
+    return JSONResponse(await serialize_response(field=campo, response_content=turmas)).body
+
+
+def normalizar(valor):
+    """Datas/horas ISO viram datetime para comparar o instante, não o texto"""
+    if isinstance(valor, list):
+        return [normalizar(v) for v in valor]
+    if isinstance(valor, dict):
+        return {k: normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, str) and len(valor) > 19 and valor[10] == "T":
+        return datetime.fromisoformat(valor.replace("Z", "+00:00"))
+    return valor
+
+
+async def medir(funcao, repeticoes: int):
+    """(melhor tempo em segundos, último corpo)"""
+    melhor, corpo = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = await funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, corpo
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Compara a serialização das listagens antes/depois do caminho rápido",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--linhas", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    from fastapi.utils import create_model_field
+    from app.models.schemas import AlunoResponse, TurmaResponse
+    from app.services import serializacao
+
+    campo_alunos = create_model_field(name="alunos", type_=List[AlunoResponse], mode="serialization")
+    campo_turmas = create_model_field(name="turmas", type_=List[TurmaResponse], mode="serialization")
+    print_info(f"Encoder do caminho rápido: {'orjson' if serializacao.orjson else 'json (orjson ausente)'}")
+
+    print("\n" + "=" * 84)
+    print(f"{'Listagem':<18} | {'Linhas':>7} | {'Antes (linhas/s)':>17} | {'Depois (linhas/s)':>18} | {'Ganho':>6} | Igual")
+    print("-" * 84)
+    iguais = True
+    for quantidade in args.linhas:
+        rng = random.Random(42)
+        alunos = linhas_alunos(quantidade, rng)
+        turmas = linhas_turmas(quantidade)
+        contagens = {turma["id"]: rng.randint(15, 30) for turma in turmas}
+
+        casos = [
+            ("Alunos", lambda: antes_alunos(campo_alunos, alunos),
+             lambda: asyncio.sleep(0, serializacao.json_bytes(serializacao.alunos_para_resposta(alunos)))),
+            ("Turmas", lambda: antes_turmas(campo_turmas, turmas, contagens),
+             lambda: asyncio.sleep(0, serializacao.json_bytes(serializacao.turmas_para_resposta(turmas, contagens)))),
+        ]
+        for rotulo, antes, depois in casos:
+            tempo_antes, corpo_antes = await medir(antes, args.repeticoes)
+            tempo_depois, corpo_depois = await medir(depois, args.repeticoes)
+            igual = normalizar(json.loads(corpo_antes)) == normalizar(json.loads(corpo_depois))
+            iguais = iguais and igual
+            print(f"{rotulo:<18} | {quantidade:>7,} | {quantidade / tempo_antes:>17,.0f} | "
+                  f"{quantidade / tempo_depois:>18,.0f} | {tempo_antes / tempo_depois:>5.1f}x | {'sim' if igual else 'NÃO'}")
+    print("=" * 84)
+
+    if iguais:
+        print_success("JSON idêntico nos dois caminhos")
+    else:
+        print_error("JSON diferente entre os caminhos")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
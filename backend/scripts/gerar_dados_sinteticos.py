@@ -0,0 +1,572 @@
+"""
+Gerador de dados sintéticos em escala de produção
+Colégio Solare - Sistema de Avaliação
+
+Gera escolas, usuários, turmas, alunos, tags e avaliações diárias de forma
+determinística (mesma semente → mesmos dados, inclusive UUIDs) e grava em
+lotes: direto no banco via PostgREST ou em CSVs prontos para COPY, que é o
+caminho recomendado para dezenas de milhões de avaliações.
+
+Uso:
+    # ~100k alunos e ~10M avaliações em CSV para COPY
+    python scripts/gerar_dados_sinteticos.py --escolas 50 --turmas-por-escola 80 \\
+        --alunos-por-turma 25 --dias 100 --destino csv --saida /tmp/solare --processos 8
+
+    # Base pequena direto no Supabase configurado no .env
+    python scripts/gerar_dados_sinteticos.py --escolas 2 --dias 20
+
+    # Sanidade contra o banco local em memória (FKs e unicidade conferidas)
+    python scripts/gerar_dados_sinteticos.py --banco-local --escolas 1 --dias 5
+
+    # Histórico de 4 anos (--dias por ano), para as partições de avaliacoes
+    python scripts/gerar_dados_sinteticos.py --banco-local --dias 60 --anos 4
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+def print_error(msg):
+    print(f"{Colors.RED}✗ {msg}{Colors.END}")
+
+
+SENHA_HASH_TESTE = "$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewKyNiGH7V4rGYma"  # senha: 123456
+
+NOMES = [
+    "João", "Pedro", "Lucas", "Gabriel", "Rafael", "Miguel", "Davi", "Arthur", "Bernardo", "Heitor",
+    "Maria", "Ana", "Julia", "Luiza", "Sophia", "Isabella", "Helena", "Valentina", "Laura", "Alice",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Rodrigues", "Almeida", "Ferreira",
+    "Gomes", "Ribeiro", "Carvalho", "Araújo", "Melo", "Barbosa", "Rocha", "Dias", "Teixeira", "Moura",
+]
+SERIES = [
+    ("Infantil II", "infantil", 4), ("Infantil III", "infantil", 5),
+    ("1º Ano", "fundamental", 6), ("2º Ano", "fundamental", 7),
+    ("3º Ano", "fundamental", 8), ("4º Ano", "fundamental", 9), ("5º Ano", "fundamental", 10),
+]
+PERIODOS = ["manha", "tarde", "integral"]
+NECESSIDADES = [
+    "TDAH - Necessita de atenção individualizada",
+    "Dislexia - Em acompanhamento",
+    "TEA nível 1 - Precisa de rotina estruturada",
+    "Dificuldade motora fina",
+]
+OBSERVACOES = [
+    "Participou bem das atividades em grupo.",
+    "Chegou cansado, rendeu melhor após o intervalo.",
+    "Pediu ajuda para concluir a atividade.",
+    "Demonstrou interesse pelo tema da aula.",
+]
+
+
+# ========== GERAÇÃO DETERMINÍSTICA ==========
+
+def novo_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def trimestre_da_data(dia: date) -> int:
+    """Calendário letivo simplificado: fev-mai, jun-ago, set-dez"""
+    if dia.month <= 5:
+        return 1
+    if dia.month <= 8:
+        return 2
+    return 3
+
+
+def dias_letivos(ano: int, quantidade: int) -> List[date]:
+    """Dias úteis a partir da primeira segunda-feira de fevereiro"""
+    dia = date(ano, 2, 1)
+    while dia.weekday() != 0:
+        dia += timedelta(days=1)
+    dias = []
+    while len(dias) < quantidade:
+        if dia.weekday() < 5:
+            dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+
+def dias_do_historico(args: argparse.Namespace) -> List[date]:
+    """--dias letivos em cada um dos --anos que terminam em --ano (mais antigo primeiro)"""
+    anos = getattr(args, "anos", 1)
+    return [dia for ano in range(args.ano - anos + 1, args.ano + 1) for dia in dias_letivos(ano, args.dias)]
+
+
+class GeradorDados:
+    """
+    Produz as linhas de cada tabela em ordem compatível com as FKs
+
+    Cada etapa tem seu próprio Random derivado da semente, então mudar
+    --dias não altera alunos nem turmas, e o resultado independe do
+    tamanho de lote ou da concorrência usada na gravação.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.escolas: List[Dict] = []
+        self.coordenadores: List[Dict] = []
+        self.professores: List[Dict] = []
+        self.turmas: List[Dict] = []
+        self.tags_por_professor: Dict[str, List[str]] = {}
+
+    def _rng(self, etapa: str) -> random.Random:
+        return random.Random(f"{self.args.seed}:{etapa}")
+
+    def gerar_estrutura(self) -> None:
+        """Escolas, usuários, turmas e tags (poucas linhas, ficam em memória)"""
+        from app.config import TAGS_COMPORTAMENTAIS_PADRAO
+
+        rng = self._rng("estrutura")
+        args = self.args
+        for e in range(args.escolas):
+            escola = {"id": novo_uuid(rng), "nome": f"Colégio Solare - Unidade {e + 1:03d}"}
+            self.escolas.append(escola)
+
+            coordenador = {
+                "id": novo_uuid(rng),
+                "email": f"coordenacao.u{e + 1:03d}@solare.edu.br",
+                "nome": f"Coordenação Unidade {e + 1:03d}",
+                "senha_hash": SENHA_HASH_TESTE,
+                "tipo": "coordenador",
+                "telefone": None,
+                "escola_id": escola["id"],
+                "coordenador_id": None,
+            }
+            self.coordenadores.append(coordenador)
+
+            professores_escola = []
+            for p in range(max(1, (args.turmas_por_escola + 1) // 2)):  # 2 turmas por professor
+                professor = {
+                    "id": novo_uuid(rng),
+                    "email": f"professor{p + 1:03d}.u{e + 1:03d}@solare.edu.br",
+                    "nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}",
+                    "senha_hash": SENHA_HASH_TESTE,
+                    "tipo": "professor",
+                    "telefone": f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                    "escola_id": escola["id"],
+                    "coordenador_id": coordenador["id"],
+                }
+                professores_escola.append(professor)
+                self.tags_por_professor[professor["id"]] = []
+            self.professores.extend(professores_escola)
+
+            for t in range(args.turmas_por_escola):
+                serie, nivel, idade = SERIES[t % len(SERIES)]
+                letra = chr(ord("A") + (t // len(SERIES)) % 26)
+                self.turmas.append({
+                    "id": novo_uuid(rng),
+                    "serie": serie,
+                    # Sufixo da unidade mantém UNIQUE(serie, turma, ano_letivo, periodo)
+                    "turma": f"{letra}{t // (len(SERIES) * 26) or ''}-{e + 1:03d}",
+                    "ano_letivo": args.ano,
+                    "periodo": PERIODOS[t % len(PERIODOS)],
+                    "nivel": nivel,
+                    "capacidade_maxima": max(args.alunos_por_turma, 30),
+                    "professor_id": professores_escola[t // 2]["id"],
+                    "escola_id": escola["id"],
+                    "_idade": idade,
+                })
+
+        self.tags = []
+        for professor in self.professores:
+            for nome in rng.sample(TAGS_COMPORTAMENTAIS_PADRAO, min(args.tags_por_professor, len(TAGS_COMPORTAMENTAIS_PADRAO))):
+                tag = {
+                    "id": novo_uuid(rng),
+                    "nome": nome,
+                    "tipo": rng.choice(["positiva", "positiva", "neutra", "negativa"]),
+                    "usuario_id": professor["id"],
+                }
+                self.tags.append(tag)
+                self.tags_por_professor[professor["id"]].append(tag["id"])
+
+    def alunos_da_turma(self, indice_turma: int) -> List[Dict]:
+        turma = self.turmas[indice_turma]
+        rng = self._rng(f"alunos:{indice_turma}")
+        alunos = []
+        for a in range(self.args.alunos_por_turma):
+            nome = rng.choice(NOMES)
+            sequencial = indice_turma * self.args.alunos_por_turma + a + 1
+            necessidades = rng.random() < 0.2
+            alunos.append({
+                "id": novo_uuid(rng),
+                "matricula": f"{self.args.ano}{sequencial:07d}",
+                "nome": f"{nome} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}",
+                "data_nascimento": date(
+                    self.args.ano - turma["_idade"] - 1, rng.randint(1, 12), rng.randint(1, 28)
+                ).isoformat(),
+                "turma_id": turma["id"],
+                "escola_id": turma["escola_id"],  # O trigger escola_alunos chegaria ao mesmo valor
+                "responsavel_nome": f"Responsável de {nome}",
+                "responsavel_telefone": f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                "responsavel_email": f"responsavel.{sequencial}@email.com",
+                "necessidades_especiais": necessidades,
+                "necessidades_descricao": rng.choice(NECESSIDADES) if necessidades else None,
+                "alergias": rng.choice(["Lactose", "Glúten", "Amendoim", "Corante"]) if rng.random() < 0.1 else None,
+            })
+        return alunos
+
+    def avaliacoes_da_turma(
+        self, indice_turma: int, alunos: List[Dict], dias: List[date]
+    ) -> Iterator[Tuple[Dict, List[Dict]]]:
+        """
+        📋 ÂNCORA: REGRA-NEGÓCIO - Notas realistas
+        Contexto: Escala 1 (autonomia) a 3 (intervenção); cada aluno tem um
+                  perfil por categoria que melhora a cada trimestre, então
+                  consolidações e relatórios têm variação plausível
+        """
+        from app.config import CATEGORIAS_FUNDAMENTAL, CATEGORIAS_INFANTIL
+
+        turma = self.turmas[indice_turma]
+        categorias = CATEGORIAS_INFANTIL if turma["nivel"] == "infantil" else CATEGORIAS_FUNDAMENTAL
+        tags_professor = self.tags_por_professor[turma["professor_id"]]
+        rng = self._rng(f"avaliacoes:{indice_turma}")
+        ultimo_dia = dias[-1] if dias else None
+
+        for aluno in alunos:
+            # Limiares acumulados (P(nota 1), P(nota <= 2)) por categoria e trimestre
+            perfil = {}
+            for categoria in categorias:
+                autonomia = rng.uniform(0.15, 0.75)
+                for trimestre in (1, 2, 3):
+                    p1 = min(0.9, autonomia + 0.08 * (trimestre - 1))
+                    perfil[(categoria, trimestre)] = (p1, p1 + (1 - p1) * 0.75)
+
+            for dia in dias:
+                trimestre = trimestre_da_data(dia)
+                campos = {}
+                for categoria in categorias:
+                    p1, p2 = perfil[(categoria, trimestre)]
+                    r = rng.random()
+                    campos[categoria] = 1 if r < p1 else (2 if r < p2 else 3)
+
+                avaliacao = {
+                    "id": novo_uuid(rng),
+                    "aluno_id": aluno["id"],
+                    "escola_id": turma["escola_id"],
+                    "data_avaliacao": dia.isoformat(),
+                    "trimestre": trimestre,
+                    "ano": dia.year,
+                    "status": "rascunho" if dia == ultimo_dia else "concluida",
+                    "campos_avaliados": campos,
+                    "observacao_livre": rng.choice(OBSERVACOES) if rng.random() < 0.15 else None,
+                    "professor_id": turma["professor_id"],
+                }
+                tags = []
+                if tags_professor and rng.random() < self.args.prob_tag:
+                    for tag_id in rng.sample(tags_professor, min(len(tags_professor), rng.randint(1, 3))):
+                        tags.append({"avaliacao_id": avaliacao["id"], "ano": dia.year, "tag_id": tag_id})
+                yield avaliacao, tags
+
+
+# ========== DESTINOS ==========
+
+def _sem_privados(linha: Dict) -> Dict:
+    return {k: v for k, v in linha.items() if not k.startswith("_")}
+
+
+class DestinoBanco:
+    """
+    🚨 ÂNCORA: CRÍTICO - Inserção em lotes com vários lotes em voo
+    Contexto: Cada lote é um único POST com return=minimal; `barreira`
+              espera os lotes de uma tabela antes de gravar dependentes
+    """
+
+    def __init__(self, tamanho_lote: int, em_voo: int):
+        from app.models.database import get_supabase
+
+        self.supabase = get_supabase()
+        self.tamanho_lote = tamanho_lote
+        self.semaforo = asyncio.Semaphore(em_voo)
+        self.buffers: Dict[str, List[Dict]] = {}
+        self.pendentes: Dict[str, List[asyncio.Task]] = {}
+        self.contagem: Dict[str, int] = {}
+
+    async def _enviar(self, tabela: str, lote: List[Dict]) -> None:
+        from postgrest import ReturnMethod
+        from app.models.database import executar
+
+        try:
+            await executar(self.supabase.table(tabela).insert(lote, returning=ReturnMethod.minimal))
+        finally:
+            self.semaforo.release()
+
+    async def adicionar(self, tabela: str, linha: Dict) -> None:
+        buffer = self.buffers.setdefault(tabela, [])
+        buffer.append(_sem_privados(linha))
+        self.contagem[tabela] = self.contagem.get(tabela, 0) + 1
+        if len(buffer) >= self.tamanho_lote:
+            await self._despachar(tabela)
+
+    async def _despachar(self, tabela: str) -> None:
+        lote = self.buffers.get(tabela)
+        if not lote:
+            return
+        self.buffers[tabela] = []
+        # Gerador espera aqui quando já há `em_voo` lotes sendo enviados
+        await self.semaforo.acquire()
+        pendentes = [t for t in self.pendentes.get(tabela, []) if not t.done()]
+        pendentes.append(asyncio.create_task(self._enviar(tabela, lote)))
+        self.pendentes[tabela] = pendentes
+
+    async def barreira(self, tabela: str) -> None:
+        await self._despachar(tabela)
+        tarefas = self.pendentes.pop(tabela, [])
+        if tarefas:
+            await asyncio.gather(*tarefas)
+
+    async def finalizar(self) -> None:
+        for tabela in list(self.buffers):
+            await self.barreira(tabela)
+
+
+class DestinoCSV:
+    """
+    Um CSV por tabela no formato do COPY ... WITH (FORMAT csv, HEADER)
+    Com `parte`, os arquivos ganham sufixo para processos gravarem em paralelo
+    """
+
+    def __init__(self, diretorio: Path, parte: Optional[int] = None):
+        self.diretorio = diretorio
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.sufixo = "" if parte is None else f".parte{parte:03d}"
+        if parte is None:
+            # Partes de execuções anteriores entrariam nos comandos de COPY
+            for antigo in self.diretorio.glob("*.csv"):
+                if antigo.name.split(".")[0] in ORDEM_TABELAS:
+                    antigo.unlink()
+        self.arquivos: Dict[str, Any] = {}
+        self.escritores: Dict[str, Tuple[Any, List[str]]] = {}
+        self.contagem: Dict[str, int] = {}
+        self.colunas_partes: Dict[str, List[str]] = {}  # Tabelas gravadas por outros processos
+
+    async def adicionar(self, tabela: str, linha: Dict) -> None:
+        if tabela not in self.escritores:
+            arquivo = open(self.diretorio / f"{tabela}{self.sufixo}.csv", "w", newline="", encoding="utf-8")
+            escritor = csv.writer(arquivo)
+            colunas = [c for c in linha if not c.startswith("_")]
+            escritor.writerow(colunas)
+            self.arquivos[tabela] = arquivo
+            self.escritores[tabela] = (escritor, colunas)
+        escritor, colunas = self.escritores[tabela]
+        escritor.writerow([_valor_csv(linha[c]) for c in colunas])
+        self.contagem[tabela] = self.contagem.get(tabela, 0) + 1
+
+    async def barreira(self, tabela: str) -> None:
+        return None
+
+    async def finalizar(self) -> None:
+        for arquivo in self.arquivos.values():
+            arquivo.close()
+
+    def colunas(self) -> Dict[str, List[str]]:
+        return {tabela: colunas for tabela, (_, colunas) in self.escritores.items()}
+
+
+def comandos_copy(diretorio: Path, colunas: Dict[str, List[str]], anos: List[int] = ()) -> List[str]:
+    """Um \\copy por arquivo, na ordem das FKs (partes em ordem de nome)"""
+    # avaliacoes é particionada por ano: a partição precisa existir antes do COPY
+    comandos = [f"SELECT criar_particoes_avaliacoes({ano});" for ano in anos]
+    for tabela in ORDEM_TABELAS:
+        if tabela not in colunas:
+            continue
+        for arquivo in sorted(diretorio.glob(f"{tabela}*.csv")):
+            if arquivo.name.split(".")[0] != tabela:
+                continue
+            comandos.append(
+                f"\\copy {tabela}({', '.join(colunas[tabela])}) FROM '{arquivo}' WITH (FORMAT csv, HEADER)"
+            )
+    return comandos
+
+
+def _valor_csv(valor: Any) -> Any:
+    if valor is None:
+        return ""  # NULL no COPY csv
+    if isinstance(valor, dict):
+        return json.dumps(valor, ensure_ascii=False, separators=(",", ":"))
+    if isinstance(valor, bool):
+        return "true" if valor else "false"
+    return valor
+
+
+# ========== EXECUÇÃO ==========
+
+ORDEM_TABELAS = ["escolas", "usuarios", "turmas", "tags", "alunos", "avaliacoes", "avaliacao_tags"]
+
+
+async def gravar_turmas(gerador: GeradorDados, destino, indices: List[int], dias: List[date],
+                        progresso: bool = True) -> None:
+    """Alunos, avaliações e tags das avaliações, turma a turma"""
+    inicio = time.perf_counter()
+    for n, indice in enumerate(indices, start=1):
+        alunos = gerador.alunos_da_turma(indice)
+        for aluno in alunos:
+            await destino.adicionar("alunos", aluno)
+        await destino.barreira("alunos")
+
+        tags_turma = []
+        for avaliacao, tags in gerador.avaliacoes_da_turma(indice, alunos, dias):
+            await destino.adicionar("avaliacoes", avaliacao)
+            tags_turma.extend(tags)
+        await destino.barreira("avaliacoes")
+        for tag in tags_turma:
+            await destino.adicionar("avaliacao_tags", tag)
+
+        if progresso and n % max(1, len(indices) // 10) == 0:
+            decorrido = time.perf_counter() - inicio
+            avaliacoes = destino.contagem.get("avaliacoes", 0)
+            print_info(f"{n}/{len(indices)} turmas · {avaliacoes:,} avaliações "
+                       f"({avaliacoes / max(decorrido, 1e-9):,.0f}/s)")
+
+
+def _gerar_parte_csv(args: argparse.Namespace, parte: int, indices: List[int]) -> Tuple[Dict, Dict]:
+    """Executado em processo separado: grava as turmas `indices` em arquivos .parteNNN"""
+    gerador = GeradorDados(args)
+    gerador.gerar_estrutura()  # Barato e determinístico: mesmos ids em todos os processos
+    destino = DestinoCSV(args.saida, parte=parte)
+
+    async def executar_parte():
+        await gravar_turmas(gerador, destino, indices, dias_do_historico(args), progresso=False)
+        await destino.finalizar()
+
+    asyncio.run(executar_parte())
+    return destino.contagem, destino.colunas()
+
+
+async def gerar(args: argparse.Namespace, destino) -> Dict[str, int]:
+    gerador = GeradorDados(args)
+    gerador.gerar_estrutura()
+    dias = dias_do_historico(args)
+
+    print_info(f"Estrutura: {len(gerador.escolas)} escolas, {len(gerador.turmas)} turmas, "
+               f"{len(gerador.professores)} professores")
+
+    # Ordem respeita as FKs: coordenador antes do professor que o referencia
+    for tabela, linhas in (
+        ("escolas", gerador.escolas),
+        ("usuarios", gerador.coordenadores),
+        ("usuarios", gerador.professores),
+        ("turmas", gerador.turmas),
+        ("tags", gerador.tags),
+    ):
+        for linha in linhas:
+            await destino.adicionar(tabela, linha)
+        await destino.barreira(tabela)
+
+    indices = list(range(len(gerador.turmas)))
+    processos = getattr(args, "processos", 1)
+    if isinstance(destino, DestinoCSV) and processos > 1:
+        # 🚨 ÂNCORA: CRÍTICO - Turmas têm sementes próprias, então cada processo
+        # gera exatamente as mesmas linhas que a execução sequencial geraria
+        from concurrent.futures import ProcessPoolExecutor
+
+        loop = asyncio.get_running_loop()
+        fatias = [indices[i::processos] for i in range(processos)]
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            resultados = await asyncio.gather(*(
+                loop.run_in_executor(pool, _gerar_parte_csv, args, parte, fatia)
+                for parte, fatia in enumerate(fatias) if fatia
+            ))
+        for contagem, colunas in resultados:
+            for tabela, quantidade in contagem.items():
+                destino.contagem[tabela] = destino.contagem.get(tabela, 0) + quantidade
+            for tabela, nomes in colunas.items():
+                destino.colunas_partes[tabela] = nomes
+    else:
+        await gravar_turmas(gerador, destino, indices, dias)
+
+    await destino.finalizar()
+    return destino.contagem
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Gera dados sintéticos determinísticos em lote",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--escolas", type=int, default=1)
+    parser.add_argument("--turmas-por-escola", type=int, default=8)
+    parser.add_argument("--alunos-por-turma", type=int, default=25)
+    parser.add_argument("--dias", type=int, default=20, help="Dias letivos com avaliação (por ano)")
+    parser.add_argument("--anos", type=int, default=1, help="Anos de histórico terminando em --ano")
+    parser.add_argument("--tags-por-professor", type=int, default=10)
+    parser.add_argument("--prob-tag", type=float, default=0.3, help="Chance de uma avaliação ter tags")
+    parser.add_argument("--ano", type=int, default=2025)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--destino", choices=["banco", "csv"], default="banco")
+    parser.add_argument("--saida", type=Path, default=Path("dados_sinteticos"), help="Diretório dos CSVs")
+    parser.add_argument("--lote", type=int, default=1000, help="Linhas por INSERT")
+    parser.add_argument("--em-voo", type=int, default=4, help="Lotes simultâneos")
+    parser.add_argument("--processos", type=int, default=1, help="Processos geradores (apenas --destino csv)")
+    parser.add_argument("--banco-local", action="store_true", help="Usa o banco em memória")
+    args = parser.parse_args()
+
+    if args.banco_local:
+        os.environ["BANCO_LOCAL"] = "true"
+        os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+        os.environ.setdefault("SUPABASE_KEY", "local")
+        os.environ.setdefault("SECRET_KEY", "dados-sinteticos")
+
+    total_alunos = args.escolas * args.turmas_por_escola * args.alunos_por_turma
+    print_info(f"Semente {args.seed}: {total_alunos:,} alunos, "
+               f"{total_alunos * args.dias * args.anos:,} avaliações previstas")
+
+    inicio = time.perf_counter()
+    try:
+        if args.destino == "csv":
+            destino = DestinoCSV(args.saida)
+        else:
+            destino = DestinoBanco(args.lote, args.em_voo)
+        contagem = await gerar(args, destino)
+    except Exception as e:
+        print_error(f"Erro ao gerar dados: {str(e)}")
+        raise
+    decorrido = time.perf_counter() - inicio
+
+    print("\n" + "=" * 50)
+    print_success(f"Dados gerados em {decorrido:.1f}s")
+    for tabela, quantidade in contagem.items():
+        print(f"   - {tabela}: {quantidade:,}")
+    if args.destino == "csv":
+        print("\n📥 Carga no Postgres (psql):")
+        anos = list(range(args.ano - args.anos + 1, args.ano + 1))
+        for comando in comandos_copy(args.saida, {**destino.colunas_partes, **destino.colunas()}, anos):
+            print(f"   {comando}")
+    print("=" * 50)
+
+    if args.destino == "banco":
+        from app.models.database import fechar_conexoes
+        fechar_conexoes()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
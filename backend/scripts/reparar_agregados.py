@@ -0,0 +1,92 @@
+"""
+Reparo dos agregados trimestrais
+Colégio Solare - Sistema de Avaliação
+
+Recalcula agregados_trimestrais a partir de avaliacoes (função SQL
+reconstruir_agregados). Necessário após carga direta por COPY com os
+triggers desabilitados, ou se houver suspeita de divergência.
+
+Uso:
+    # Todos os alunos
+    python scripts/reparar_agregados.py --todos
+
+    # Apenas os alunos de uma turma
+    python scripts/reparar_agregados.py --turma <turma_id>
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.models.database import get_supabase, executar, executar_paginado, fechar_conexoes
+from app.services.agregados import reconstruir_agregados
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+def print_success(msg):
+    print(f"{Colors.GREEN}✓ {msg}{Colors.END}")
+
+def print_info(msg):
+    print(f"{Colors.BLUE}→ {msg}{Colors.END}")
+
+def print_error(msg):
+    print(f"{Colors.RED}✗ {msg}{Colors.END}")
+
+
+async def alunos_da_turma(turma_id: str):
+    supabase = get_supabase()
+    turma = await executar(supabase.table("turmas").select("id").eq("id", turma_id))
+    if not turma.data:
+        return None
+    alunos = await executar_paginado(
+        lambda: supabase.table("alunos").select("id").eq("turma_id", turma_id).order("id")
+    )
+    return [aluno["id"] for aluno in alunos]
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Recalcula os agregados trimestrais a partir das avaliações",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    alvo = parser.add_mutually_exclusive_group(required=True)
+    alvo.add_argument("--todos", action="store_true", help="Reconstrói os agregados de todos os alunos")
+    alvo.add_argument("--turma", help="ID da turma cujos alunos serão reparados")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    try:
+        aluno_ids = None
+        if args.turma:
+            aluno_ids = await alunos_da_turma(args.turma)
+            if aluno_ids is None:
+                print_error(f"Turma {args.turma} não encontrada")
+                return
+            print_info(f"{len(aluno_ids)} alunos na turma")
+
+        total = await reconstruir_agregados(aluno_ids)
+    except Exception as e:
+        print_error(f"Erro ao reconstruir agregados: {str(e)}")
+        raise
+    finally:
+        fechar_conexoes()
+
+    print_success(f"{total:,} agregados (aluno, trimestre, ano) reconstruídos "
+                  f"em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
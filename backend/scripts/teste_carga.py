@@ -0,0 +1,272 @@
+"""
+Teste de carga ponta a ponta contra o banco local (PostgREST em memória)
+Reproduz cenários reais de uso e reporta p50/p95/p99 e requisições/s.
+Falha (exit 1) se algum cenário regredir em relação às baselines salvas.
+
+Cenários:
+    rush_dashboard  - professores abrindo o dashboard de manhã (GET /turmas)
+    tela_avaliacao  - tela de avaliação da turma (GET /turmas/{id} + /alunos/turma/{id})
+    secretaria      - secretaria paginando e abrindo fichas de alunos
+
+Uso:
+    python scripts/teste_carga.py                       # roda e compara com baselines
+    python scripts/teste_carga.py --salvar-baseline     # grava novas baselines
+    python scripts/teste_carga.py --cenarios tela_avaliacao --latencia-ms 15
+
+Cuidado: baselines dependem da máquina; gere-as no mesmo ambiente do CI.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Adiciona o diretório pai ao path para importar os módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+ARQUIVO_BASELINES = Path(__file__).parent / "baselines_teste_carga.json"
+
+
+# Cores para output no terminal
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    END = '\033[0m'
+
+
+def configurar_ambiente(latencia_ms: float, jitter_ms: float) -> None:
+    """Aponta get_supabase() para o banco local antes de importar a aplicação"""
+    os.environ["BANCO_LOCAL"] = "true"
+    os.environ["BANCO_LOCAL_LATENCIA_MS"] = str(latencia_ms)
+    os.environ["BANCO_LOCAL_JITTER_MS"] = str(jitter_ms)
+    os.environ.setdefault("SUPABASE_URL", "http://banco-local")
+    os.environ.setdefault("SUPABASE_KEY", "local")
+    os.environ.setdefault("SECRET_KEY", "teste-carga")
+
+
+def popular_banco(banco, semente: int, num_turmas: int, alunos_por_turma: int) -> Dict[str, List]:
+    """Cria uma escola sintética diretamente no banco local"""
+    rng = random.Random(semente)
+    escola = banco.inserir("escolas", [{"nome": "Escola Carga"}])[0]
+
+    coordenador = banco.inserir("usuarios", [{
+        "email": "coord@carga.edu.br", "nome": "Coordenação", "senha_hash": "x",
+        "tipo": "coordenador", "escola_id": escola["id"]
+    }])[0]
+    professores = banco.inserir("usuarios", [
+        {
+            "email": f"prof{i}@carga.edu.br", "nome": f"Professor(a) {i}", "senha_hash": "x",
+            "tipo": "professor", "escola_id": escola["id"], "coordenador_id": coordenador["id"]
+        }
+        for i in range(max(1, num_turmas // 2))
+    ])
+
+    turmas = banco.inserir("turmas", [
+        {
+            "serie": f"{i // 3 + 1}º Ano", "turma": "ABC"[i % 3], "ano_letivo": 2025,
+            "periodo": "manha" if i % 2 == 0 else "tarde", "nivel": "fundamental",
+            "capacidade_maxima": alunos_por_turma + 5,
+            "professor_id": professores[i % len(professores)]["id"], "escola_id": escola["id"]
+        }
+        for i in range(num_turmas)
+    ])
+
+    nomes = ["Ana", "João", "Maria", "Pedro", "Luíza", "Gabriel", "Helena", "Davi", "Alice", "Miguel"]
+    sobrenomes = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa"]
+    alunos = banco.inserir("alunos", [
+        {
+            "matricula": f"2025{t * alunos_por_turma + i:06d}",
+            "nome": f"{rng.choice(nomes)} {rng.choice(sobrenomes)}",
+            "data_nascimento": (date(2018, 1, 1) + timedelta(days=rng.randint(0, 700))).isoformat(),
+            "turma_id": turma["id"],
+            "responsavel_email": f"resp{t}_{i}@email.com",
+            "necessidades_especiais": rng.random() < 0.1,
+        }
+        for t, turma in enumerate(turmas)
+        for i in range(alunos_por_turma)
+    ])
+
+    return {
+        "escola": [escola], "professores": professores, "turmas": turmas, "alunos": alunos,
+        "coordenador": [coordenador],
+    }
+
+
+Requisicao = Tuple[str, str]
+
+
+@dataclass
+class Cenario:
+    nome: str
+    usuarios_virtuais: int
+    sessoes_por_usuario: int
+    sessao: Callable[[random.Random, Dict[str, List]], List[Requisicao]]
+
+
+def _sessao_dashboard(rng: random.Random, dados: Dict[str, List]) -> List[Requisicao]:
+    if rng.random() < 0.1:
+        coord = dados["coordenador"][0]
+        return [("GET", f"/api/v1/turmas/?usuario_tipo=coordenador&usuario_id={coord['id']}")]
+    prof = rng.choice(dados["professores"])
+    return [("GET", f"/api/v1/turmas/?usuario_tipo=professor&usuario_id={prof['id']}")]
+
+
+def _sessao_avaliacao(rng: random.Random, dados: Dict[str, List]) -> List[Requisicao]:
+    turma = rng.choice(dados["turmas"])
+    # Professor abre a turma e recarrega a lista de alunos algumas vezes
+    return [("GET", f"/api/v1/turmas/{turma['id']}")] + \
+        [("GET", f"/api/v1/alunos/turma/{turma['id']}")] * 3
+
+
+def _sessao_secretaria(rng: random.Random, dados: Dict[str, List]) -> List[Requisicao]:
+    aluno = rng.choice(dados["alunos"])
+    pagina = rng.randint(0, 5)
+    return [
+        ("GET", f"/api/v1/alunos/?ordenar_por=nome&limite=50&offset={pagina * 50}"),
+        ("GET", f"/api/v1/alunos/{aluno['id']}"),
+    ]
+
+
+CENARIOS = {
+    "rush_dashboard": Cenario("rush_dashboard", usuarios_virtuais=40, sessoes_por_usuario=5, sessao=_sessao_dashboard),
+    "tela_avaliacao": Cenario("tela_avaliacao", usuarios_virtuais=30, sessoes_por_usuario=4, sessao=_sessao_avaliacao),
+    "secretaria": Cenario("secretaria", usuarios_virtuais=10, sessoes_por_usuario=10, sessao=_sessao_secretaria),
+}
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil pelo método nearest-rank"""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+async def executar_cenario(cliente, cenario: Cenario, dados: Dict[str, List], semente: int,
+                           rodadas: int) -> Dict[str, float]:
+    """Executa o cenário `rodadas` vezes (após aquecimento) e agrega as medições"""
+    latencias: List[float] = []
+    erros = 0
+
+    async def usuario_virtual(indice: int):
+        nonlocal erros
+        rng = random.Random(semente * 1000 + indice)
+        for _ in range(cenario.sessoes_por_usuario):
+            for metodo, url in cenario.sessao(rng, dados):
+                inicio = time.perf_counter()
+                resposta = await cliente.request(metodo, url)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                if resposta.status_code >= 400:
+                    erros += 1
+
+    # Aquecimento: a primeira rodada não entra nas medições
+    await asyncio.gather(*(usuario_virtual(i) for i in range(cenario.usuarios_virtuais)))
+    latencias.clear()
+    erros = 0
+
+    duracao = 0.0
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        await asyncio.gather(*(usuario_virtual(i) for i in range(cenario.usuarios_virtuais)))
+        duracao += time.perf_counter() - inicio
+
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "rps": len(latencias) / duracao,
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+        "p99_ms": percentil(latencias, 99),
+    }
+
+
+def comparar(nome: str, resultado: Dict[str, float], baseline: Dict[str, float], tolerancia: float) -> List[str]:
+    """Retorna lista de regressões do cenário em relação à baseline"""
+    regressoes = []
+    for metrica in ("p50_ms", "p95_ms", "p99_ms"):
+        limite = baseline[metrica] * (1 + tolerancia)
+        if resultado[metrica] > limite:
+            regressoes.append(f"{nome}: {metrica} {resultado[metrica]:.1f} > {limite:.1f} (baseline {baseline[metrica]:.1f})")
+    limite_rps = baseline["rps"] * (1 - tolerancia)
+    if resultado["rps"] < limite_rps:
+        regressoes.append(f"{nome}: rps {resultado['rps']:.1f} < {limite_rps:.1f} (baseline {baseline['rps']:.1f})")
+    return regressoes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument("--latencia-ms", type=float, default=10.0, help="Latência injetada por consulta")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Variação aleatória somada à latência")
+    parser.add_argument("--turmas", type=int, default=40)
+    parser.add_argument("--alunos-por-turma", type=int, default=28)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--rodadas", type=int, default=3, help="Rodadas medidas por cenário")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="Regressão máxima aceita (0.5 = 50%%)")
+    parser.add_argument("--salvar-baseline", action="store_true")
+    args = parser.parse_args()
+
+    configurar_ambiente(args.latencia_ms, args.jitter_ms)
+
+    import httpx
+    from app.main import app
+    from app.models.database import fechar_conexoes
+    from app.models.postgrest_local import get_banco_local
+
+    banco = get_banco_local()
+    banco.limpar()
+    dados = popular_banco(banco, args.semente, args.turmas, args.alunos_por_turma)
+
+    print(f"{Colors.BLUE}→ Banco local: {len(dados['turmas'])} turmas, {len(dados['alunos'])} alunos, "
+          f"latência {args.latencia_ms:.0f}±{args.jitter_ms:.0f} ms{Colors.END}\n")
+    print(f"{'cenário':<16} {'reqs':>6} {'erros':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    resultados = {}
+    transporte = httpx.ASGITransport(app=app)
+    # Como o frontend: toda requisição diz a escola (escopo e partição do cache de respostas)
+    cabecalhos = {"X-Escola-Id": dados["escola"][0]["id"]}
+    async with httpx.AsyncClient(transport=transporte, base_url="http://teste-carga", headers=cabecalhos) as cliente:
+        for nome in args.cenarios:
+            r = await executar_cenario(cliente, CENARIOS[nome], dados, args.semente, args.rodadas)
+            resultados[nome] = r
+            print(f"{nome:<16} {r['requisicoes']:>6} {r['erros']:>6} {r['rps']:>8.1f} "
+                  f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+    fechar_conexoes()
+
+    if args.salvar_baseline:
+        baselines = json.loads(ARQUIVO_BASELINES.read_text()) if ARQUIVO_BASELINES.exists() else {}
+        for nome, r in resultados.items():
+            baselines[nome] = {k: round(v, 2) for k, v in r.items() if k in ("rps", "p50_ms", "p95_ms", "p99_ms")}
+        ARQUIVO_BASELINES.write_text(json.dumps(baselines, indent=2, ensure_ascii=False) + "\n")
+        print(f"\n{Colors.GREEN}✓ Baselines salvas em {ARQUIVO_BASELINES.name}{Colors.END}")
+        return 0
+
+    falhas = [f"{nome}: {r['erros']} requisições com erro" for nome, r in resultados.items() if r["erros"]]
+    baselines = json.loads(ARQUIVO_BASELINES.read_text()) if ARQUIVO_BASELINES.exists() else {}
+    for nome, r in resultados.items():
+        if nome in baselines:
+            falhas += comparar(nome, r, baselines[nome], args.tolerancia)
+        else:
+            print(f"{Colors.YELLOW}! Sem baseline para '{nome}' (use --salvar-baseline){Colors.END}")
+
+    if falhas:
+        print(f"\n{Colors.RED}✗ Regressões detectadas:{Colors.END}")
+        for falha in falhas:
+            print(f"  - {falha}")
+        return 1
+
+    print(f"\n{Colors.GREEN}✓ Nenhuma regressão (tolerância {args.tolerancia:.0%}){Colors.END}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,87 @@
+"""
+Fixtures dos testes da API contra o banco local em memória
+
+O mesmo cliente supabase-py fala com o PostgREST local (BANCO_LOCAL=true),
+então filtros, chaves únicas, RPCs e triggers são os do espelho do SQL.
+Cada teste começa com o banco e os caches de resposta vazios.
+"""
+
+import os
+import tempfile
+
+# Antes de qualquer import de app.*: get_settings() é cacheado
+_dir_temporario = tempfile.mkdtemp(prefix="solare-testes-")
+os.environ.update({
+    "BANCO_LOCAL": "true",
+    "SUPABASE_URL": "http://banco-local",
+    "SUPABASE_KEY": "chave-de-teste",
+    "SECRET_KEY": "segredo-de-teste",
+    "TAREFAS_TRABALHADORES": "0",
+    "ARMAZENAMENTO_DIR": os.path.join(_dir_temporario, "storage"),
+    "CACHE_RELATORIOS_DIR": os.path.join(_dir_temporario, "cache"),
+})
+
+from typing import Any, Dict, Optional  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.models.postgrest_local import BancoLocal, get_banco_local  # noqa: E402
+from app.services import cache_respostas, turmas  # noqa: E402
+
+
+@pytest.fixture
+def banco() -> BancoLocal:
+    banco = get_banco_local()
+    banco.limpar()
+    cache_respostas._caches.clear()
+    turmas._professores_coordenados = None
+    yield banco
+    banco.limpar()
+
+
+@pytest.fixture
+def cliente(banco) -> TestClient:
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+class Fabrica:
+    """Linhas mínimas gravadas direto no banco local (sem passar pela API)"""
+
+    def __init__(self, banco: BancoLocal):
+        self.banco = banco
+        self._contador = 0
+
+    def _proximo(self) -> int:
+        self._contador += 1
+        return self._contador
+
+    def escola(self, **campos) -> Dict[str, Any]:
+        return self.banco.inserir("escolas", [{"nome": f"Escola {self._proximo()}", **campos}])[0]
+
+    def turma(self, escola_id: str, **campos) -> Dict[str, Any]:
+        return self.banco.inserir("turmas", [{
+            "serie": "1º Ano", "turma": f"T{self._proximo()}", "periodo": "manha",
+            "nivel": "fundamental", "ano_letivo": 2026, "escola_id": escola_id, **campos,
+        }])[0]
+
+    def aluno(self, turma_id: str, **campos) -> Dict[str, Any]:
+        n = self._proximo()
+        return self.banco.inserir("alunos", [{
+            "matricula": f"M{n:05d}", "nome": f"Aluno {n}", "data_nascimento": "2018-03-01",
+            "turma_id": turma_id, **campos,
+        }])[0]
+
+    def relatorio(self, aluno_id: str, pdf_url: Optional[str] = None, **campos) -> Dict[str, Any]:
+        return self.banco.inserir("relatorios", [{
+            "aluno_id": aluno_id, "trimestre": 1, "ano": 2026, "texto_final": "Texto do relatório",
+            "pdf_url": pdf_url, **campos,
+        }])[0]
+
+
+@pytest.fixture
+def fabrica(banco) -> Fabrica:
+    return Fabrica(banco)
+
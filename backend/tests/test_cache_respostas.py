@@ -0,0 +1,136 @@
+"""
+Cache de respostas de GET /turmas: ETag, invalidação por escrita e partições
+
+As contagens (quantidade_atual) vêm dos alunos, então toda escrita em alunos
+precisa derrubar a listagem pela tag turma:<id>.
+"""
+
+import pytest
+
+from app.api.endpoints import turmas as endpoints_turmas
+from app.services.cache_respostas import CacheRespostas, invalidar_turmas, obter_cache_respostas
+
+URL_TURMAS = "/api/v1/turmas/"
+
+
+def _quantidades(resposta):
+    assert resposta.status_code == 200, resposta.text
+    return {t["id"]: t["quantidade_atual"] for t in resposta.json()}
+
+
+@pytest.fixture
+def escola(fabrica):
+    escola = fabrica.escola()
+    turma_a = fabrica.turma(escola["id"], turma="A")
+    turma_b = fabrica.turma(escola["id"], turma="B")
+    fabrica.aluno(turma_a["id"])
+    return {"escola": escola, "a": turma_a["id"], "b": turma_b["id"],
+            "headers": {"X-Escola-Id": escola["id"]}}
+
+
+def test_etag_repetida_responde_304(cliente, escola):
+    primeira = cliente.get(URL_TURMAS, headers=escola["headers"])
+    assert primeira.status_code == 200
+    etag = primeira.headers["ETag"]
+    assert primeira.headers["Cache-Control"] == "private, no-cache"
+
+    repetida = cliente.get(URL_TURMAS, headers={**escola["headers"], "If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert repetida.headers["ETag"] == etag
+
+    outra = cliente.get(URL_TURMAS, headers={**escola["headers"], "If-None-Match": '"outra-versao"'})
+    assert outra.status_code == 200
+    assert outra.json() == primeira.json()
+    assert obter_cache_respostas(escola["escola"]["id"]).estatisticas()["acertos"] == 2
+
+
+def test_criar_mover_e_desativar_aluno_atualizam_a_contagem(cliente, escola):
+    headers = escola["headers"]
+    antes = cliente.get(URL_TURMAS, headers=headers)
+    assert _quantidades(antes) == {escola["a"]: 1, escola["b"]: 0}
+
+    novo = cliente.post("/api/v1/alunos/", headers=headers, json={
+        "matricula": "NOVO-1", "nome": "Aluno Novo", "data_nascimento": "2018-05-05", "turma_id": escola["a"],
+    })
+    assert novo.status_code == 201, novo.text
+    depois_criar = cliente.get(URL_TURMAS, headers={**headers, "If-None-Match": antes.headers["ETag"]})
+    assert _quantidades(depois_criar) == {escola["a"]: 2, escola["b"]: 0}
+
+    movido = cliente.patch(f"/api/v1/alunos/{novo.json()['id']}", headers=headers, json={"turma_id": escola["b"]})
+    assert movido.status_code == 200, movido.text
+    depois_mover = cliente.get(URL_TURMAS, headers={**headers, "If-None-Match": depois_criar.headers["ETag"]})
+    assert _quantidades(depois_mover) == {escola["a"]: 1, escola["b"]: 1}
+
+    desativado = cliente.delete(f"/api/v1/alunos/{novo.json()['id']}", headers=headers)
+    assert desativado.status_code == 200, desativado.text
+    depois_desativar = cliente.get(URL_TURMAS, headers={**headers, "If-None-Match": depois_mover.headers["ETag"]})
+    assert _quantidades(depois_desativar) == {escola["a"]: 1, escola["b"]: 0}
+    assert depois_desativar.headers["ETag"] == antes.headers["ETag"]  # Mesmo conteúdo, mesma versão
+
+
+def test_leitura_anterior_a_escrita_nao_fica_em_cache(cliente, escola, fabrica, monkeypatch):
+    contar = endpoints_turmas.contar_alunos_ativos
+
+    async def contar_com_escrita_concorrente(turma_ids):
+        contagens = await contar(turma_ids)
+        # Outra requisição grava um aluno depois desta leitura e antes do guardar()
+        fabrica.aluno(escola["a"])
+        invalidar_turmas([escola["a"]])
+        return contagens
+
+    monkeypatch.setattr(endpoints_turmas, "contar_alunos_ativos", contar_com_escrita_concorrente)
+    desatualizada = cliente.get(URL_TURMAS, headers=escola["headers"])
+    assert _quantidades(desatualizada) == {escola["a"]: 1, escola["b"]: 0}
+    assert obter_cache_respostas(escola["escola"]["id"]).estatisticas()["entradas"] == 0
+
+    monkeypatch.setattr(endpoints_turmas, "contar_alunos_ativos", contar)
+    atual = cliente.get(URL_TURMAS, headers=escola["headers"])
+    assert _quantidades(atual) == {escola["a"]: 2, escola["b"]: 0}
+
+
+def test_guardar_descarta_versao_lida_antes_de_invalidar():
+    cache = CacheRespostas(max_entradas=10, ttl_segundos=60)
+    versao = cache.versao
+    cache.invalidar("turma:x")
+    cache.guardar("chave", b"[]", '"e"', ["turma:x"], versao)
+    assert cache.obter("chave") is None
+
+    cache.guardar("chave", b"[]", '"e"', ["turma:x"], cache.versao)
+    assert cache.obter("chave") is not None
+
+
+def test_lru_respeita_o_limite_e_invalida_por_tag():
+    cache = CacheRespostas(max_entradas=2, ttl_segundos=60)
+    for chave, tag in (("um", "turma:1"), ("dois", "turma:2")):
+        cache.guardar(chave, b"[]", '"e"', [tag], cache.versao)
+    cache.obter("um")  # "dois" passa a ser a menos usada
+    cache.guardar("tres", b"[]", '"e"', ["turma:1"], cache.versao)
+    assert cache.obter("dois") is None
+
+    assert cache.invalidar("turma:1") == 2
+    assert cache.estatisticas()["entradas"] == 0
+
+
+def test_cada_escola_tem_sua_particao(cliente, fabrica):
+    escola_1, escola_2 = fabrica.escola(), fabrica.escola()
+    turma_1 = fabrica.turma(escola_1["id"])
+    turma_2 = fabrica.turma(escola_2["id"])
+    headers_1, headers_2 = {"X-Escola-Id": escola_1["id"]}, {"X-Escola-Id": escola_2["id"]}
+
+    # Mesma chave de cache (mesmos filtros), respostas de escolas diferentes
+    assert list(_quantidades(cliente.get(URL_TURMAS, headers=headers_1))) == [turma_1["id"]]
+    assert list(_quantidades(cliente.get(URL_TURMAS, headers=headers_2))) == [turma_2["id"]]
+    assert set(_quantidades(cliente.get(URL_TURMAS))) == {turma_1["id"], turma_2["id"]}
+
+    # Escrita na escola 1: derruba a partição dela e a sem escola (admin), não a da escola 2
+    criado = cliente.post("/api/v1/alunos/", headers=headers_1, json={
+        "matricula": "P-1", "nome": "Aluno Um", "data_nascimento": "2018-05-05", "turma_id": turma_1["id"],
+    })
+    assert criado.status_code == 201, criado.text
+    assert obter_cache_respostas(escola_1["id"]).estatisticas()["entradas"] == 0
+    assert obter_cache_respostas(None).estatisticas()["entradas"] == 0
+    assert obter_cache_respostas(escola_2["id"]).estatisticas()["entradas"] == 1
+
+    assert _quantidades(cliente.get(URL_TURMAS, headers=headers_1)) == {turma_1["id"]: 1}
+    assert _quantidades(cliente.get(URL_TURMAS)) == {turma_1["id"]: 1, turma_2["id"]: 0}
@@ -0,0 +1,94 @@
+"""
+Isolamento entre escolas (X-Escola-Id)
+
+Id de outra escola responde 404, como se não existisse, e nada é alterado.
+Sem header a requisição é de admin e vê todas as escolas.
+"""
+
+import pytest
+
+from app.services.armazenamento import obter_armazenamento
+from app.services.links_pdf import link_assinado
+
+
+@pytest.fixture
+def escolas(fabrica):
+    """Escola A com turma, aluno e relatório com PDF; escola B vazia"""
+    escola_a, escola_b = fabrica.escola(), fabrica.escola()
+    turma = fabrica.turma(escola_a["id"])
+    aluno = fabrica.aluno(turma["id"])
+    chave = f"relatorios/{escola_a['id']}/2026/1/{aluno['id']}-teste.pdf"
+    armazenamento = obter_armazenamento()
+    armazenamento.salvar(chave, b"%PDF-1.4 teste")
+    relatorio = fabrica.relatorio(aluno["id"], pdf_url=armazenamento.url(chave))
+    return {
+        "turma": turma, "aluno": aluno, "relatorio": relatorio,
+        "a": {"X-Escola-Id": escola_a["id"]}, "b": {"X-Escola-Id": escola_b["id"]},
+    }
+
+
+LEITURAS = [
+    "/api/v1/turmas/{turma}",
+    "/api/v1/turmas/{turma}/alunos-count",
+    "/api/v1/alunos/{aluno}",
+    "/api/v1/alunos/turma/{turma}",
+    "/api/v1/relatorios/{relatorio}/pdf",
+    "/api/v1/relatorios/consolidacao/turma/{turma}?trimestre=1&ano=2026",
+]
+
+
+def _url(modelo, escolas):
+    return modelo.format(turma=escolas["turma"]["id"], aluno=escolas["aluno"]["id"],
+                         relatorio=escolas["relatorio"]["id"])
+
+
+@pytest.mark.parametrize("modelo", LEITURAS)
+def test_leitura_de_outra_escola_responde_404(cliente, escolas, modelo):
+    url = _url(modelo, escolas)
+    assert cliente.get(url, headers=escolas["b"]).status_code == 404
+    assert cliente.get(url, headers=escolas["a"]).status_code == 200
+    assert cliente.get(url).status_code == 200  # Admin
+
+
+@pytest.mark.parametrize("modelo, tabela, chave, corpo", [
+    ("/api/v1/turmas/{turma}", "turmas", "turma", {"turma": "Z"}),
+    ("/api/v1/alunos/{aluno}", "alunos", "aluno", {"nome": "Nome Trocado"}),
+])
+def test_edicao_de_outra_escola_responde_404_e_nao_altera(cliente, escolas, banco, modelo, tabela, chave, corpo):
+    url = _url(modelo, escolas)
+    assert cliente.patch(url, json=corpo, headers=escolas["b"]).status_code == 404
+    assert banco.buscar_por_id(tabela, escolas[chave]["id"]) == escolas[chave]
+    assert cliente.patch(url, json=corpo, headers=escolas["a"]).status_code == 200
+
+
+@pytest.mark.parametrize("modelo, tabela, chave", [
+    ("/api/v1/turmas/{turma}", "turmas", "turma"),
+    ("/api/v1/alunos/{aluno}", "alunos", "aluno"),
+])
+def test_exclusao_de_outra_escola_responde_404_e_nao_desativa(cliente, escolas, banco, modelo, tabela, chave):
+    url = _url(modelo, escolas)
+    assert cliente.delete(url, headers=escolas["b"]).status_code == 404
+    assert banco.buscar_por_id(tabela, escolas[chave]["id"])["ativo"] is True
+    assert cliente.delete(url, headers=escolas["a"]).status_code == 200
+    assert banco.buscar_por_id(tabela, escolas[chave]["id"])["ativo"] is False
+
+
+def test_listagens_de_outra_escola_vem_vazias(cliente, escolas):
+    assert cliente.get("/api/v1/turmas/", headers=escolas["b"]).json() == []
+    assert cliente.get("/api/v1/alunos/", headers=escolas["b"]).json() == []
+    assert [t["id"] for t in cliente.get("/api/v1/turmas/", headers=escolas["a"]).json()] == [escolas["turma"]["id"]]
+    assert [a["id"] for a in cliente.get("/api/v1/alunos/", headers=escolas["a"]).json()] == [escolas["aluno"]["id"]]
+
+
+def test_tarefas_em_lote_nao_aceitam_turma_de_outra_escola(cliente, escolas):
+    url = _url("/api/v1/relatorios/pdf/turma/{turma}", escolas)
+    assert cliente.post(url, json={"trimestre": 1, "ano": 2026}, headers=escolas["b"]).status_code == 404
+    assert cliente.post(url, json={"trimestre": 1, "ano": 2026}, headers=escolas["a"]).status_code == 202
+
+
+def test_pdf_pelo_link_assinado_dispensa_escola_mas_confere_assinatura(cliente, escolas):
+    link = link_assinado(escolas["relatorio"]["id"])
+    resposta = cliente.get(link)
+    assert resposta.status_code == 200
+    assert resposta.content == b"%PDF-1.4 teste"
+    assert cliente.get(link[:-1] + ("0" if link[-1] != "0" else "1")).status_code == 403
@@ -0,0 +1,127 @@
+"""
+Importação de alunos (POST /alunos/importar)
+
+Arquivos como o Excel pt-BR exporta, matrícula única por escola (no banco e
+no próprio arquivo), capacidade das turmas e simulação sem gravar.
+"""
+
+import pytest
+
+URL_IMPORTAR = "/api/v1/alunos/importar"
+
+
+def _csv(linhas, separador=",", codificacao="utf-8"):
+    cabecalho = separador.join(["matricula", "nome", "data_nascimento", "turma_id"])
+    return "\n".join([cabecalho, *(separador.join(linha) for linha in linhas)]).encode(codificacao)
+
+
+def _importar(cliente, conteudo, headers=None, **params):
+    resposta = cliente.post(URL_IMPORTAR, files={"arquivo": ("alunos.csv", conteudo, "text/csv")},
+                            headers=headers or {}, params=params)
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()
+
+
+def _erros(resultado):
+    return {erro["linha"]: erro["erros"] for erro in resultado["erros"]}
+
+
+@pytest.fixture
+def escolas(fabrica):
+    escola_a, escola_b = fabrica.escola(), fabrica.escola()
+    return {
+        "turma_a": fabrica.turma(escola_a["id"])["id"],
+        "turma_b": fabrica.turma(escola_b["id"])["id"],
+        "a": {"X-Escola-Id": escola_a["id"]},
+        "b": {"X-Escola-Id": escola_b["id"]},
+    }
+
+
+def test_csv_com_ponto_e_virgula_em_latin1(cliente, escolas, banco):
+    conteudo = _csv([
+        ("L-1", "João Conceição", "2018-04-01", escolas["turma_a"]),
+        ("L-2", "Maria Antônia", "2018-07-15", escolas["turma_a"]),
+    ], separador=";", codificacao="latin-1")
+
+    resultado = _importar(cliente, conteudo, escolas["a"])
+    assert (resultado["total_linhas"], resultado["importados"], resultado["erros"]) == (2, 2, [])
+    assert sorted(a["nome"] for a in banco.tabelas["alunos"]) == ["João Conceição", "Maria Antônia"]
+
+
+def test_matricula_repetida_no_arquivo(cliente, escolas, banco):
+    conteudo = _csv([
+        ("R-1", "Primeiro Aluno", "2018-04-01", escolas["turma_a"]),
+        ("R-2", "Segundo Aluno", "2018-04-01", escolas["turma_a"]),
+        ("R-1", "Repetido Aluno", "2018-04-01", escolas["turma_a"]),
+    ])
+
+    resultado = _importar(cliente, conteudo, escolas["a"])
+    assert resultado["importados"] == 2
+    assert _erros(resultado) == {4: ["Matrícula 'R-1' repetida no arquivo (linha 2)"]}
+    assert sorted(a["nome"] for a in banco.tabelas["alunos"]) == ["Primeiro Aluno", "Segundo Aluno"]
+
+
+def test_matricula_em_uso_so_conflita_na_mesma_escola(cliente, escolas, fabrica):
+    fabrica.aluno(escolas["turma_a"], matricula="E-1")
+    fabrica.aluno(escolas["turma_b"], matricula="E-2")
+    conteudo = _csv([
+        ("E-1", "Já Existe", "2018-04-01", escolas["turma_a"]),
+        ("E-2", "Existe Em Outra", "2018-04-01", escolas["turma_a"]),
+    ])
+
+    resultado = _importar(cliente, conteudo, escolas["a"])
+    assert resultado["importados"] == 1
+    assert _erros(resultado) == {2: ["Matrícula 'E-1' já está em uso"]}
+
+
+def test_admin_importa_mesma_matricula_em_escolas_diferentes(cliente, escolas, banco):
+    conteudo = _csv([
+        ("D-1", "Aluno Escola A", "2018-04-01", escolas["turma_a"]),
+        ("D-1", "Aluno Escola B", "2018-04-01", escolas["turma_b"]),
+        ("D-1", "Repetido Na B", "2018-04-01", escolas["turma_b"]),
+    ])
+
+    resultado = _importar(cliente, conteudo)  # Sem X-Escola-Id
+    assert resultado["importados"] == 2
+    assert _erros(resultado) == {4: ["Matrícula 'D-1' repetida no arquivo (linha 3)"]}
+    assert {(a["escola_id"], a["matricula"]) for a in banco.tabelas["alunos"]} == {
+        (escolas["a"]["X-Escola-Id"], "D-1"), (escolas["b"]["X-Escola-Id"], "D-1"),
+    }
+
+
+def test_turma_de_outra_escola_nao_e_encontrada(cliente, escolas):
+    conteudo = _csv([("O-1", "Aluno Outra", "2018-04-01", escolas["turma_b"])])
+
+    resultado = _importar(cliente, conteudo, escolas["a"])
+    assert resultado["importados"] == 0
+    assert _erros(resultado) == {2: [f"Turma com ID '{escolas['turma_b']}' não encontrada"]}
+
+
+def test_turma_na_capacidade_maxima(cliente, fabrica, banco):
+    escola = fabrica.escola()
+    turma = fabrica.turma(escola["id"], capacidade_maxima=2)
+    fabrica.aluno(turma["id"])
+    conteudo = _csv([
+        ("C-1", "Cabe Na Turma", "2018-04-01", turma["id"]),
+        ("C-2", "Não Cabe Mais", "2018-04-01", turma["id"]),
+    ])
+
+    resultado = _importar(cliente, conteudo, {"X-Escola-Id": escola["id"]})
+    assert resultado["importados"] == 1
+    assert _erros(resultado) == {3: ["Turma já atingiu a capacidade máxima"]}
+    assert len(banco.tabelas["alunos"]) == 2
+
+
+def test_simulacao_valida_sem_gravar(cliente, escolas, banco):
+    conteudo = _csv([
+        ("S-1", "Aluno Simulado", "2018-04-01", escolas["turma_a"]),
+        ("S-2", "Outro Simulado", "2099-01-01", escolas["turma_a"]),
+    ])
+
+    resultado = _importar(cliente, conteudo, escolas["a"], simular="true")
+    assert resultado["simulacao"] is True
+    assert (resultado["validos"], resultado["importados"]) == (1, 0)
+    assert _erros(resultado) == {3: ["Data de nascimento não pode ser futura"]}
+    assert banco.tabelas["alunos"] == []
+
+    assert _importar(cliente, conteudo, escolas["a"])["importados"] == 1
@@ -0,0 +1,84 @@
+"""
+Paginação por cursor de GET /alunos (X-Next-Cursor)
+
+Percorrer as páginas precisa devolver cada aluno exatamente uma vez, na
+ordem (coluna, id), inclusive com valores repetidos na coluna ordenada.
+"""
+
+import base64
+import json
+import random
+
+import pytest
+
+from app.services.paginacao import codificar_cursor
+
+URL_ALUNOS = "/api/v1/alunos/"
+NOMES = ["Ana Souza", "Bruno Lima", "Ana Souza", "Carla Dias", "Bruno Lima", "Ana Souza"]
+DATAS = ["2018-01-10", "2018-06-20", "2019-02-01"]
+
+
+@pytest.fixture
+def alunos(fabrica):
+    """37 alunos em duas turmas; nomes e datas muito repetidos (desempate por id)"""
+    rng = random.Random(7)
+    escola = fabrica.escola()
+    turmas = [fabrica.turma(escola["id"]) for _ in range(2)]
+    linhas = [
+        fabrica.aluno(rng.choice(turmas)["id"], nome=rng.choice(NOMES), data_nascimento=rng.choice(DATAS))
+        for _ in range(37)
+    ]
+    fabrica.aluno(turmas[0]["id"], ativo=False)  # Fora da listagem padrão
+    return {"linhas": linhas, "headers": {"X-Escola-Id": escola["id"]}}
+
+
+def _percorrer(cliente, headers, **params):
+    paginas, cursor = [], None
+    while True:
+        resposta = cliente.get(URL_ALUNOS, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert resposta.status_code == 200, resposta.text
+        paginas.append([a["id"] for a in resposta.json()])
+        cursor = resposta.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return paginas
+        assert len(paginas) < 100, "cursor não avança"
+
+
+@pytest.mark.parametrize("ordenar_por, coluna", [
+    ("nome", "nome"), ("matricula", "matricula"), ("idade", "data_nascimento"),
+])
+@pytest.mark.parametrize("limite", [1, 5, 10, 37, 100])
+def test_paginas_trazem_cada_aluno_uma_vez_na_ordem(cliente, alunos, ordenar_por, coluna, limite):
+    paginas = _percorrer(cliente, alunos["headers"], ordenar_por=ordenar_por, limite=limite)
+
+    esperado = [a["id"] for a in sorted(alunos["linhas"], key=lambda a: (a[coluna], a["id"]))]
+    assert [id_ for pagina in paginas for id_ in pagina] == esperado
+    assert all(len(pagina) == limite for pagina in paginas[:-1])
+    assert 1 <= len(paginas[-1]) <= limite
+
+
+def test_cursor_respeita_os_filtros(cliente, alunos):
+    turma_id = alunos["linhas"][0]["turma_id"]
+    paginas = _percorrer(cliente, alunos["headers"], turma_id=turma_id, limite=4)
+
+    esperado = sorted((a for a in alunos["linhas"] if a["turma_id"] == turma_id), key=lambda a: (a["nome"], a["id"]))
+    assert [id_ for pagina in paginas for id_ in pagina] == [a["id"] for a in esperado]
+
+
+def _base64(dados) -> str:
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "isto-nao-e-base64!",
+    "%%%",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),       # Não é UTF-8
+    _base64("texto"),                                     # JSON que não é objeto
+    _base64([1, 2]),
+    _base64({"c": "nome", "v": "Ana"}),                   # Sem id
+    _base64({"c": "nome", "id": "x"}),                    # Sem valor
+    codificar_cursor("matricula", "M00001", "x"),         # Outra ordenação
+])
+def test_cursor_malformado_responde_400(cliente, alunos, cursor):
+    resposta = cliente.get(URL_ALUNOS, headers=alunos["headers"], params={"cursor": cursor})
+    assert resposta.status_code == 400, resposta.text
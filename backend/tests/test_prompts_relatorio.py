@@ -0,0 +1,26 @@
+"""
+Tamanho do prefixo estável dos prompts de relatório
+
+Abaixo de MIN_TOKENS_CACHE_PREFIXO os provedores não cacheiam o prefixo e
+cada chamada paga o texto inteiro.
+"""
+
+import pytest
+
+from app.services.prompts_relatorio import MIN_TOKENS_CACHE_PREFIXO, estimar_tokens, prefixo_prompt
+
+
+@pytest.mark.parametrize("nivel", ["infantil", "fundamental"])
+def test_prefixo_passa_do_minimo_de_cache(nivel):
+    tokens = estimar_tokens(prefixo_prompt(nivel))
+    assert tokens >= MIN_TOKENS_CACHE_PREFIXO, (
+        f"Prefixo de {nivel} com ~{tokens} tokens, abaixo do mínimo de cache ({MIN_TOKENS_CACHE_PREFIXO})"
+    )
+
+
+@pytest.mark.parametrize("nivel", ["infantil", "fundamental"])
+def test_prefixo_identico_entre_chamadas(nivel):
+    prefixo_prompt.cache_clear()
+    primeiro = prefixo_prompt(nivel)
+    prefixo_prompt.cache_clear()
+    assert prefixo_prompt(nivel) == primeiro
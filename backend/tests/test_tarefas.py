@@ -0,0 +1,259 @@
+"""
+Garantias da fila de tarefas contra o banco local
+
+Dono da tarefa (trabalhador) em cada escrita, cancelamento, devolução à
+fila no desligamento, limite de tentativas e recuperação de órfãs.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import get_settings
+from app.models.database import get_supabase, executar
+from app.services import tarefas
+from app.services.tarefas import (
+    PoolTrabalhadores, cancelar_tarefa, enfileirar, obter_tarefa, tipo_tarefa,
+)
+
+
+@pytest.fixture
+def ajustes(monkeypatch):
+    """Heartbeat rápido para os testes não esperarem segundos"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "tarefas_heartbeat_segundos", 0.02)
+    monkeypatch.setattr(settings, "tarefas_max_tentativas", 2)
+    return settings
+
+
+@pytest.fixture
+def executores(monkeypatch):
+    """Tipos de tarefa de teste: registrados só durante o teste"""
+    monkeypatch.setattr(tarefas, "TIPOS_TAREFA", dict(tarefas.TIPOS_TAREFA))
+    execucoes = {"iniciadas": 0, "concluidas": 0}
+
+    @tipo_tarefa("teste_rapida")
+    async def _rapida(parametros, contexto):
+        execucoes["iniciadas"] += 1
+        await asyncio.sleep(parametros.get("segundos", 0))
+        contexto.progresso(1, 1)
+        execucoes["concluidas"] += 1
+        return {"ok": True}
+
+    @tipo_tarefa("teste_infinita")
+    async def _infinita(parametros, contexto):
+        execucoes["iniciadas"] += 1
+        await asyncio.Event().wait()
+
+    @tipo_tarefa("teste_falha")
+    async def _falha(parametros, contexto):
+        execucoes["iniciadas"] += 1
+        raise RuntimeError("executor quebrou")
+
+    return execucoes
+
+
+def _rodar(corrotina):
+    return asyncio.run(corrotina)
+
+
+async def _enfileirar_e_reservar(tipo, trabalhador="teste:0", **parametros):
+    criada = await enfileirar(tipo, parametros)
+    reservada = await tarefas._reservar(trabalhador)
+    assert reservada["id"] == criada["id"]
+    return reservada
+
+
+def test_atualizar_exige_o_trabalhador_dono(banco, executores):
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_rapida", "teste:0")
+        assert await tarefas._atualizar(tarefa["id"], "teste:1", {"progresso_feito": 9}) is None
+        atual = await tarefas._atualizar(tarefa["id"], "teste:0", {"progresso_feito": 1})
+        assert atual["progresso_feito"] == 1
+        # Status diferente do esperado também não grava
+        assert await tarefas._atualizar(tarefa["id"], "teste:0", {"progresso_feito": 2}, status="pendente") is None
+        return await obter_tarefa(tarefa["id"])
+
+    assert _rodar(cenario())["progresso_feito"] == 1
+
+
+def test_executar_conclui_e_grava_resultado(banco, executores, ajustes):
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_rapida", segundos=0.05)
+        await PoolTrabalhadores(1)._executar(tarefa, "teste:0")
+        return await obter_tarefa(tarefa["id"])
+
+    final = _rodar(cenario())
+    assert final["status"] == "concluida"
+    assert final["resultado"] == {"ok": True}
+    assert (final["progresso_feito"], final["progresso_total"]) == (1, 1)
+    assert final["concluida_em"] is not None
+
+
+def test_cancelar_pendente_finaliza_na_hora(banco, executores):
+    async def cenario():
+        criada = await enfileirar("teste_rapida", {})
+        tarefa, cancelou = await cancelar_tarefa(criada["id"])
+        reservada = await tarefas._reservar("teste:0")
+        return tarefa, cancelou, reservada
+
+    tarefa, cancelou, reservada = _rodar(cenario())
+    assert cancelou
+    assert tarefa["status"] == "cancelada"
+    assert tarefa["concluida_em"] is not None
+    assert reservada is None  # Não volta a ser reservada
+
+
+def test_cancelar_em_execucao_interrompe_no_heartbeat(banco, executores, ajustes):
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_infinita")
+        execucao = asyncio.create_task(PoolTrabalhadores(1)._executar(tarefa, "teste:0"))
+        await asyncio.sleep(0.05)
+        pedido, cancelou = await cancelar_tarefa(tarefa["id"])
+        assert cancelou
+        assert pedido["status"] == "executando"  # Só o pedido; o trabalhador interrompe
+        assert pedido["cancelamento_solicitado"] is True
+        await asyncio.wait_for(execucao, 2)
+        return await obter_tarefa(tarefa["id"])
+
+    final = _rodar(cenario())
+    assert final["status"] == "cancelada"
+    assert final["concluida_em"] is not None
+
+
+def test_cancelar_finalizada_nao_muda_nada(banco, executores, ajustes):
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_rapida")
+        await PoolTrabalhadores(1)._executar(tarefa, "teste:0")
+        return await cancelar_tarefa(tarefa["id"])
+
+    tarefa, cancelou = _rodar(cenario())
+    assert not cancelou
+    assert tarefa["status"] == "concluida"
+    assert tarefa["cancelamento_solicitado"] is False
+
+
+def test_desligamento_devolve_a_fila_sem_gastar_tentativa(banco, executores, ajustes):
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_infinita")
+        assert tarefa["tentativas"] == 1
+        execucao = asyncio.create_task(PoolTrabalhadores(1)._executar(tarefa, "teste:0"))
+        await asyncio.sleep(0.05)
+        execucao.cancel()  # O que parar() faz com os laços
+        with pytest.raises(asyncio.CancelledError):
+            await execucao
+        return await obter_tarefa(tarefa["id"])
+
+    final = _rodar(cenario())
+    assert final["status"] == "pendente"
+    assert final["trabalhador"] is None
+    assert final["tentativas"] == 0
+
+
+def test_falha_volta_a_fila_ate_esgotar_tentativas(banco, executores, ajustes):
+    async def cenario():
+        criada = await enfileirar("teste_falha", {})
+        assert criada["max_tentativas"] == 2
+        estados = []
+        for _ in range(3):
+            tarefa = await tarefas._reservar("teste:0")
+            if tarefa is None:
+                break
+            await PoolTrabalhadores(1)._executar(tarefa, "teste:0")
+            estados.append(await obter_tarefa(criada["id"]))
+        return estados
+
+    estados = _rodar(cenario())
+    assert [e["status"] for e in estados] == ["pendente", "falhou"]
+    assert estados[0]["erro"] == "RuntimeError: executor quebrou"
+    assert estados[0]["trabalhador"] is None and estados[0]["concluida_em"] is None
+    assert estados[1]["tentativas"] == 2
+    assert estados[1]["concluida_em"] is not None
+    assert executores["iniciadas"] == 2
+
+
+def test_orfa_volta_a_fila_e_antigo_dono_nao_grava_mais(banco, executores, ajustes):
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_rapida", "teste:0")
+        atrasado = (datetime.now(timezone.utc) - timedelta(seconds=ajustes.tarefas_orfa_segundos + 1)).isoformat()
+        banco.atualizar("tarefas", lambda t: t["id"] == tarefa["id"], {"heartbeat_em": atrasado})
+        recuperadas = await executar(
+            get_supabase().rpc("recuperar_tarefas_orfas", {"p_segundos": ajustes.tarefas_orfa_segundos})
+        )
+        assert recuperadas.data == 1
+        devolvida = await obter_tarefa(tarefa["id"])
+        assert (devolvida["status"], devolvida["erro"]) == ("pendente", "Trabalhador parou de responder")
+
+        nova = await tarefas._reservar("teste:1")
+        assert nova["id"] == tarefa["id"] and nova["tentativas"] == 2
+        # O antigo dono termina depois: nenhuma escrita dele chega à linha
+        await PoolTrabalhadores(1)._executar(tarefa, "teste:0")
+        return await obter_tarefa(tarefa["id"])
+
+    final = _rodar(cenario())
+    assert final["status"] == "executando"
+    assert final["trabalhador"] == "teste:1"
+
+
+def test_execucao_perdida_e_interrompida_no_heartbeat(banco, executores, ajustes):
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_infinita", "teste:0")
+        execucao = asyncio.create_task(PoolTrabalhadores(1)._executar(tarefa, "teste:0"))
+        await asyncio.sleep(0.05)
+        # O vigia de outro processo devolveu e outro trabalhador reservou
+        banco.atualizar("tarefas", lambda t: t["id"] == tarefa["id"], {"trabalhador": "teste:1"})
+        await asyncio.wait_for(execucao, 2)
+        return await obter_tarefa(tarefa["id"])
+
+    final = _rodar(cenario())
+    assert final["status"] == "executando"
+    assert final["trabalhador"] == "teste:1"
+    assert final["concluida_em"] is None
+
+
+def test_heartbeat_com_falha_nao_abandona_a_execucao(banco, executores, ajustes, monkeypatch):
+    atualizar = tarefas._atualizar
+    falhas = {"heartbeats": 0}
+
+    async def atualizar_instavel(tarefa_id, trabalhador, dados, status="executando"):
+        if "heartbeat_em" in dados and falhas["heartbeats"] < 3:
+            falhas["heartbeats"] += 1
+            raise ConnectionError("PostgREST fora do ar")
+        return await atualizar(tarefa_id, trabalhador, dados, status)
+
+    monkeypatch.setattr(tarefas, "_atualizar", atualizar_instavel)
+
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_rapida", segundos=0.2)
+        await PoolTrabalhadores(1)._executar(tarefa, "teste:0")
+        return await obter_tarefa(tarefa["id"])
+
+    final = _rodar(cenario())
+    assert falhas["heartbeats"] == 3
+    assert final["status"] == "concluida"
+    assert executores == {"iniciadas": 1, "concluidas": 1}
+
+
+class Interrupcao(BaseException):
+    """Saída que não é Exception (como KeyboardInterrupt/SystemExit)"""
+
+
+def test_saida_inesperada_cancela_a_execucao(banco, executores, ajustes, monkeypatch):
+    atualizar = tarefas._atualizar
+
+    async def atualizar_interrompido(tarefa_id, trabalhador, dados, status="executando"):
+        if "heartbeat_em" in dados:
+            raise Interrupcao
+        return await atualizar(tarefa_id, trabalhador, dados, status)
+
+    monkeypatch.setattr(tarefas, "_atualizar", atualizar_interrompido)
+
+    async def cenario():
+        tarefa = await _enfileirar_e_reservar("teste_infinita")
+        antes = set(asyncio.all_tasks())
+        with pytest.raises(Interrupcao):
+            await PoolTrabalhadores(1)._executar(tarefa, "teste:0")
+        return set(asyncio.all_tasks()) - antes
+
+    assert _rodar(cenario()) == set()  # Nenhuma execução ficou rodando sem dono
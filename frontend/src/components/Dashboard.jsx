@@ -6,6 +6,7 @@ import api from '../services/api'
 function Dashboard() {
   const navigate = useNavigate()
   const [turmas, setTurmas] = useState([])
+  const [totais, setTotais] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   
@@ -26,14 +27,17 @@ function Dashboard() {
     try {
       setLoading(true)
       
-      // Por enquanto, passar tipo de usuário como query param
-      const response = await api.get('/turmas', {
+      // Uma chamada traz turmas, avaliações do dia e relatórios do trimestre
+      // Por enquanto, passar usuário como query param
+      const response = await api.get('/dashboard', {
         params: {
+          usuario_id: usuario.id,
           usuario_tipo: usuario.tipo,
         }
       })
       
-      setTurmas(response.data)
+      setTurmas(response.data.turmas)
+      setTotais(response.data.totais)
       setError(null)
     } catch (err) {
       setError('Erro ao carregar turmas')
@@ -121,7 +125,7 @@ function Dashboard() {
               <div className="flex items-center justify-between mb-4">
                 <div>
                   <p className="text-3xl font-bold text-orange-600">
-                    {turma.quantidade_atual || 0}
+                    {turma.alunos_ativos}
                   </p>
                   <p className="text-gray-600 text-sm">alunos</p>
                 </div>
@@ -135,6 +139,11 @@ function Dashboard() {
               <div className="space-y-2 text-sm text-gray-600 mb-4">
                 <p>📅 Ano: {turma.ano_letivo}</p>
                 <p>🕐 Período: {turma.periodo}</p>
+                <p>✅ Avaliados hoje: {turma.avaliacoes_hoje.concluidas}/{turma.alunos_ativos}</p>
+                <p>📝 Relatórios aprovados: {turma.relatorios.aprovado}/{turma.alunos_ativos}</p>
+                {turma.necessidades_especiais > 0 && (
+                  <p>💛 Necessidades especiais: {turma.necessidades_especiais}</p>
+                )}
               </div>
               
               <button className="w-full bg-orange-500 hover:bg-orange-600 text-white font-medium py-2 px-4 rounded-lg transition-colors duration-200 group-hover:scale-105 transform">
@@ -146,14 +155,15 @@ function Dashboard() {
       </div>
 
       {/* Card de resumo */}
-      {turmas.length > 0 && (
+      {totais && turmas.length > 0 && (
         <div className="mt-8 bg-gradient-to-r from-orange-100 to-yellow-100 rounded-xl p-6">
           <h3 className="text-lg font-semibold text-gray-800 mb-2">
             📊 Resumo do Dia
           </h3>
           <p className="text-gray-600">
-            Você tem <span className="font-bold text-orange-600">{turmas.length} turmas</span> com 
-            <span className="font-bold text-orange-600"> {turmas.reduce((total, turma) => total + (turma.quantidade_atual || 0), 0)} alunos</span> no total para avaliar hoje.
+            Você tem <span className="font-bold text-orange-600">{totais.turmas} turmas</span> com 
+            <span className="font-bold text-orange-600"> {totais.alunos_ativos} alunos</span> no total;
+            <span className="font-bold text-orange-600"> {totais.avaliacoes_pendentes}</span> ainda sem avaliação hoje.
           </p>
         </div>
       )}
@@ -9,6 +9,17 @@ const api = axios.create({
   }
 })
 
+// Escola do usuário logado: o backend filtra todos os dados por ela
+const escolaAtual = () => JSON.parse(localStorage.getItem('usuario') || '{}').escola_id
+
+api.interceptors.request.use(config => {
+  const escolaId = escolaAtual()
+  if (escolaId) {
+    config.headers['X-Escola-Id'] = escolaId
+  }
+  return config
+})
+
 // Interceptor para log de erros (útil para debug)
 api.interceptors.response.use(
   response => response,
@@ -18,4 +29,40 @@ api.interceptors.response.use(
   }
 )
 
-export default api
\ No newline at end of file
+export default api
+
+// Gera o rascunho de um aluno recebendo o texto em trechos (Server-Sent Events)
+// params: { trimestre, usuario_id, ano?, provedor?, modelo?, ignorar_cache? }
+// Retorna uma função que cancela a geração
+export function transmitirRascunho(alunoId, params, { onInicio, onTexto, onFim, onErro } = {}) {
+  // EventSource não envia headers: a escola vai na query
+  const query = new URLSearchParams(
+    Object.entries({ ...params, escola: escolaAtual() })
+      .filter(([, valor]) => valor !== undefined && valor !== null)
+  )
+  const fonte = new EventSource(
+    `${api.defaults.baseURL}/relatorios/gerar/aluno/${alunoId}/stream?${query}`
+  )
+  const dados = evento => JSON.parse(evento.data)
+
+  fonte.addEventListener('inicio', evento => onInicio?.(dados(evento)))
+  fonte.addEventListener('texto', evento => onTexto?.(dados(evento).texto))
+  fonte.addEventListener('fim', evento => {
+    fonte.close()
+    onFim?.(dados(evento))
+  })
+  fonte.addEventListener('erro', evento => {
+    fonte.close()
+    onErro?.(dados(evento).detail)
+  })
+  // Falha de conexão ou 4xx/5xx: fecha para o EventSource não reconectar
+  // (reconectar dispararia uma nova geração)
+  fonte.onerror = () => {
+    if (fonte.readyState !== EventSource.CLOSED) {
+      fonte.close()
+      onErro?.('Falha na conexão com o servidor')
+    }
+  }
+
+  return () => fonte.close()
+}